@@ -2,6 +2,7 @@
 BERT分類モデルクライアント
 Hugging Face Transformersを使用して発言を分類
 """
+import asyncio
 import torch
 from typing import List, Dict, Any, Tuple
 from transformers import (
@@ -54,33 +55,138 @@ class BERTClassifier:
         ]
         
         class DummyClassifier:
-            def __init__(self, categories):
+            """
+            窓単位のバッチを受け取り、カテゴリごとのlogitsを返すダミー分類器
+            
+            実モデルに差し替える場合も入出力（input_idsのバッチ → logits）は同じ
+            """
+            def __init__(self, categories, tokenizer):
                 self.categories = categories
+                self.tokenizer = tokenizer
             
-            def __call__(self, text: str) -> List[Dict[str, Any]]:
-                # ダミー実装：テキストの長さと内容に基づいて分類
+            def __call__(self, batch_input_ids: List[List[int]]) -> List[List[float]]:
+                # ダミー実装：テキストの内容に基づいて分類
+                import math
                 import random
                 
-                # 簡単なルールベース分類
-                if "?" in text or "？" in text:
-                    category = "質問"
-                elif "反対" in text or "違う" in text or "間違い" in text:
-                    category = "反論"
-                elif "賛成" in text or "同意" in text or "そうだ" in text:
-                    category = "同意"
-                elif "なぜ" in text or "理由" in text or "根拠" in text:
-                    category = "根拠"
-                else:
-                    category = random.choice(self.categories)
-                
-                confidence = random.uniform(0.7, 0.95)
+                batch_logits = []
+                for input_ids in batch_input_ids:
+                    text = self.tokenizer.decode(
+                        input_ids, skip_special_tokens=True
+                    ).replace(" ", "")
+                    
+                    # 簡単なルールベース分類
+                    if "?" in text or "？" in text:
+                        category = "質問"
+                    elif "反対" in text or "違う" in text or "間違い" in text:
+                        category = "反論"
+                    elif "賛成" in text or "同意" in text or "そうだ" in text:
+                        category = "同意"
+                    elif "なぜ" in text or "理由" in text or "根拠" in text:
+                        category = "根拠"
+                    else:
+                        category = random.choice(self.categories)
+                    
+                    # softmax後の信頼度が0.7-0.95になるlogitを設定
+                    confidence = random.uniform(0.7, 0.95)
+                    n = len(self.categories)
+                    logits = [0.0] * n
+                    logits[self.categories.index(category)] = math.log(
+                        confidence * (n - 1) / (1 - confidence)
+                    )
+                    batch_logits.append(logits)
                 
-                return [{
-                    "label": category,
-                    "score": confidence
-                }]
+                return batch_logits
+        
+        return DummyClassifier(categories, self.tokenizer)
+    
+    def _build_windows(self, token_ids: List[int]) -> List[List[int]]:
+        """
+        トークン列を重なりのある固定長の窓に分割
+        
+        窓長は [CLS]/[SEP] を含めて bert_max_length。通常は bert_window_stride
+        トークンずつ重ねて窓を進めるが、窓数が bert_max_windows を超える場合は
+        重なりを縮めて全体を覆う。重なりなしでも覆えない長さの場合のみ末尾を切り捨てる。
+        
+        Args:
+            token_ids: 特殊トークンを含まないトークンID列
+            
+        Returns:
+            特殊トークン付きの窓リスト
+        """
+        window_size = self.max_length - 2
+        overlap = min(settings.bert_window_stride, window_size - 1)
+        max_windows = max(1, settings.bert_max_windows)
         
-        return DummyClassifier(categories)
+        if len(token_ids) <= window_size:
+            starts = [0]
+        else:
+            span = len(token_ids) - window_size
+            step = window_size - overlap
+            n_windows = -(-span // step) + 1
+            
+            if n_windows > max_windows:
+                if len(token_ids) > window_size * max_windows:
+                    logger.warning(
+                        f"Message of {len(token_ids)} tokens exceeds "
+                        f"{max_windows} windows; trailing tokens are truncated"
+                    )
+                    span = window_size * (max_windows - 1)
+                n_windows = max_windows
+            
+            if n_windows == 1:
+                starts = [0]
+            else:
+                starts = [
+                    round(i * span / (n_windows - 1)) for i in range(n_windows)
+                ]
+        
+        cls_id = self.tokenizer.cls_token_id
+        sep_id = self.tokenizer.sep_token_id
+        return [
+            [cls_id] + token_ids[start:start + window_size] + [sep_id]
+            for start in starts
+        ]
+    
+    def _infer_windows(self, windows: List[List[int]]) -> List[List[float]]:
+        """
+        全発言の窓をまとめてバッチ推論
+        
+        Args:
+            windows: 窓リスト（全発言分を連結したもの）
+            
+        Returns:
+            窓ごとのlogits
+        """
+        batch_size = max(1, settings.bert_batch_size)
+        logits: List[List[float]] = []
+        
+        with torch.inference_mode():
+            for start in range(0, len(windows), batch_size):
+                logits.extend(self.classifier(windows[start:start + batch_size]))
+        
+        return logits
+    
+    def _pool_logits(self, window_logits: List[List[float]]) -> Tuple[int, float]:
+        """
+        発言単位に窓のlogitsを集約
+        
+        Args:
+            window_logits: 1発言分の窓ごとのlogits
+            
+        Returns:
+            (カテゴリインデックス, 信頼度)
+        """
+        stacked = torch.tensor(window_logits)
+        
+        if settings.bert_window_pooling == "max":
+            pooled = stacked.max(dim=0).values
+        else:
+            pooled = stacked.mean(dim=0)
+        
+        probs = pooled.softmax(dim=-1)
+        confidence, index = probs.max(dim=-1)
+        return int(index), float(confidence)
     
     async def classify_messages(
         self, 
@@ -89,36 +195,64 @@ class BERTClassifier:
         """
         発言リストを分類
         
+        長い発言は重なりのある窓に分割し、全発言の窓を同じバッチに詰めて推論した後、
+        窓のlogitsを発言単位に集約する。推論はイベントループを塞がないよう
+        スレッドで実行する。
+        
         Args:
             messages: 発言リスト [{"speaker": "A", "text": "..."}, ...]
             
         Returns:
             分類結果リスト
         """
+        return await asyncio.to_thread(self._classify_messages_sync, messages)
+    
+    def _classify_messages_sync(
+        self,
+        messages: List[Dict[str, str]]
+    ) -> List[Dict[str, Any]]:
+        """発言リストを分類（同期処理本体）"""
         logger.info(f"Classifying {len(messages)} messages")
         
         results = []
         
         try:
+            texts = [message["text"] for message in messages]
+            token_ids = self.tokenizer(
+                texts, add_special_tokens=False, truncation=False
+            )["input_ids"]
+            
+            # 窓を作成し、どの発言に属するかを記録
+            windows: List[List[int]] = []
+            owners: List[int] = []
+            for i, ids in enumerate(token_ids):
+                message_windows = self._build_windows(ids)
+                windows.extend(message_windows)
+                owners.extend([i] * len(message_windows))
+            
+            window_logits = self._infer_windows(windows)
+            
+            grouped: List[List[List[float]]] = [[] for _ in messages]
+            for owner, logits in zip(owners, window_logits):
+                grouped[owner].append(logits)
+            
             for i, message in enumerate(messages):
                 text = message["text"]
                 speaker = message["speaker"]
                 
-                # BERT分類実行
-                classification_result = self.classifier(text)
+                index, confidence = self._pool_logits(grouped[i])
+                category = self.classifier.categories[index]
                 
                 # 結果を整形
                 result = {
                     "index": i,
                     "speaker": speaker,
                     "text": text,
+                    "window_count": len(grouped[i]),
                     "classification": {
-                        "category": classification_result[0]["label"],
-                        "confidence": classification_result[0]["score"],
-                        "subcategory": self._get_subcategory(
-                            classification_result[0]["label"], 
-                            text
-                        )
+                        "category": category,
+                        "confidence": confidence,
+                        "subcategory": self._get_subcategory(category, text)
                     }
                 }
                 
@@ -126,7 +260,10 @@ class BERTClassifier:
                 
                 logger.debug(f"Classified message {i}: {result['classification']['category']}")
             
-            logger.info(f"Successfully classified {len(results)} messages")
+            logger.info(
+                f"Successfully classified {len(results)} messages "
+                f"({len(windows)} windows)"
+            )
             return results
             
         except Exception as e:
@@ -14,6 +14,9 @@ logger = get_logger(__name__)
 # Gemini API URL
 GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
 
+# プロンプトのバージョン（プロンプトを変更したら更新し、解析結果キャッシュを無効化する）
+PROMPT_VERSION = "1"
+
 
 class GeminiClient:
     """論争解析用Gemini API クライアント"""
@@ -18,17 +18,40 @@ class Settings(BaseSettings):
     # BERTモデル設定
     bert_model_name: str = Field(default="cl-tohoku/bert-base-japanese-v3", env="BERT_MODEL_NAME")
     bert_max_length: int = Field(default=512, env="BERT_MAX_LENGTH")
+    bert_window_stride: int = Field(default=128, env="BERT_WINDOW_STRIDE")  # 窓間の重なりトークン数
+    bert_max_windows: int = Field(default=16, env="BERT_MAX_WINDOWS")  # 1発言あたりの最大窓数
+    bert_batch_size: int = Field(default=16, env="BERT_BATCH_SIZE")
+    bert_window_pooling: str = Field(default="mean", env="BERT_WINDOW_POOLING")  # mean/max
     
     # ネットワーク設定
     request_timeout_sec: int = Field(default=30, env="REQUEST_TIMEOUT_SEC")
     connect_timeout_sec: int = Field(default=5, env="CONNECT_TIMEOUT_SEC")
     
+    # Redis設定（空の場合はプロセス内キャッシュのみ）
+    redis_url: str = Field(default="", env="REDIS_URL")
+    
     # ログ設定
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
     
     # 論争解析設定
     max_topics: int = Field(default=10, env="MAX_TOPICS")
     min_confidence_threshold: float = Field(default=0.7, env="MIN_CONFIDENCE_THRESHOLD")
+    
+    # 対話ログ圧縮設定（Geminiプロンプト用の前処理）
+    transcript_compression_enabled: bool = Field(default=True, env="TRANSCRIPT_COMPRESSION_ENABLED")
+    transcript_remove_fillers: bool = Field(default=True, env="TRANSCRIPT_REMOVE_FILLERS")  # フィラー・相槌除去
+    transcript_collapse_repeats: bool = Field(default=True, env="TRANSCRIPT_COLLAPSE_REPEATS")  # 重複文・引用の折り畳み
+    transcript_max_message_chars: int = Field(default=0, env="TRANSCRIPT_MAX_MESSAGE_CHARS")  # 0で抽出型圧縮を無効化
+    
+    # 解析結果キャッシュ設定
+    analysis_cache_ttl_sec: int = Field(default=86400, env="ANALYSIS_CACHE_TTL_SEC")
+    analysis_cache_max_entries: int = Field(default=256, env="ANALYSIS_CACHE_MAX_ENTRIES")  # プロセス内キャッシュの上限
+    idempotency_ttl_sec: int = Field(default=86400, env="IDEMPOTENCY_TTL_SEC")
+    
+    # 非同期ジョブ設定
+    job_max_workers: int = Field(default=4, env="JOB_MAX_WORKERS")  # 同時実行する解析ジョブ数
+    job_ttl_sec: int = Field(default=3600, env="JOB_TTL_SEC")  # 完了ジョブの保持期間
+    sse_keepalive_sec: int = Field(default=15, env="SSE_KEEPALIVE_SEC")
 
     class Config:
         env_file = ".env"
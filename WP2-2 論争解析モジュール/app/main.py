@@ -2,22 +2,46 @@
 論争解析モジュールのメインAPI
 FastAPIアプリケーションとエンドポイント定義
 """
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Header, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .schemas import DisputeAnalysisRequest, ApiResponse, ErrorPayload
+from .schemas import DisputeAnalysisRequest, ApiResponse, ErrorPayload, JobApiResponse
 from .services.dispute_analysis_service import DisputeAnalysisService
+from .services.job_service import AnalysisJobManager
+from .services.result_cache import AnalysisResultCache
 from .utils.error_mapping import AppError, to_http_exception
+from .utils.sse import format_sse, format_sse_comment
+from .utils.response_format import to_compact_data, negotiate_response
 from .config import settings
 from .logger import get_logger
 
 logger = get_logger(__name__)
 
+# サービス初期化
+service = DisputeAnalysisService()
+job_manager = AnalysisJobManager(service)
+result_cache = AnalysisResultCache()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """アプリケーションのライフサイクル管理"""
+    await result_cache.connect()
+    
+    yield
+    
+    await result_cache.disconnect()
+
+
 # FastAPIアプリケーション初期化
 app = FastAPI(
     title="Law Chat - Dispute Analysis Module",
     description="論争解析モジュール：対話ログから論点化と対立関係抽出",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS設定
@@ -29,9 +53,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# サービス初期化
-service = DisputeAnalysisService()
-
 
 @app.get("/")
 async def root():
@@ -55,37 +76,52 @@ async def health_check():
 
 
 @app.post("/v1/analyze", response_model=ApiResponse)
-async def analyze_dispute(req: DisputeAnalysisRequest):
+async def analyze_dispute(
+    req: DisputeAnalysisRequest,
+    request: Request,
+    compact: bool = Query(False, description="コンパクト表現で返す"),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key")
+):
     """
     論争解析エンドポイント
     
+    同じ内容の解析結果はキャッシュから返し、実行中の同じ解析があればその結果を待つ。
+    キャッシュ利用の有無は X-Cache ヘッダー（HIT/MISS）で返す。
+    compact=true の場合は発言本文を省き、発言をインデックス、論点名を topic_names の
+    インデックスで参照する。Accept: application/msgpack の場合はMessagePackで返す。
+    
     Args:
         req: 論争解析リクエスト
+        request: HTTPリクエスト（Acceptヘッダー参照用）
+        compact: コンパクト表現で返すか
+        idempotency_key: Idempotency-Key ヘッダー（任意）
         
     Returns:
         統一JSONレスポンス形式
     """
     logger.info(f"Received dispute analysis request: {len(req.messages)} messages")
     
-    # 入力検証
-    if not req.messages:
-        raise to_http_exception(
-            AppError("INVALID_INPUT", "messages is required")
-        )
-    
-    if len(req.messages) < 2:
-        raise to_http_exception(
-            AppError("INVALID_INPUT", "At least 2 messages are required for analysis")
-        )
+    _validate_request(req)
     
     try:
-        # 論争解析処理実行
-        data = await service.analyze_dispute(req)
+        # 論争解析処理実行（キャッシュ経由）
+        data, reused = await result_cache.get_or_compute(
+            req,
+            lambda: service.analyze_dispute(req),
+            idempotency_key=idempotency_key
+        )
         
-        response = ApiResponse(success=True, data=data, error=None)
+        if compact:
+            content = {"success": True, "data": to_compact_data(data), "error": None}
+        else:
+            content = ApiResponse(success=True, data=data, error=None).model_dump(mode="json")
         logger.info("Dispute analysis request processed successfully")
         
-        return JSONResponse(content=response.model_dump())
+        return negotiate_response(
+            content,
+            accept=request.headers.get("accept"),
+            headers={"X-Cache": "HIT" if reused else "MISS"}
+        )
         
     except AppError as e:
         logger.error(f"Application error: {e.code} - {e.message}")
@@ -98,6 +134,146 @@ async def analyze_dispute(req: DisputeAnalysisRequest):
         )
 
 
+@app.post("/v1/analyze/stream")
+async def analyze_dispute_stream(req: DisputeAnalysisRequest):
+    """
+    論争解析ストリーミングエンドポイント
+    
+    各段階の結果を完了した順にSSEで送信する。イベント名は段階名
+    （classifications / topics / positions / relations / summary）で、
+    最後に最終結果全体の completed、またはエラー時の failed を送信する。
+    
+    Args:
+        req: 論争解析リクエスト
+        
+    Returns:
+        text/event-stream レスポンス
+    """
+    logger.info(f"Received streaming dispute analysis request: {len(req.messages)} messages")
+    
+    _validate_request(req)
+    
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def on_stage(stage: str, payload):
+        await queue.put((stage, payload))
+    
+    async def run_analysis():
+        try:
+            data = await service.analyze_dispute(req, on_stage=on_stage)
+            await queue.put(("completed", data.model_dump(mode="json")))
+        except AppError as e:
+            logger.error(f"Application error: {e.code} - {e.message}")
+            error = ErrorPayload(code=e.code, message=e.message, details=e.details)
+            await queue.put(("failed", error.model_dump()))
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            error = ErrorPayload(code="UNEXPECTED", message="Unexpected error", details={"error": str(e)})
+            await queue.put(("failed", error.model_dump()))
+    
+    async def event_stream():
+        task = asyncio.create_task(run_analysis())
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), settings.sse_keepalive_sec)
+                except asyncio.TimeoutError:
+                    yield format_sse_comment()
+                    continue
+                
+                yield format_sse(event, data)
+                
+                if event in ("completed", "failed"):
+                    break
+        finally:
+            # クライアント切断時は解析を中断
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/v1/analyze/jobs", response_model=JobApiResponse, status_code=202)
+async def submit_analysis_job(req: DisputeAnalysisRequest):
+    """
+    非同期論争解析ジョブ登録エンドポイント
+    
+    解析完了を待たずにジョブIDを返す。結果は GET /v1/analyze/jobs/{job_id} で
+    ポーリングするか、/events のSSEで進捗を受け取る。
+    
+    Args:
+        req: 論争解析リクエスト
+        
+    Returns:
+        登録されたジョブ
+    """
+    logger.info(f"Received analysis job request: {len(req.messages)} messages")
+    
+    _validate_request(req)
+    
+    job = job_manager.submit(req)
+    response = JobApiResponse(success=True, data=job, error=None)
+    
+    return JSONResponse(status_code=202, content=response.model_dump(mode="json"))
+
+
+@app.get("/v1/analyze/jobs/{job_id}", response_model=JobApiResponse)
+async def get_analysis_job(job_id: str):
+    """
+    非同期論争解析ジョブ取得エンドポイント
+    
+    Args:
+        job_id: ジョブID
+        
+    Returns:
+        ジョブ状態と完了済み段階の部分結果
+    """
+    try:
+        job = job_manager.get(job_id)
+    except AppError as e:
+        raise to_http_exception(e)
+    
+    response = JobApiResponse(success=True, data=job, error=None)
+    return JSONResponse(content=response.model_dump(mode="json"))
+
+
+@app.get("/v1/analyze/jobs/{job_id}/events")
+async def stream_analysis_job_events(job_id: str):
+    """
+    非同期論争解析ジョブの進捗SSEエンドポイント
+    
+    status / 各段階（classifications, topics, positions, relations, summary）/
+    completed または failed の順にイベントを送信する。
+    
+    Args:
+        job_id: ジョブID
+        
+    Returns:
+        text/event-stream レスポンス
+    """
+    try:
+        job_manager.get(job_id)
+    except AppError as e:
+        raise to_http_exception(e)
+    
+    async def event_stream():
+        async for event in job_manager.events(job_id, keepalive_sec=settings.sse_keepalive_sec):
+            if event is None:
+                yield format_sse_comment()
+            else:
+                yield format_sse(*event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/v1/models")
 async def get_models():
     """使用中のモデル情報を取得"""
@@ -109,6 +285,19 @@ async def get_models():
     }
 
 
+def _validate_request(req: DisputeAnalysisRequest):
+    """論争解析リクエストの入力検証"""
+    if not req.messages:
+        raise to_http_exception(
+            AppError("INVALID_INPUT", "messages is required")
+        )
+    
+    if len(req.messages) < 2:
+        raise to_http_exception(
+            AppError("INVALID_INPUT", "At least 2 messages are required for analysis")
+        )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8082)
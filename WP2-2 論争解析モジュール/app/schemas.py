@@ -2,6 +2,7 @@
 論争解析モジュールのスキーマ定義
 入出力データモデルとAPIレスポンス形式
 """
+from datetime import datetime
 from typing import List, Optional, Dict, Any, Literal
 from pydantic import BaseModel, Field
 
@@ -77,6 +78,8 @@ class UsagePayload(BaseModel):
     gemini_tokens: Optional[int] = None
     bert_inferences: int = Field(default=0)
     processing_time_ms: int = Field(description="処理時間（ミリ秒）")
+    transcript_tokens_before: Optional[int] = Field(default=None, description="圧縮前の対話ログ推定トークン数")
+    transcript_tokens_after: Optional[int] = Field(default=None, description="圧縮後の対話ログ推定トークン数")
 
 
 class MetaPayload(BaseModel):
@@ -105,3 +108,21 @@ class ApiResponse(BaseModel):
     success: bool
     data: Optional[SuccessData] = None
     error: Optional[ErrorPayload] = None
+
+
+class AnalysisJob(BaseModel):
+    """非同期解析ジョブ"""
+    job_id: str = Field(description="ジョブID")
+    status: Literal["queued", "running", "succeeded", "failed"] = Field(description="ジョブ状態")
+    stages: Dict[str, Any] = Field(default_factory=dict, description="完了済み段階の部分結果")
+    result: Optional[SuccessData] = Field(default=None, description="最終結果（成功時）")
+    error: Optional[ErrorPayload] = Field(default=None, description="エラー情報（失敗時）")
+    created_at: datetime = Field(description="作成日時")
+    updated_at: datetime = Field(description="更新日時")
+
+
+class JobApiResponse(BaseModel):
+    """ジョブAPIレスポンス形式"""
+    success: bool
+    data: Optional[AnalysisJob] = None
+    error: Optional[ErrorPayload] = None
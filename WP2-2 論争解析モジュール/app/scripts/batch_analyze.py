@@ -0,0 +1,339 @@
+"""
+論争解析一括バッチ
+JSONL形式の対話ログを読み込み、解析結果をJSONL形式で出力
+
+入力は1行1対話（{"id": "...", "messages": [...], "analysis_depth": "standard"}）。
+出力は1行1結果（{"id": "...", "success": true, "data": {...}}）で、出力ファイル自体を
+チェックポイントとして扱い、再実行時は成功済みのIDをスキップする。
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+
+from ..schemas import DisputeAnalysisRequest, ErrorPayload
+from ..services.dispute_analysis_service import DisputeAnalysisService
+from ..clients.gemini_client import GeminiClient
+from ..utils.error_mapping import AppError
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+# ワーカープロセス内のBERT分類器
+_worker_classifier = None
+
+
+def _init_bert_worker(num_threads: int):
+    """ワーカープロセスでBERT分類器をロード"""
+    global _worker_classifier
+    import torch
+    from ..clients.bert_client import BERTClassifier
+    
+    torch.set_num_threads(num_threads)
+    _worker_classifier = BERTClassifier()
+
+
+def _classify_in_worker(messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """ワーカープロセスで発言リストを分類"""
+    return _worker_classifier._classify_messages_sync(messages)
+
+
+class PooledBERTClassifier:
+    """
+    プロセスプール上で推論するBERT分類器
+    
+    BERTClassifier と同じ classify_messages インターフェースを持ち、
+    DisputeAnalysisService に差し込んで使用する
+    """
+    
+    def __init__(self, workers: int):
+        """
+        Args:
+            workers: ワーカープロセス数
+        """
+        self.model_name = settings.bert_model_name
+        num_threads = max(1, (os.cpu_count() or 1) // workers)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_bert_worker,
+            initargs=(num_threads,)
+        )
+    
+    async def classify_messages(
+        self,
+        messages: List[Dict[str, str]]
+    ) -> List[Dict[str, Any]]:
+        """発言リストをワーカープロセスで分類"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _classify_in_worker, messages)
+    
+    def shutdown(self):
+        """プロセスプールを停止"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ThrottledGeminiClient(GeminiClient):
+    """
+    同時呼び出し数を制限するGeminiクライアント
+    
+    1対話の解析では立場分析と関係分析を並行して呼び出すため、対話数ではなく
+    API呼び出し単位で上限をかける
+    """
+    
+    def __init__(self, max_concurrent_calls: int):
+        """
+        Args:
+            max_concurrent_calls: Gemini API の同時呼び出し数の上限
+        """
+        super().__init__()
+        self._semaphore = asyncio.Semaphore(max_concurrent_calls)
+    
+    async def generate(
+        self,
+        contents: list[dict],
+        max_tokens: int | None,
+        temperature: float | None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """同時呼び出し数の範囲内で Gemini API を呼び出す"""
+        async with self._semaphore:
+            return await super().generate(contents, max_tokens, temperature)
+
+
+class BatchAnalyzer:
+    """
+    論争解析一括バッチ
+    
+    BERT分類はプロセスプールに分散し、対話単位の解析とGemini API の呼び出しは
+    それぞれ同時実行数を制限して処理する
+    """
+    
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        concurrency: int = 4,
+        bert_workers: int = 2,
+        progress_interval_sec: float = 10.0
+    ):
+        """
+        Args:
+            input_path: 入力JSONLファイル
+            output_path: 出力JSONLファイル（チェックポイントを兼ねる）
+            concurrency: 同時に解析する対話数（Gemini API の同時呼び出し数の上限を兼ねる）
+            bert_workers: BERT推論ワーカープロセス数
+            progress_interval_sec: 進捗ログの出力間隔（秒）
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.concurrency = max(1, concurrency)
+        self.bert_workers = max(1, bert_workers)
+        self.progress_interval_sec = progress_interval_sec
+        
+        self.processed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self._total = 0
+        self._start_time = 0.0
+        self._last_progress = 0.0
+    
+    async def run(self) -> Dict[str, Any]:
+        """
+        バッチを実行
+        
+        Returns:
+            実行結果サマリー
+        """
+        done_ids = self._load_checkpoint()
+        self._total = self._count_pending(done_ids)
+        logger.info(
+            f"Starting batch analysis: {self._total} dialogues pending, "
+            f"{len(done_ids)} already done (concurrency={self.concurrency}, "
+            f"bert_workers={self.bert_workers})"
+        )
+        
+        bert_classifier = PooledBERTClassifier(self.bert_workers)
+        service = DisputeAnalysisService(
+            gemini_client=ThrottledGeminiClient(self.concurrency),
+            bert_classifier=bert_classifier
+        )
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending: Set[asyncio.Task] = set()
+        self._start_time = time.perf_counter()
+        self._last_progress = self._start_time
+        
+        try:
+            with open(self.output_path, "a", encoding="utf-8") as out:
+                for record_id, record in self._iter_records(done_ids):
+                    await semaphore.acquire()
+                    task = asyncio.create_task(
+                        self._analyze_one(service, record_id, record, out, semaphore)
+                    )
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                
+                if pending:
+                    await asyncio.gather(*pending)
+        finally:
+            bert_classifier.shutdown()
+        
+        elapsed = time.perf_counter() - self._start_time
+        summary = {
+            "processed": self.processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped": len(done_ids),
+            "elapsed_sec": round(elapsed, 1),
+            "dialogues_per_sec": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0
+        }
+        logger.info(f"Batch analysis completed: {summary}")
+        return summary
+    
+    async def _analyze_one(
+        self,
+        service: DisputeAnalysisService,
+        record_id: str,
+        record: Dict[str, Any],
+        out,
+        semaphore: asyncio.Semaphore
+    ):
+        """1対話を解析して結果を出力"""
+        try:
+            request = DisputeAnalysisRequest(**record)
+            if len(request.messages) < 2:
+                raise AppError("INVALID_INPUT", "At least 2 messages are required for analysis")
+            
+            data = await service.analyze_dispute(request)
+            result = {"id": record_id, "success": True, "data": data.model_dump(mode="json")}
+            self.succeeded += 1
+        
+        except ValidationError as e:
+            error = ErrorPayload(code="INVALID_INPUT", message="Invalid dialogue record", details={"error": str(e)})
+            result = {"id": record_id, "success": False, "error": error.model_dump()}
+            self.failed += 1
+        
+        except AppError as e:
+            logger.error(f"Failed to analyze dialogue {record_id}: {e.code} - {e.message}")
+            error = ErrorPayload(code=e.code, message=e.message, details=e.details)
+            result = {"id": record_id, "success": False, "error": error.model_dump()}
+            self.failed += 1
+        
+        except Exception as e:
+            logger.exception(f"Unexpected error analyzing dialogue {record_id}: {e}")
+            error = ErrorPayload(code="UNEXPECTED", message="Unexpected error", details={"error": str(e)})
+            result = {"id": record_id, "success": False, "error": error.model_dump()}
+            self.failed += 1
+        
+        finally:
+            semaphore.release()
+        
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+        self.processed += 1
+        self._report_progress()
+    
+    def _iter_records(self, done_ids: Set[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """未処理の入力レコードを逐次読み込み"""
+        with open(self.input_path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.error(f"Skipping invalid JSON at line {line_no}: {e}")
+                    continue
+                
+                record_id = str(record.pop("id", line_no))
+                if record_id in done_ids:
+                    continue
+                
+                yield record_id, record
+    
+    def _count_pending(self, done_ids: Set[str]) -> int:
+        """進捗表示用に未処理件数を数える"""
+        return sum(1 for _ in self._iter_records(done_ids))
+    
+    def _load_checkpoint(self) -> Set[str]:
+        """
+        出力ファイルから成功済みのIDを読み込む
+        
+        失敗した行・重複した行・書きかけの行を除いて出力ファイルを書き直すため、
+        再実行で再解析したIDの結果は1行だけになる
+        """
+        done_ids: Set[str] = set()
+        
+        if not os.path.exists(self.output_path):
+            return done_ids
+        
+        tmp_path = f"{self.output_path}.tmp"
+        with open(self.output_path, encoding="utf-8") as f, open(tmp_path, "w", encoding="utf-8") as out:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # 中断時に書きかけた行は無視
+                    continue
+                record_id = str(result.get("id"))
+                if not result.get("success") or record_id in done_ids:
+                    continue
+                done_ids.add(record_id)
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        
+        os.replace(tmp_path, self.output_path)
+        return done_ids
+    
+    def _report_progress(self):
+        """スループットと残り時間を出力"""
+        now = time.perf_counter()
+        if now - self._last_progress < self.progress_interval_sec:
+            return
+        self._last_progress = now
+        
+        elapsed = now - self._start_time
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        remaining = self._total - self.processed
+        eta: Optional[float] = remaining / rate if rate > 0 else None
+        
+        logger.info(
+            f"Progress: {self.processed}/{self._total} "
+            f"(ok={self.succeeded}, failed={self.failed}), "
+            f"{rate:.2f} dialogues/s, "
+            f"ETA {f'{eta / 60:.1f} min' if eta is not None else 'unknown'}"
+        )
+
+
+async def main():
+    """メイン処理（CLI実行時）"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Dispute Analysis Batch over JSONL")
+    parser.add_argument("input", help="入力JSONLファイル")
+    parser.add_argument("output", help="出力JSONLファイル（再実行時は成功済みIDをスキップし、失敗したIDを再解析）")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時に解析する対話数（Gemini API の同時呼び出し数の上限）")
+    parser.add_argument("--bert-workers", type=int, default=2, help="BERT推論ワーカープロセス数")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="進捗ログ間隔（秒）")
+    
+    args = parser.parse_args()
+    
+    batch = BatchAnalyzer(
+        input_path=args.input,
+        output_path=args.output,
+        concurrency=args.concurrency,
+        bert_workers=args.bert_workers,
+        progress_interval_sec=args.progress_interval
+    )
+    await batch.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
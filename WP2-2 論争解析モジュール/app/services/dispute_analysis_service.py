@@ -2,9 +2,10 @@
 論争解析サービス
 Gemini APIとBERTを組み合わせて論争解析を実行
 """
+import asyncio
 import json
 import time
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional, Callable, Awaitable
 from ..schemas import (
     DisputeAnalysisRequest, 
     DisputeAnalysisData,
@@ -18,27 +19,48 @@ from ..schemas import (
 )
 from ..clients.gemini_client import GeminiClient
 from ..clients.bert_client import BERTClassifier
+from .transcript_compressor import TranscriptCompressor
 from ..utils.error_mapping import AppError
+from ..config import settings
 from ..logger import get_logger
 
 logger = get_logger(__name__)
 
+# 段階結果の通知先: (段階名, JSON化済み結果) -> None
+StageCallback = Callable[[str, Any], Awaitable[None]]
+
 
 class DisputeAnalysisService:
     """論争解析サービス"""
     
-    def __init__(self):
-        """サービス初期化"""
-        self.gemini_client = GeminiClient()
-        self.bert_classifier = BERTClassifier()
+    def __init__(
+        self,
+        gemini_client: Optional[GeminiClient] = None,
+        bert_classifier: Optional[BERTClassifier] = None
+    ):
+        """
+        サービス初期化
+        
+        Args:
+            gemini_client: Geminiクライアント（省略時は新規作成）
+            bert_classifier: BERT分類器（省略時は新規作成）
+        """
+        self.gemini_client = gemini_client or GeminiClient()
+        self.bert_classifier = bert_classifier or BERTClassifier()
+        self.compressor = TranscriptCompressor()
         logger.info("DisputeAnalysisService initialized")
     
-    async def analyze_dispute(self, request: DisputeAnalysisRequest) -> SuccessData:
+    async def analyze_dispute(
+        self,
+        request: DisputeAnalysisRequest,
+        on_stage: Optional[StageCallback] = None
+    ) -> SuccessData:
         """
         論争解析を実行
         
         Args:
             request: 論争解析リクエスト
+            on_stage: 各段階の完了時に (段階名, JSON化済み結果) で呼ばれるコールバック（任意）
             
         Returns:
             解析結果
@@ -50,38 +72,54 @@ class DisputeAnalysisService:
             # 1. 入力データの前処理
             messages = [{"speaker": msg.speaker, "text": msg.text} for msg in request.messages]
             
-            # 2. BERT分類実行
-            bert_results = await self.bert_classifier.classify_messages(messages)
-            
-            # 3. Gemini APIで論点分析
-            topics_data = await self.gemini_client.analyze_dispute_topics(messages)
-            topics = self._parse_topics_response(topics_data[0])
+            # Geminiプロンプト用に対話ログを圧縮（BERT分類と発言分析は元のログを使用）
+            prompt_messages, compression_stats = self.compressor.compress(messages)
             
-            # 4. Gemini APIで立場分析
-            topic_names = [topic["topic_name"] for topic in topics]
-            positions_data = await self.gemini_client.analyze_positions(messages, topic_names)
-            positions = self._parse_positions_response(positions_data[0])
+            # 2. BERT分類（論点分析と並行して実行）
+            classify_task = asyncio.create_task(
+                self._run_classification(messages, on_stage)
+            )
             
-            # 5. Gemini APIで関係分析
-            relations_data = await self.gemini_client.analyze_relations(messages, topic_names)
-            relations = self._parse_relations_response(relations_data[0])
+            try:
+                # 3. Gemini APIで論点分析
+                topic_infos = await self._run_topic_analysis(prompt_messages, on_stage)
+                
+                # 4-5. 論点に依存する立場分析と関係分析を並行実行
+                topic_names = [topic.topic_name for topic in topic_infos]
+                _, topic_relations = await asyncio.gather(
+                    self._run_position_analysis(prompt_messages, topic_names, on_stage),
+                    self._run_relation_analysis(prompt_messages, topic_names, on_stage)
+                )
+                
+                bert_results, classifications = await classify_task
+            finally:
+                if not classify_task.done():
+                    classify_task.cancel()
             
             # 6. 結果を統合
-            analysis_data = self._integrate_results(
-                topics, positions, relations, bert_results, messages
+            analysis_data = DisputeAnalysisData(
+                topics=topic_infos,
+                relations=topic_relations,
+                message_analyses=self._build_message_analyses(
+                    classifications, topic_infos, messages
+                ),
+                summary=self._build_summary(topic_infos, topic_relations)
             )
+            await self._emit(on_stage, "summary", analysis_data.summary)
             
             # 7. 使用量情報を計算
             processing_time_ms = int((time.perf_counter() - start_time) * 1000)
             usage = UsagePayload(
                 gemini_tokens=None,  # Gemini REST APIでは詳細なトークン情報が取得できない場合がある
-                bert_inferences=len(messages),
-                processing_time_ms=processing_time_ms
+                bert_inferences=sum(r.get("window_count", 1) for r in bert_results),
+                processing_time_ms=processing_time_ms,
+                transcript_tokens_before=compression_stats["tokens_before"],
+                transcript_tokens_after=compression_stats["tokens_after"]
             )
             
             # 8. メタ情報を構築
             meta = MetaPayload(
-                model=f"{self.gemini_client.gemini_model}+{self.bert_classifier.model_name}",
+                model=f"{settings.gemini_model}+{self.bert_classifier.model_name}",
                 analysis_depth=request.analysis_depth,
                 total_messages=len(messages)
             )
@@ -102,6 +140,66 @@ class DisputeAnalysisService:
                 {"error": str(e)}
             )
     
+    async def _run_classification(
+        self,
+        messages: List[Dict[str, str]],
+        on_stage: Optional[StageCallback]
+    ) -> Tuple[List[Dict[str, Any]], List[ClassificationResult]]:
+        """BERT分類を実行して classifications 段階を通知"""
+        bert_results = await self.bert_classifier.classify_messages(messages)
+        classifications = self._build_classifications(bert_results)
+        await self._emit(on_stage, "classifications", [
+            {"index": i, **c.model_dump()} for i, c in enumerate(classifications)
+        ])
+        return bert_results, classifications
+    
+    async def _run_topic_analysis(
+        self,
+        messages: List[Dict[str, str]],
+        on_stage: Optional[StageCallback]
+    ) -> List[TopicInfo]:
+        """論点分析を実行して topics 段階を通知"""
+        topics_data = await self.gemini_client.analyze_dispute_topics(messages)
+        topics = self._parse_topics_response(topics_data[0])
+        topic_infos = self._build_topic_infos(topics)
+        await self._emit(on_stage, "topics", [t.model_dump() for t in topic_infos])
+        return topic_infos
+    
+    async def _run_position_analysis(
+        self,
+        messages: List[Dict[str, str]],
+        topic_names: List[str],
+        on_stage: Optional[StageCallback]
+    ) -> List[Dict[str, Any]]:
+        """立場分析を実行して positions 段階を通知"""
+        positions_data = await self.gemini_client.analyze_positions(messages, topic_names)
+        positions = self._parse_positions_response(positions_data[0])
+        await self._emit(on_stage, "positions", positions)
+        return positions
+    
+    async def _run_relation_analysis(
+        self,
+        messages: List[Dict[str, str]],
+        topic_names: List[str],
+        on_stage: Optional[StageCallback]
+    ) -> List[TopicRelation]:
+        """関係分析を実行して relations 段階を通知"""
+        relations_data = await self.gemini_client.analyze_relations(messages, topic_names)
+        relations = self._parse_relations_response(relations_data[0])
+        topic_relations = self._build_relations(relations)
+        await self._emit(on_stage, "relations", [r.model_dump() for r in topic_relations])
+        return topic_relations
+    
+    async def _emit(
+        self,
+        on_stage: Optional[StageCallback],
+        stage: str,
+        payload: Any
+    ) -> None:
+        """段階結果をコールバックに通知"""
+        if on_stage is not None:
+            await on_stage(stage, payload)
+    
     def _parse_topics_response(self, response_text: str) -> List[Dict[str, Any]]:
         """Geminiの論点分析レスポンスをパース"""
         try:
@@ -171,17 +269,22 @@ class DisputeAnalysisService:
             logger.error(f"Failed to parse relations response: {e}")
             return []
     
-    def _integrate_results(
+    def _build_classifications(
         self,
-        topics: List[Dict[str, Any]],
-        positions: List[Dict[str, Any]],
-        relations: List[Dict[str, Any]],
-        bert_results: List[Dict[str, Any]],
-        messages: List[Dict[str, str]]
-    ) -> DisputeAnalysisData:
-        """各分析結果を統合して最終結果を構築"""
-        
-        # TopicInfoオブジェクトを作成
+        bert_results: List[Dict[str, Any]]
+    ) -> List[ClassificationResult]:
+        """BERT分類結果をClassificationResultに変換"""
+        return [
+            ClassificationResult(
+                category=bert_result["classification"]["category"],
+                confidence=bert_result["classification"]["confidence"],
+                subcategory=bert_result["classification"].get("subcategory")
+            )
+            for bert_result in bert_results
+        ]
+    
+    def _build_topic_infos(self, topics: List[Dict[str, Any]]) -> List[TopicInfo]:
+        """論点分析結果をTopicInfoに変換"""
         topic_infos = []
         for topic in topics:
             topic_info = TopicInfo(
@@ -191,54 +294,53 @@ class DisputeAnalysisService:
                 keywords=topic.get("keywords", [])
             )
             topic_infos.append(topic_info)
-        
-        # TopicRelationオブジェクトを作成
-        topic_relations = []
-        for relation in relations:
-            topic_relation = TopicRelation(
+        return topic_infos
+    
+    def _build_relations(self, relations: List[Dict[str, Any]]) -> List[TopicRelation]:
+        """関係分析結果をTopicRelationに変換"""
+        return [
+            TopicRelation(
                 topic=relation.get("topic", "未分類"),
                 a_position=relation.get("a_position", "不明"),
                 b_position=relation.get("b_position", "不明"),
                 relation_type=relation.get("relation_type", "不明"),
                 intensity=relation.get("intensity", 0.5)
             )
-            topic_relations.append(topic_relation)
-        
-        # MessageAnalysisオブジェクトを作成
+            for relation in relations
+        ]
+    
+    def _build_message_analyses(
+        self,
+        classifications: List[ClassificationResult],
+        topic_infos: List[TopicInfo],
+        messages: List[Dict[str, str]]
+    ) -> List[MessageAnalysis]:
+        """発言ごとの分析結果を構築"""
         message_analyses = []
-        for i, bert_result in enumerate(bert_results):
-            if i < len(messages):
-                message = messages[i]
-                classification = ClassificationResult(
-                    category=bert_result["classification"]["category"],
-                    confidence=bert_result["classification"]["confidence"],
-                    subcategory=bert_result["classification"].get("subcategory")
-                )
-                
-                message_analysis = MessageAnalysis(
-                    speaker=message["speaker"],
-                    text=message["text"],
-                    classification=classification,
-                    topics=[topic["topic_name"] for topic in topics],  # 簡易実装
-                    sentiment=None  # 感情分析は未実装
-                )
-                message_analyses.append(message_analysis)
-        
-        # サマリー情報を構築
-        summary = {
+        for message, classification in zip(messages, classifications):
+            message_analysis = MessageAnalysis(
+                speaker=message["speaker"],
+                text=message["text"],
+                classification=classification,
+                topics=[topic.topic_name for topic in topic_infos],  # 簡易実装
+                sentiment=None  # 感情分析は未実装
+            )
+            message_analyses.append(message_analysis)
+        return message_analyses
+    
+    def _build_summary(
+        self,
+        topic_infos: List[TopicInfo],
+        topic_relations: List[TopicRelation]
+    ) -> Dict[str, Any]:
+        """解析サマリーを構築"""
+        return {
             "total_topics": len(topic_infos),
             "total_relations": len(topic_relations),
             "conflict_intensity": self._calculate_conflict_intensity(topic_relations),
             "main_disputes": [rel.topic for rel in topic_relations if rel.intensity > 0.7],
             "agreement_areas": [rel.topic for rel in topic_relations if rel.intensity < 0.3]
         }
-        
-        return DisputeAnalysisData(
-            topics=topic_infos,
-            relations=topic_relations,
-            message_analyses=message_analyses,
-            summary=summary
-        )
     
     def _calculate_conflict_intensity(self, relations: List[TopicRelation]) -> float:
         """全体的な対立強度を計算"""
@@ -0,0 +1,215 @@
+"""
+非同期解析ジョブサービス
+重い論争解析をプロセス内ワーカープールで実行し、段階ごとの部分結果を保持
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from ..schemas import DisputeAnalysisRequest, AnalysisJob, ErrorPayload
+from .dispute_analysis_service import DisputeAnalysisService
+from ..utils.error_mapping import AppError
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+# 完了ジョブの掃除を行う最大間隔（秒）
+PURGE_INTERVAL_SEC = 60
+
+
+class _JobState:
+    """ジョブ本体とイベント履歴"""
+
+    def __init__(self, job: AnalysisJob):
+        self.job = job
+        self.events: List[Tuple[str, Any]] = []
+        self.done = False
+        self.condition = asyncio.Condition()
+
+
+class AnalysisJobManager:
+    """
+    非同期解析ジョブ管理
+
+    ジョブはワーカー数（job_max_workers）で同時実行数を制限して処理し、
+    完了した段階の結果をジョブに逐次保存する。ジョブはプロセスメモリ上に保持されるため、
+    複数ワーカー構成では同一プロセスへのルーティングが必要。
+    保持期間（job_ttl_sec）を過ぎた完了ジョブは、登録・参照時と、ジョブが残っている間
+    バックグラウンドで定期的に削除する。
+    """
+
+    def __init__(self, service: DisputeAnalysisService):
+        """
+        Args:
+            service: 解析を実行する論争解析サービス
+        """
+        self.service = service
+        self._jobs: Dict[str, _JobState] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(max(1, settings.job_max_workers))
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def submit(self, request: DisputeAnalysisRequest) -> AnalysisJob:
+        """
+        解析ジョブを登録してバックグラウンド実行を開始
+
+        Args:
+            request: 論争解析リクエスト
+
+        Returns:
+            登録されたジョブ（status=queued）
+        """
+        self._purge_expired()
+
+        now = datetime.utcnow()
+        job = AnalysisJob(
+            job_id=uuid.uuid4().hex,
+            status="queued",
+            created_at=now,
+            updated_at=now
+        )
+        state = _JobState(job)
+        self._jobs[job.job_id] = state
+
+        task = asyncio.create_task(self._run(state, request))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+        logger.info(f"Submitted analysis job {job.job_id} ({len(request.messages)} messages)")
+        return job
+
+    def get(self, job_id: str) -> AnalysisJob:
+        """
+        ジョブを取得
+
+        Args:
+            job_id: ジョブID
+
+        Returns:
+            ジョブ
+        """
+        return self._get_state(job_id).job
+
+    async def events(
+        self,
+        job_id: str,
+        keepalive_sec: Optional[float] = None
+    ) -> AsyncIterator[Optional[Tuple[str, Any]]]:
+        """
+        ジョブのイベントを購読
+
+        購読開始前のイベントも先頭から再送する。keepalive_sec を指定した場合、
+        その間イベントがなければ None を返す。
+
+        Args:
+            job_id: ジョブID
+            keepalive_sec: キープアライブ間隔（秒）
+
+        Yields:
+            (イベント名, データ) または None
+        """
+        state = self._get_state(job_id)
+        index = 0
+
+        while True:
+            async with state.condition:
+                if index >= len(state.events) and not state.done:
+                    try:
+                        await asyncio.wait_for(state.condition.wait(), keepalive_sec)
+                    except asyncio.TimeoutError:
+                        pass
+                pending = state.events[index:]
+                index = len(state.events)
+                done = state.done
+
+            if not pending and not done:
+                yield None
+
+            for event in pending:
+                yield event
+
+            if done:
+                return
+
+    async def _run(self, state: _JobState, request: DisputeAnalysisRequest):
+        """ジョブを実行"""
+        async with self._semaphore:
+            await self._publish(state, "status", {"status": "running"}, status="running")
+
+            async def on_stage(stage: str, payload: Any):
+                state.job.stages[stage] = payload
+                await self._publish(state, stage, payload)
+
+            try:
+                result = await self.service.analyze_dispute(request, on_stage=on_stage)
+                state.job.result = result
+                await self._publish(
+                    state, "completed", result.model_dump(mode="json"),
+                    status="succeeded", done=True
+                )
+                logger.info(f"Analysis job {state.job.job_id} succeeded")
+
+            except AppError as e:
+                logger.error(f"Analysis job {state.job.job_id} failed: {e.code} - {e.message}")
+                await self._fail(state, ErrorPayload(code=e.code, message=e.message, details=e.details))
+
+            except Exception as e:
+                logger.error(f"Analysis job {state.job.job_id} failed unexpectedly: {e}")
+                await self._fail(
+                    state,
+                    ErrorPayload(code="UNEXPECTED", message="Unexpected error", details={"error": str(e)})
+                )
+
+    async def _fail(self, state: _JobState, error: ErrorPayload):
+        """ジョブを失敗として記録"""
+        state.job.error = error
+        await self._publish(state, "failed", error.model_dump(), status="failed", done=True)
+
+    async def _publish(
+        self,
+        state: _JobState,
+        event: str,
+        data: Any,
+        status: Optional[str] = None,
+        done: bool = False
+    ):
+        """ジョブを更新してイベントを購読者に通知"""
+        async with state.condition:
+            if status is not None:
+                state.job.status = status
+            state.job.updated_at = datetime.utcnow()
+            state.events.append((event, data))
+            state.done = state.done or done
+            state.condition.notify_all()
+
+    def _get_state(self, job_id: str) -> _JobState:
+        """ジョブ状態を取得（存在しなければ JOB_NOT_FOUND）"""
+        self._purge_expired()
+        state = self._jobs.get(job_id)
+        if state is None:
+            raise AppError("JOB_NOT_FOUND", "Job not found", {"job_id": job_id})
+        return state
+
+    def _purge_expired(self):
+        """保持期間を過ぎた完了ジョブを削除"""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.job_ttl_sec)
+        expired = [
+            job_id for job_id, state in self._jobs.items()
+            if state.done and state.job.updated_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+        if expired:
+            logger.debug(f"Purged {len(expired)} expired analysis jobs")
+
+    async def _sweep(self):
+        """ジョブが残っている間、保持期間を過ぎた完了ジョブを定期的に削除"""
+        interval = max(1, min(PURGE_INTERVAL_SEC, settings.job_ttl_sec))
+        while self._jobs:
+            await asyncio.sleep(interval)
+            self._purge_expired()
@@ -0,0 +1,246 @@
+"""
+解析結果キャッシュサービス
+論争解析結果をプロセス内LRUとRedisの2段でキャッシュし、重複リクエストを集約
+"""
+import asyncio
+import hashlib
+import json
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from ..schemas import DisputeAnalysisRequest, SuccessData
+from ..clients.gemini_client import PROMPT_VERSION
+from ..utils.error_mapping import AppError
+from ..config import settings
+from ..logger import get_logger
+
+# redis が利用可能な場合のみインポート
+try:
+    import redis.asyncio as redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+logger = get_logger(__name__)
+
+
+def _consume_exception(task: asyncio.Task):
+    """バックグラウンドで完了した解析の例外を回収してログに出力"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug(f"Shared analysis failed: {task.exception()}")
+
+
+class _LRUCache:
+    """TTL付きプロセス内LRUキャッシュ"""
+    
+    def __init__(self, max_entries: int, ttl_sec: int):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any):
+        if self.max_entries <= 0:
+            return
+        
+        self._data[key] = (time.monotonic() + self.ttl_sec, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+class AnalysisResultCache:
+    """
+    解析結果キャッシュ
+    
+    キャッシュキーは（正規化した発言ログのハッシュ, 解析深度, モデル, プロンプトバージョン,
+    対話ログ圧縮設定）から生成する。同じキーの解析が実行中であれば新たに解析を開始せず、
+    実行中の解析結果を待つ。Idempotency-Key はキャッシュキーに紐付け、同じキーで
+    異なる内容が送られた場合はエラーとする。
+    
+    実行中の解析の集約はプロセス内のみで行う。複数のワーカープロセスで同時に届いた
+    同じリクエストはそれぞれ解析され、結果は Redis 経由で以降のリクエストに共有される。
+    """
+    
+    def __init__(self):
+        self.ttl = settings.analysis_cache_ttl_sec
+        self.idempotency_ttl = settings.idempotency_ttl_sec
+        self._results = _LRUCache(settings.analysis_cache_max_entries, self.ttl)
+        self._idempotency_keys = _LRUCache(settings.analysis_cache_max_entries * 4, self.idempotency_ttl)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.redis_client = None
+    
+    async def connect(self):
+        """Redis に接続（未設定・接続失敗時はプロセス内キャッシュのみで動作）"""
+        if not HAS_REDIS or not settings.redis_url:
+            logger.info("Redis is not configured; using in-process analysis cache only")
+            return
+        
+        try:
+            self.redis_client = redis.from_url(
+                settings.redis_url,
+                encoding="utf-8",
+                decode_responses=True
+            )
+            await self.redis_client.ping()
+            logger.info("Connected to Redis for analysis cache")
+        except Exception as e:
+            logger.error(f"Failed to connect to Redis: {str(e)}")
+            self.redis_client = None
+    
+    async def disconnect(self):
+        """Redis 接続を切断"""
+        if self.redis_client:
+            await self.redis_client.aclose()
+            self.redis_client = None
+            logger.info("Disconnected from Redis")
+    
+    def make_key(self, request: DisputeAnalysisRequest) -> str:
+        """
+        キャッシュキーを生成
+        
+        Args:
+            request: 論争解析リクエスト
+        
+        Returns:
+            キャッシュキー
+        """
+        messages = [
+            [msg.speaker, unicodedata.normalize("NFKC", msg.text).strip()]
+            for msg in request.messages
+        ]
+        material = json.dumps({
+            "messages": messages,
+            "analysis_depth": request.analysis_depth,
+            "gemini_model": settings.gemini_model,
+            "bert_model": settings.bert_model_name,
+            "prompt_version": PROMPT_VERSION,
+            "transcript": [
+                settings.transcript_compression_enabled,
+                settings.transcript_remove_fillers,
+                settings.transcript_collapse_repeats,
+                settings.transcript_max_message_chars,
+            ],
+        }, ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha256(material.encode("utf-8")).hexdigest()
+        return f"dispute_analysis:result:{digest}"
+    
+    async def get_or_compute(
+        self,
+        request: DisputeAnalysisRequest,
+        compute: Callable[[], Awaitable[SuccessData]],
+        idempotency_key: Optional[str] = None
+    ) -> Tuple[SuccessData, bool]:
+        """
+        キャッシュされた解析結果を返すか、解析を実行してキャッシュする
+        
+        Args:
+            request: 論争解析リクエスト
+            compute: 解析を実行するコルーチン関数
+            idempotency_key: Idempotency-Key ヘッダーの値（任意）
+        
+        Returns:
+            (解析結果, キャッシュまたは実行中の解析を再利用したか)
+        """
+        cache_key = self.make_key(request)
+        
+        if idempotency_key:
+            await self._bind_idempotency_key(idempotency_key, cache_key)
+        
+        cached = await self._get(cache_key)
+        if cached is not None:
+            logger.info("Analysis cache hit")
+            return cached, True
+        
+        task = self._inflight.get(cache_key)
+        if task is not None:
+            logger.info("Attaching to in-flight analysis")
+            return await asyncio.shield(task), True
+        
+        task = asyncio.create_task(self._compute_and_store(cache_key, compute))
+        self._inflight[cache_key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        # 待機中の呼び出し元がすべてキャンセルされた場合も例外を回収し、未取得の警告を出さない
+        task.add_done_callback(_consume_exception)
+        
+        # 呼び出し元がキャンセルされても解析は継続し、後続の重複リクエストが結果を受け取る
+        return await asyncio.shield(task), False
+    
+    async def _compute_and_store(
+        self,
+        cache_key: str,
+        compute: Callable[[], Awaitable[SuccessData]]
+    ) -> SuccessData:
+        """解析を実行して結果をキャッシュ"""
+        result = await compute()
+        await self._set(cache_key, result)
+        return result
+    
+    async def _bind_idempotency_key(self, idempotency_key: str, cache_key: str):
+        """Idempotency-Key をキャッシュキーに紐付け（内容が異なる再利用はエラー）"""
+        redis_key = f"dispute_analysis:idempotency:{idempotency_key}"
+        bound = self._idempotency_keys.get(idempotency_key)
+        
+        if bound is None and self.redis_client:
+            try:
+                # 未登録なら登録し、登録済みなら既存の値を取得
+                await self.redis_client.set(redis_key, cache_key, ex=self.idempotency_ttl, nx=True)
+                bound = await self.redis_client.get(redis_key)
+            except Exception as e:
+                logger.error(f"Error binding idempotency key: {str(e)}")
+        
+        if bound is not None and bound != cache_key:
+            raise AppError(
+                "IDEMPOTENCY_KEY_CONFLICT",
+                "Idempotency-Key was already used with a different request",
+                {"idempotency_key": idempotency_key}
+            )
+        
+        self._idempotency_keys.set(idempotency_key, cache_key)
+    
+    async def _get(self, cache_key: str) -> Optional[SuccessData]:
+        """プロセス内キャッシュ、Redisの順に結果を取得"""
+        result = self._results.get(cache_key)
+        if result is not None:
+            return result
+        
+        if not self.redis_client:
+            return None
+        
+        try:
+            value = await self.redis_client.get(cache_key)
+        except Exception as e:
+            logger.error(f"Error getting from cache: {str(e)}")
+            return None
+        
+        if not value:
+            return None
+        
+        result = SuccessData.model_validate_json(value)
+        self._results.set(cache_key, result)
+        return result
+    
+    async def _set(self, cache_key: str, result: SuccessData):
+        """両方の階層に結果を保存"""
+        self._results.set(cache_key, result)
+        
+        if not self.redis_client:
+            return
+        
+        try:
+            await self.redis_client.set(cache_key, result.model_dump_json(), ex=self.ttl)
+        except Exception as e:
+            logger.error(f"Error setting cache: {str(e)}")
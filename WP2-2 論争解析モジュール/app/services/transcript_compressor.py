@@ -0,0 +1,230 @@
+"""
+対話ログ圧縮サービス
+Geminiプロンプトに埋め込む前に対話ログを正規化・圧縮してトークン数を削減
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import List, Dict, Any, Tuple
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+# フィラー（発言冒頭・句読点の直後に現れ、読点や空白が続くもの）
+FILLERS = [
+    "えーっと", "えーと", "ええと", "えっと", "えー", "あのー", "あの", "そのー",
+    "まあ", "うーん", "んー", "なんか", "ほら"
+]
+FILLER_PATTERN = re.compile(
+    r"(?:^|(?<=[、。！？!?\s]))(?:"
+    + "|".join(re.escape(f) for f in sorted(FILLERS, key=len, reverse=True))
+    + r")(?:[、,…・\s]+|(?=$))"
+)
+
+# 相槌のみの発言（質問への返答として現れた場合は除去しない）
+AIZUCHI = {
+    "はい", "はいはい", "ええ", "うん", "うんうん", "そうですね", "そうですか",
+    "なるほど", "なるほどですね", "へえ", "ふむ", "ああ", "ですね"
+}
+AIZUCHI_STRIP_PATTERN = re.compile(r"[、。！？!?…・ー〜\s]")
+
+# 質問で終わる発言（疑問符、または「〜か」で終わるもの）
+QUESTION_PATTERN = re.compile(r"(?:[？?]|か[。…]*)$")
+
+# 文分割
+SENTENCE_PATTERN = re.compile(r"[^。！？!?\n]+[。！？!?]*")
+
+# 引用（「」内）
+QUOTE_PATTERN = re.compile(r"「([^「」]+)」")
+QUOTE_MIN_CHARS = 10
+
+# 抽出型圧縮で内容語とみなす文字（漢字・カタカナ・英数字）
+CONTENT_CHAR_PATTERN = re.compile(r"[\u4e00-\u9fff\u30a0-\u30ffA-Za-z0-9]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークン数を推定
+    
+    日本語など非ASCII文字は1文字1トークン、ASCII文字は4文字1トークンとして概算する
+    
+    Args:
+        text: テキスト
+    
+    Returns:
+        推定トークン数
+    """
+    ascii_chars = sum(1 for c in text if c.isascii())
+    return (len(text) - ascii_chars) + math.ceil(ascii_chars / 4)
+
+
+class TranscriptCompressor:
+    """
+    対話ログ圧縮サービス
+    
+    NFKC正規化、フィラー・相槌の除去、重複した文や引用の折り畳み、
+    長い発言のローカル抽出型圧縮を設定に応じて適用する
+    """
+    
+    def __init__(self):
+        self.enabled = settings.transcript_compression_enabled
+        self.remove_fillers = settings.transcript_remove_fillers
+        self.collapse_repeats = settings.transcript_collapse_repeats
+        self.max_message_chars = settings.transcript_max_message_chars
+    
+    def compress(
+        self,
+        messages: List[Dict[str, str]]
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        対話ログを圧縮
+        
+        Args:
+            messages: 発言リスト [{"speaker": "A", "text": "..."}, ...]
+        
+        Returns:
+            (圧縮後の発言リスト, 削減量の統計)
+        """
+        if not self.enabled:
+            return messages, self._stats(messages, messages)
+        
+        compressed: List[Dict[str, str]] = []
+        seen_sentences = set()
+        history: List[str] = []
+        previous_text = ""
+        
+        for message in messages:
+            text = unicodedata.normalize("NFKC", message["text"]).strip()
+            # 質問直後の短い返答（「はい」「そうですね」）は立場の表明として残す
+            is_answer = bool(QUESTION_PATTERN.search(previous_text))
+            previous_text = text
+            
+            if self.remove_fillers:
+                text = FILLER_PATTERN.sub("", text).strip()
+                if self._is_aizuchi(text) and not is_answer:
+                    continue
+            
+            if self.collapse_repeats:
+                text = self._collapse_quotes(text, history)
+                if not is_answer:
+                    text = self._drop_seen_sentences(text, message["speaker"], seen_sentences)
+            
+            if self.max_message_chars and len(text) > self.max_message_chars:
+                text = self._extract_key_sentences(text, self.max_message_chars)
+            
+            if not text:
+                continue
+            
+            history.append(text)
+            compressed.append({"speaker": message["speaker"], "text": text})
+        
+        # 全発言が除去された場合は元のログを使用
+        if not compressed:
+            compressed = messages
+        
+        stats = self._stats(messages, compressed)
+        logger.info(
+            f"Transcript compressed: {stats['tokens_before']} -> {stats['tokens_after']} "
+            f"estimated tokens ({stats['messages_dropped']} messages dropped)"
+        )
+        return compressed, stats
+    
+    def _is_aizuchi(self, text: str) -> bool:
+        """相槌のみの発言かを判定"""
+        core = AIZUCHI_STRIP_PATTERN.sub("", text)
+        return core == "" or core in AIZUCHI
+    
+    def _collapse_quotes(self, text: str, history: List[str]) -> str:
+        """既出の発言を引用している箇所を省略"""
+        def replace(match: re.Match) -> str:
+            quoted = match.group(1)
+            if len(quoted) >= QUOTE_MIN_CHARS and any(quoted in prev for prev in history):
+                return "「…」"
+            return match.group(0)
+        
+        return QUOTE_PATTERN.sub(replace, text)
+    
+    def _drop_seen_sentences(self, text: str, speaker: str, seen_sentences: set) -> str:
+        """
+        同じ話者が既に発言した文（挨拶の繰り返し等）を除去
+        
+        別の話者が同じ文を述べた場合は同意・反論の表明として残す
+        """
+        kept = []
+        for sentence in SENTENCE_PATTERN.findall(text):
+            core = AIZUCHI_STRIP_PATTERN.sub("", sentence)
+            if not core:
+                continue
+            key = (speaker, core)
+            if key in seen_sentences:
+                continue
+            seen_sentences.add(key)
+            kept.append(sentence.strip())
+        return "".join(kept)
+    
+    def _extract_key_sentences(self, text: str, max_chars: int) -> str:
+        """
+        長い発言から重要文を抽出（ローカル抽出型圧縮）
+        
+        内容語の文字バイグラムの出現頻度で各文を採点し、平均以上の文を上位から
+        max_chars に収まるよう選択して元の順序で連結する。先頭文は常に残す。
+        
+        Args:
+            text: 発言テキスト
+            max_chars: 最大文字数
+        
+        Returns:
+            圧縮後のテキスト
+        """
+        sentences = [s.strip() for s in SENTENCE_PATTERN.findall(text) if s.strip()]
+        if len(sentences) <= 1:
+            return text[:max_chars]
+        
+        def content_bigrams(s: str) -> List[str]:
+            # ひらがな・記号のみのバイグラム（助詞・語尾）は採点に使わない
+            return [
+                s[i:i + 2] for i in range(len(s) - 1)
+                if CONTENT_CHAR_PATTERN.search(s[i:i + 2])
+            ]
+        
+        bigrams = Counter(content_bigrams(text))
+        
+        def score(sentence: str) -> float:
+            grams = content_bigrams(sentence)
+            if not grams:
+                return 0.0
+            return sum(bigrams[g] for g in grams) / len(grams)
+        
+        scores = [score(sentence) for sentence in sentences]
+        threshold = sum(scores) / len(scores)
+        ranked = sorted(range(1, len(sentences)), key=lambda i: scores[i], reverse=True)
+        selected = {0}
+        used = len(sentences[0])
+        for i in ranked:
+            # 平均未満の文で残り枠を埋めない
+            if scores[i] < threshold:
+                break
+            if used + len(sentences[i]) > max_chars:
+                continue
+            selected.add(i)
+            used += len(sentences[i])
+        
+        return "".join(sentences[i] for i in sorted(selected))
+    
+    def _stats(
+        self,
+        original: List[Dict[str, str]],
+        compressed: List[Dict[str, str]]
+    ) -> Dict[str, Any]:
+        """削減量の統計を算出"""
+        before = "\n".join(f"{m['speaker']}: {m['text']}" for m in original)
+        after = "\n".join(f"{m['speaker']}: {m['text']}" for m in compressed)
+        return {
+            "chars_before": len(before),
+            "chars_after": len(after),
+            "tokens_before": estimate_tokens(before),
+            "tokens_after": estimate_tokens(after),
+            "messages_dropped": len(original) - len(compressed)
+        }
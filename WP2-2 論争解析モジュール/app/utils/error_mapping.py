@@ -35,6 +35,8 @@ def to_http_exception(error: AppError):
         "BERT_MODEL_ERROR": 500,
         "BERT_INFERENCE_ERROR": 500,
         "ANALYSIS_TIMEOUT": 504,
+        "JOB_NOT_FOUND": 404,
+        "IDEMPOTENCY_KEY_CONFLICT": 422,
         "UNEXPECTED": 500,
     }
     
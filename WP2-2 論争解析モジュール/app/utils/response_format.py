@@ -0,0 +1,197 @@
+"""
+レスポンス形式ユーティリティ
+解析結果のコンパクト表現とAcceptヘッダーによるシリアライズ形式の選択
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi.responses import Response
+from ..schemas import SuccessData
+
+# orjson / msgpack が利用可能な場合のみインポート
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def to_compact_data(data: SuccessData) -> Dict[str, Any]:
+    """
+    解析結果をコンパクト表現に変換
+    
+    - 発言本文は返さず、発言はリクエスト内のインデックス（index）で参照する
+    - 論点名は topic_names に一度だけ格納し、各所ではそのインデックスで参照する
+    
+    Args:
+        data: 解析結果
+    
+    Returns:
+        コンパクト表現の辞書
+    """
+    analysis = data.analysis
+    topic_names: List[str] = []
+    topic_ids: Dict[str, int] = {}
+    
+    def intern(name: str) -> int:
+        topic_id = topic_ids.get(name)
+        if topic_id is None:
+            topic_id = topic_ids[name] = len(topic_names)
+            topic_names.append(name)
+        return topic_id
+    
+    topics = [
+        {
+            "topic_id": topic.topic_id,
+            "name": intern(topic.topic_name),
+            "confidence": topic.confidence,
+            "keywords": topic.keywords
+        }
+        for topic in analysis.topics
+    ]
+    
+    relations = [
+        {
+            "topic": intern(relation.topic),
+            "a_position": relation.a_position,
+            "b_position": relation.b_position,
+            "relation_type": relation.relation_type,
+            "intensity": relation.intensity
+        }
+        for relation in analysis.relations
+    ]
+    
+    message_analyses = [
+        {
+            "index": i,
+            "speaker": message.speaker,
+            "category": message.classification.category,
+            "confidence": message.classification.confidence,
+            "subcategory": message.classification.subcategory,
+            "topics": [intern(name) for name in message.topics],
+            "sentiment": message.sentiment
+        }
+        for i, message in enumerate(analysis.message_analyses)
+    ]
+    
+    summary = dict(analysis.summary)
+    for key in ("main_disputes", "agreement_areas"):
+        if key in summary:
+            summary[key] = [intern(name) for name in summary[key]]
+    
+    return {
+        "analysis": {
+            "topic_names": topic_names,
+            "topics": topics,
+            "relations": relations,
+            "message_analyses": message_analyses,
+            "summary": summary
+        },
+        "usage": data.usage.model_dump(),
+        "meta": data.meta.model_dump()
+    }
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    """
+    Acceptヘッダーをメディアレンジと品質値（q）のリストに分解
+    
+    Args:
+        accept: Acceptヘッダーの値
+    
+    Returns:
+        [(メディアレンジ, q), ...]（q が不正な場合は 0 とみなす）
+    """
+    ranges = []
+    for part in accept.split(","):
+        media_range, *params = [p.strip() for p in part.split(";")]
+        if not media_range:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        ranges.append((media_range.lower(), q))
+    return ranges
+
+
+def _json_quality(ranges: List[Tuple[str, float]]) -> float:
+    """application/json に適用される最も具体的なメディアレンジの q を取得"""
+    for candidate in ("application/json", "application/*", "*/*"):
+        qualities = [q for media_range, q in ranges if media_range == candidate]
+        if qualities:
+            return max(qualities)
+    return 0.0
+
+
+def _prefers_msgpack(accept: Optional[str]) -> bool:
+    """
+    AcceptヘッダーがJSONよりMessagePackを優先しているかを判定
+    
+    MessagePackはメディアタイプが明示された場合のみ選択し（ワイルドカードは対象外）、
+    q が 0 の場合や JSON の q の方が高い場合は選択しない。q が同じ場合は MessagePack を優先する。
+    
+    Args:
+        accept: Acceptヘッダーの値
+    
+    Returns:
+        MessagePackで返すべきか
+    """
+    if not accept:
+        return False
+    
+    ranges = _parse_accept(accept)
+    msgpack_q = max((q for media_range, q in ranges if media_range in MSGPACK_MEDIA_TYPES), default=0.0)
+    return msgpack_q > 0 and msgpack_q >= _json_quality(ranges)
+
+
+def negotiate_response(
+    content: Any,
+    accept: Optional[str],
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Acceptヘッダーに応じてMessagePackまたはJSONでレスポンスを生成
+    
+    Args:
+        content: JSON化可能なレスポンス内容
+        accept: Acceptヘッダーの値
+        status_code: HTTPステータスコード
+        headers: 追加ヘッダー
+    
+    Returns:
+        レスポンス
+    """
+    headers = {**(headers or {}), "Vary": "Accept"}
+    
+    if HAS_MSGPACK and _prefers_msgpack(accept):
+        return Response(
+            content=msgpack.packb(content, use_bin_type=True),
+            status_code=status_code,
+            media_type="application/msgpack",
+            headers=headers
+        )
+    
+    if HAS_ORJSON:
+        body = orjson.dumps(content)
+    else:
+        body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers
+    )
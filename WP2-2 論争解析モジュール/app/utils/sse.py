@@ -0,0 +1,25 @@
+"""
+Server-Sent Events ユーティリティ
+"""
+import json
+from typing import Any
+
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    SSEイベント文字列を生成
+    
+    Args:
+        event: イベント名
+        data: JSON化可能なデータ
+        
+    Returns:
+        SSE形式の文字列
+    """
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def format_sse_comment(comment: str = "keepalive") -> str:
+    """接続維持用のSSEコメント行を生成"""
+    return f": {comment}\n\n"
@@ -0,0 +1,3 @@
+"""
+テスト
+"""
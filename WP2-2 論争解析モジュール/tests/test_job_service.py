@@ -0,0 +1,113 @@
+"""
+非同期解析ジョブ管理の単体テスト
+"""
+import asyncio
+from datetime import timedelta
+import pytest
+from app.config import settings
+from app.schemas import (
+    DisputeAnalysisRequest, SuccessData, DisputeAnalysisData, UsagePayload, MetaPayload
+)
+from app.services import job_service
+from app.services.job_service import AnalysisJobManager
+from app.utils.error_mapping import AppError
+
+
+class FakeAnalysisService:
+    """段階結果を1つ通知してから結果を返す（error を指定した場合は送出する）論争解析サービス"""
+    
+    def __init__(self, error=None):
+        self.error = error
+    
+    async def analyze_dispute(self, request, on_stage=None):
+        await on_stage("topics", {"topics": []})
+        if self.error is not None:
+            raise self.error
+        return SuccessData(
+            analysis=DisputeAnalysisData(topics=[], relations=[], message_analyses=[], summary={}),
+            usage=UsagePayload(processing_time_ms=1),
+            meta=MetaPayload(model="test", analysis_depth="standard", total_messages=len(request.messages))
+        )
+
+
+@pytest.fixture
+def request_body():
+    """論争解析リクエスト"""
+    return DisputeAnalysisRequest(messages=[
+        {"speaker": "A", "text": "契約は無効です"},
+        {"speaker": "B", "text": "いいえ有効です"}
+    ])
+
+
+async def run_job(manager, request):
+    """ジョブを登録し、全イベントを受け取るまで待つ"""
+    job = manager.submit(request)
+    events = [event async for event in manager.events(job.job_id)]
+    return manager.get(job.job_id), events
+
+
+def test_job_runs_to_completion(request_body):
+    """ジョブは段階結果を保存しながら実行され、最終結果とともに succeeded になる"""
+    manager = AnalysisJobManager(FakeAnalysisService())
+    
+    job, events = asyncio.run(run_job(manager, request_body))
+    
+    assert job.status == "succeeded"
+    assert job.stages == {"topics": {"topics": []}}
+    assert job.result.meta.total_messages == 2
+    assert job.error is None
+    assert [name for name, _ in events] == ["status", "topics", "completed"]
+
+
+@pytest.mark.parametrize("error, code", [
+    (AppError("GEMINI_TIMEOUT", "Gemini timed out"), "GEMINI_TIMEOUT"),
+    (RuntimeError("boom"), "UNEXPECTED")
+])
+def test_job_failure_is_recorded(request_body, error, code):
+    """解析の失敗はエラー情報とともに failed として記録される"""
+    manager = AnalysisJobManager(FakeAnalysisService(error))
+    
+    job, events = asyncio.run(run_job(manager, request_body))
+    
+    assert job.status == "failed"
+    assert job.result is None
+    assert job.error.code == code
+    assert job.stages == {"topics": {"topics": []}}
+    assert events[-1] == ("failed", job.error.model_dump())
+
+
+def test_expired_job_is_purged_on_lookup(request_body):
+    """保持期間を過ぎた完了ジョブは参照時に削除され JOB_NOT_FOUND になる"""
+    manager = AnalysisJobManager(FakeAnalysisService())
+    
+    job, _ = asyncio.run(run_job(manager, request_body))
+    manager._jobs[job.job_id].job.updated_at -= timedelta(seconds=settings.job_ttl_sec + 1)
+    
+    with pytest.raises(AppError) as exc_info:
+        manager.get(job.job_id)
+    assert exc_info.value.code == "JOB_NOT_FOUND"
+
+
+def test_sweeper_purges_expired_jobs(request_body, monkeypatch):
+    """参照されない完了ジョブも、保持期間を過ぎるとバックグラウンドで削除される"""
+    intervals = []
+    sleep = asyncio.sleep
+    
+    async def fast_sleep(delay, *args, **kwargs):
+        intervals.append(delay)
+        await sleep(0)
+    
+    monkeypatch.setattr(job_service.asyncio, "sleep", fast_sleep)
+    monkeypatch.setattr(settings, "job_ttl_sec", 30)
+    manager = AnalysisJobManager(FakeAnalysisService())
+    
+    async def run():
+        job, _ = await run_job(manager, request_body)
+        assert job.job_id in manager._jobs
+        job.updated_at -= timedelta(seconds=31)
+        await asyncio.wait_for(manager._sweeper, 1)
+    
+    asyncio.run(run())
+    
+    assert manager._jobs == {}
+    assert set(intervals) == {30}
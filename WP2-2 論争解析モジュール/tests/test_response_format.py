@@ -0,0 +1,22 @@
+"""
+シリアライズ形式選択の単体テスト
+"""
+import pytest
+from app.utils.response_format import _prefers_msgpack
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, False),
+    ("application/json", False),
+    ("*/*", False),
+    ("application/msgpack", True),
+    ("application/x-msgpack, application/json", True),
+    ("application/msgpack;q=0, application/json", False),
+    ("application/msgpack;q=0.5, application/json", False),
+    ("application/json;q=0.5, application/msgpack", True),
+    ("application/msgpack;q=0.8, */*;q=0.1", True),
+    ("application/msgpack;q=invalid, application/json", False)
+])
+def test_prefers_msgpack_honours_quality(accept, expected):
+    """MessagePackはq値がJSON以上の場合のみ選択する"""
+    assert _prefers_msgpack(accept) is expected
@@ -0,0 +1,99 @@
+"""
+解析結果キャッシュの単体テスト
+"""
+import asyncio
+import pytest
+from app.config import settings
+from app.schemas import (
+    DisputeAnalysisRequest, SuccessData, DisputeAnalysisData, UsagePayload, MetaPayload
+)
+from app.services import result_cache
+from app.services.result_cache import AnalysisResultCache
+from app.utils.error_mapping import AppError, to_http_exception
+
+
+def make_request(*texts, analysis_depth="standard"):
+    """発言を交互に並べた論争解析リクエスト"""
+    return DisputeAnalysisRequest(
+        messages=[{"speaker": "AB"[i % 2], "text": text} for i, text in enumerate(texts)],
+        analysis_depth=analysis_depth
+    )
+
+
+def make_result():
+    """解析結果"""
+    return SuccessData(
+        analysis=DisputeAnalysisData(topics=[], relations=[], message_analyses=[], summary={}),
+        usage=UsagePayload(processing_time_ms=1),
+        meta=MetaPayload(model="test", analysis_depth="standard", total_messages=2)
+    )
+
+
+@pytest.fixture
+def cache():
+    """Redis を使わないプロセス内キャッシュ"""
+    return AnalysisResultCache()
+
+
+def test_key_normalizes_text(cache):
+    """全角・半角や前後の空白の違いは同じキーになり、発言者や解析深度の違いは別のキーになる"""
+    key = cache.make_key(make_request("ＡＢＣ１２３です", "反論します"))
+    
+    assert cache.make_key(make_request(" ABC123です ", "反論します")) == key
+    assert cache.make_key(make_request("ABC123です", "反論します", analysis_depth="detailed")) != key
+    assert cache.make_key(make_request("反論します", "ABC123です")) != key
+
+
+def test_key_depends_on_prompt_and_compressor(cache, monkeypatch):
+    """プロンプトバージョンや対話ログ圧縮の設定を変えるとキーが変わる"""
+    request = make_request("契約は無効です", "いいえ有効です")
+    key = cache.make_key(request)
+    
+    monkeypatch.setattr(result_cache, "PROMPT_VERSION", "test-next")
+    prompt_key = cache.make_key(request)
+    assert prompt_key != key
+    
+    monkeypatch.setattr(settings, "transcript_remove_fillers", not settings.transcript_remove_fillers)
+    assert cache.make_key(request) not in (key, prompt_key)
+
+
+def test_duplicate_requests_share_one_compute(cache):
+    """同じ内容のリクエストが同時に届いても解析は1回だけ実行される"""
+    calls = []
+    
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return make_result()
+    
+    async def run():
+        first, second = await asyncio.gather(
+            cache.get_or_compute(make_request("契約は無効です", "いいえ"), compute),
+            cache.get_or_compute(make_request("契約は無効です ", "いいえ"), compute)
+        )
+        third = await cache.get_or_compute(make_request("契約は無効です", "いいえ"), compute)
+        return first, second, third
+    
+    first, second, third = asyncio.run(run())
+    
+    assert len(calls) == 1
+    assert first[0] == second[0] == third[0]
+    assert sorted([first[1], second[1]]) == [False, True]
+    assert third[1] is True
+
+
+def test_idempotency_key_conflict(cache):
+    """同じ Idempotency-Key で異なる内容を送ると IDEMPOTENCY_KEY_CONFLICT（422）になる"""
+    async def compute():
+        return make_result()
+    
+    async def run():
+        await cache.get_or_compute(make_request("契約は無効です", "いいえ"), compute, idempotency_key="key-1")
+        await cache.get_or_compute(make_request("契約は無効です", "いいえ"), compute, idempotency_key="key-1")
+        await cache.get_or_compute(make_request("契約は有効です", "いいえ"), compute, idempotency_key="key-1")
+    
+    with pytest.raises(AppError) as exc_info:
+        asyncio.run(run())
+    
+    assert exc_info.value.code == "IDEMPOTENCY_KEY_CONFLICT"
+    assert to_http_exception(exc_info.value).status_code == 422
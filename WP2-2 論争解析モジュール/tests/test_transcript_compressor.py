@@ -0,0 +1,56 @@
+"""
+対話ログ圧縮の単体テスト
+"""
+import pytest
+from app.services.transcript_compressor import TranscriptCompressor
+
+
+@pytest.fixture
+def compressor():
+    """フィラー・相槌除去と重複文の折り畳みを有効にした圧縮サービス"""
+    compressor = TranscriptCompressor()
+    compressor.enabled = True
+    compressor.remove_fillers = True
+    compressor.collapse_repeats = True
+    compressor.max_message_chars = 0
+    return compressor
+
+
+def texts(messages):
+    return [(m["speaker"], m["text"]) for m in messages]
+
+
+def test_same_sentence_from_two_speakers_survives(compressor):
+    """別の話者が同じ文を述べた場合はどちらも残し、同じ話者の繰り返しのみ除去する"""
+    compressed, _ = compressor.compress([
+        {"speaker": "A", "text": "増税には反対です。"},
+        {"speaker": "B", "text": "増税には反対です。"},
+        {"speaker": "A", "text": "増税には反対です。財源は別に探すべきです。"}
+    ])
+    
+    assert texts(compressed) == [
+        ("A", "増税には反対です。"),
+        ("B", "増税には反対です。"),
+        ("A", "財源は別に探すべきです。")
+    ]
+
+
+def test_aizuchi_kept_only_as_answer_to_question(compressor):
+    """質問への返答の相槌は残し、それ以外の相槌は除去する"""
+    compressed, stats = compressor.compress([
+        {"speaker": "A", "text": "この案に賛成ですか？"},
+        {"speaker": "B", "text": "はい。"},
+        {"speaker": "A", "text": "期限は守れますか。"},
+        {"speaker": "B", "text": "そうですね"},
+        {"speaker": "A", "text": "では来週までに進めます。"},
+        {"speaker": "B", "text": "ですね"}
+    ])
+    
+    assert texts(compressed) == [
+        ("A", "この案に賛成ですか?"),
+        ("B", "はい。"),
+        ("A", "期限は守れますか。"),
+        ("B", "そうですね"),
+        ("A", "では来週までに進めます。")
+    ]
+    assert stats["messages_dropped"] == 1
@@ -2,18 +2,28 @@
 法令APIエンドポイント
 法令取得、検索、要約、論点抽出
 """
+import json
+import time
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query, Path
+from fastapi.responses import StreamingResponse
 
 from ..schemas import (
     LawListResponse, LawListItem, LawInfo, ArticleInfo,
+    SearchHit, SearchResponse, SemanticSearchResponse, SuggestItem, SuggestResponse,
     SummarizeArticleRequest, SummaryResponse,
     ExtractTopicsRequest, TopicsResponse,
     ApiResponse
 )
-from ..services.egov_client import EGOvClient
+from ..services.law_service import LawService
+from ..services.search_service import law_search
+from ..services.law_suggest import law_suggest
+from ..services.semantic_search import semantic_search
+from ..services.law_popularity import law_popularity, article_popularity, article_ref
+from ..services.law_repository import article_hash
 from ..services.summarizer import ArticleSummarizer
 from ..services.topic_extractor import TopicExtractor
+from ..utils.article_number import canonical_article_key
 from ..logger import get_logger
 
 logger = get_logger(__name__)
@@ -34,15 +44,15 @@ async def list_laws(
         law_type: 法令種別（任意）
         page: ページ番号
         per_page: 1ページあたりの件数
-        
+    
     Returns:
         法令リスト
     """
     logger.info(f"Getting law list: type={law_type}, page={page}, per_page={per_page}")
     
     try:
-        async with EGOvClient() as client:
-            data = await client.get_law_list(
+        async with LawService() as service:
+            data = await service.list_laws(
                 law_type=law_type,
                 page=page,
                 per_page=per_page
@@ -65,12 +75,44 @@ async def list_laws(
             page=page,
             per_page=per_page
         )
-        
+    
     except Exception as e:
         logger.error(f"Error getting law list: {str(e)}")
         raise HTTPException(status_code=500, detail=f"法令リストの取得に失敗しました: {str(e)}")
 
 
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest_laws(
+    q: str = Query(..., min_length=1, description="入力中の法令名・読み・略称"),
+    law_type: Optional[str] = Query(None, description="法令種別（任意）"),
+    limit: int = Query(10, ge=1, le=50, description="最大件数")
+):
+    """
+    法令名の入力補完
+    
+    法令名・読み・略称の前方一致を参照回数の多い順に返す（完全一致は先頭）
+    
+    Args:
+        q: 入力中の文字列
+        law_type: 法令種別（任意）
+        limit: 最大件数
+    
+    Returns:
+        候補の法令リスト
+    """
+    start = time.perf_counter()
+    try:
+        suggestions = await law_suggest.suggest(q, limit=limit, law_type=law_type)
+    except Exception as e:
+        logger.error(f"Error suggesting laws: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"法令名の補完に失敗しました: {str(e)}")
+    
+    return SuggestResponse(
+        suggestions=[SuggestItem(**item) for item in suggestions],
+        took_ms=round((time.perf_counter() - start) * 1000, 3)
+    )
+
+
 @router.get("/{law_id}", response_model=LawInfo)
 async def get_law_details(
     law_id: str = Path(..., description="法令ID")
@@ -80,15 +122,16 @@ async def get_law_details(
     
     Args:
         law_id: 法令ID
-        
+    
     Returns:
         法令詳細情報
     """
     logger.info(f"Getting law details: {law_id}")
     
     try:
-        async with EGOvClient() as client:
-            data = await client.get_law_details(law_id)
+        async with LawService() as service:
+            data = await service.get_law_details(law_id)
+        law_popularity.record(law_id)
         
         articles = [
             ArticleInfo(
@@ -104,16 +147,74 @@ async def get_law_details(
             law_id=data.get("law_id", law_id),
             title=data.get("title", ""),
             law_no=data.get("law_no", ""),
-            enact_date=data.get("enact_date"),
+            enact_date=data.get("enact_date") or None,
             articles=articles,
             metadata=data.get("metadata")
         )
-        
+    
     except Exception as e:
         logger.error(f"Error getting law details: {str(e)}")
         raise HTTPException(status_code=500, detail=f"法令詳細の取得に失敗しました: {str(e)}")
 
 
+@router.get("/{law_id}/articles:stream")
+async def stream_articles(
+    law_id: str = Path(..., description="法令ID")
+):
+    """
+    条文を NDJSON 形式で逐次返す
+    
+    法令全体を組み立てずに、取得・パースできた条文から1行1条文で送信する
+    
+    Args:
+        law_id: 法令ID
+    
+    Returns:
+        条文情報の NDJSON ストリーム（application/x-ndjson）
+    """
+    logger.info(f"Streaming articles: {law_id}")
+    
+    service = LawService()
+    articles = service.stream_articles(law_id)
+    
+    # 最初の条文まではここで取得し、取得失敗をエラーレスポンスとして返せるようにする
+    try:
+        first = await articles.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except Exception as e:
+        await service.close()
+        logger.error(f"Error streaming articles: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"条文の取得に失敗しました: {str(e)}")
+    
+    def to_line(article: dict) -> str:
+        info = ArticleInfo(
+            article_no=article.get("article_no", ""),
+            heading=article.get("heading"),
+            text=article.get("text", ""),
+            structure=article.get("structure")
+        )
+        return json.dumps(info.model_dump(), ensure_ascii=False) + "\n"
+    
+    async def body():
+        try:
+            if first is None:
+                return
+            law_popularity.record(law_id)
+            yield to_line(first)
+            async for article in articles:
+                yield to_line(article)
+        except Exception as e:
+            # 送信開始後はステータスを変更できないため、接続を中断して異常終了を伝える
+            logger.error(f"Error streaming articles: {str(e)}")
+            raise
+        finally:
+            await articles.aclose()
+            await service.close()
+    
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
 @router.get("/{law_id}/articles/{article_no}", response_model=ArticleInfo)
 async def get_article(
     law_id: str = Path(..., description="法令ID"),
@@ -125,15 +226,17 @@ async def get_article(
     Args:
         law_id: 法令ID
         article_no: 条番号
-        
+    
     Returns:
         条文情報
     """
     logger.info(f"Getting article: {law_id}/{article_no}")
     
     try:
-        async with EGOvClient() as client:
-            article_data = await client.get_article(law_id, article_no)
+        async with LawService() as service:
+            article_data = await service.get_article(law_id, article_no)
+        law_popularity.record(law_id)
+        article_popularity.record(article_ref(law_id, canonical_article_key(article_no)))
         
         return ArticleInfo(
             article_no=article_data.get("article_no", article_no),
@@ -141,7 +244,7 @@ async def get_article(
             text=article_data.get("text", ""),
             structure=article_data.get("structure")
         )
-        
+    
     except ValueError as e:
         logger.error(f"Article not found: {str(e)}")
         raise HTTPException(status_code=404, detail=f"条文が見つかりません: {str(e)}")
@@ -163,7 +266,7 @@ async def summarize_article(
         law_id: 法令ID
         article_no: 条番号
         request: 要約リクエスト
-        
+    
     Returns:
         要約結果
     """
@@ -174,8 +277,9 @@ async def summarize_article(
     
     try:
         # まず条文を取得
-        async with EGOvClient() as client:
-            article_data = await client.get_article(law_id, article_no)
+        async with LawService() as service:
+            article_data = await service.get_article(law_id, article_no)
+        article_popularity.record(article_ref(law_id, canonical_article_key(article_no)))
         
         article_text = article_data.get("text", "")
         
@@ -185,7 +289,9 @@ async def summarize_article(
             article_text=article_text,
             article_no=article_no,
             max_length=request.max_length,
-            style=request.style
+            style=request.style,
+            law_id=law_id,
+            content_hash=article_hash(article_data)
         )
         
         return SummaryResponse(
@@ -195,7 +301,7 @@ async def summarize_article(
             style=request.style,
             word_count=summary.get("word_count", 0)
         )
-        
+    
     except ValueError as e:
         logger.error(f"Article not found: {str(e)}")
         raise HTTPException(status_code=404, detail=f"条文が見つかりません: {str(e)}")
@@ -211,7 +317,7 @@ async def extract_topics(request: ExtractTopicsRequest):
     
     Args:
         request: 論点抽出リクエスト
-        
+    
     Returns:
         論点抽出結果
     """
@@ -229,57 +335,137 @@ async def extract_topics(request: ExtractTopicsRequest):
             topics=result.get("topics", []),
             relations=result.get("relations", [])
         )
-        
+    
     except Exception as e:
         logger.error(f"Error extracting topics: {str(e)}")
         raise HTTPException(status_code=500, detail=f"論点の抽出に失敗しました: {str(e)}")
 
 
-@router.post("/search", response_model=LawListResponse)
+@router.post("/search", response_model=SearchResponse)
 async def search_laws(
     keyword: Optional[str] = None,
     law_reference: Optional[str] = None,
     law_type: Optional[str] = None,
-    page: int = 1,
-    per_page: int = 20
+    page: int = Query(1, ge=1, description="ページ番号"),
+    per_page: int = Query(20, ge=1, le=100, description="1ページあたりの件数")
 ):
     """
     法令を検索（キーワード or 条文参照）
     
+    キーワードは法令名・条文の見出し・本文を対象に全文検索し、BM25 の降順で返す。
+    条文参照を指定した場合は全文検索を行わず、参照先の条文（項・号）を1件返す
+    
     Args:
-        keyword: キーワード
-        law_reference: 条文参照（例: "民法第1条"）
+        keyword: キーワード（空白区切りで AND 検索、1文字から）
+        law_reference: 条文参照（例: "民法第709条"・"刑訴法321条1項2号"、keyword より優先）
         law_type: 法令種別
         page: ページ番号
         per_page: 1ページあたりの件数
-        
+    
     Returns:
         検索結果
     """
     logger.info(f"Searching laws: keyword={keyword}, reference={law_reference}")
     
+    if law_reference:
+        return await _lookup_reference(law_reference, page, per_page)
+    
+    keyword = (keyword or "").strip()
+    if not keyword:
+        raise HTTPException(status_code=400, detail="キーワードを指定してください")
+    
+    start = time.perf_counter()
     try:
-        # 実装: e-Gov API またはデータベースで検索
-        # ここではサンプル実装
-        
-        sample_laws = [
-            LawListItem(
-                law_id="CIVIL_LAW_001",
-                title="民法",
-                law_no="明治29年法律第89号",
-                law_type="法律",
-                enact_date=None
-            )
-        ]
-        
-        return LawListResponse(
-            laws=sample_laws,
-            total=1,
-            page=page,
-            per_page=per_page
-        )
-        
+        result = await law_search.search(keyword, law_type=law_type, page=page, per_page=per_page)
     except Exception as e:
         logger.error(f"Error searching laws: {str(e)}")
         raise HTTPException(status_code=500, detail=f"法令の検索に失敗しました: {str(e)}")
+    
+    return SearchResponse(
+        hits=[SearchHit(**hit) for hit in result["hits"]],
+        total=result["total"],
+        page=page,
+        per_page=per_page,
+        took_ms=round((time.perf_counter() - start) * 1000, 3)
+    )
 
+
+@router.post("/semantic_search", response_model=SemanticSearchResponse)
+async def semantic_search_laws(
+    query: Optional[str] = None,
+    similar_to: Optional[str] = None,
+    law_id: Optional[str] = None,
+    law_type: Optional[str] = None,
+    k: int = Query(10, ge=1, le=100, description="取得件数")
+):
+    """
+    意味の近い条文を検索（クエリ文 or 条文参照）
+    
+    条文の埋め込みベクトルの近似最近傍探索（HNSW）で、コサイン類似度の降順に返す。
+    条文参照を指定した場合は参照先の条文に似た条文を返す（参照先自体は含めない）
+    
+    Args:
+        query: クエリ文
+        similar_to: 条文参照（例: "民法第709条"、query より優先）
+        law_id: 法令ID で絞り込む場合に指定
+        law_type: 法令種別で絞り込む場合に指定
+        k: 取得件数
+    
+    Returns:
+        検索結果
+    """
+    logger.info(f"Semantic search: query={query}, similar_to={similar_to}, law_id={law_id}")
+    
+    query = (query or "").strip()
+    if not query and not similar_to:
+        raise HTTPException(status_code=400, detail="query または similar_to を指定してください")
+    
+    start = time.perf_counter()
+    try:
+        result = await semantic_search.search_similar(
+            query=query or None, similar_to=similar_to, law_id=law_id, law_type=law_type, k=k
+        )
+    except LookupError as e:
+        logger.error(f"Semantic search source not found: {str(e)}")
+        raise HTTPException(status_code=404, detail=f"条文が見つかりません: {similar_to}")
+    except RuntimeError as e:
+        logger.error(f"Semantic search is not available: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"意味検索を利用できません: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error in semantic search: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"意味検索に失敗しました: {str(e)}")
+    
+    source = result["source"]
+    if source is not None:
+        law_popularity.record(source["law_id"])
+    
+    return SemanticSearchResponse(
+        hits=[SearchHit(**hit) for hit in result["hits"]],
+        source=SearchHit(**source) if source is not None else None,
+        took_ms=round((time.perf_counter() - start) * 1000, 3)
+    )
+
+
+async def _lookup_reference(law_reference: str, page: int, per_page: int) -> SearchResponse:
+    """条文参照を解決して検索レスポンスを作成"""
+    start = time.perf_counter()
+    try:
+        hit = await law_search.lookup_reference(law_reference)
+    except ValueError as e:
+        logger.error(f"Referenced article not found: {str(e)}")
+        raise HTTPException(status_code=404, detail=f"条文が見つかりません: {law_reference}")
+    except Exception as e:
+        logger.error(f"Error resolving law reference: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"条文参照の解決に失敗しました: {str(e)}")
+    
+    if hit is None:
+        raise HTTPException(status_code=404, detail=f"法令が見つかりません: {law_reference}")
+    law_popularity.record(hit["law_id"])
+    
+    return SearchResponse(
+        hits=[SearchHit(**hit)],
+        total=1,
+        page=page,
+        per_page=per_page,
+        took_ms=round((time.perf_counter() - start) * 1000, 3)
+    )
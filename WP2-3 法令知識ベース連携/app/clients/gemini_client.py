@@ -2,6 +2,7 @@
 Google Gemini API クライアント
 要約、論点抽出などのAI機能を提供
 """
+import hashlib
 import json
 import httpx
 from typing import Dict, Any, Optional, List
@@ -233,6 +234,40 @@ class GeminiClient:
             # デフォルトテンプレート
             return self._get_default_template(filename)
     
+    def estimate_summary_tokens(
+        self,
+        text: str,
+        context_items: Optional[List[str]] = None
+    ) -> int:
+        """
+        要約リクエストの入力トークン数を見積もり（予算・費用の見積もり用）
+        
+        日本語はおおむね1文字あたり1トークン以下のため、プロンプトの文字数を上限の目安とする
+        
+        Args:
+            text: 要約対象テキスト
+            context_items: 追加コンテキスト（任意）
+            
+        Returns:
+            見積もった入力トークン数
+        """
+        return len(self._build_summary_prompt(text, context_items))
+    
+    def prompt_version(self, filename: str) -> str:
+        """
+        プロンプトテンプレートの版（テンプレートの内容のハッシュ）
+        
+        テンプレートを書き換えると版が変わり、以前の生成結果のキャッシュは参照されなくなる
+        
+        Args:
+            filename: テンプレートファイル名
+        
+        Returns:
+            ハッシュの先頭12桁
+        """
+        template = self._load_prompt_template(filename)
+        return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+    
     def _get_default_template(self, filename: str) -> str:
         """
         デフォルトプロンプトテンプレートを取得
@@ -286,7 +321,7 @@ class GeminiClient:
             
         except (KeyError, json.JSONDecodeError) as e:
             logger.error(f"Error parsing summary response: {str(e)}")
-            return {"summary": "要約の生成に失敗しました。", "highlights": [], "citations": []}
+            return {"summary": "要約の生成に失敗しました。", "highlights": [], "citations": [], "fallback": True}
     
     def _parse_topics_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -307,7 +342,7 @@ class GeminiClient:
             
         except (KeyError, json.JSONDecodeError) as e:
             logger.error(f"Error parsing topics response: {str(e)}")
-            return {"topics": [], "relations": []}
+            return {"topics": [], "relations": [], "fallback": True}
     
     def _mock_summary(self, text: str) -> Dict[str, Any]:
         """
@@ -317,7 +352,7 @@ class GeminiClient:
             text: 対象テキスト
             
         Returns:
-            モック要約結果
+            モック要約結果（fallback: True、キャッシュしない）
         """
         # 先頭の一部を要約として返す
         summary = text[:200] + "..." if len(text) > 200 else text
@@ -325,7 +360,8 @@ class GeminiClient:
         return {
             "summary": summary,
             "highlights": [text[:100] + "..."],
-            "citations": []
+            "citations": [],
+            "fallback": True
         }
     
     def _mock_topics_extraction(self, texts: List[str], max_topics: int) -> Dict[str, Any]:
@@ -337,7 +373,7 @@ class GeminiClient:
             max_topics: 最大論点数
             
         Returns:
-            モック抽出結果
+            モック抽出結果（fallback: True、キャッシュしない）
         """
         topics = []
         
@@ -349,7 +385,7 @@ class GeminiClient:
                 "source_refs": []
             })
         
-        return {"topics": topics, "relations": []}
+        return {"topics": topics, "relations": [], "fallback": True}
     
     async def close(self):
         """HTTPクライアントをクローズ"""
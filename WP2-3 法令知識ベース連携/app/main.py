@@ -15,6 +15,14 @@ from .schemas import (
     ApiResponse
 )
 from .api import laws
+from .services.law_cache import law_cache
+from .services.parse_executor import xml_parse_executor
+from .services.law_snapshot import law_snapshots
+from .services.search_service import law_search
+from .services.law_suggest import law_suggest
+from .services.law_popularity import law_popularity, article_popularity
+from .services.semantic_search import semantic_search
+from .models.database import dispose_db
 from .api.middleware import RateLimitMiddleware, ErrorHandlerMiddleware
 
 logger = get_logger(__name__)
@@ -26,11 +34,25 @@ async def lifespan(app: FastAPI):
     # 起動時の初期化処理
     logger.info("Starting Law Knowledge Base Module...")
     logger.info(f"Environment: {settings.environment}")
+    await law_cache.connect()
+    # 参照回数の多い法令から開く（集計が無ければ更新日時の新しい順）
+    scores = await law_popularity.scores()
+    law_snapshots.warm(sorted(scores, key=lambda law_id: (-scores[law_id], law_id)))
+    if law_search.backend == "memory":
+        await law_search.get_index()
+    await law_suggest.get_suggester()
+    if semantic_search.backend == "hnsw":
+        await semantic_search.get_index()
     
     yield
     
     # 終了時のクリーンアップ処理
     logger.info("Shutting down Law Knowledge Base Module...")
+    await law_popularity.flush()
+    await article_popularity.flush()
+    await law_cache.disconnect()
+    await dispose_db()
+    xml_parse_executor.shutdown()
 
 
 # FastAPIアプリケーション初期化
@@ -4,7 +4,7 @@ SQLAlchemy ORM を使用したテーブル定義
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, JSON, Boolean, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -26,6 +26,10 @@ class LegalRef(Base):
     enact_date = Column(DateTime, comment="施行年月日")
     source_url = Column(Text, comment="e-Gov API のURL")
     raw_xml = Column(Text, comment="元のXMLデータ（バックアップ用）")
+    content_hash = Column(String(64), comment="元XMLのSHA-256（変更検知用）")
+    list_fingerprint = Column(String(64), comment="法令リスト項目のハッシュ（公布・改正日などの変更検知用）")
+    etag = Column(String(200), comment="e-Gov API の ETag（条件付きリクエスト用）")
+    last_modified = Column(String(100), comment="e-Gov API の Last-Modified（条件付きリクエスト用）")
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -39,10 +43,16 @@ class Article(Base):
     各条文の内容を保存
     """
     __tablename__ = "articles"
+    __table_args__ = (
+        Index("ix_articles_law_id_article_key", "law_id", "article_key", unique=True),
+    )
     
     article_id = Column(Integer, primary_key=True, autoincrement=True)
     law_id = Column(String(100), ForeignKey("legal_refs.law_id"), nullable=False)
     article_no = Column(String(50), nullable=False, comment="条番号（例：第1条、第1条の2）")
+    article_key = Column(String(50), comment="正規化した条文キー（例：1、1-2。重複時は 1#2）")
+    position = Column(Integer, comment="法令内での並び順")
+    content_hash = Column(String(64), comment="条文内容のSHA-256（変更検知用）")
     heading = Column(String(500), comment="見出し・題名")
     text = Column(Text, nullable=False, comment="条文本文")
     parsed_json = Column(JSON, comment="正規化された構造データ（項・号など）")
@@ -63,7 +73,10 @@ class ArticleEmbedding(Base):
     
     embedding_id = Column(Integer, primary_key=True, autoincrement=True)
     article_id = Column(Integer, ForeignKey("articles.article_id"), nullable=False, unique=True)
-    embedding = Column(Text, comment="ベクトルデータ（JSON形式）")
+    embedding = Column(LargeBinary, comment="ベクトルデータ（リトルエンディアンの float32/float16 配列）")
+    dimension = Column(Integer, comment="ベクトルの次元数")
+    dtype = Column(String(10), default="float16", comment="ベクトルの要素型（float32/float16）")
+    content_hash = Column(String(64), comment="埋め込み作成時の条文ハッシュ（差分再計算用）")
     model_name = Column(String(100), default="bert-base-japanese-v3")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -84,11 +97,35 @@ class SyncLog(Base):
     started_at = Column(DateTime, default=datetime.utcnow)
     finished_at = Column(DateTime)
     result_count = Column(Integer, default=0, comment="取得件数")
+    failed_count = Column(Integer, default=0, comment="失敗件数")
+    total_count = Column(Integer, comment="対象件数（法令リストの総数）")
+    checkpoint_page = Column(Integer, default=0, comment="処理済みの最終ページ（再開位置）")
+    change_set = Column(JSON, comment="変更セット（キャッシュ・埋め込みの無効化用）")
     status = Column(String(20), default="running", comment="running/success/failed")
     error_message = Column(Text, comment="エラーメッセージ")
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class GeneratedResult(Base):
+    """
+    AI 生成結果テーブル
+    条文要約・論点抽出の結果を保存（Gemini 呼び出しの永続キャッシュ）
+    """
+    __tablename__ = "generated_results"
+    __table_args__ = (
+        Index("ix_generated_results_law_id_article_key", "law_id", "article_key"),
+    )
+    
+    cache_key = Column(String(200), primary_key=True, comment="キャッシュキー（入力・モデル・プロンプト版のハッシュを含む）")
+    kind = Column(String(20), nullable=False, comment="summary/topics")
+    law_id = Column(String(100), comment="法令ID（要約のみ、同期時の無効化用）")
+    article_key = Column(String(50), comment="正規化した条文キー（要約のみ、同期時の無効化用）")
+    model_name = Column(String(100), comment="生成に使ったモデル")
+    prompt_version = Column(String(50), comment="生成に使ったプロンプトの版")
+    result = Column(JSON, nullable=False, comment="生成結果")
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class CacheEntry(Base):
     """
     キャッシュエントリ（オプション）
@@ -93,6 +93,70 @@ class LawListResponse(BaseModel):
     per_page: int
 
 
+class SearchHit(BaseModel):
+    """検索結果項目（法令名に一致した場合は article_no が None）"""
+    law_id: str
+    title: str
+    law_type: Optional[str] = None
+    article_no: Optional[str] = None
+    heading: Optional[str] = None
+    snippet: str  # 一致箇所を <mark> で囲んだ抜粋（HTML エスケープ済み）
+    score: float
+    text: Optional[str] = None  # 条文参照で検索した場合の条・項・号の本文
+
+
+class SearchResponse(BaseModel):
+    """検索レスポンス"""
+    hits: List[SearchHit]
+    total: int
+    page: int
+    per_page: int
+    took_ms: float
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "hits": [
+                    {
+                        "law_id": "129AC0000000089",
+                        "title": "民法",
+                        "law_type": "Act",
+                        "article_no": "第七百九条",
+                        "heading": "不法行為による損害賠償",
+                        "snippet": "故意又は過失によって他人の権利又は法律上保護される利益を侵害した者は、これによって生じた損害を賠償する責任を負う。",
+                        "score": 12.7
+                    }
+                ],
+                "total": 1,
+                "page": 1,
+                "per_page": 20,
+                "took_ms": 2.4
+            }
+        }
+
+
+class SemanticSearchResponse(BaseModel):
+    """意味検索レスポンス"""
+    hits: List[SearchHit]
+    source: Optional[SearchHit] = None
+    took_ms: float
+
+
+class SuggestItem(BaseModel):
+    """入力補完の候補"""
+    law_id: str
+    title: str
+    law_type: Optional[str] = None
+    title_kana: Optional[str] = None
+    popularity: int = 0
+
+
+class SuggestResponse(BaseModel):
+    """入力補完レスポンス"""
+    suggestions: List[SuggestItem]
+    took_ms: float
+
+
 class SummaryResponse(BaseModel):
     """要約レスポンス"""
     summary_text: str
@@ -0,0 +1,88 @@
+"""
+法令表現のメモリベンチマーク
+パース済み法令データ（辞書形式）と CompactLaw のメモリ使用量・参照時間を比較
+"""
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+
+from ..services.compact_law import CompactLaw
+from ..services.xml_parser import LegalXMLParser
+from .bench_xml_parser import generate_law_xml
+
+
+def retained_memory(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """
+    オブジェクトを作成し、作成後も保持されているメモリ量（バイト）を計測
+    
+    Args:
+        build: 計測対象のオブジェクトを作成する関数
+    
+    Returns:
+        (作成したオブジェクト, 保持されているメモリ量)
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        value = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return value, after - before
+
+
+def run_benchmark(laws: int, articles: int, depth: int):
+    """
+    法令を生成してパースし、辞書形式と CompactLaw のメモリ使用量と参照時間を表示
+    
+    Args:
+        laws: 法令数
+        articles: 法令あたりの条文数
+        depth: 号の細分の深さ
+    """
+    parser = LegalXMLParser()
+    documents = [generate_law_xml(articles, depth=depth) for _ in range(laws)]
+    
+    dicts, dict_bytes = retained_memory(lambda: [parser.parse_xml(xml) for xml in documents])
+    compacts, compact_bytes = retained_memory(lambda: [CompactLaw.from_dict(law) for law in dicts])
+    
+    print(f"laws={laws} articles/law={articles} depth={depth}")
+    print(f"  dict form   : {dict_bytes / 1024 / 1024:8.2f} MB")
+    print(f"  CompactLaw  : {compact_bytes / 1024 / 1024:8.2f} MB ({dict_bytes / max(compact_bytes, 1):.1f}x smaller)")
+    
+    law: CompactLaw = compacts[0]
+    positions: List[int] = list(range(0, len(law), max(1, len(law) // 100)))
+    
+    start = time.perf_counter()
+    for position in positions:
+        law.get_article(position)
+    per_article = (time.perf_counter() - start) / len(positions)
+    
+    start = time.perf_counter()
+    law.to_dict()
+    to_dict = time.perf_counter() - start
+    
+    print(f"  get_article : {per_article * 1e6:8.1f} us")
+    print(f"  to_dict     : {to_dict * 1000:8.1f} ms ({len(law)} articles)")
+
+
+def main():
+    """メイン処理（CLI実行時）"""
+    import argparse
+    import logging
+    
+    parser = argparse.ArgumentParser(description="Law representation memory benchmark")
+    parser.add_argument("--laws", type=int, default=20)
+    parser.add_argument("--articles", type=int, default=500)
+    parser.add_argument("--depth", type=int, default=1)
+    args = parser.parse_args()
+    
+    logging.getLogger("app.services.xml_parser").setLevel(logging.WARNING)
+    run_benchmark(args.laws, args.articles, args.depth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+XML パーサーのマイクロベンチマーク
+大きな法令XMLを生成し、条文数・ネストの深さに対してパース時間が線形に伸びること、
+パース中もイベントループが止まらないことを確認
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+from ..services.xml_parser import LegalXMLParser
+from ..services.parse_executor import XMLParseExecutor
+
+NAMESPACE = "http://law.e-gov.go.jp/ns/ul/011BENCH"
+
+
+def _subitems(level: int, depth: int) -> str:
+    """号の細分（Subitem1〜）を指定の深さまで入れ子にして生成"""
+    if level > depth:
+        return ""
+    tag = f"Subitem{level}"
+    return (
+        f'<{tag} Num="1"><{tag}Title>（{level}）</{tag}Title>'
+        f"<{tag}Sentence><Sentence>第{level}階層の細分の本文である。</Sentence></{tag}Sentence>"
+        f"{_subitems(level + 1, depth)}</{tag}>"
+    )
+
+
+def generate_law_xml(article_count: int, depth: int = 1, paragraphs: int = 3, items: int = 3) -> bytes:
+    """
+    e-Gov 形式の法令XMLを生成
+    
+    Args:
+        article_count: 条文数
+        depth: 号の細分のネストの深さ（0 は細分なし、最大 10）
+        paragraphs: 条あたりの項数
+        items: 項あたりの号数
+    
+    Returns:
+        XMLバイト列
+    """
+    item_xml = "".join(
+        f'<Item Num="{i}"><ItemTitle>{i}</ItemTitle>'
+        f"<ItemSentence><Sentence>号の本文である。</Sentence></ItemSentence>"
+        f"{_subitems(1, depth)}</Item>"
+        for i in range(1, items + 1)
+    )
+    paragraph_xml = "".join(
+        f'<Paragraph Num="{p}"><ParagraphNum>{p}</ParagraphNum>'
+        f"<ParagraphSentence><Sentence>この法律は、ベンチマークのための本文である。</Sentence>"
+        f"<Sentence>ただし、書きを含む。</Sentence></ParagraphSentence>{item_xml}</Paragraph>"
+        for p in range(1, paragraphs + 1)
+    )
+    articles = "".join(
+        f'<Article Num="{n}"><ArticleCaption>（見出し{n}）</ArticleCaption>'
+        f"<ArticleTitle>第{n}条</ArticleTitle>{paragraph_xml}</Article>"
+        for n in range(1, article_count + 1)
+    )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><Law xmlns="{NAMESPACE}" LawType="Act">'
+        f"<LawNum>令和元年法律第一号</LawNum><LawBody><LawTitle>ベンチマーク法</LawTitle>"
+        f"<MainProvision>{articles}</MainProvision></LawBody></Law>"
+    ).encode("utf-8")
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    """
+    関数を繰り返し実行して最短の実行時間（秒）を返す
+    
+    Args:
+        func: 計測対象
+        repeat: 実行回数
+    
+    Returns:
+        最短の実行時間（秒）
+    """
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_benchmark(sizes: List[int], depths: List[int], repeat: int = 3):
+    """
+    条文数・ネストの深さを変えてパース時間を計測し、1MB あたりの時間を表示
+    
+    線形であれば MB あたりの時間は入力の大きさ・深さによらずほぼ一定になる
+    
+    Args:
+        sizes: 条文数のリスト
+        depths: 号の細分の深さのリスト
+        repeat: 計測の繰り返し回数
+    """
+    parser = LegalXMLParser()
+    
+    print(f"{'articles':>8} {'depth':>5} {'size(MB)':>9} {'parse(s)':>9} {'stream(s)':>9} {'s/MB':>7}")
+    for depth in depths:
+        for size in sizes:
+            xml = generate_law_xml(size, depth=depth)
+            megabytes = len(xml) / 1024 / 1024
+            parse_time = best_of(lambda: parser.parse_xml(xml), repeat)
+            stream_time = best_of(lambda: sum(1 for _ in parser.iter_articles(xml)), repeat)
+            print(
+                f"{size:>8} {depth:>5} {megabytes:>9.2f} {parse_time:>9.3f} "
+                f"{stream_time:>9.3f} {parse_time / megabytes:>7.3f}"
+            )
+
+
+async def max_loop_lag(task: Callable[[], Awaitable[object]], interval: float = 0.005) -> float:
+    """
+    タスク実行中のイベントループの遅延の最大値（秒）を計測
+    
+    Args:
+        task: 計測中に実行するコルーチン関数
+        interval: 遅延を計測する間隔（秒）
+    
+    Returns:
+        予定時刻からの遅れの最大値（秒）
+    """
+    lags: List[float] = []
+    done = asyncio.Event()
+    
+    async def ticker():
+        while not done.is_set():
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - expected)
+    
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    try:
+        await task()
+    finally:
+        done.set()
+        await ticker_task
+    return max(lags, default=0.0)
+
+
+async def run_lag_benchmark(size: int, depth: int):
+    """
+    大きな法令のパース中のイベントループ遅延を、実行方式ごとに表示
+    
+    Args:
+        size: 条文数
+        depth: 号の細分の深さ
+    """
+    xml = generate_law_xml(size, depth=depth)
+    print(f"document: {len(xml) / 1024 / 1024:.2f} MB")
+    
+    modes = {
+        "inline": XMLParseExecutor(inline_max_bytes=len(xml)),
+        "thread": XMLParseExecutor(inline_max_bytes=0, process_min_bytes=0),
+        "process": XMLParseExecutor(inline_max_bytes=0, process_min_bytes=1),
+    }
+    for name, executor in modes.items():
+        try:
+            # プロセスプールの起動時間を計測に含めない
+            await executor.parse(generate_law_xml(1))
+            start = time.perf_counter()
+            lag = await max_loop_lag(lambda: executor.parse(xml))
+            print(f"{name:>8}: parse {time.perf_counter() - start:.3f}s, max loop lag {lag * 1000:.1f}ms")
+        finally:
+            executor.shutdown()
+
+
+def main():
+    """メイン処理（CLI実行時）"""
+    import argparse
+    import logging
+    
+    parser = argparse.ArgumentParser(description="LegalXMLParser micro-benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000])
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 5, 10])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--lag", action="store_true", help="パース中のイベントループ遅延を実行方式ごとに計測")
+    args = parser.parse_args()
+    
+    logging.getLogger("app.services.xml_parser").setLevel(logging.WARNING)
+    if args.lag:
+        asyncio.run(run_lag_benchmark(max(args.sizes), max(args.depths)))
+    else:
+        run_benchmark(args.sizes, args.depths, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+全文検索インデックス作成バッチ
+知識ベース（またはスナップショット）の全法令から転置インデックスを作り直す
+"""
+import asyncio
+
+from ..services.law_repository import LawRepository
+from ..services.search_service import rebuild_search_index
+from ..models.database import dispose_db
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+async def main():
+    """メイン処理（CLI実行時）"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Build full-text search index")
+    parser.add_argument("--output", default=None, help="保存先（省略時は SEARCH_INDEX_PATH）")
+    parser.add_argument(
+        "--trigram",
+        action="store_true",
+        help="pg_trgm バックエンド用の拡張と GIN 索引を作成（PostgreSQL のみ）"
+    )
+    args = parser.parse_args()
+    
+    repository = LawRepository()
+    try:
+        if args.trigram:
+            if not repository.available:
+                raise SystemExit("Knowledge base database is not available")
+            await repository.ensure_trigram_indexes()
+        else:
+            await rebuild_search_index(repository, path=args.output or settings.search_index_path)
+    finally:
+        await dispose_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+"""
+ベクトルインデックス作成バッチ
+知識ベースの条文の埋め込みから意味検索用の HNSW インデックスを作り直す
+"""
+import asyncio
+
+from ..services.law_repository import LawRepository
+from ..services.semantic_search import rebuild_vector_index, sync_pgvector
+from ..models.database import dispose_db
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+async def main():
+    """メイン処理（CLI実行時）"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Build vector index for semantic search")
+    parser.add_argument("--output", default=None, help="保存先（省略時は VECTOR_INDEX_DIR）")
+    parser.add_argument("--model", default=None, help="埋め込みモデル（省略時は BERT_MODEL_NAME）")
+    parser.add_argument(
+        "--pgvector",
+        action="store_true",
+        help="pgvector バックエンド用の vector 列と HNSW 索引を作成・更新（PostgreSQL のみ）"
+    )
+    args = parser.parse_args()
+    
+    repository = LawRepository()
+    if not repository.available:
+        raise SystemExit("Knowledge base database is not available")
+    
+    try:
+        if args.pgvector:
+            await sync_pgvector(repository, model_name=args.model)
+        else:
+            await rebuild_vector_index(
+                repository, directory=args.output or settings.vector_index_dir, model_name=args.model
+            )
+    finally:
+        await dispose_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
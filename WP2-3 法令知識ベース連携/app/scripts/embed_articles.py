@@ -0,0 +1,48 @@
+"""
+条文埋め込みバッチ
+知識ベースの条文のうち、埋め込みが無い・内容が変わった条文のみを埋め込む（中断後は再実行で再開）
+"""
+import asyncio
+
+from ..services.article_embedding import VECTOR_DTYPES, ArticleEmbedder, embed_articles
+from ..services.law_repository import LawRepository
+from ..models.database import dispose_db
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+async def main():
+    """メイン処理（CLI実行時）"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Embed knowledge base articles")
+    parser.add_argument("--model", default=None, help="埋め込みモデル（省略時は BERT_MODEL_NAME）")
+    parser.add_argument("--batch-size", type=int, default=None, help="1バッチの最大条文数（省略時は EMBEDDING_BATCH_SIZE）")
+    parser.add_argument(
+        "--dtype",
+        choices=sorted(VECTOR_DTYPES),
+        default=settings.embedding_dtype,
+        help="保存するベクトルの要素型"
+    )
+    parser.add_argument("--limit", type=int, default=None, help="処理する最大条文数（省略時は全件）")
+    args = parser.parse_args()
+    
+    repository = LawRepository()
+    if not repository.available:
+        raise SystemExit("Knowledge base database is not available")
+    
+    try:
+        embedder = ArticleEmbedder(model_name=args.model, batch_size=args.batch_size)
+        stats = await embed_articles(repository, embedder, dtype=args.dtype, limit=args.limit)
+        print(
+            f"Embedded {stats['embedded']} of {stats['pending']} pending articles "
+            f"in {stats['elapsed_sec']}s ({stats['articles_per_sec']} articles/s)"
+        )
+    finally:
+        await dispose_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
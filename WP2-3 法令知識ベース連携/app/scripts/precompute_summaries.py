@@ -0,0 +1,75 @@
+"""
+要約の事前生成バッチ
+参照回数の多い条文（または指定した法令の全条文）の要約をすべてのスタイルで生成し、キャッシュに保存する（中断後は再実行で再開）
+"""
+import asyncio
+
+from ..services.law_cache import law_cache
+from ..services.law_popularity import article_popularity
+from ..services.law_service import LawService
+from ..services.summarizer import SUMMARY_STYLES
+from ..services.summary_precompute import iter_target_articles, popular_articles, precompute_summaries
+from ..models.database import dispose_db
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+async def main():
+    """メイン処理（CLI実行時）"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Precompute article summaries for popular articles")
+    parser.add_argument(
+        "--laws",
+        nargs="*",
+        default=[law_id for law_id in settings.precompute_law_ids.split(",") if law_id.strip()],
+        help="全条文を対象にする法令ID（省略時は PRECOMPUTE_LAW_IDS、空の場合は参照回数の多い条文）"
+    )
+    parser.add_argument("--top", type=int, default=settings.precompute_top_articles, help="参照回数の多い順に対象にする条文数")
+    parser.add_argument("--styles", nargs="+", choices=SUMMARY_STYLES, default=list(SUMMARY_STYLES), help="生成するスタイル")
+    parser.add_argument("--max-length", type=int, default=200, help="要約の最大文字数（/summarize の max_length）")
+    parser.add_argument("--max-requests", type=int, default=None, help="最大リクエスト数（省略時は PRECOMPUTE_MAX_REQUESTS）")
+    parser.add_argument("--max-tokens", type=int, default=None, help="推定トークン数の上限（省略時は PRECOMPUTE_MAX_TOKENS）")
+    parser.add_argument("--estimate", action="store_true", help="生成せずにリクエスト数・トークン数・費用を見積もる")
+    args = parser.parse_args()
+    
+    if not settings.gemini_api_key and not args.estimate:
+        raise SystemExit("GEMINI_API_KEY is required to precompute summaries")
+    
+    await law_cache.connect()
+    try:
+        law_ids = [law_id.strip() for law_id in args.laws]
+        articles = [] if law_ids else await popular_articles(article_popularity, args.top)
+        if not law_ids and not articles:
+            logger.warning("No article access statistics yet; specify --laws or PRECOMPUTE_LAW_IDS")
+        
+        async with LawService() as service:
+            stats = await precompute_summaries(
+                iter_target_articles(service, articles=articles, law_ids=law_ids),
+                styles=args.styles,
+                max_length=args.max_length,
+                max_requests=args.max_requests,
+                max_tokens=args.max_tokens,
+                dry_run=args.estimate
+            )
+        
+        action = "Would generate" if args.estimate else f"Generated {stats['generated']} of"
+        print(
+            f"{action} {stats['requests']} summaries for {stats['articles']} articles "
+            f"({stats['cached']} already cached, {stats['failed']} failed); "
+            f"~{stats['input_tokens']} input / {stats['output_tokens']} output tokens, "
+            f"estimated ${stats['estimated_cost_usd']}"
+        )
+        if stats["stopped"] == "budget":
+            print("Stopped at the request/token budget; run again to continue")
+        elif stats["stopped"] == "failures":
+            print("Stopped after repeated Gemini failures; run again to continue")
+    finally:
+        await law_cache.disconnect()
+        await dispose_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,16 +3,56 @@ e-Gov API 同期バッチ
 定期的に e-Gov API から法令データを取得してデータベースを更新
 """
 import asyncio
+import json
+import math
+import time
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+
+import httpx
 
 from ..services.egov_client import EGOvClient
+from ..services.parse_executor import xml_parse_executor
+from ..services.law_cache import law_cache
+from ..services.generation_cache import generation_cache
+from ..services.law_snapshot import law_snapshots
+from ..services.search_service import rebuild_search_index, update_search_index
+from ..services.bulk_writer import KnowledgeBaseBulkWriter
+from ..services.law_repository import (
+    LawRepository, SyncLogRepository, content_hash, article_hash
+)
+from ..models.database import init_db
 from ..models.models import LegalRef, Article, SyncLog
+from ..utils.rate_limiter import AsyncRateLimiter
+from ..utils.article_number import unique_article_keys
 from ..config import settings
 from ..logger import get_logger
 
 logger = get_logger(__name__)
 
+# 法令リスト項目のうち、法令の変更を表す項目（公布・改正日など）
+LIST_CHANGE_FIELDS = (
+    "promulgation_date", "amendment_date", "amend_date", "updated_at", "last_modified"
+)
+
+
+def list_fingerprint(law_item: Dict[str, Any]) -> Optional[str]:
+    """
+    法令リスト項目のハッシュを算出
+    
+    公布・改正日などの変更を表す項目を含まない場合は、リスト項目からは変更を
+    判定できないため None を返す
+    
+    Args:
+        law_item: 法令リスト項目
+    
+    Returns:
+        ハッシュ（判定に使えない場合は None）
+    """
+    if not any(law_item.get(field) for field in LIST_CHANGE_FIELDS):
+        return None
+    return content_hash(law_item)
+
 
 class EGOvSyncBatch:
     """
@@ -21,51 +61,118 @@ class EGOvSyncBatch:
     初回取得および定期更新を実行
     """
     
-    def __init__(self):
+    # 再試行するHTTPステータス（レート制限・一時的なサーバーエラー）
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        page_size: Optional[int] = None
+    ):
+        """
+        Args:
+            concurrency: 同時に取得する法令数（省略時は settings.sync_concurrency）
+            page_size: 法令リストの1ページあたりの件数（省略時は settings.sync_page_size）
+        """
         self.sync_type = "full"  # or "update"
+        self.concurrency = max(1, concurrency or settings.sync_concurrency)
+        self.page_size = page_size or settings.sync_page_size
+        self.parse_executor = xml_parse_executor
+        self.snapshots = law_snapshots
+        self.rate_limiter = AsyncRateLimiter(settings.egov_rate_limit_per_minute)
+        self.repository: Optional[LawRepository] = None
+        self.sync_logs: Optional[SyncLogRepository] = None
+        self.writer: Optional[KnowledgeBaseBulkWriter] = None
     
-    async def run_full_sync(self):
+    async def run_full_sync(self, resume: bool = True):
         """
         フル同期を実行（全法令を取得）
         
-        初回インポート時に使用
+        初回インポート時に使用。法令リストを全ページ取得し、各ページの法令詳細を
+        レート制限の範囲で並行して取得・保存する。ページ単位で進捗を SyncLog に
+        記録し、中断した同期は次回実行時に続きのページから再開する。
+        
+        Args:
+            resume: 中断した同期があれば再開するか
+        
+        Returns:
+            同期ログ
         """
         logger.info("Starting full sync with e-Gov API...")
         
-        sync_log = SyncLog(
-            sync_type="full",
-            started_at=datetime.utcnow(),
-            status="running"
-        )
+        await self._init_repositories()
+        
+        sync_log = await self.sync_logs.find_resumable("full") if resume else None
+        resuming = sync_log is not None
+        if resuming:
+            logger.info(
+                f"Resuming full sync #{sync_log.sync_id} after page {sync_log.checkpoint_page} "
+                f"({sync_log.result_count} laws already imported)"
+            )
+            sync_log.status = "running"
+            sync_log.error_message = None
+        else:
+            sync_log = await self.sync_logs.start("full")
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start_time = time.perf_counter()
+        imported_this_run = 0
+        
+        # 法令・条文は一括書き込みでまとめて投入し、索引の更新は最後に1回だけ行う
+        self.writer = KnowledgeBaseBulkWriter(defer_indexes=True, reset=not resuming)
         
         try:
+            await self.writer.start()
+            
             async with EGOvClient() as client:
-                # 法令リストを取得
-                laws_data = await client.get_law_list(page=1, per_page=100)
+                page = (sync_log.checkpoint_page or 0) + 1
                 
-                total_laws = laws_data.get("total", 0)
-                logger.info(f"Found {total_laws} laws to import")
-                
-                # 各法令を処理
-                processed_count = 0
-                
-                for law_item in laws_data.get("laws", []):
-                    try:
-                        await self._import_law(client, law_item)
-                        processed_count += 1
-                        
-                        if processed_count % 10 == 0:
-                            logger.info(f"Processed {processed_count}/{total_laws} laws")
-                        
-                    except Exception as e:
-                        logger.error(f"Error importing law {law_item.get('law_id')}: {str(e)}")
-                        continue
-                
-                sync_log.finished_at = datetime.utcnow()
-                sync_log.result_count = processed_count
-                sync_log.status = "success"
-                
-                logger.info(f"Full sync completed: {processed_count} laws imported")
+                while True:
+                    # 法令リストを取得
+                    laws_data = await self._with_retry(
+                        lambda: client.get_law_list(page=page, per_page=self.page_size)
+                    )
+                    law_items = laws_data.get("laws", [])
+                    if not law_items:
+                        break
+                    
+                    sync_log.total_count = laws_data.get("total", sync_log.total_count)
+                    
+                    # ページ内の法令を並行して取り込み
+                    results = await asyncio.gather(*[
+                        self._import_law_limited(client, law_item, semaphore)
+                        for law_item in law_items
+                    ])
+                    succeeded = sum(results)
+                    imported_this_run += succeeded
+                    
+                    # チェックポイントを記録する前にページ分の行を書き込む
+                    await self.writer.flush()
+                    
+                    sync_log.result_count = (sync_log.result_count or 0) + succeeded
+                    sync_log.failed_count = (sync_log.failed_count or 0) + len(results) - succeeded
+                    sync_log.checkpoint_page = page
+                    await self.sync_logs.save(sync_log)
+                    
+                    self._log_progress(sync_log, imported_this_run, start_time)
+                    
+                    total_pages = math.ceil((sync_log.total_count or 0) / self.page_size)
+                    if page >= total_pages:
+                        break
+                    page += 1
+            
+            await self.writer.finish()
+            await self._invalidate_all_caches()
+            await self._rebuild_search_index()
+            
+            sync_log.finished_at = datetime.utcnow()
+            sync_log.status = "success"
+            
+            logger.info(
+                f"Full sync completed: {sync_log.result_count} laws imported, "
+                f"{sync_log.failed_count} failed, {self.writer.rows_written} rows written "
+                f"({self.writer.rows_per_sec:.0f} rows/s)"
+            )
         
         except Exception as e:
             logger.error(f"Error in full sync: {str(e)}")
@@ -73,43 +180,83 @@ class EGOvSyncBatch:
             sync_log.status = "failed"
             sync_log.error_message = str(e)
         
+        await self.sync_logs.save(sync_log)
         return sync_log
     
-    async def run_update_sync(self):
+    async def run_update_sync(self, changes_out: Optional[str] = None):
         """
         差分更新を実行
         
-        定期的に実行して変更を取得
+        定期的に実行して変更を取得。法令リストの公布・改正日などで未変更の法令を
+        除外し、残りは条件付きリクエストと元XMLのハッシュで変更を判定する。
+        変更のあった法令は条文ハッシュを比較し、追加・変更・削除された条文のみを
+        書き換える。変更セットは SyncLog に記録し、法令キャッシュを無効化する。
+        
+        Args:
+            changes_out: 変更セットを書き出すJSONLファイル（任意）
+        
+        Returns:
+            同期ログ
         """
         logger.info("Starting update sync with e-Gov API...")
         
-        sync_log = SyncLog(
-            sync_type="update",
-            started_at=datetime.utcnow(),
-            status="running"
-        )
+        await self._init_repositories()
+        sync_log = await self.sync_logs.start("update")
+        semaphore = asyncio.Semaphore(self.concurrency)
         
         try:
+            states = await self.repository.get_sync_states()
+            
             async with EGOvClient() as client:
-                # 変更検知の実装は e-Gov API の仕様に依存
-                # ここではサンプル実装
+                law_items = await self._list_all_laws(client)
                 
-                # 最新の法令リストを取得
-                laws_data = await client.get_law_list(page=1, per_page=50)
-                
-                updated_count = 0
-                
-                for law_item in laws_data.get("laws", []):
-                    # 既存レコードと比較
-                    # 差分があれば更新
-                    # （実装詳細は省略）
-                    updated_count += 1
+                seen_ids = {law_item.get("law_id") for law_item in law_items}
+                candidates = []
+                for law_item in law_items:
+                    fingerprint = list_fingerprint(law_item)
+                    state = states.get(law_item.get("law_id"))
+                    if state and fingerprint and state["list_fingerprint"] == fingerprint:
+                        continue
+                    candidates.append((law_item, fingerprint))
                 
-                sync_log.finished_at = datetime.utcnow()
-                sync_log.result_count = updated_count
-                sync_log.status = "success"
+                logger.info(
+                    f"{len(candidates)}/{len(law_items)} laws to check "
+                    f"({len(law_items) - len(candidates)} unchanged by list metadata)"
+                )
                 
-                logger.info(f"Update sync completed: {updated_count} laws updated")
+                results = await asyncio.gather(*[
+                    self._update_law_limited(
+                        client, law_item, fingerprint, states.get(law_item.get("law_id")), semaphore
+                    )
+                    for law_item, fingerprint in candidates
+                ])
+            
+            changes = [change for ok, change in results if change]
+            failed_count = sum(1 for ok, _ in results if not ok)
+            
+            # 法令リストから消えた法令を削除
+            if law_items:
+                for law_id in sorted(set(states) - seen_ids):
+                    await self.repository.delete_law(law_id)
+                    self.snapshots.delete(law_id)
+                    changes.append({"law_id": law_id, "change": "removed", "articles": None})
+            
+            sync_log.total_count = len(law_items)
+            sync_log.result_count = len(changes)
+            sync_log.failed_count = failed_count
+            sync_log.change_set = changes
+            sync_log.finished_at = datetime.utcnow()
+            sync_log.status = "success"
+            
+            await self._invalidate_caches(changes)
+            await self._update_search_index(changes)
+            if changes_out:
+                self._write_changes(changes_out, changes)
+            
+            logger.info(
+                f"Update sync completed: {len(changes)} laws changed, "
+                f"{failed_count} failed"
+            )
         
         except Exception as e:
             logger.error(f"Error in update sync: {str(e)}")
@@ -117,8 +264,191 @@ class EGOvSyncBatch:
             sync_log.status = "failed"
             sync_log.error_message = str(e)
         
+        await self.sync_logs.save(sync_log)
         return sync_log
     
+    async def _list_all_laws(self, client: EGOvClient) -> List[Dict[str, Any]]:
+        """法令リストを全ページ取得"""
+        law_items: List[Dict[str, Any]] = []
+        page = 1
+        
+        while True:
+            laws_data = await self._with_retry(
+                lambda: client.get_law_list(page=page, per_page=self.page_size)
+            )
+            page_items = laws_data.get("laws", [])
+            if not page_items:
+                break
+            law_items.extend(page_items)
+            
+            if page >= math.ceil(laws_data.get("total", 0) / self.page_size):
+                break
+            page += 1
+        
+        return law_items
+    
+    async def _update_law(
+        self,
+        client: EGOvClient,
+        law_item: Dict[str, Any],
+        fingerprint: Optional[str],
+        state: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        個別の法令を差分更新
+        
+        Args:
+            client: e-Gov API クライアント
+            law_item: 法令項目データ
+            fingerprint: 法令リスト項目のハッシュ
+            state: 保存済みの同期状態（未登録の法令は None）
+        
+        Returns:
+            変更内容（変更がなければ None）
+        """
+        law_id = law_item.get("law_id")
+        sync_state = {"list_fingerprint": fingerprint}
+        
+        result = await self._with_retry(
+            lambda: client.get_law_xml_if_modified(
+                law_id,
+                etag=state["etag"] if state else None,
+                last_modified=state["last_modified"] if state else None
+            )
+        )
+        
+        # 304 Not Modified
+        if result is None:
+            await self.repository.update_sync_state(law_id, sync_state)
+            return None
+        
+        xml_content = result["xml"]
+        sync_state.update(etag=result["etag"], last_modified=result["last_modified"])
+        
+        # 元XMLが同一なら再パースしない
+        if state and state["content_hash"] == content_hash(xml_content):
+            await self.repository.update_sync_state(law_id, sync_state)
+            return None
+        
+        law_details = await self._parse_law(xml_content, law_item)
+        articles = law_details.get("articles", [])
+        article_keys = unique_article_keys(articles)
+        
+        if state is None:
+            await self.repository.save_law(law_id, law_details, raw_xml=xml_content, sync_state=sync_state)
+            await self._save_snapshot(law_id, law_details)
+            return {
+                "law_id": law_id,
+                "change": "added",
+                "articles": {"added": article_keys, "updated": [], "removed": []}
+            }
+        
+        # 条文ハッシュを比較して変更のあった条文のみを書き換え
+        previous = await self.repository.get_article_states(law_id)
+        changed: List[Tuple[str, int, Dict[str, Any]]] = []
+        moved: Dict[str, int] = {}
+        added: List[str] = []
+        updated: List[str] = []
+        
+        for position, (key, article) in enumerate(zip(article_keys, articles)):
+            prev = previous.get(key)
+            if prev is None:
+                added.append(key)
+                changed.append((key, position, article))
+            elif prev[0] != article_hash(article):
+                updated.append(key)
+                changed.append((key, position, article))
+            elif prev[1] != position:
+                moved[key] = position
+        
+        current = set(article_keys)
+        removed = [key for key in previous if key not in current]
+        
+        await self.repository.apply_article_changes(
+            law_id, law_details, changed, moved, removed,
+            raw_xml=xml_content, sync_state=sync_state
+        )
+        await self._save_snapshot(law_id, law_details)
+        
+        return {
+            "law_id": law_id,
+            "change": "updated",
+            "articles": {"added": added, "updated": updated, "removed": removed}
+        }
+    
+    async def _update_law_limited(
+        self,
+        client: EGOvClient,
+        law_item: Dict[str, Any],
+        fingerprint: Optional[str],
+        state: Optional[Dict[str, Any]],
+        semaphore: asyncio.Semaphore
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """同時実行数を制限して法令を差分更新（(成功したか, 変更内容) を返す）"""
+        async with semaphore:
+            try:
+                return True, await self._update_law(client, law_item, fingerprint, state)
+            except Exception as e:
+                logger.error(f"Error updating law {law_item.get('law_id')}: {str(e)}")
+                return False, None
+    
+    async def _invalidate_caches(self, changes: List[Dict[str, Any]]):
+        """
+        変更のあった法令のキャッシュと、変更のあった条文の要約を無効化
+        
+        Redis のエントリを削除し、世代番号を更新して API プロセス内のLRUも破棄させる
+        """
+        if not changes:
+            return
+        
+        await law_cache.connect()
+        try:
+            for change in changes:
+                await law_cache.invalidate(change["law_id"])
+            await generation_cache.invalidate_changes(changes)
+        finally:
+            await law_cache.disconnect()
+    
+    async def _invalidate_all_caches(self):
+        """フル同期で取り込んだすべての法令のキャッシュ（Redis・API プロセス内のLRU）を無効化"""
+        law_ids = await self.repository.get_sync_states()
+        
+        await law_cache.connect()
+        try:
+            await law_cache.invalidate_all(law_ids)
+        finally:
+            await law_cache.disconnect()
+    
+    async def _rebuild_search_index(self):
+        """全文検索の転置インデックスを作り直す（失敗しても同期は成功扱い）"""
+        if settings.search_backend != "memory":
+            return
+        try:
+            await rebuild_search_index(self.repository, self.snapshots)
+        except Exception as e:
+            logger.error(f"Error building search index: {str(e)}")
+    
+    async def _update_search_index(self, changes: List[Dict[str, Any]]):
+        """変更のあった法令のみ全文検索の転置インデックスを更新（失敗しても同期は成功扱い）"""
+        if settings.search_backend != "memory" or not changes:
+            return
+        try:
+            await update_search_index(
+                [change["law_id"] for change in changes if change["change"] != "removed"],
+                [change["law_id"] for change in changes if change["change"] == "removed"],
+                self.repository,
+                self.snapshots
+            )
+        except Exception as e:
+            logger.error(f"Error updating search index: {str(e)}")
+    
+    def _write_changes(self, path: str, changes: List[Dict[str, Any]]):
+        """変更セットをJSONLファイルに書き出し"""
+        with open(path, "w", encoding="utf-8") as f:
+            for change in changes:
+                f.write(json.dumps(change, ensure_ascii=False) + "\n")
+        logger.info(f"Wrote {len(changes)} changes to {path}")
+    
     async def _import_law(
         self,
         client: EGOvClient,
@@ -133,13 +463,107 @@ class EGOvSyncBatch:
         """
         law_id = law_item.get("law_id")
         
-        # 法令詳細を取得
-        law_details = await client.get_law_details(law_id)
+        # 法令XMLを取得
+        result = await self._with_retry(lambda: client.get_law_xml_if_modified(law_id))
+        xml_content = result["xml"]
+        
+        law_details = await self._parse_law(xml_content, law_item)
         
-        # データベースに保存
-        # （実装詳細は省略、実際には SQLAlchemy を使用）
+        # 一括書き込みの対象に追加
+        await self.writer.add_law(
+            law_id,
+            law_details,
+            raw_xml=xml_content,
+            sync_state={
+                "list_fingerprint": list_fingerprint(law_item),
+                "etag": result["etag"],
+                "last_modified": result["last_modified"]
+            }
+        )
+        await self._save_snapshot(law_id, law_details)
         logger.debug(f"Imported law: {law_id}")
     
+    async def _parse_law(self, xml_content: str, law_item: Dict[str, Any]) -> Dict[str, Any]:
+        """法令XMLをパースし、XMLに含まれない項目を法令リストの値で補完"""
+        # パースは文書サイズに応じてスレッド・プロセスプールで実行（イベントループをブロックしない）
+        law_details = await self.parse_executor.parse(xml_content)
+        
+        for key in ("title", "law_no", "law_type", "enact_date"):
+            if not law_details.get(key) and law_item.get(key):
+                law_details[key] = law_item[key]
+        
+        return law_details
+    
+    async def _save_snapshot(self, law_id: str, law_details: Dict[str, Any]):
+        """法令スナップショットを保存（失敗しても同期は継続）"""
+        try:
+            await asyncio.to_thread(self.snapshots.save, law_id, law_details)
+        except Exception as e:
+            logger.error(f"Error saving law snapshot {law_id}: {str(e)}")
+    
+    async def _import_law_limited(
+        self,
+        client: EGOvClient,
+        law_item: Dict[str, Any],
+        semaphore: asyncio.Semaphore
+    ) -> bool:
+        """同時実行数を制限して法令をインポート（成功したかを返す）"""
+        async with semaphore:
+            try:
+                await self._import_law(client, law_item)
+                return True
+            except Exception as e:
+                logger.error(f"Error importing law {law_item.get('law_id')}: {str(e)}")
+                return False
+    
+    async def _with_retry(self, request):
+        """
+        レート制限を守って e-Gov API を呼び出し、429/5xx・通信エラー時は指数バックオフで再試行
+        
+        Args:
+            request: e-Gov API を呼び出すコルーチン関数
+        
+        Returns:
+            呼び出し結果
+        """
+        for attempt in range(settings.sync_max_retries + 1):
+            await self.rate_limiter.acquire()
+            try:
+                return await request()
+            except (httpx.HTTPStatusError, httpx.TransportError) as e:
+                retryable = (
+                    isinstance(e, httpx.TransportError)
+                    or e.response.status_code in self.RETRY_STATUS_CODES
+                )
+                if not retryable or attempt >= settings.sync_max_retries:
+                    raise
+                
+                backoff = 2 ** attempt
+                logger.warning(f"Retrying e-Gov request in {backoff}s: {str(e)}")
+                await asyncio.sleep(backoff)
+    
+    async def _init_repositories(self):
+        """テーブルを用意してリポジトリを初期化"""
+        await init_db()
+        self.repository = LawRepository()
+        self.sync_logs = SyncLogRepository()
+        if not self.repository.available:
+            raise RuntimeError("Knowledge base database is not available")
+    
+    def _log_progress(self, sync_log: SyncLog, imported_this_run: int, start_time: float):
+        """スループットと残り時間を出力"""
+        elapsed = time.perf_counter() - start_time
+        rate = imported_this_run / elapsed if elapsed > 0 else 0.0
+        done = (sync_log.result_count or 0) + (sync_log.failed_count or 0)
+        remaining = max(0, (sync_log.total_count or 0) - done)
+        eta = f"{remaining / rate / 60:.1f} min" if rate > 0 else "unknown"
+        
+        logger.info(
+            f"Processed {done}/{sync_log.total_count} laws "
+            f"(page {sync_log.checkpoint_page}, failed={sync_log.failed_count}), "
+            f"{rate:.2f} laws/s, {self.writer.rows_per_sec:.0f} rows/s written, ETA {eta}"
+        )
+    
     async def compare_and_log_changes(
         self,
         old_data: Dict[str, Any],
@@ -151,17 +575,32 @@ class EGOvSyncBatch:
         Args:
             old_data: 既存データ
             new_data: 新規データ
-            
+        
         Returns:
             変更内容のリスト
         """
         changes = []
         
-        # 簡単な実装：主要フィールドを比較
-        for key in ["title", "text"]:
+        # 法令の基本項目を比較
+        for key in ["title", "law_no", "law_type", "enact_date"]:
             if old_data.get(key) != new_data.get(key):
                 changes.append(f"{key} changed")
         
+        # 条文をハッシュで比較
+        old_articles = old_data.get("articles", [])
+        new_articles = new_data.get("articles", [])
+        old_hashes = dict(zip(unique_article_keys(old_articles), map(article_hash, old_articles)))
+        new_hashes = dict(zip(unique_article_keys(new_articles), map(article_hash, new_articles)))
+        
+        for key, digest in new_hashes.items():
+            if key not in old_hashes:
+                changes.append(f"article {key} added")
+            elif old_hashes[key] != digest:
+                changes.append(f"article {key} changed")
+        for key in old_hashes:
+            if key not in new_hashes:
+                changes.append(f"article {key} removed")
+        
         if changes:
             logger.info(f"Changes detected: {', '.join(changes)}")
         
@@ -174,15 +613,21 @@ async def main():
     
     parser = argparse.ArgumentParser(description="e-Gov API Synchronization Batch")
     parser.add_argument("--mode", choices=["full", "update"], default="update")
+    parser.add_argument("--restart", action="store_true", help="中断したフル同期を再開せず最初からやり直す")
+    parser.add_argument("--concurrency", type=int, default=None, help="同時に取得する法令数")
+    parser.add_argument("--changes-out", default=None, help="差分更新の変更セットを書き出すJSONLファイル")
     
     args = parser.parse_args()
     
-    batch = EGOvSyncBatch()
+    batch = EGOvSyncBatch(concurrency=args.concurrency)
     
-    if args.mode == "full":
-        await batch.run_full_sync()
-    else:
-        await batch.run_update_sync()
+    try:
+        if args.mode == "full":
+            await batch.run_full_sync(resume=not args.restart)
+        else:
+            await batch.run_update_sync(changes_out=args.changes_out)
+    finally:
+        xml_parse_executor.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,248 @@
+"""
+条文の埋め込み
+条文を BERT で長さ別のバッチにまとめてベクトル化し、内容が変わった条文のみ作り直す
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from .law_repository import LawRepository
+from ..config import settings
+from ..logger import get_logger
+
+try:
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    HAS_TRANSFORMERS = True
+except ImportError:
+    HAS_TRANSFORMERS = False
+
+logger = get_logger(__name__)
+
+# 保存するベクトルの要素型（リトルエンディアン）
+VECTOR_DTYPES = {"float32": "<f4", "float16": "<f2"}
+
+# 1回の読み込み・書き込みでまとめる条文数
+EMBED_CHUNK_SIZE = 512
+
+
+def encode_vector(vector: Sequence[float], dtype: str = "float16") -> bytes:
+    """
+    ベクトルをバイナリに変換
+    
+    Args:
+        vector: ベクトル
+        dtype: 要素型（float32/float16）
+    
+    Returns:
+        リトルエンディアンの配列のバイト列
+    """
+    return np.asarray(vector, dtype=VECTOR_DTYPES[dtype]).tobytes()
+
+
+def decode_vector(data: bytes, dtype: str = "float16") -> np.ndarray:
+    """
+    バイナリをベクトルに変換
+    
+    Args:
+        data: encode_vector で変換したバイト列
+        dtype: 要素型（float32/float16）
+    
+    Returns:
+        float32 のベクトル
+    """
+    return np.frombuffer(data, dtype=VECTOR_DTYPES[dtype]).astype(np.float32)
+
+
+def embedding_text(article: Dict[str, Any]) -> str:
+    """
+    埋め込みの入力にする条文テキスト（見出し + 本文）
+    
+    Args:
+        article: 条文データ
+    
+    Returns:
+        条文テキスト
+    """
+    heading = article.get("heading")
+    text = article.get("text") or ""
+    return f"{heading}\n{text}" if heading else text
+
+
+def bucket_batches(lengths: Sequence[int], batch_size: int, max_batch_tokens: int) -> List[List[int]]:
+    """
+    長さの近い入力を同じバッチにまとめる（パディングを減らす）
+    
+    入力を長さ順に並べ、件数が batch_size に達するか、パディング後のトークン数
+    （バッチ内の最大長 × 件数）が max_batch_tokens を超える手前で区切る
+    
+    Args:
+        lengths: 入力ごとのトークン数
+        batch_size: 1バッチの最大件数
+        max_batch_tokens: 1バッチのパディング後の最大トークン数
+    
+    Returns:
+        バッチごとの入力の添字（バッチ内は長さの昇順）
+    """
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    for i in sorted(range(len(lengths)), key=lengths.__getitem__):
+        if batch and (len(batch) >= batch_size or lengths[i] * (len(batch) + 1) > max_batch_tokens):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class ArticleEmbedder:
+    """
+    条文の埋め込みモデル（CPU 推論）
+    
+    トークン化は全件まとめて行い、長さ別のバッチごとにパディングして推論する。
+    出力は最終層の平均プーリングを L2 正規化したベクトル（内積がコサイン類似度になる）。
+    """
+    
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        max_length: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None
+    ):
+        """
+        Args:
+            model_name: モデル名（省略時は settings.bert_model_name）
+            max_length: 最大トークン数（省略時は settings.bert_max_length、超えた分は切り捨て）
+            batch_size: 1バッチの最大件数（省略時は settings.embedding_batch_size）
+            max_batch_tokens: 1バッチのパディング後の最大トークン数（省略時は settings.embedding_max_batch_tokens）
+        """
+        self.model_name = model_name or settings.bert_model_name
+        self.max_length = max_length or settings.bert_max_length
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self.max_batch_tokens = max(max_batch_tokens or settings.embedding_max_batch_tokens, self.max_length)
+        self._tokenizer = None
+        self._model = None
+    
+    def load(self):
+        """トークナイザーとモデルを読み込む（初回のみ）"""
+        if self._model is not None:
+            return
+        if not HAS_TRANSFORMERS:
+            raise RuntimeError("transformers and torch are required to embed articles")
+        
+        if settings.embedding_threads > 0:
+            torch.set_num_threads(settings.embedding_threads)
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self._model = AutoModel.from_pretrained(self.model_name).eval()
+        logger.info(f"Loaded embedding model {self.model_name} ({torch.get_num_threads()} threads)")
+    
+    @property
+    def dimension(self) -> int:
+        """ベクトルの次元数"""
+        self.load()
+        return self._model.config.hidden_size
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        テキストをベクトル化
+        
+        Args:
+            texts: テキストのリスト
+        
+        Returns:
+            (件数, 次元数) の float32 配列（入力と同じ順）
+        """
+        self.load()
+        input_ids = self._tokenizer(texts, truncation=True, max_length=self.max_length)["input_ids"]
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        
+        with torch.inference_mode():
+            for batch in bucket_batches([len(ids) for ids in input_ids], self.batch_size, self.max_batch_tokens):
+                inputs = self._tokenizer.pad({"input_ids": [input_ids[i] for i in batch]}, return_tensors="pt")
+                hidden = self._model(**inputs).last_hidden_state
+                mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+                vectors[batch] = torch.nn.functional.normalize(pooled, dim=-1).numpy()
+        return vectors
+
+
+async def embed_articles(
+    repository: LawRepository,
+    embedder: Optional[ArticleEmbedder] = None,
+    dtype: Optional[str] = None,
+    limit: Optional[int] = None,
+    chunk_size: int = EMBED_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    埋め込みが無い、または条文ハッシュ・モデルが変わった条文を埋め込み、知識ベースに保存
+    
+    条文ID順に chunk_size 件ずつ処理し、チャンクごとに保存する。処理済みの条文は
+    次回の対象から外れるため、中断した場合も再実行すれば続きから再開する。
+    推論（スレッド）と前のチャンクの保存は並行して行う。
+    
+    Args:
+        repository: 法令リポジトリ
+        embedder: 埋め込みモデル（省略時は設定値のモデル）
+        dtype: 保存する要素型（省略時は settings.embedding_dtype）
+        limit: 処理する最大条文数（省略時は全件）
+        chunk_size: 1回の読み込み・書き込みでまとめる条文数
+    
+    Returns:
+        {"pending": 実行前の対象件数, "embedded": 埋め込んだ件数, "elapsed_sec", "articles_per_sec"}
+    """
+    embedder = embedder or ArticleEmbedder()
+    dtype = dtype or settings.embedding_dtype
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    
+    pending = await repository.count_articles_to_embed(embedder.model_name)
+    target = pending if limit is None else min(pending, limit)
+    logger.info(f"Embedding {target} of {pending} pending articles with {embedder.model_name}")
+    
+    start = time.perf_counter()
+    embedded = 0
+    after_id = 0
+    saving: Optional[asyncio.Task] = None
+    try:
+        while embedded < target:
+            articles = await repository.get_articles_to_embed(
+                embedder.model_name, after_id, min(chunk_size, target - embedded)
+            )
+            if not articles:
+                break
+            
+            vectors = await asyncio.to_thread(embedder.encode, [embedding_text(a) for a in articles])
+            rows = [
+                {
+                    "article_id": article["article_id"],
+                    "embedding": encode_vector(vector, dtype),
+                    "dimension": len(vector),
+                    "dtype": dtype,
+                    "content_hash": article["content_hash"],
+                    "model_name": embedder.model_name
+                }
+                for article, vector in zip(articles, vectors)
+            ]
+            if saving is not None:
+                await saving
+            saving = asyncio.create_task(repository.save_embeddings(rows))
+            
+            embedded += len(articles)
+            after_id = articles[-1]["article_id"]
+            elapsed = time.perf_counter() - start
+            logger.info(f"Embedded {embedded}/{target} articles ({embedded / elapsed:.1f} articles/s)")
+    finally:
+        if saving is not None:
+            await saving
+    
+    elapsed = time.perf_counter() - start
+    stats = {
+        "pending": pending,
+        "embedded": embedded,
+        "elapsed_sec": round(elapsed, 2),
+        "articles_per_sec": round(embedded / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    logger.info(f"Embedding finished: {stats}")
+    return stats
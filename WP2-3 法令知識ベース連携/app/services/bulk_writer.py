@@ -0,0 +1,348 @@
+"""
+知識ベース一括書き込み
+同期バッチ向けに法令・条文をバッチ単位でまとめて書き込む
+"""
+import asyncio
+import itertools
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from ..models.database import get_session_factory
+from ..models.models import Article, ArticleEmbedding, LegalRef
+from ..utils.article_number import unique_article_keys
+from .law_repository import SYNC_STATE_FIELDS, _parse_date, article_hash, content_hash
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+LAW_COLUMNS = [
+    "law_id", "title", "law_no", "law_type", "enact_date", "source_url", "raw_xml",
+    "content_hash", "list_fingerprint", "etag", "last_modified"
+]
+ARTICLE_COLUMNS = [
+    "law_id", "article_no", "article_key", "position", "heading", "text",
+    "parsed_json", "content_hash"
+]
+
+# PostgreSQL の取り込み用ステージングテーブル（UNLOGGED・索引なし）
+LAW_STAGE_TABLE = "legal_refs_stage"
+ARTICLE_STAGE_TABLE = "articles_stage"
+STAGE_DDL = [
+    f"""CREATE UNLOGGED TABLE IF NOT EXISTS {LAW_STAGE_TABLE} (
+        seq bigserial, load_id text, law_id text, title text, law_no text, law_type text,
+        enact_date timestamp, source_url text, raw_xml text, content_hash text,
+        list_fingerprint text, etag text, last_modified text
+    )""",
+    f"""CREATE UNLOGGED TABLE IF NOT EXISTS {ARTICLE_STAGE_TABLE} (
+        load_id text, law_id text, article_no text, article_key text, position integer,
+        heading text, text text, parsed_json text, content_hash text
+    )""",
+]
+
+# 取り込み中に削除し、取り込み後に再作成する索引
+DEFERRED_INDEXES = {
+    "ix_articles_law_id_article_key":
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_articles_law_id_article_key ON articles (law_id, article_key)",
+}
+
+
+class KnowledgeBaseBulkWriter:
+    """
+    知識ベース一括書き込み
+    
+    法令・条文の行をメモリにためて batch_size 行ごとに書き込む。
+    
+    - PostgreSQL: COPY でステージングテーブルに投入し、finish() で集合演算により
+      本テーブルへ反映する（INSERT … ON CONFLICT）。defer_indexes=True の場合は
+      反映中の索引更新を省き、反映後に索引を再作成する。ステージングテーブルは
+      永続化されるため、中断したフル同期を再開した場合も投入済みの行は反映される。
+    - その他のデータベース: executemany（INSERT … ON CONFLICT）で本テーブルに直接書き込む。
+    
+    使用例:
+        async with KnowledgeBaseBulkWriter(defer_indexes=True) as writer:
+            await writer.add_law(law_id, law_data, raw_xml=xml)
+    """
+    
+    def __init__(
+        self,
+        session_factory: Optional[async_sessionmaker] = None,
+        batch_size: Optional[int] = None,
+        defer_indexes: bool = False,
+        reset: bool = False
+    ):
+        """
+        Args:
+            session_factory: セッションファクトリ（省略時はアプリケーション共通のエンジン）
+            batch_size: 1回の書き込みでまとめる行数（省略時は settings.bulk_batch_size）
+            defer_indexes: 反映時に索引を削除・再作成するか（フルロード向け）
+            reset: 前回の中断で残ったステージング行を破棄するか
+        """
+        self.session_factory = session_factory or get_session_factory()
+        self.batch_size = batch_size or settings.bulk_batch_size
+        self.defer_indexes = defer_indexes
+        self.reset = reset
+        self.use_copy = self.session_factory.kw["bind"].dialect.name == "postgresql"
+        
+        # 同じバッチ内で同じ法令が再投入された場合は後のものだけを残す
+        self._law_rows: Dict[str, Dict[str, Any]] = {}
+        self._article_rows: Dict[str, List[Dict[str, Any]]] = {}
+        self._staged_rows = 0
+        self._lock = asyncio.Lock()
+        self._load_prefix = uuid.uuid4().hex
+        self._load_seq = itertools.count()
+        
+        self.rows_written = 0
+        self._write_seconds = 0.0
+    
+    async def __aenter__(self):
+        await self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            await self.finish()
+        else:
+            # 異常終了時は投入済みのステージング行を残し、再開時に反映する
+            await self.flush()
+    
+    @property
+    def rows_per_sec(self) -> float:
+        """書き込みスループット（行/秒、書き込みに要した時間あたり）"""
+        return self.rows_written / self._write_seconds if self._write_seconds > 0 else 0.0
+    
+    async def start(self):
+        """ステージングテーブルを用意"""
+        if not self.use_copy:
+            return
+        
+        async with self.session_factory() as session:
+            async with session.begin():
+                for ddl in STAGE_DDL:
+                    await session.execute(text(ddl))
+                if self.reset:
+                    await session.execute(text(f"TRUNCATE {LAW_STAGE_TABLE}, {ARTICLE_STAGE_TABLE}"))
+    
+    async def add_law(
+        self,
+        law_id: str,
+        law_data: Dict[str, Any],
+        raw_xml: Optional[str] = None,
+        sync_state: Optional[Dict[str, Any]] = None
+    ):
+        """
+        法令と条文を書き込み対象に追加（batch_size 行たまったら書き込む）
+        
+        Args:
+            law_id: 法令ID
+            law_data: パース済み法令データ
+            raw_xml: 元のXMLデータ（任意）
+            sync_state: 同期状態（任意）
+        """
+        law_row = {
+            "law_id": law_id,
+            "title": law_data.get("title") or "",
+            "law_no": law_data.get("law_no") or "",
+            "law_type": law_data.get("law_type") or None,
+            "enact_date": _parse_date(law_data.get("enact_date")),
+            "source_url": law_data.get("source_url") or None,
+            "raw_xml": raw_xml,
+            "content_hash": content_hash(raw_xml) if raw_xml is not None else None,
+            "list_fingerprint": None,
+            "etag": None,
+            "last_modified": None
+        }
+        law_row.update({k: v for k, v in (sync_state or {}).items() if k in SYNC_STATE_FIELDS})
+        
+        articles = law_data.get("articles", [])
+        article_rows = [
+            {
+                "law_id": law_id,
+                "article_no": article.get("article_no", ""),
+                "article_key": key,
+                "position": position,
+                "heading": article.get("heading"),
+                "text": article.get("text", ""),
+                "parsed_json": article.get("structure"),
+                "content_hash": article_hash(article)
+            }
+            for position, (key, article) in enumerate(zip(unique_article_keys(articles), articles))
+        ]
+        
+        # ステージング行と法令の取り込み単位を対応付ける識別子
+        law_row["load_id"] = f"{self._load_prefix}-{next(self._load_seq)}"
+        
+        self._law_rows[law_id] = law_row
+        self._article_rows[law_id] = article_rows
+        self._staged_rows += 1 + len(article_rows)
+        
+        if self._staged_rows >= self.batch_size:
+            await self.flush()
+    
+    async def flush(self):
+        """たまっている行を書き込む"""
+        async with self._lock:
+            law_rows = list(self._law_rows.values())
+            article_rows = [
+                dict(row, load_id=self._law_rows[law_id]["load_id"])
+                for law_id, rows in self._article_rows.items()
+                for row in rows
+            ]
+            self._law_rows, self._article_rows, self._staged_rows = {}, {}, 0
+            if not law_rows:
+                return
+            
+            start = time.perf_counter()
+            if self.use_copy:
+                await self._copy_to_stage(law_rows, article_rows)
+            else:
+                await self._upsert(law_rows, article_rows)
+            self._write_seconds += time.perf_counter() - start
+            self.rows_written += len(law_rows) + len(article_rows)
+    
+    async def finish(self):
+        """残りの行を書き込み、ステージングテーブルを本テーブルへ反映"""
+        await self.flush()
+        
+        if self.use_copy:
+            start = time.perf_counter()
+            await self._merge_stage()
+            self._write_seconds += time.perf_counter() - start
+        
+        logger.info(
+            f"Bulk write completed: {self.rows_written} rows in {self._write_seconds:.1f}s "
+            f"({self.rows_per_sec:.0f} rows/s)"
+        )
+    
+    async def _copy_to_stage(
+        self,
+        law_rows: List[Dict[str, Any]],
+        article_rows: List[Dict[str, Any]]
+    ):
+        """COPY でステージングテーブルに投入（PostgreSQL）"""
+        async with self.session_factory() as session:
+            async with session.begin():
+                conn = await session.connection()
+                raw = await conn.get_raw_connection()
+                driver = raw.driver_connection
+                
+                law_columns = ["load_id"] + LAW_COLUMNS
+                await driver.copy_records_to_table(
+                    LAW_STAGE_TABLE,
+                    records=[tuple(row[c] for c in law_columns) for row in law_rows],
+                    columns=law_columns
+                )
+                
+                article_columns = ["load_id"] + ARTICLE_COLUMNS
+                await driver.copy_records_to_table(
+                    ARTICLE_STAGE_TABLE,
+                    records=[
+                        tuple(
+                            json.dumps(row[c], ensure_ascii=False)
+                            if c == "parsed_json" and row[c] is not None else row[c]
+                            for c in article_columns
+                        )
+                        for row in article_rows
+                    ],
+                    columns=article_columns
+                )
+    
+    async def _merge_stage(self):
+        """ステージングテーブルを本テーブルへ集合演算で反映（PostgreSQL）"""
+        law_columns = ", ".join(LAW_COLUMNS)
+        law_updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in LAW_COLUMNS if c != "law_id")
+        article_columns = ", ".join(ARTICLE_COLUMNS)
+        article_values = ", ".join(
+            "a.parsed_json::json" if c == "parsed_json" else f"a.{c}" for c in ARTICLE_COLUMNS
+        )
+        
+        async with self.session_factory() as session:
+            async with session.begin():
+                # 同じ法令が複数回投入されている場合（中断・再開時）は最後の投入を採用
+                await session.execute(text(f"""
+                    CREATE TEMP TABLE latest_laws ON COMMIT DROP AS
+                    SELECT DISTINCT ON (law_id) * FROM {LAW_STAGE_TABLE}
+                    ORDER BY law_id, seq DESC
+                """))
+                
+                await session.execute(text(f"""
+                    INSERT INTO legal_refs ({law_columns}, created_at, updated_at)
+                    SELECT {law_columns}, now(), now() FROM latest_laws
+                    ON CONFLICT (law_id) DO UPDATE SET {law_updates}, updated_at = now()
+                """))
+                
+                # 投入した法令の既存条文（と埋め込み）を置き換え
+                await session.execute(text("""
+                    DELETE FROM article_embeddings WHERE article_id IN (
+                        SELECT article_id FROM articles
+                        WHERE law_id IN (SELECT law_id FROM latest_laws)
+                    )
+                """))
+                await session.execute(text("""
+                    DELETE FROM articles WHERE law_id IN (SELECT law_id FROM latest_laws)
+                """))
+                
+                if self.defer_indexes:
+                    for name in DEFERRED_INDEXES:
+                        await session.execute(text(f"DROP INDEX IF EXISTS {name}"))
+                
+                await session.execute(text(f"""
+                    INSERT INTO articles ({article_columns}, created_at, updated_at)
+                    SELECT {article_values}, now(), now()
+                    FROM {ARTICLE_STAGE_TABLE} a
+                    JOIN latest_laws l ON a.load_id = l.load_id
+                """))
+                
+                if self.defer_indexes:
+                    for ddl in DEFERRED_INDEXES.values():
+                        await session.execute(text(ddl))
+                
+                await session.execute(text(f"TRUNCATE {LAW_STAGE_TABLE}, {ARTICLE_STAGE_TABLE}"))
+            
+            # 一括反映後の統計情報を更新
+            await session.execute(text("ANALYZE legal_refs"))
+            await session.execute(text("ANALYZE articles"))
+            await session.commit()
+    
+    async def _upsert(
+        self,
+        law_rows: List[Dict[str, Any]],
+        article_rows: List[Dict[str, Any]]
+    ):
+        """executemany（INSERT … ON CONFLICT）で本テーブルに書き込む"""
+        async with self.session_factory() as session:
+            async with session.begin():
+                insert = self._dialect_insert(session)
+                law_ids = list({row["law_id"] for row in law_rows})
+                
+                stmt = insert(LegalRef)
+                await session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[LegalRef.law_id],
+                        set_={c: getattr(stmt.excluded, c) for c in LAW_COLUMNS if c != "law_id"}
+                    ),
+                    [{c: row[c] for c in LAW_COLUMNS} for row in law_rows]
+                )
+                
+                article_ids = select(Article.article_id).where(Article.law_id.in_(law_ids))
+                await session.execute(
+                    delete(ArticleEmbedding).where(ArticleEmbedding.article_id.in_(article_ids))
+                )
+                await session.execute(delete(Article).where(Article.law_id.in_(law_ids)))
+                
+                if article_rows:
+                    await session.execute(
+                        insert(Article),
+                        [{c: row[c] for c in ARTICLE_COLUMNS} for row in article_rows]
+                    )
+    
+    def _dialect_insert(self, session: AsyncSession):
+        """データベースに応じた ON CONFLICT 対応の insert を返す"""
+        if session.bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert
@@ -4,7 +4,7 @@ Redis を使用したキャッシュ機能
 """
 import json
 import redis.asyncio as redis
-from typing import Optional, Any
+from typing import Optional, Any, Dict
 from ..config import settings
 from ..logger import get_logger
 
@@ -30,6 +30,7 @@ class CacheService:
                 encoding="utf-8",
                 decode_responses=True
             )
+            await self.redis_client.ping()
             logger.info("Connected to Redis")
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {str(e)}")
@@ -40,6 +41,7 @@ class CacheService:
         """Redis 接続を切断"""
         if self.redis_client:
             await self.redis_client.aclose()
+            self.redis_client = None
             logger.info("Disconnected from Redis")
     
     async def get(self, key: str) -> Optional[Any]:
@@ -99,6 +101,34 @@ class CacheService:
         except Exception as e:
             logger.error(f"Error setting cache: {str(e)}")
     
+    async def set_many(
+        self,
+        items: Dict[str, Any],
+        ttl: Optional[int] = None
+    ):
+        """
+        複数の値をまとめてキャッシュに保存（パイプラインで1往復）
+        
+        Args:
+            items: {キャッシュキー: 保存する値} の辞書
+            ttl: 有効期限（秒）、デフォルトは settings.cache_ttl
+        """
+        if not self.redis_client or not items:
+            return
+        
+        try:
+            ttl = ttl or self.ttl
+            
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(key, json.dumps(value, ensure_ascii=False), ex=ttl)
+                await pipe.execute()
+            
+            logger.debug(f"Cached {len(items)} keys (TTL: {ttl}s)")
+            
+        except Exception as e:
+            logger.error(f"Error setting cache: {str(e)}")
+    
     async def delete(self, key: str):
         """
         キャッシュを削除
@@ -115,6 +145,24 @@ class CacheService:
         except Exception as e:
             logger.error(f"Error deleting cache: {str(e)}")
     
+    async def delete_pattern(self, pattern: str):
+        """
+        パターンに一致するキャッシュをまとめて削除
+        
+        Args:
+            pattern: キーのパターン（例: "law:CIVIL_LAW_001:article:*"）
+        """
+        if not self.redis_client:
+            return
+        
+        try:
+            keys = [key async for key in self.redis_client.scan_iter(match=pattern, count=500)]
+            if keys:
+                await self.redis_client.delete(*keys)
+            
+        except Exception as e:
+            logger.error(f"Error deleting cache: {str(e)}")
+    
     async def exists(self, key: str) -> bool:
         """
         キャッシュキーの存在確認
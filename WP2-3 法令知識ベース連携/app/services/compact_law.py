@@ -0,0 +1,214 @@
+"""
+コンパクトな法令表現
+プロセス内キャッシュ用に、条文を1つのUTF-8バッファと列指向の配列で保持
+"""
+import json
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+from ..utils.article_number import build_article_index, canonical_article_key
+
+# 条文ごとにバッファへ格納する列（条番号・本文）
+COLUMNS = 2
+
+# 構造の行が本文の空行である場合の行番号
+EMPTY_LINE = -1
+
+
+def _intern_all(values: Dict[Optional[str], int]) -> Tuple[Optional[str], ...]:
+    """出現順の値をインターンしたタプルに変換"""
+    return tuple(sys.intern(v) if isinstance(v, str) else v for v in values)
+
+
+def _structure_lines(structure: Any, lines: List[str]) -> Optional[List[Tuple[int, Optional[str], int]]]:
+    """
+    構造（項・号の行）を本文の行番号で表す
+    
+    構造の各行のテキストは本文の行と同じであるため、テキストを重複して保持せずに
+    (階層, 番号, 本文の行番号) で表す。この形式で表せない構造の場合は None を返す。
+    """
+    if not isinstance(structure, dict) or set(structure) != {"items"}:
+        return None
+    
+    result = []
+    cursor = 0
+    for item in structure["items"]:
+        if not isinstance(item, dict) or set(item) != {"level", "text", "number"}:
+            return None
+        level, text, number = item["level"], item["text"], item["number"]
+        if not isinstance(level, int) or not 0 <= level <= 255:
+            return None
+        if number is not None and not isinstance(number, str):
+            return None
+        
+        if text == "":
+            result.append((level, number, EMPTY_LINE))
+            continue
+        try:
+            line = lines.index(text, cursor)
+        except ValueError:
+            return None
+        result.append((level, number, line))
+        cursor = line + 1
+    return result
+
+
+class CompactLaw:
+    """
+    コンパクトな法令表現
+    
+    パース済み法令データ（条文ごとの辞書）は、同じキーの繰り返しと多数の小さな文字列で
+    大きなメモリを使う。CompactLaw は全条文の条番号・本文を1つの UTF-8 バッファに
+    連結し、条文ごとの境界を array に保持する。見出し・項番号は重複が多いため
+    インターンした文字列のタプルと添字で保持する。構造（項・号の行）はテキストが
+    本文の行と重複するため、(階層, 番号, 本文の行番号) の列として保持し、参照された
+    時点で組み立てる。
+    """
+    
+    __slots__ = (
+        "law_info", "_buffer", "_bounds", "_headings", "_heading_ids",
+        "_item_bounds", "_item_levels", "_item_numbers", "_item_lines",
+        "_numbers", "_fallback", "_article_index"
+    )
+    
+    def __init__(self, law: Dict[str, Any]):
+        """
+        Args:
+            law: パース済み法令データ（LegalXMLParser.parse_xml と同じ形式）
+        """
+        self.law_info = {key: value for key, value in law.items() if key not in ("articles", "article_index")}
+        self._article_index: Optional[Dict[str, int]] = law.get("article_index")
+        
+        parts: List[bytes] = []
+        size = 0
+        headings: Dict[Optional[str], int] = {}
+        numbers: Dict[Optional[str], int] = {}
+        
+        self._bounds = array("I", [0])
+        self._heading_ids = array("I")
+        self._item_bounds = array("I", [0])
+        self._item_levels = array("B")
+        self._item_numbers = array("I")
+        self._item_lines = array("i")
+        # 列形式で表せない構造（位置 → 構造 JSON）
+        self._fallback: Dict[int, bytes] = {}
+        
+        for position, article in enumerate(law.get("articles", [])):
+            text = article.get("text") or ""
+            for value in ((article.get("article_no") or "").encode("utf-8"), text.encode("utf-8")):
+                parts.append(value)
+                size += len(value)
+                self._bounds.append(size)
+            self._heading_ids.append(headings.setdefault(article.get("heading"), len(headings)))
+            
+            structure = article.get("structure")
+            items = _structure_lines(structure, text.split("\n"))
+            if items is None:
+                self._fallback[position] = json.dumps(structure, ensure_ascii=False).encode("utf-8")
+                items = []
+            for level, number, line in items:
+                self._item_levels.append(level)
+                self._item_numbers.append(numbers.setdefault(number, len(numbers)))
+                self._item_lines.append(line)
+            self._item_bounds.append(len(self._item_levels))
+        
+        self._buffer = b"".join(parts)
+        self._headings = _intern_all(headings)
+        self._numbers = _intern_all(numbers)
+    
+    @classmethod
+    def from_dict(cls, law: Dict[str, Any]) -> "CompactLaw":
+        """
+        パース済み法令データから作成
+        
+        Args:
+            law: パース済み法令データ
+        
+        Returns:
+            コンパクトな法令表現
+        """
+        return cls(law)
+    
+    def __len__(self) -> int:
+        return len(self._heading_ids)
+    
+    @property
+    def article_index(self) -> Dict[str, int]:
+        """条文キー → 位置の索引"""
+        if self._article_index is None:
+            self._article_index = build_article_index(
+                [{"article_no": self._column(position, 0)} for position in range(len(self))]
+            )
+        return self._article_index
+    
+    def get_article(self, position: int) -> Dict[str, Any]:
+        """
+        指定位置の条文を取得
+        
+        Args:
+            position: 条文の位置
+        
+        Returns:
+            条文データ
+        """
+        if not 0 <= position < len(self):
+            raise IndexError(f"Article position out of range: {position}")
+        
+        text = self._column(position, 1)
+        return {
+            "article_no": self._column(position, 0),
+            "heading": self._headings[self._heading_ids[position]],
+            "text": text,
+            "structure": self._structure(position, text)
+        }
+    
+    def find_article(self, article_no: str) -> Optional[Dict[str, Any]]:
+        """
+        条番号で条文を取得（表記揺れ可）
+        
+        Args:
+            article_no: 条番号（"第百二十三条の二"・"123の2" など）
+        
+        Returns:
+            条文データ（該当する条文がなければ None）
+        """
+        position = self.article_index.get(canonical_article_key(article_no))
+        if position is None:
+            return None
+        return self.get_article(position)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        パース済み法令データ（API で使用する辞書形式）に変換
+        
+        Returns:
+            パース済み法令データ
+        """
+        law = dict(self.law_info)
+        law["articles"] = [self.get_article(position) for position in range(len(self))]
+        law["article_index"] = dict(self.article_index)
+        return law
+    
+    def _column(self, position: int, column: int) -> str:
+        """条文の列をバッファから切り出して文字列に変換"""
+        start = self._bounds[position * COLUMNS + column]
+        end = self._bounds[position * COLUMNS + column + 1]
+        return self._buffer[start:end].decode("utf-8")
+    
+    def _structure(self, position: int, text: str) -> Any:
+        """条文の構造を組み立てる"""
+        fallback = self._fallback.get(position)
+        if fallback is not None:
+            return json.loads(fallback)
+        
+        lines = text.split("\n")
+        return {
+            "items": [
+                {
+                    "level": self._item_levels[i],
+                    "text": lines[self._item_lines[i]] if self._item_lines[i] != EMPTY_LINE else "",
+                    "number": self._numbers[self._item_numbers[i]]
+                }
+                for i in range(self._item_bounds[position], self._item_bounds[position + 1])
+            ]
+        }
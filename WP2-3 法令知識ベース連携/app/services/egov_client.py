@@ -3,8 +3,10 @@ e-Gov API クライアント
 法令APIを利用して法令データを取得
 """
 import httpx
-from typing import Optional, Dict, Any
-from .xml_parser import LegalXMLParser
+from typing import Optional, Dict, Any, AsyncIterator
+from .xml_parser import LegalXMLParser, ArticleStreamParser
+from .parse_executor import xml_parse_executor
+from ..utils.article_number import canonical_article_key, build_article_index
 from ..config import settings
 from ..logger import get_logger
 
@@ -51,7 +53,7 @@ class EGOvClient:
             law_type: 法令種別（任意）
             page: ページ番号
             per_page: 1ページあたりの件数
-            
+        
         Returns:
             法令リスト（辞書形式）
         """
@@ -74,7 +76,7 @@ class EGOvClient:
             logger.info(f"Retrieved {len(data.get('laws', []))} laws from e-Gov API")
             
             return data
-            
+        
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error from e-Gov API: {e}")
             raise
@@ -82,33 +84,57 @@ class EGOvClient:
             logger.error(f"Error getting law list: {str(e)}")
             raise
     
-    async def get_law_details(self, law_id: str) -> Dict[str, Any]:
+    async def get_law_xml(self, law_id: str) -> str:
         """
-        法令詳細情報を取得（XML形式）
+        法令XMLを取得（パースしない）
         
         Args:
             law_id: 法令ID
-            
+        
         Returns:
-            パース済み法令データ（辞書形式）
+            XML文字列
+        """
+        result = await self.get_law_xml_if_modified(law_id)
+        return result["xml"]
+    
+    async def get_law_xml_if_modified(
+        self,
+        law_id: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        前回取得時から変更されていれば法令XMLを取得（条件付きリクエスト）
+        
+        Args:
+            law_id: 法令ID
+            etag: 前回取得時の ETag
+            last_modified: 前回取得時の Last-Modified
+        
+        Returns:
+            {"xml": XML文字列, "etag": ..., "last_modified": ...}（未変更の場合は None）
         """
         try:
             # 実際のAPIエンドポイントに合わせて調整
             url = f"{self.base_url}/laws/{law_id}"
             
-            response = await self.client.get(url)
-            response.raise_for_status()
-            
-            # XMLデータを取得
-            xml_content = response.text
-            
-            # XMLをパースして内部形式に変換
-            parsed_data = self.parser.parse_xml(xml_content)
+            headers = {}
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
             
-            logger.info(f"Retrieved and parsed law: {law_id}")
-            
-            return parsed_data
+            response = await self.client.get(url, headers=headers)
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
             
+            return {
+                "xml": response.text,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            }
+        
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error getting law details: {e}")
             raise
@@ -116,6 +142,56 @@ class EGOvClient:
             logger.error(f"Error getting law details: {str(e)}")
             raise
     
+    async def get_law_details(self, law_id: str) -> Dict[str, Any]:
+        """
+        法令詳細情報を取得（XML形式）
+        
+        キャッシュ・知識ベースを経由した取得は LawService を使用する
+        
+        Args:
+            law_id: 法令ID
+        
+        Returns:
+            パース済み法令データ（辞書形式）
+        """
+        xml_content = await self.get_law_xml(law_id)
+        
+        # XMLをパースして内部形式に変換（大きな法令はイベントループ外で実行）
+        parsed_data = await xml_parse_executor.parse(xml_content)
+        
+        logger.info(f"Retrieved and parsed law: {law_id}")
+        
+        return parsed_data
+    
+    async def stream_articles(self, law_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        法令XMLを受信しながら条文を逐次パースして返す
+        
+        レスポンス全体をバッファせず、受信したチャンクごとに閉じた条文から順に返す
+        
+        Args:
+            law_id: 法令ID
+        
+        Yields:
+            条文データ
+        """
+        url = f"{self.base_url}/laws/{law_id}"
+        stream_parser = ArticleStreamParser(self.parser)
+        
+        try:
+            async with self.client.stream("GET", url) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    for article in stream_parser.feed(chunk):
+                        yield article
+            
+            for article in stream_parser.close():
+                yield article
+        
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error streaming law: {e}")
+            raise
+    
     async def get_article(
         self,
         law_id: str,
@@ -126,22 +202,22 @@ class EGOvClient:
         
         Args:
             law_id: 法令ID
-            article_no: 条番号（例: "第1条"）
-            
+            article_no: 条番号（例: "第1条"、"第百二十三条の二"、"123の2"）
+        
         Returns:
             条文データ（辞書形式）
         """
         try:
-            # 法令全体を取得してから該当条文を抽出
+            # 法令全体を取得してから条文キーの索引で該当条文を参照
             law_data = await self.get_law_details(law_id)
             
-            # 該当条文を検索
-            for article in law_data.get("articles", []):
-                if article.get("article_no") == article_no:
-                    return article
-            
-            raise ValueError(f"Article {article_no} not found in law {law_id}")
+            index = law_data.get("article_index") or build_article_index(law_data.get("articles", []))
+            position = index.get(canonical_article_key(article_no))
+            if position is None:
+                raise ValueError(f"Article {article_no} not found in law {law_id}")
             
+            return law_data["articles"][position]
+        
         except Exception as e:
             logger.error(f"Error getting article: {str(e)}")
             raise
@@ -0,0 +1,223 @@
+"""
+AI 生成結果キャッシュ
+条文要約・論点抽出の結果を Redis と知識ベースの2段でキャッシュし、同期の変更セットで無効化する
+"""
+from typing import Any, Dict, List, Optional
+from .cache_service import CacheService
+from .law_cache import law_cache
+from .law_repository import GeneratedResultRepository, content_hash
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class GenerationCache:
+    """
+    要約・論点抽出結果のキャッシュ
+    
+    Redis（settings.generation_cache_ttl で失効）→ 知識ベース（generated_results、無期限）の
+    順に参照し、知識ベースで見つかった結果は Redis に書き戻す。
+    
+    要約のキーには法令ID・条文キーに加え、条文ハッシュ・スタイル・最大文字数・モデル・
+    プロンプトの版のハッシュを含めるため、条文やプロンプトが変わると自動的に別のキーになる。
+    同期で変更・削除された条文の古い結果は invalidate_changes で削除する。
+    論点抽出のキーは入力テキストの順序に依存しない（各テキストのハッシュをソートして連結）。
+    """
+    
+    SUMMARY_PREFIX = "summary"
+    TOPICS_PREFIX = "topics"
+    
+    def __init__(
+        self,
+        cache_service: Optional[CacheService] = None,
+        repository: Optional[GeneratedResultRepository] = None,
+        ttl: Optional[int] = None
+    ):
+        """
+        Args:
+            cache_service: Redis キャッシュサービス（省略時は法令キャッシュと共有）
+            repository: 生成結果リポジトリ（省略時はアプリケーション共通のエンジン）
+            ttl: Redis での有効期限（秒、省略時は settings.generation_cache_ttl）
+        """
+        self.cache_service = cache_service or law_cache.cache_service
+        self.repository = repository or GeneratedResultRepository()
+        self.ttl = ttl or settings.generation_cache_ttl
+    
+    def summary_key(
+        self,
+        law_id: str,
+        article_key: str,
+        article_hash: str,
+        style: str,
+        max_length: int,
+        model_name: str,
+        prompt_version: str
+    ) -> str:
+        """
+        条文要約のキャッシュキーを生成
+        
+        Args:
+            law_id: 法令ID
+            article_key: 正規化した条文キー
+            article_hash: 条文内容のハッシュ
+            style: 要約スタイル
+            max_length: 最大文字数
+            model_name: 生成モデル
+            prompt_version: プロンプトの版
+        
+        Returns:
+            キャッシュキー（summary:法令ID:条文キー:ハッシュ）
+        """
+        digest = content_hash([article_hash, style, max_length, model_name, prompt_version])
+        return self.cache_service.make_key(self.SUMMARY_PREFIX, law_id, article_key, digest)
+    
+    def topics_key(
+        self,
+        texts: List[str],
+        mode: str,
+        max_topics: int,
+        model_name: str,
+        prompt_version: str
+    ) -> str:
+        """
+        論点抽出のキャッシュキーを生成（テキストの順序に依存しない）
+        
+        Args:
+            texts: 条文テキストリスト
+            mode: 抽出モード
+            max_topics: 最大論点数
+            model_name: 生成モデル
+            prompt_version: プロンプトの版
+        
+        Returns:
+            キャッシュキー（topics:ハッシュ）
+        """
+        text_hashes = sorted(content_hash(text) for text in texts)
+        digest = content_hash([text_hashes, mode, max_topics, model_name, prompt_version])
+        return self.cache_service.make_key(self.TOPICS_PREFIX, digest)
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        キャッシュされた生成結果を取得
+        
+        Args:
+            key: キャッシュキー
+        
+        Returns:
+            生成結果（なければ None）
+        """
+        result = await self.cache_service.get(key)
+        if result is not None:
+            logger.debug(f"Generation cache hit (redis): {key}")
+            return result
+        
+        if not self.repository.available:
+            return None
+        try:
+            result = await self.repository.get(key)
+        except Exception as e:
+            logger.error(f"Error reading generated result: {str(e)}")
+            return None
+        
+        if result is not None:
+            logger.debug(f"Generation cache hit (knowledge base): {key}")
+            await self.cache_service.set(key, result, ttl=self.ttl)
+        return result
+    
+    async def set(
+        self,
+        key: str,
+        result: Dict[str, Any],
+        kind: str,
+        model_name: str,
+        prompt_version: str,
+        law_id: Optional[str] = None,
+        article_key: Optional[str] = None
+    ):
+        """
+        生成結果を Redis と知識ベースに保存
+        
+        Args:
+            key: キャッシュキー
+            result: 生成結果
+            kind: 種別（summary/topics）
+            model_name: 生成モデル
+            prompt_version: プロンプトの版
+            law_id: 法令ID（要約のみ）
+            article_key: 条文キー（要約のみ）
+        """
+        await self.cache_service.set(key, result, ttl=self.ttl)
+        
+        if not self.repository.available:
+            return
+        try:
+            await self.repository.save({
+                "cache_key": key,
+                "kind": kind,
+                "law_id": law_id,
+                "article_key": article_key,
+                "model_name": model_name,
+                "prompt_version": prompt_version,
+                "result": result
+            })
+        except Exception as e:
+            logger.error(f"Error saving generated result: {str(e)}")
+    
+    async def invalidate_articles(self, law_id: str, article_keys: Optional[List[str]] = None):
+        """
+        条文の要約を両方の階層から削除
+        
+        Args:
+            law_id: 法令ID
+            article_keys: 条文キー（省略時は法令内のすべての条文）
+        """
+        await self._delete_cached_summaries(law_id, article_keys)
+        
+        if not self.repository.available:
+            return
+        try:
+            await self.repository.delete_articles(law_id, article_keys)
+        except Exception as e:
+            logger.error(f"Error deleting generated results: {str(e)}")
+    
+    async def _delete_cached_summaries(self, law_id: str, article_keys: Optional[List[str]]):
+        """法令の要約キーを1回の走査で集め、対象の条文のキーを Redis から削除"""
+        client = self.cache_service.redis_client
+        if not client:
+            return
+        
+        prefix = self.cache_service.make_key(self.SUMMARY_PREFIX, law_id, "")
+        targets = set(article_keys) if article_keys is not None else None
+        try:
+            keys = [
+                key async for key in client.scan_iter(match=f"{prefix}*", count=500)
+                if targets is None or key[len(prefix):].rsplit(":", 1)[0] in targets
+            ]
+            if keys:
+                await client.delete(*keys)
+        except Exception as e:
+            logger.error(f"Error deleting cached summaries: {str(e)}")
+    
+    async def invalidate_changes(self, changes: List[Dict[str, Any]]):
+        """
+        同期の変更セットに含まれる条文の要約を削除
+        
+        削除された法令はすべての条文、変更のあった法令は追加・変更・削除された条文が対象
+        
+        Args:
+            changes: 変更セット（[{"law_id", "change", "articles": {"added", "updated", "removed"}}, ...]）
+        """
+        for change in changes:
+            articles = change.get("articles")
+            if change["change"] == "removed" or articles is None:
+                await self.invalidate_articles(change["law_id"])
+                continue
+            
+            article_keys = articles.get("added", []) + articles.get("updated", []) + articles.get("removed", [])
+            if article_keys:
+                await self.invalidate_articles(change["law_id"], article_keys)
+
+
+# アプリケーション共通の生成結果キャッシュ
+generation_cache = GenerationCache()
@@ -0,0 +1,367 @@
+"""
+法令キャッシュサービス
+パース済み法令データをプロセス内LRUとRedisの2段でキャッシュ（リードスルー）
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from .cache_service import CacheService
+from .compact_law import CompactLaw
+from ..utils.article_number import canonical_article_key, build_article_index
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _LRUCache:
+    """TTL付きプロセス内LRUキャッシュ"""
+    
+    def __init__(self, max_entries: int, ttl_sec: int):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any):
+        if self.max_entries <= 0:
+            return
+        
+        self._data[key] = (time.monotonic() + self.ttl_sec, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+    
+    def delete(self, key: str):
+        self._data.pop(key, None)
+    
+    def clear(self):
+        self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LawCache:
+    """
+    パース済み法令データのリードスルーキャッシュ
+    
+    プロセス内LRU → Redis（CacheService）→ 取得関数の順に参照し、下位層で見つかった
+    データは上位層に書き戻す。同じ法令IDの取得が実行中であれば新たに取得を開始せず、
+    実行中の取得結果を待つ（同時ミス時も上流へのアクセスは1回）。
+    
+    Redis には法令全体に加えて条文単位のエントリも保存し、プロセス内にない法令の
+    1条文だけを参照する場合は法令全体を読み込まずに済むようにする。
+    
+    プロセス内LRUには法令をコンパクトな表現（CompactLaw）で保持し、参照時に辞書形式に
+    変換して返す（条文単位の参照は該当条文のみを変換する）。頻繁に参照される少数の法令は
+    変換済みの辞書も保持し（settings.law_cache_hot_entries）、参照のたびに全条文を組み立て直さない。
+    
+    同期バッチなど別プロセスでの無効化は Redis の世代番号（法令ごとのハッシュ）で伝える。
+    各プロセスは settings.law_cache_generation_check_sec ごとに世代番号を確認し、
+    番号が変わった法令をプロセス内LRUから削除する。
+    """
+    
+    KEY_PREFIX = "law"
+    
+    # 世代番号のハッシュのフィールド（法令IDのほかに、全体の版とすべての法令の世代番号）
+    GENERATION_VERSION = "_version"
+    GENERATION_ALL = "_all"
+    
+    def __init__(self, cache_service: Optional[CacheService] = None):
+        self.cache_service = cache_service or CacheService()
+        self._local = _LRUCache(settings.law_cache_max_entries, settings.cache_ttl)
+        # 変換済みの辞書形式（直近に参照された少数の法令のみ）
+        self._hot = _LRUCache(settings.law_cache_hot_entries, settings.cache_ttl)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.generation_check_sec = settings.law_cache_generation_check_sec
+        self._generation_version: Optional[str] = None
+        self._generations: Optional[Dict[str, str]] = None
+        self._generation_checked_at = 0.0
+    
+    async def connect(self):
+        """Redis に接続（接続失敗時はプロセス内キャッシュのみで動作）"""
+        await self.cache_service.connect()
+    
+    async def disconnect(self):
+        """Redis 接続を切断"""
+        await self.cache_service.disconnect()
+    
+    def make_key(self, law_id: str) -> str:
+        """
+        キャッシュキーを生成
+        
+        Args:
+            law_id: 法令ID
+        
+        Returns:
+            キャッシュキー
+        """
+        return self.cache_service.make_key(self.KEY_PREFIX, law_id)
+    
+    def make_article_key(self, law_id: str, article_key: str) -> str:
+        """
+        条文単位のキャッシュキーを生成
+        
+        Args:
+            law_id: 法令ID
+            article_key: 正規化した条文キー
+        
+        Returns:
+            キャッシュキー
+        """
+        return self.cache_service.make_key(self.KEY_PREFIX, law_id, "article", article_key)
+    
+    @property
+    def generation_key(self) -> str:
+        """世代番号を保持するハッシュのキー"""
+        return self.cache_service.make_key(self.KEY_PREFIX, "generation")
+    
+    async def get_or_load(
+        self,
+        law_id: str,
+        loader: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        キャッシュされた法令データを返すか、取得してキャッシュする
+        
+        Args:
+            law_id: 法令ID
+            loader: 上流から法令データを取得してパースするコルーチン関数
+        
+        Returns:
+            パース済み法令データ
+        """
+        key = self.make_key(law_id)
+        await self._check_generations()
+        
+        law = self._hot.get(key)
+        if law is not None:
+            return law
+        
+        compact = self._local.get(key)
+        if compact is not None:
+            law = compact.to_dict()
+            self._hot.set(key, law)
+            return law
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(law_id, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.debug(f"Attaching to in-flight law fetch: {law_id}")
+        
+        # 呼び出し元がキャンセルされても取得は継続し、待機中の他のリクエストが結果を受け取る
+        return await asyncio.shield(task)
+    
+    async def get_cached(self, law_id: str) -> Optional[CompactLaw]:
+        """
+        プロセス内にキャッシュされた法令を返す（Redis の法令データ・上流は参照しない）
+        
+        Args:
+            law_id: 法令ID
+        
+        Returns:
+            コンパクトな法令表現（キャッシュされていない場合は None）
+        """
+        await self._check_generations()
+        return self._local.get(self.make_key(law_id))
+    
+    async def get_article(
+        self,
+        law_id: str,
+        article_no: str,
+        loader: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        キャッシュを経由して条文を取得
+        
+        プロセス内の法令データ、Redis の条文エントリ、法令全体の取得の順に参照する
+        
+        Args:
+            law_id: 法令ID
+            article_no: 条番号（"第百二十三条の二"・"123の2" など表記揺れ可）
+            loader: 上流から法令データを取得してパースするコルーチン関数
+        
+        Returns:
+            条文データ（該当する条文がなければ None）
+        """
+        article_key = canonical_article_key(article_no)
+        
+        compact = await self.get_cached(law_id)
+        if compact is not None:
+            return compact.find_article(article_key)
+        
+        article = await self.cache_service.get(self.make_article_key(law_id, article_key))
+        if article is not None:
+            return article
+        
+        law = await self.get_or_load(law_id, loader)
+        return self._find_article(law, article_key)
+    
+    async def invalidate(self, law_id: str):
+        """
+        法令データのキャッシュを両方の階層から削除
+        
+        Args:
+            law_id: 法令ID
+        """
+        key = self.make_key(law_id)
+        self._evict(key)
+        await self.cache_service.delete(key)
+        await self.cache_service.delete_pattern(self.make_article_key(law_id, "*"))
+        await self.bump_generations([law_id])
+    
+    async def invalidate_all(self, law_ids: Iterable[str]):
+        """
+        フル同期後に法令データのキャッシュをまとめて無効化
+        
+        指定した法令の Redis のエントリを1回の走査で削除し、すべての法令の世代番号を
+        更新して各プロセスのLRUを破棄させる
+        
+        Args:
+            law_ids: 同期した法令ID
+        """
+        self._clear()
+        
+        targets = set(law_ids)
+        client = self.cache_service.redis_client
+        if client and targets:
+            try:
+                keys = [
+                    key async for key in client.scan_iter(match=f"{self.KEY_PREFIX}:*", count=500)
+                    if key.split(":")[1] in targets
+                ]
+                for start in range(0, len(keys), 1000):
+                    await client.delete(*keys[start:start + 1000])
+            except Exception as e:
+                logger.error(f"Error deleting cached laws: {str(e)}")
+        
+        await self.bump_generations()
+    
+    async def bump_generations(self, law_ids: Optional[Iterable[str]] = None):
+        """
+        世代番号を更新して他プロセスのLRUに無効化を伝える
+        
+        Args:
+            law_ids: 法令ID（省略時はすべての法令）
+        """
+        client = self.cache_service.redis_client
+        if not client:
+            return
+        
+        try:
+            async with client.pipeline(transaction=True) as pipe:
+                for field in (law_ids if law_ids is not None else [self.GENERATION_ALL]):
+                    pipe.hincrby(self.generation_key, field, 1)
+                pipe.hincrby(self.generation_key, self.GENERATION_VERSION, 1)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error updating law cache generations: {str(e)}")
+    
+    async def _check_generations(self):
+        """一定間隔で世代番号を確認し、更新された法令をプロセス内LRUから削除"""
+        client = self.cache_service.redis_client
+        now = time.monotonic()
+        if not client or now - self._generation_checked_at < self.generation_check_sec:
+            return
+        self._generation_checked_at = now
+        
+        try:
+            # 通常は版の確認のみ（1往復）で済ませ、変わった場合のみ全体を読む
+            version = await client.hget(self.generation_key, self.GENERATION_VERSION)
+            if self._generations is not None and version == self._generation_version:
+                return
+            generations = await client.hgetall(self.generation_key)
+        except Exception as e:
+            logger.error(f"Error reading law cache generations: {str(e)}")
+            return
+        
+        # 初回は基準の記録のみ（LRUは世代番号の確認後に読み込んだ法令のみを含む）
+        if self._generations is not None:
+            if generations.get(self.GENERATION_ALL) != self._generations.get(self.GENERATION_ALL):
+                logger.info("All laws were re-synced; clearing in-process law cache")
+                self._clear()
+            else:
+                for law_id, generation in generations.items():
+                    if law_id.startswith("_") or self._generations.get(law_id) == generation:
+                        continue
+                    logger.debug(f"Law re-synced in another process: {law_id}")
+                    self._evict(self.make_key(law_id))
+        
+        self._generation_version = generations.get(self.GENERATION_VERSION)
+        self._generations = generations
+    
+    async def _load(
+        self,
+        law_id: str,
+        loader: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Redis、取得関数の順に法令データを取得して上位層に保存"""
+        key = self.make_key(law_id)
+        data = await self.cache_service.get(key)
+        if data is not None:
+            logger.debug(f"Law cache hit (redis): {key}")
+            self._store(key, data)
+            return data
+        
+        data = await loader()
+        if "article_index" not in data:
+            data["article_index"] = build_article_index(data.get("articles", []))
+        
+        self._store(key, data)
+        await self.cache_service.set(key, data)
+        await self.cache_service.set_many({
+            self.make_article_key(law_id, article_key): data["articles"][position]
+            for article_key, position in data["article_index"].items()
+        })
+        return data
+    
+    def _store(self, key: str, data: Dict[str, Any]):
+        """取得した法令データをプロセス内の両方の表現で保持"""
+        self._local.set(key, CompactLaw.from_dict(data))
+        self._hot.set(key, data)
+    
+    def _evict(self, key: str):
+        """法令をプロセス内の両方の表現から削除"""
+        self._local.delete(key)
+        self._hot.delete(key)
+    
+    def _clear(self):
+        """プロセス内のすべての法令を削除"""
+        self._local.clear()
+        self._hot.clear()
+    
+    def _find_article(
+        self,
+        law: Dict[str, Any],
+        article_key: str
+    ) -> Optional[Dict[str, Any]]:
+        """法令データの索引から条文を取得"""
+        index = law.get("article_index")
+        if index is None:
+            index = build_article_index(law.get("articles", []))
+        
+        position = index.get(article_key)
+        if position is None:
+            return None
+        return law["articles"][position]
+
+
+# アプリケーション共通の法令キャッシュ
+law_cache = LawCache()
@@ -0,0 +1,124 @@
+"""
+法令の参照回数カウンター
+法令・条文の参照回数をプロセス内で集計し、一定間隔で Redis のハッシュにまとめて加算する
+"""
+import asyncio
+import time
+from collections import Counter
+from typing import Dict, Optional
+from .cache_service import CacheService
+from .law_cache import law_cache
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LawPopularity:
+    """
+    法令の参照回数カウンター
+    
+    参照のたびに Redis へ書き込まず、プロセス内で加算した差分を
+    settings.popularity_flush_sec ごとにパイプラインでまとめて HINCRBY する。
+    Redis が利用できない場合はプロセス内の集計のみを使う。
+    """
+    
+    KEY = "law:popularity"
+    
+    def __init__(
+        self,
+        cache_service: Optional[CacheService] = None,
+        flush_sec: Optional[int] = None,
+        key: Optional[str] = None
+    ):
+        """
+        Args:
+            cache_service: Redis キャッシュサービス（省略時は法令キャッシュと共有）
+            flush_sec: Redis にまとめて書き込む間隔（秒、省略時は settings.popularity_flush_sec）
+            key: 参照回数を保存する Redis のハッシュ（省略時は KEY）
+        """
+        self.cache_service = cache_service or law_cache.cache_service
+        self.key = key or self.KEY
+        self.flush_sec = flush_sec if flush_sec is not None else settings.popularity_flush_sec
+        # 起動後の参照回数（Redis が利用できない場合の集計）
+        self._local: Counter = Counter()
+        # Redis に未反映の参照回数
+        self._pending: Counter = Counter()
+        self._last_flush = time.monotonic()
+        self._flushing: Optional[asyncio.Task] = None
+    
+    def record(self, law_id: str):
+        """
+        法令の参照を記録（前回の書き込みから一定時間経っていればバックグラウンドで書き込む）
+        
+        Args:
+            law_id: 法令ID（条文単位のカウンターでは article_ref の集計キー）
+        """
+        self._local[law_id] += 1
+        self._pending[law_id] += 1
+        
+        if time.monotonic() - self._last_flush < self.flush_sec:
+            return
+        if self._flushing is not None and not self._flushing.done():
+            return
+        try:
+            self._flushing = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
+            # イベントループ外（バッチ処理など）では次回の flush で書き込む
+            pass
+    
+    async def flush(self):
+        """未反映の参照回数を Redis に加算"""
+        self._last_flush = time.monotonic()
+        client = self.cache_service.redis_client
+        if not client or not self._pending:
+            return
+        
+        pending, self._pending = self._pending, Counter()
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                for law_id, count in pending.items():
+                    pipe.hincrby(self.key, law_id, count)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error flushing law popularity: {str(e)}")
+            self._pending.update(pending)
+    
+    async def scores(self) -> Dict[str, int]:
+        """
+        法令ごとの参照回数を取得
+        
+        Returns:
+            {法令ID: 参照回数}（Redis の累計 + 未反映分、Redis が利用できない場合はプロセス内の集計）
+        """
+        client = self.cache_service.redis_client
+        if client:
+            try:
+                stored = await client.hgetall(self.key)
+                scores = Counter({law_id: int(count) for law_id, count in stored.items()})
+                scores.update(self._pending)
+                return dict(scores)
+            except Exception as e:
+                logger.error(f"Error reading law popularity: {str(e)}")
+        return dict(self._local)
+
+
+def article_ref(law_id: str, article_key: str) -> str:
+    """
+    条文の参照回数の集計キー
+    
+    Args:
+        law_id: 法令ID
+        article_key: 正規化した条文キー
+    
+    Returns:
+        "法令ID:条文キー"
+    """
+    return f"{law_id}:{article_key}"
+
+
+# アプリケーション共通の参照回数カウンター
+law_popularity = LawPopularity()
+
+# アプリケーション共通の条文単位の参照回数カウンター（集計キーは article_ref）
+article_popularity = LawPopularity(key="law:article_popularity")
@@ -0,0 +1,273 @@
+"""
+条文参照の解決
+"民法第709条第1項" のような条文参照を、法令名のトライ木と条文索引で検索せずに条文へ対応付ける
+"""
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from ..utils.article_number import NUMBER_PATTERN, kanji_to_int
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+_NUMBER = NUMBER_PATTERN.pattern
+
+# 法令名に続く条・項・号（"第七百九条の二第一項第三号"・"709条の2 1項"・"709"）
+REFERENCE_PATTERN = re.compile(
+    rf"第?(?P<main>{_NUMBER})条?(?P<branches>(?:[のノ]{_NUMBER})*)"
+    rf"(?:第?(?P<paragraph>{_NUMBER})項)?(?:第?(?P<item>{_NUMBER})号)?"
+)
+
+# 同名の法令がある場合に優先する法令種別（e-Gov の LawType とその日本語名）
+LAW_TYPE_PRIORITY = {
+    "Constitution": 0, "憲法": 0,
+    "Act": 1, "法律": 1,
+    "CabinetOrder": 2, "政令": 2,
+    "ImperialOrder": 3, "勅令": 3,
+    "MinisterialOrdinance": 4, "府省令": 4,
+    "Rule": 5, "規則": 5,
+}
+
+# よく使われる法令の略称 → 正式名称
+LAW_ABBREVIATIONS = {
+    "憲法": "日本国憲法",
+    "民訴": "民事訴訟法",
+    "民訴法": "民事訴訟法",
+    "民訴規則": "民事訴訟規則",
+    "刑訴": "刑事訴訟法",
+    "刑訴法": "刑事訴訟法",
+    "刑訴規則": "刑事訴訟規則",
+    "民執法": "民事執行法",
+    "民保法": "民事保全法",
+    "行訴法": "行政事件訴訟法",
+    "行手法": "行政手続法",
+    "行審法": "行政不服審査法",
+    "国賠法": "国家賠償法",
+    "地自法": "地方自治法",
+    "国公法": "国家公務員法",
+    "地公法": "地方公務員法",
+    "情報公開法": "行政機関の保有する情報の公開に関する法律",
+    "個人情報保護法": "個人情報の保護に関する法律",
+    "労基法": "労働基準法",
+    "労契法": "労働契約法",
+    "労組法": "労働組合法",
+    "労安衛法": "労働安全衛生法",
+    "安衛法": "労働安全衛生法",
+    "派遣法": "労働者派遣事業の適正な運営の確保及び派遣労働者の保護等に関する法律",
+    "育児介護休業法": "育児休業、介護休業等育児又は家族介護を行う労働者の福祉に関する法律",
+    "男女雇用機会均等法": "雇用の分野における男女の均等な機会及び待遇の確保等に関する法律",
+    "独禁法": "私的独占の禁止及び公正取引の確保に関する法律",
+    "独占禁止法": "私的独占の禁止及び公正取引の確保に関する法律",
+    "下請法": "下請代金支払遅延等防止法",
+    "景表法": "不当景品類及び不当表示防止法",
+    "特商法": "特定商取引に関する法律",
+    "金商法": "金融商品取引法",
+    "宅建業法": "宅地建物取引業法",
+    "建基法": "建築基準法",
+    "道交法": "道路交通法",
+    "入管法": "出入国管理及び難民認定法",
+    "不登法": "不動産登記法",
+    "商登法": "商業登記法",
+    "破産法": "破産法",
+    "会更法": "会社更生法",
+    "民再法": "民事再生法",
+}
+
+
+def normalize_reference(text: str) -> str:
+    """
+    条文参照・法令名を照合用に正規化（NFKC・空白除去）
+    
+    Args:
+        text: 条文参照または法令名
+    
+    Returns:
+        正規化した文字列
+    """
+    return re.sub(r"\s+", "", unicodedata.normalize("NFKC", text or ""))
+
+
+class TitleTrie:
+    """
+    法令名のトライ木
+    
+    文字ごとの辞書を入れ子にし、法令名の終端に値を持たせる。
+    条文参照の先頭から1文字ずつたどるだけで、最長一致する法令名を求める。
+    """
+    
+    # 終端の値を格納するキー（法令名の1文字と衝突しない）
+    _END = ""
+    
+    def __init__(self):
+        self._root: Dict[str, Any] = {}
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def insert(self, name: str, value: Any):
+        """
+        法令名を登録（同じ名前は上書き）
+        
+        Args:
+            name: 正規化済みの法令名
+            value: 終端に持たせる値
+        """
+        node = self._root
+        for char in name:
+            node = node.setdefault(char, {})
+        if self._END not in node:
+            self._size += 1
+        node[self._END] = value
+    
+    def longest_prefix(self, text: str) -> Tuple[Optional[Any], int]:
+        """
+        テキストの先頭と最長一致する法令名を検索
+        
+        Args:
+            text: 正規化済みのテキスト
+        
+        Returns:
+            (終端の値, 一致した文字数)（一致しない場合は (None, 0)）
+        """
+        node = self._root
+        found: Tuple[Optional[Any], int] = (None, 0)
+        for length, char in enumerate(text, 1):
+            node = node.get(char)
+            if node is None:
+                break
+            if self._END in node:
+                found = (node[self._END], length)
+        return found
+
+
+class LawReferenceResolver:
+    """
+    条文参照の解決器
+    
+    登録された法令名と略称からトライ木を作り、参照文字列の先頭で最長一致する法令を
+    決めてから、残りを条・項・号として解釈する。全文検索や LLM を使わずに
+    参照文字列の長さに比例する時間で解決する。
+    """
+    
+    def __init__(self, laws: Iterable[Tuple[str, str, Optional[str]]] = ()):
+        """
+        Args:
+            laws: (法令ID, 法令名, 法令種別) の列
+        """
+        self._trie = TitleTrie()
+        self._laws: Dict[str, Tuple[str, str, Optional[str]]] = {}
+        self.add_laws(laws)
+    
+    def __len__(self) -> int:
+        return len(self._laws)
+    
+    def add_laws(self, laws: Iterable[Tuple[str, str, Optional[str]]]):
+        """
+        法令名を登録（同名の法令は法令種別の優先度、法令IDの順で1件を採用）
+        
+        Args:
+            laws: (法令ID, 法令名, 法令種別) の列
+        """
+        for law_id, title, law_type in laws:
+            name = normalize_reference(title)
+            if not name:
+                continue
+            current = self._laws.get(name)
+            if current is None or self._rank(law_id, law_type) < self._rank(current[0], current[2]):
+                self._laws[name] = (law_id, title, law_type)
+                self._trie.insert(name, self._laws[name])
+        
+        # 略称は正式名称の法令が登録されている場合のみ有効（正式名称と同じ略称は上書きしない）
+        for abbreviation, title in LAW_ABBREVIATIONS.items():
+            name = normalize_reference(abbreviation)
+            law = self._laws.get(normalize_reference(title))
+            if law is not None and name not in self._laws:
+                self._trie.insert(name, law)
+    
+    def resolve(self, reference: str) -> Optional[Dict[str, Any]]:
+        """
+        条文参照を解決
+        
+        Args:
+            reference: 条文参照（例: "民法第709条"・"刑訴法三百二十一条第一項第二号"・"民法"）
+        
+        Returns:
+            {"law_id", "title", "law_type", "article_key", "paragraph", "item"}
+            （条文キーは "709"・"3-2" の形式、法令名のみの場合は条・項・号が None。
+            法令名に一致しない、または条・項・号として解釈できない場合は None）
+        """
+        text = normalize_reference(reference)
+        law, length = self._trie.longest_prefix(text)
+        if law is None:
+            return None
+        
+        law_id, title, law_type = law
+        resolved = {
+            "law_id": law_id,
+            "title": title,
+            "law_type": law_type,
+            "article_key": None,
+            "paragraph": None,
+            "item": None
+        }
+        rest = text[length:]
+        if not rest:
+            return resolved
+        
+        match = REFERENCE_PATTERN.fullmatch(rest)
+        if match is None:
+            return None
+        
+        numbers = [match.group("main")] + NUMBER_PATTERN.findall(match.group("branches"))
+        resolved["article_key"] = "-".join(str(kanji_to_int(n)) for n in numbers)
+        for field in ("paragraph", "item"):
+            if match.group(field):
+                resolved[field] = kanji_to_int(match.group(field))
+        return resolved
+    
+    @staticmethod
+    def _rank(law_id: str, law_type: Optional[str]) -> Tuple[int, str]:
+        """同名の法令の優先順位（小さいほど優先）"""
+        return LAW_TYPE_PRIORITY.get(law_type or "", len(LAW_TYPE_PRIORITY)), law_id
+
+
+def select_provision(article: Dict[str, Any], paragraph: Optional[int], item: Optional[int]) -> Optional[str]:
+    """
+    条文から項・号の本文を切り出す（配下の号・細分を含む）
+    
+    項は構造の階層1の行、号は項の配下の階層2の行を先頭から数えて特定する
+    
+    Args:
+        article: 条文データ
+        paragraph: 項番号（省略時は条文全体、号のみ指定された場合は第1項）
+        item: 号番号（任意）
+    
+    Returns:
+        項・号の本文（構造が無い、または該当する項・号が無い場合は None）
+    """
+    if paragraph is None and item is None:
+        return article.get("text")
+    
+    structure = article.get("structure") or {}
+    items: List[Dict[str, Any]] = structure.get("items") or []
+    
+    def block(lines: List[Dict[str, Any]], level: int, number: int) -> Optional[List[Dict[str, Any]]]:
+        count = 0
+        for start, line in enumerate(lines):
+            if line.get("level") != level:
+                continue
+            count += 1
+            if count == number:
+                end = start + 1
+                while end < len(lines) and lines[end].get("level", 0) > level:
+                    end += 1
+                return lines[start:end]
+        return None
+    
+    selected = block(items, 1, paragraph or 1)
+    if selected is not None and item is not None:
+        selected = block(selected, 2, item)
+    if not selected:
+        return None
+    return "\n".join(line.get("text", "") for line in selected)
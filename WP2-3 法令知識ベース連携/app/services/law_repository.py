@@ -0,0 +1,974 @@
+"""
+法令リポジトリ
+ローカル知識ベース（PostgreSQL）に対する法令・条文の読み書き
+"""
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import delete, func, insert, or_, select, text, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from ..models.database import get_session_factory
+from ..models.models import Article, ArticleEmbedding, GeneratedResult, LegalRef, SyncLog
+from ..utils.article_number import build_article_index, unique_article_keys
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    """日付文字列を datetime に変換（解釈できない場合は None）"""
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _format_date(value: Optional[datetime]) -> Optional[str]:
+    """datetime を ISO 形式の文字列に変換"""
+    return value.isoformat() if value else None
+
+
+def content_hash(value: Any) -> str:
+    """
+    内容のSHA-256ハッシュを算出（文字列以外はキー順のJSONに変換して算出）
+    
+    Args:
+        value: 文字列または JSON 化可能な値
+    
+    Returns:
+        16進表記のハッシュ
+    """
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def article_hash(article: Dict[str, Any]) -> str:
+    """
+    条文内容のハッシュを算出（条番号・見出し・本文・構造）
+    
+    Args:
+        article: 条文データ
+    
+    Returns:
+        16進表記のハッシュ
+    """
+    return content_hash([
+        article.get("article_no", ""),
+        article.get("heading"),
+        article.get("text", ""),
+        article.get("structure")
+    ])
+
+
+# 同期状態として LegalRef に保存する項目
+SYNC_STATE_FIELDS = ("content_hash", "list_fingerprint", "etag", "last_modified")
+
+# 条文の逐次取得で一度に読み込む行数
+STREAM_BATCH_SIZE = 200
+
+# 条文の埋め込みを逐次読み込む際に一度に読み込む行数
+EMBEDDING_BATCH_SIZE = 2000
+
+# pgvector による類似条文検索用の列と HNSW 索引（{dimension}・{m}・{ef_construction} を埋める）
+PGVECTOR_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS vector",
+    "ALTER TABLE article_embeddings ADD COLUMN IF NOT EXISTS embedding_vector vector({dimension})",
+    "CREATE INDEX IF NOT EXISTS ix_article_embeddings_vector_hnsw ON article_embeddings "
+    "USING hnsw (embedding_vector vector_ip_ops) WITH (m = {m}, ef_construction = {ef_construction})",
+)
+
+# pg_trgm による全文検索用の索引
+TRIGRAM_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_articles_text_trgm ON articles USING gin (text gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_legal_refs_title_trgm ON legal_refs USING gin (title gin_trgm_ops)",
+)
+
+
+def _escape_like(value: str) -> str:
+    """LIKE パターンの特殊文字をエスケープ"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class LawRepository:
+    """
+    法令リポジトリ
+    
+    パース済み法令データ（LegalXMLParser の出力形式）とテーブルの相互変換を行う
+    """
+    
+    def __init__(self, session_factory: Optional[async_sessionmaker] = None):
+        """
+        Args:
+            session_factory: セッションファクトリ（省略時はアプリケーション共通のエンジン）
+        """
+        self.session_factory = session_factory or get_session_factory()
+    
+    @property
+    def available(self) -> bool:
+        """データベースが利用可能か"""
+        return self.session_factory is not None
+    
+    async def get_law(self, law_id: str) -> Optional[Dict[str, Any]]:
+        """
+        法令データを取得
+        
+        Args:
+            law_id: 法令ID
+        
+        Returns:
+            パース済み法令データ（未登録の場合は None）
+        """
+        async with self.session_factory() as session:
+            legal_ref = await session.get(LegalRef, law_id)
+            if legal_ref is None:
+                return None
+            
+            result = await session.execute(
+                select(Article.article_no, Article.heading, Article.text, Article.parsed_json)
+                .where(Article.law_id == law_id)
+                .order_by(Article.position, Article.article_id)
+            )
+            articles = [
+                {
+                    "article_no": row.article_no,
+                    "heading": row.heading,
+                    "text": row.text,
+                    "structure": row.parsed_json
+                }
+                for row in result
+            ]
+        
+        law = self._law_to_dict(legal_ref)
+        law["articles"] = articles
+        law["article_index"] = build_article_index(articles)
+        return law
+    
+    async def stream_articles(self, law_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        条文を条順に逐次取得（サーバーサイドカーソルで少しずつ読み込む）
+        
+        Args:
+            law_id: 法令ID
+        
+        Yields:
+            条文データ
+        """
+        async with self.session_factory() as session:
+            result = await session.stream(
+                select(Article.article_no, Article.heading, Article.text, Article.parsed_json)
+                .where(Article.law_id == law_id)
+                .order_by(Article.position, Article.article_id)
+                .execution_options(yield_per=STREAM_BATCH_SIZE)
+            )
+            async for row in result:
+                yield {
+                    "article_no": row.article_no,
+                    "heading": row.heading,
+                    "text": row.text,
+                    "structure": row.parsed_json
+                }
+    
+    async def get_article_at(self, law_id: str, position: int) -> Optional[Dict[str, Any]]:
+        """
+        法令内の並び順で条文を取得
+        
+        Args:
+            law_id: 法令ID
+            position: 並び順
+        
+        Returns:
+            条文データ（存在しない場合は None）
+        """
+        async with self.session_factory() as session:
+            row = (await session.execute(
+                select(Article.article_no, Article.heading, Article.text, Article.parsed_json)
+                .where(Article.law_id == law_id, Article.position == position)
+                .limit(1)
+            )).first()
+        
+        if row is None:
+            return None
+        return {
+            "article_no": row.article_no,
+            "heading": row.heading,
+            "text": row.text,
+            "structure": row.parsed_json
+        }
+    
+    async def search_articles(
+        self,
+        terms: List[str],
+        law_type: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        条文を pg_trgm で全文検索（全ての語を法令名・見出し・本文のいずれかに含む条文）
+        
+        LIKE による絞り込みは pg_trgm の GIN 索引（ensure_trigram_indexes）で処理され、
+        word_similarity の降順で並べる
+        
+        Args:
+            terms: 検索語のリスト
+            law_type: 法令種別で絞り込む場合に指定
+            offset: 取得開始位置
+            limit: 取得件数
+        
+        Returns:
+            ([条文データ（law_id・title・law_type・position・score を含む）], 総件数)
+        """
+        conditions = []
+        for term in terms:
+            pattern = f"%{_escape_like(term)}%"
+            conditions.append(or_(
+                Article.text.ilike(pattern, escape="\\"),
+                Article.heading.ilike(pattern, escape="\\"),
+                LegalRef.title.ilike(pattern, escape="\\")
+            ))
+        if law_type:
+            conditions.append(LegalRef.law_type == law_type)
+        
+        query_text = " ".join(terms)
+        score = (
+            func.word_similarity(query_text, Article.text)
+            + func.word_similarity(query_text, LegalRef.title)
+        ).label("score")
+        
+        async with self.session_factory() as session:
+            total = await session.scalar(
+                select(func.count())
+                .select_from(Article)
+                .join(LegalRef, LegalRef.law_id == Article.law_id)
+                .where(*conditions)
+            )
+            result = await session.execute(
+                select(
+                    Article.law_id, Article.position, Article.article_no, Article.heading,
+                    Article.text, LegalRef.title, LegalRef.law_type, score
+                )
+                .join(LegalRef, LegalRef.law_id == Article.law_id)
+                .where(*conditions)
+                .order_by(score.desc(), Article.article_id)
+                .offset(offset)
+                .limit(limit)
+            )
+            rows = [dict(row._mapping) for row in result]
+        
+        return rows, total or 0
+    
+    async def ensure_trigram_indexes(self):
+        """pg_trgm 拡張と全文検索用の GIN 索引を作成（PostgreSQL のみ）"""
+        async with self.session_factory() as session:
+            async with session.begin():
+                await session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                for ddl in TRIGRAM_INDEXES:
+                    await session.execute(text(ddl))
+        logger.info("Created pg_trgm indexes for full-text search")
+    
+    async def get_law_titles(self) -> List[Tuple[str, str, Optional[str]]]:
+        """
+        全法令の法令名を取得
+        
+        Returns:
+            [(法令ID, 法令名, 法令種別), ...]
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(select(LegalRef.law_id, LegalRef.title, LegalRef.law_type))
+            return [(row.law_id, row.title, row.law_type) for row in result]
+    
+    async def count_articles_to_embed(self, model_name: str) -> int:
+        """
+        埋め込みの作成が必要な条文数を取得
+        
+        Args:
+            model_name: 埋め込みモデル名
+        
+        Returns:
+            条文数
+        """
+        async with self.session_factory() as session:
+            return await session.scalar(
+                select(func.count())
+                .select_from(Article)
+                .outerjoin(ArticleEmbedding, ArticleEmbedding.article_id == Article.article_id)
+                .where(self._needs_embedding(model_name))
+            ) or 0
+    
+    async def get_articles_to_embed(self, model_name: str, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        埋め込みが無い、または作成後に条文ハッシュ・モデルが変わった条文を条文ID順に取得
+        
+        Args:
+            model_name: 埋め込みモデル名
+            after_id: この条文IDより後の条文を取得
+            limit: 取得件数
+        
+        Returns:
+            条文データ（article_id・content_hash を含む）のリスト
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Article.article_id, Article.article_no, Article.heading, Article.text, Article.content_hash)
+                .outerjoin(ArticleEmbedding, ArticleEmbedding.article_id == Article.article_id)
+                .where(Article.article_id > after_id, self._needs_embedding(model_name))
+                .order_by(Article.article_id)
+                .limit(limit)
+            )
+            return [dict(row._mapping) for row in result]
+    
+    async def save_embeddings(self, rows: List[Dict[str, Any]]):
+        """
+        条文の埋め込みを保存（既存の埋め込みは置き換え）
+        
+        Args:
+            rows: [{"article_id", "embedding", "dimension", "dtype", "content_hash", "model_name"}, ...]
+        """
+        if not rows:
+            return
+        async with self.session_factory() as session:
+            async with session.begin():
+                await session.execute(
+                    delete(ArticleEmbedding)
+                    .where(ArticleEmbedding.article_id.in_([row["article_id"] for row in rows]))
+                )
+                await session.execute(insert(ArticleEmbedding), rows)
+    
+    async def count_embeddings(self, model_name: str) -> int:
+        """
+        埋め込み済みの条文数を取得
+        
+        Args:
+            model_name: 埋め込みモデル名
+        
+        Returns:
+            条文数
+        """
+        async with self.session_factory() as session:
+            return await session.scalar(
+                select(func.count()).select_from(ArticleEmbedding).where(ArticleEmbedding.model_name == model_name)
+            ) or 0
+    
+    async def iter_embeddings(self, model_name: str) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        条文の埋め込みを法令ID・並び順の順に一定数ずつ取得
+        
+        Args:
+            model_name: 埋め込みモデル名
+        
+        Yields:
+            [{"article_id", "law_id", "position", "article_key", "embedding", "dtype"}, ...]
+        """
+        after: Optional[Tuple[str, int]] = None
+        while True:
+            query = (
+                select(
+                    Article.article_id, Article.law_id, Article.position, Article.article_key,
+                    ArticleEmbedding.embedding, ArticleEmbedding.dtype
+                )
+                .join(ArticleEmbedding, ArticleEmbedding.article_id == Article.article_id)
+                .where(ArticleEmbedding.model_name == model_name)
+                .order_by(Article.law_id, Article.position)
+                .limit(EMBEDDING_BATCH_SIZE)
+            )
+            if after is not None:
+                query = query.where(tuple_(Article.law_id, Article.position) > tuple_(*after))
+            
+            async with self.session_factory() as session:
+                rows = [dict(row._mapping) for row in await session.execute(query)]
+            if not rows:
+                return
+            yield rows
+            after = (rows[-1]["law_id"], rows[-1]["position"])
+    
+    async def get_embedding_dimension(self, model_name: str) -> Optional[int]:
+        """
+        埋め込みの次元数を取得
+        
+        Args:
+            model_name: 埋め込みモデル名
+        
+        Returns:
+            次元数（埋め込みが無い場合は None）
+        """
+        async with self.session_factory() as session:
+            return await session.scalar(
+                select(ArticleEmbedding.dimension).where(ArticleEmbedding.model_name == model_name).limit(1)
+            )
+    
+    async def get_article_embedding(
+        self,
+        law_id: str,
+        article_key: str,
+        model_name: str
+    ) -> Optional[Tuple[bytes, str]]:
+        """
+        条文の埋め込みを取得
+        
+        Args:
+            law_id: 法令ID
+            article_key: 条文キー
+            model_name: 埋め込みモデル名
+        
+        Returns:
+            (ベクトルのバイト列, 要素型)（埋め込みが無い場合は None）
+        """
+        async with self.session_factory() as session:
+            row = (await session.execute(
+                select(ArticleEmbedding.embedding, ArticleEmbedding.dtype)
+                .join(Article, Article.article_id == ArticleEmbedding.article_id)
+                .where(
+                    Article.law_id == law_id,
+                    Article.article_key == article_key,
+                    ArticleEmbedding.model_name == model_name
+                )
+            )).first()
+        return None if row is None else (row.embedding, row.dtype)
+    
+    async def ensure_pgvector_index(self, dimension: int, m: int, ef_construction: int):
+        """
+        pgvector 拡張と埋め込みの vector 列・HNSW 索引を作成（PostgreSQL のみ）
+        
+        Args:
+            dimension: ベクトルの次元数
+            m: HNSW のリンク数の上限
+            ef_construction: HNSW の作成時に保つ候補数
+        """
+        async with self.session_factory() as session:
+            async with session.begin():
+                for ddl in PGVECTOR_DDL:
+                    await session.execute(text(ddl.format(
+                        dimension=int(dimension), m=int(m), ef_construction=int(ef_construction)
+                    )))
+        logger.info(f"Created pgvector column and HNSW index ({dimension} dimensions)")
+    
+    async def get_embeddings_without_vector(self, model_name: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        vector 列が未設定の埋め込みを取得（pgvector バックエンド用）
+        
+        Args:
+            model_name: 埋め込みモデル名
+            limit: 取得件数
+        
+        Returns:
+            [{"article_id", "embedding", "dtype"}, ...]
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                text(
+                    "SELECT article_id, embedding, dtype FROM article_embeddings "
+                    "WHERE embedding_vector IS NULL AND model_name = :model_name LIMIT :limit"
+                ),
+                {"model_name": model_name, "limit": limit}
+            )
+            return [dict(row._mapping) for row in result]
+    
+    async def set_embedding_vectors(self, vectors: List[Tuple[int, str]]):
+        """
+        埋め込みの vector 列を設定（pgvector バックエンド用）
+        
+        Args:
+            vectors: [(条文ID, pgvector のテキスト表現 "[0.1,0.2,...]"), ...]
+        """
+        async with self.session_factory() as session:
+            async with session.begin():
+                await session.execute(
+                    text(
+                        "UPDATE article_embeddings SET embedding_vector = CAST(:vector AS vector) "
+                        "WHERE article_id = :article_id"
+                    ),
+                    [{"article_id": article_id, "vector": vector} for article_id, vector in vectors]
+                )
+    
+    async def search_similar_articles(
+        self,
+        vector: str,
+        model_name: str,
+        k: int,
+        law_id: Optional[str] = None,
+        law_type: Optional[str] = None,
+        exclude: Optional[Tuple[str, str]] = None,
+        ef_search: int = 64
+    ) -> List[Dict[str, Any]]:
+        """
+        pgvector の HNSW 索引で内積の大きい条文を検索
+        
+        絞り込みがある場合は pgvector 0.8 以降の iterative scan で k 件に達するまで探索を続ける
+        
+        Args:
+            vector: クエリの pgvector テキスト表現（正規化済み）
+            model_name: 埋め込みモデル名
+            k: 取得件数
+            law_id: 法令で絞り込む場合に指定
+            law_type: 法令種別で絞り込む場合に指定
+            exclude: 結果から除く条文 (法令ID, 条文キー)
+            ef_search: HNSW の探索で保つ候補数
+        
+        Returns:
+            条文データ（law_id・title・law_type・position・article_key・score を含む）のリスト
+        """
+        conditions = ["e.model_name = :model_name", "e.embedding_vector IS NOT NULL"]
+        params: Dict[str, Any] = {"vector": vector, "model_name": model_name, "k": k}
+        if law_id:
+            conditions.append("a.law_id = :law_id")
+            params["law_id"] = law_id
+        if law_type:
+            conditions.append("l.law_type = :law_type")
+            params["law_type"] = law_type
+        if exclude:
+            conditions.append("NOT (a.law_id = :exclude_law_id AND a.article_key = :exclude_article_key)")
+            params.update(exclude_law_id=exclude[0], exclude_article_key=exclude[1])
+        
+        query = text(f"""
+            SELECT a.law_id, l.title, l.law_type, a.position, a.article_key, a.article_no,
+                   a.heading, a.text, -(e.embedding_vector <#> CAST(:vector AS vector)) AS score
+            FROM article_embeddings e
+            JOIN articles a ON a.article_id = e.article_id
+            JOIN legal_refs l ON l.law_id = a.law_id
+            WHERE {" AND ".join(conditions)}
+            ORDER BY e.embedding_vector <#> CAST(:vector AS vector)
+            LIMIT :k
+        """)
+        
+        async with self.session_factory() as session:
+            async with session.begin():
+                await session.execute(text(f"SET LOCAL hnsw.ef_search = {max(int(ef_search), k)}"))
+                await session.execute(text("SET LOCAL hnsw.iterative_scan = strict_order"))
+                result = await session.execute(query, params)
+                return [dict(row._mapping) for row in result]
+    
+    async def law_exists(self, law_id: str) -> bool:
+        """
+        法令が知識ベースに登録されているか
+        
+        Args:
+            law_id: 法令ID
+        
+        Returns:
+            登録されていれば True
+        """
+        async with self.session_factory() as session:
+            return await session.get(LegalRef, law_id) is not None
+    
+    async def list_laws(
+        self,
+        law_type: Optional[str] = None,
+        page: int = 1,
+        per_page: int = 20
+    ) -> Dict[str, Any]:
+        """
+        法令リストを取得
+        
+        Args:
+            law_type: 法令種別（任意）
+            page: ページ番号
+            per_page: 1ページあたりの件数
+        
+        Returns:
+            {"laws": [...], "total": 件数}
+        """
+        query = select(LegalRef)
+        count_query = select(func.count()).select_from(LegalRef)
+        if law_type:
+            query = query.where(LegalRef.law_type == law_type)
+            count_query = count_query.where(LegalRef.law_type == law_type)
+        
+        async with self.session_factory() as session:
+            total = await session.scalar(count_query)
+            result = await session.scalars(
+                query.order_by(LegalRef.law_id)
+                .offset((page - 1) * per_page)
+                .limit(per_page)
+            )
+            laws = [self._law_to_dict(legal_ref) for legal_ref in result]
+        
+        return {"laws": laws, "total": total or 0}
+    
+    async def save_law(
+        self,
+        law_id: str,
+        law_data: Dict[str, Any],
+        raw_xml: Optional[str] = None,
+        sync_state: Optional[Dict[str, Any]] = None
+    ):
+        """
+        法令データを保存（既存の条文は置き換え）
+        
+        Args:
+            law_id: 法令ID
+            law_data: パース済み法令データ
+            raw_xml: 元のXMLデータ（任意）
+            sync_state: 同期状態（content_hash・list_fingerprint・etag・last_modified、任意）
+        """
+        async with self.session_factory() as session:
+            async with session.begin():
+                await self._upsert_legal_ref(session, law_id, law_data, raw_xml, sync_state)
+                
+                await self._delete_articles(session, law_id)
+                articles = law_data.get("articles", [])
+                session.add_all([
+                    self._article_to_row(law_id, key, position, article)
+                    for position, (key, article) in enumerate(zip(unique_article_keys(articles), articles))
+                ])
+        
+        logger.debug(f"Saved law to knowledge base: {law_id}")
+    
+    async def get_sync_states(self) -> Dict[str, Dict[str, Any]]:
+        """
+        全法令の同期状態を取得
+        
+        Returns:
+            {法令ID: {"content_hash": ..., "list_fingerprint": ..., "etag": ..., "last_modified": ...}}
+        """
+        columns = [getattr(LegalRef, field) for field in SYNC_STATE_FIELDS]
+        async with self.session_factory() as session:
+            result = await session.execute(select(LegalRef.law_id, *columns))
+            return {
+                row.law_id: {field: getattr(row, field) for field in SYNC_STATE_FIELDS}
+                for row in result
+            }
+    
+    async def update_sync_state(self, law_id: str, sync_state: Dict[str, Any]):
+        """
+        法令の同期状態のみを更新（内容が変わっていない場合に使用）
+        
+        Args:
+            law_id: 法令ID
+            sync_state: 更新する同期状態
+        """
+        values = {k: v for k, v in sync_state.items() if k in SYNC_STATE_FIELDS}
+        if not values:
+            return
+        
+        async with self.session_factory() as session:
+            async with session.begin():
+                await session.execute(
+                    update(LegalRef).where(LegalRef.law_id == law_id).values(**values)
+                )
+    
+    async def get_article_states(self, law_id: str) -> Dict[str, Tuple[str, int]]:
+        """
+        法令内の条文のハッシュと並び順を取得
+        
+        Args:
+            law_id: 法令ID
+        
+        Returns:
+            {条文キー: (ハッシュ, 並び順)}
+        """
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Article.article_key, Article.content_hash, Article.position)
+                .where(Article.law_id == law_id)
+            )
+            return {row.article_key: (row.content_hash, row.position) for row in result}
+    
+    async def apply_article_changes(
+        self,
+        law_id: str,
+        law_data: Dict[str, Any],
+        changed: List[Tuple[str, int, Dict[str, Any]]],
+        moved: Dict[str, int],
+        removed: List[str],
+        raw_xml: Optional[str] = None,
+        sync_state: Optional[Dict[str, Any]] = None
+    ):
+        """
+        変更のあった条文のみを書き換え（条文IDは維持され、埋め込みとの対応が保たれる）
+        
+        Args:
+            law_id: 法令ID
+            law_data: パース済み法令データ（法令マスタの更新に使用）
+            changed: 追加・変更された条文 [(条文キー, 並び順, 条文データ), ...]
+            moved: 内容は同じで並び順のみ変わった条文 {条文キー: 並び順}
+            removed: 削除された条文キー
+            raw_xml: 元のXMLデータ（任意）
+            sync_state: 同期状態（任意）
+        """
+        async with self.session_factory() as session:
+            async with session.begin():
+                await self._upsert_legal_ref(session, law_id, law_data, raw_xml, sync_state)
+                
+                if removed:
+                    await self._delete_articles(session, law_id, removed)
+                
+                existing = {}
+                if changed:
+                    result = await session.scalars(
+                        select(Article).where(
+                            Article.law_id == law_id,
+                            Article.article_key.in_([key for key, _, _ in changed])
+                        )
+                    )
+                    existing = {row.article_key: row for row in result}
+                
+                for key, position, article in changed:
+                    row = existing.get(key)
+                    if row is None:
+                        session.add(self._article_to_row(law_id, key, position, article))
+                        continue
+                    row.article_no = article.get("article_no", "")
+                    row.heading = article.get("heading")
+                    row.text = article.get("text", "")
+                    row.parsed_json = article.get("structure")
+                    row.position = position
+                    row.content_hash = article_hash(article)
+                
+                for key, position in moved.items():
+                    await session.execute(
+                        update(Article)
+                        .where(Article.law_id == law_id, Article.article_key == key)
+                        .values(position=position)
+                    )
+        
+        logger.debug(
+            f"Applied article changes to {law_id}: {len(changed)} changed, "
+            f"{len(moved)} moved, {len(removed)} removed"
+        )
+    
+    async def delete_law(self, law_id: str):
+        """
+        法令と条文を削除
+        
+        Args:
+            law_id: 法令ID
+        """
+        async with self.session_factory() as session:
+            async with session.begin():
+                await self._delete_articles(session, law_id)
+                await session.execute(delete(LegalRef).where(LegalRef.law_id == law_id))
+    
+    async def _upsert_legal_ref(
+        self,
+        session: AsyncSession,
+        law_id: str,
+        law_data: Dict[str, Any],
+        raw_xml: Optional[str],
+        sync_state: Optional[Dict[str, Any]]
+    ) -> LegalRef:
+        """法令マスタ行を作成または更新"""
+        legal_ref = await session.get(LegalRef, law_id)
+        if legal_ref is None:
+            legal_ref = LegalRef(law_id=law_id)
+            session.add(legal_ref)
+        
+        legal_ref.title = law_data.get("title") or ""
+        legal_ref.law_no = law_data.get("law_no") or ""
+        legal_ref.law_type = law_data.get("law_type") or None
+        legal_ref.enact_date = _parse_date(law_data.get("enact_date"))
+        legal_ref.source_url = law_data.get("source_url") or None
+        if raw_xml is not None:
+            legal_ref.raw_xml = raw_xml
+            legal_ref.content_hash = content_hash(raw_xml)
+        for field, value in (sync_state or {}).items():
+            if field in SYNC_STATE_FIELDS:
+                setattr(legal_ref, field, value)
+        
+        return legal_ref
+    
+    async def _delete_articles(
+        self,
+        session: AsyncSession,
+        law_id: str,
+        article_keys: Optional[List[str]] = None
+    ):
+        """条文（と埋め込み）を削除（条文キー省略時は法令内の全条文）"""
+        condition = [Article.law_id == law_id]
+        if article_keys is not None:
+            condition.append(Article.article_key.in_(article_keys))
+        
+        article_ids = select(Article.article_id).where(*condition)
+        await session.execute(
+            delete(ArticleEmbedding).where(ArticleEmbedding.article_id.in_(article_ids))
+        )
+        await session.execute(delete(Article).where(*condition))
+    
+    @staticmethod
+    def _needs_embedding(model_name: str):
+        """埋め込みの作成が必要な条文の条件（ArticleEmbedding を外部結合したクエリ用）"""
+        return or_(
+            ArticleEmbedding.article_id.is_(None),
+            ArticleEmbedding.content_hash.is_distinct_from(Article.content_hash),
+            ArticleEmbedding.model_name != model_name
+        )
+    
+    def _article_to_row(
+        self,
+        law_id: str,
+        article_key: str,
+        position: int,
+        article: Dict[str, Any]
+    ) -> Article:
+        """条文データをテーブル行に変換"""
+        return Article(
+            law_id=law_id,
+            article_no=article.get("article_no", ""),
+            article_key=article_key,
+            position=position,
+            heading=article.get("heading"),
+            text=article.get("text", ""),
+            parsed_json=article.get("structure"),
+            content_hash=article_hash(article)
+        )
+    
+    def _law_to_dict(self, legal_ref: LegalRef) -> Dict[str, Any]:
+        """法令マスタ行を辞書に変換"""
+        return {
+            "law_id": legal_ref.law_id,
+            "title": legal_ref.title,
+            "law_no": legal_ref.law_no,
+            "law_type": legal_ref.law_type,
+            "enact_date": _format_date(legal_ref.enact_date),
+            "source_url": legal_ref.source_url
+        }
+
+
+class SyncLogRepository:
+    """
+    同期ログリポジトリ
+    
+    同期バッチの進捗（チェックポイント）を記録し、中断した同期の再開位置を返す
+    """
+    
+    def __init__(self, session_factory: Optional[async_sessionmaker] = None):
+        """
+        Args:
+            session_factory: セッションファクトリ（省略時はアプリケーション共通のエンジン）
+        """
+        self.session_factory = session_factory or get_session_factory()
+    
+    async def start(self, sync_type: str) -> SyncLog:
+        """
+        同期ログを作成
+        
+        Args:
+            sync_type: 同期種別（full/update）
+        
+        Returns:
+            作成した同期ログ
+        """
+        sync_log = SyncLog(
+            sync_type=sync_type,
+            started_at=datetime.utcnow(),
+            status="running",
+            result_count=0,
+            failed_count=0,
+            checkpoint_page=0
+        )
+        
+        async with self.session_factory() as session:
+            async with session.begin():
+                session.add(sync_log)
+        
+        return sync_log
+    
+    async def find_resumable(self, sync_type: str) -> Optional[SyncLog]:
+        """
+        再開可能な同期ログを取得
+        
+        同じ種別の最新の同期が完了していない（running/failed）場合にそのログを返す
+        
+        Args:
+            sync_type: 同期種別（full/update）
+        
+        Returns:
+            同期ログ（再開対象がない場合は None）
+        """
+        async with self.session_factory() as session:
+            sync_log = await session.scalar(
+                select(SyncLog)
+                .where(SyncLog.sync_type == sync_type)
+                .order_by(SyncLog.sync_id.desc())
+                .limit(1)
+            )
+        
+        if sync_log is None or sync_log.status == "success":
+            return None
+        return sync_log
+    
+    async def save(self, sync_log: SyncLog):
+        """
+        同期ログの進捗を保存
+        
+        Args:
+            sync_log: 同期ログ
+        """
+        async with self.session_factory() as session:
+            async with session.begin():
+                await session.merge(sync_log)
+
+
+class GeneratedResultRepository:
+    """
+    AI 生成結果リポジトリ
+    
+    条文要約・論点抽出の結果をキャッシュキーで保存・取得し、条文の変更時に削除する
+    """
+    
+    def __init__(self, session_factory: Optional[async_sessionmaker] = None):
+        """
+        Args:
+            session_factory: セッションファクトリ（省略時はアプリケーション共通のエンジン）
+        """
+        self.session_factory = session_factory or get_session_factory()
+    
+    @property
+    def available(self) -> bool:
+        """データベースが利用可能か"""
+        return self.session_factory is not None
+    
+    async def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        生成結果を取得
+        
+        Args:
+            cache_key: キャッシュキー
+        
+        Returns:
+            生成結果（なければ None）
+        """
+        async with self.session_factory() as session:
+            return await session.scalar(
+                select(GeneratedResult.result).where(GeneratedResult.cache_key == cache_key)
+            )
+    
+    async def save(self, row: Dict[str, Any]):
+        """
+        生成結果を保存（同じキャッシュキーの結果は置き換える）
+        
+        Args:
+            row: cache_key・kind・result と任意の law_id・article_key・model_name・prompt_version
+        """
+        async with self.session_factory() as session:
+            async with session.begin():
+                await session.execute(
+                    delete(GeneratedResult).where(GeneratedResult.cache_key == row["cache_key"])
+                )
+                await session.execute(insert(GeneratedResult), [row])
+    
+    async def delete_articles(self, law_id: str, article_keys: Optional[List[str]] = None) -> int:
+        """
+        条文の生成結果（要約）を削除
+        
+        Args:
+            law_id: 法令ID
+            article_keys: 条文キー（省略時は法令内のすべての条文）
+        
+        Returns:
+            削除した件数
+        """
+        statement = delete(GeneratedResult).where(GeneratedResult.law_id == law_id)
+        if article_keys is not None:
+            if not article_keys:
+                return 0
+            statement = statement.where(GeneratedResult.article_key.in_(article_keys))
+        
+        async with self.session_factory() as session:
+            async with session.begin():
+                result = await session.execute(statement)
+        return result.rowcount
@@ -0,0 +1,195 @@
+"""
+法令取得サービス
+キャッシュ → スナップショット → ローカル知識ベース → e-Gov API の順に法令データを取得
+"""
+from typing import Any, AsyncIterator, Dict, Optional
+from .egov_client import EGOvClient
+from .law_cache import LawCache, law_cache
+from .law_repository import LawRepository
+from .law_snapshot import LawSnapshotStore, law_snapshots
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LawService:
+    """
+    法令取得サービス
+    
+    ホットパスではキャッシュ、同期バッチが作成したスナップショット（mmap）、
+    ローカル知識ベースの順に参照して応答し、e-Gov API は
+    知識ベースに未登録の法令を取得する場合（または DB 障害時）のみ使用する。
+    e-Gov API から取得した法令は知識ベースに書き戻す。
+    """
+    
+    def __init__(
+        self,
+        repository: Optional[LawRepository] = None,
+        cache: Optional[LawCache] = None,
+        client: Optional[EGOvClient] = None,
+        snapshots: Optional[LawSnapshotStore] = None
+    ):
+        """
+        Args:
+            repository: 法令リポジトリ（省略時はアプリケーション共通のエンジン）
+            cache: 法令キャッシュ（省略時はアプリケーション共通のキャッシュ）
+            client: e-Gov API クライアント（省略時は必要になった時点で作成）
+            snapshots: 法令スナップショットストア（省略時はアプリケーション共通のストア）
+        """
+        self.repository = repository or LawRepository()
+        self.cache = cache or law_cache
+        self.snapshots = snapshots or law_snapshots
+        self._client = client
+        self._owns_client = client is None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+    
+    @property
+    def client(self) -> EGOvClient:
+        """e-Gov API クライアント（初回参照時に作成）"""
+        if self._client is None:
+            self._client = EGOvClient()
+        return self._client
+    
+    async def get_law_details(self, law_id: str) -> Dict[str, Any]:
+        """
+        法令詳細情報を取得
+        
+        Args:
+            law_id: 法令ID
+        
+        Returns:
+            パース済み法令データ（辞書形式）
+        """
+        return await self.cache.get_or_load(law_id, lambda: self._load_law(law_id))
+    
+    async def get_article(self, law_id: str, article_no: str) -> Dict[str, Any]:
+        """
+        特定の条文を取得
+        
+        Args:
+            law_id: 法令ID
+            article_no: 条番号（例: "第1条"、"第百二十三条の二"、"123の2"）
+        
+        Returns:
+            条文データ（辞書形式）
+        
+        Raises:
+            ValueError: 条文が存在しない場合
+        """
+        # スナップショットがあれば法令全体を展開せずに該当条文のみを切り出す
+        if await self.cache.get_cached(law_id) is None:
+            snapshot = self.snapshots.open(law_id)
+            if snapshot is not None:
+                article = snapshot.find_article(article_no)
+                if article is None:
+                    raise ValueError(f"Article {article_no} not found in law {law_id}")
+                return article
+        
+        article = await self.cache.get_article(
+            law_id,
+            article_no,
+            lambda: self._load_law(law_id)
+        )
+        if article is None:
+            raise ValueError(f"Article {article_no} not found in law {law_id}")
+        return article
+    
+    async def stream_articles(self, law_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        条文を条順に逐次取得
+        
+        プロセス内キャッシュ、スナップショット、知識ベース（カーソル読み出し）、
+        e-Gov API（逐次パース）の順に参照し、
+        法令全体を組み立てずに条文を1件ずつ返す
+        
+        Args:
+            law_id: 法令ID
+        
+        Yields:
+            条文データ
+        """
+        # プロセス内キャッシュ（CompactLaw）とスナップショットは同じ条文参照インターフェースを持つ
+        law = await self.cache.get_cached(law_id) or self.snapshots.open(law_id)
+        if law is not None:
+            for position in range(len(law)):
+                yield law.get_article(position)
+            return
+        
+        in_knowledge_base = False
+        if self.repository.available:
+            try:
+                in_knowledge_base = await self.repository.law_exists(law_id)
+            except Exception as e:
+                logger.error(f"Error reading law from knowledge base: {str(e)}")
+        
+        if in_knowledge_base:
+            async for article in self.repository.stream_articles(law_id):
+                yield article
+            return
+        
+        logger.info(f"Law not in knowledge base, streaming from e-Gov API: {law_id}")
+        async for article in self.client.stream_articles(law_id):
+            yield article
+    
+    async def list_laws(
+        self,
+        law_type: Optional[str] = None,
+        page: int = 1,
+        per_page: int = 20
+    ) -> Dict[str, Any]:
+        """
+        法令リストを取得（知識ベースが空の場合は e-Gov API から取得）
+        
+        Args:
+            law_type: 法令種別（任意）
+            page: ページ番号
+            per_page: 1ページあたりの件数
+        
+        Returns:
+            法令リスト（辞書形式）
+        """
+        if self.repository.available:
+            try:
+                data = await self.repository.list_laws(law_type, page, per_page)
+                if data["total"] > 0:
+                    return data
+            except Exception as e:
+                logger.error(f"Error listing laws from knowledge base: {str(e)}")
+        
+        return await self.client.get_law_list(law_type=law_type, page=page, per_page=per_page)
+    
+    async def close(self):
+        """自身で作成した e-Gov API クライアントをクローズ"""
+        if self._owns_client and self._client is not None:
+            await self._client.close()
+            self._client = None
+    
+    async def _load_law(self, law_id: str) -> Dict[str, Any]:
+        """スナップショット、知識ベース、e-Gov API の順に法令データを取得"""
+        snapshot = self.snapshots.open(law_id)
+        if snapshot is not None:
+            return snapshot.to_dict()
+        
+        if self.repository.available:
+            try:
+                law = await self.repository.get_law(law_id)
+                if law is not None:
+                    return law
+            except Exception as e:
+                logger.error(f"Error reading law from knowledge base: {str(e)}")
+        
+        logger.info(f"Law not in knowledge base, fetching from e-Gov API: {law_id}")
+        law = await self.client.get_law_details(law_id)
+        
+        if self.repository.available:
+            try:
+                await self.repository.save_law(law_id, law)
+            except Exception as e:
+                logger.error(f"Error saving law to knowledge base: {str(e)}")
+        
+        return law
@@ -0,0 +1,377 @@
+"""
+法令スナップショット
+パース済み法令をバイナリ形式（文字列テーブル + 条文オフセット索引）で保存し、mmap で読み込む
+
+ファイル形式（リトルエンディアン）:
+    ヘッダー      HEADER（マジック・バージョン・条文数・各領域のオフセット）
+    メタ情報      法令基本情報（JSON, UTF-8）
+    条文索引      条文ごとに INDEX_ENTRY（条番号・見出し・本文・構造の文字列テーブル内オフセットと長さ）
+    文字列テーブル UTF-8 文字列の連結（同一の文字列は1度だけ格納）
+"""
+import itertools
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from ..utils.article_number import canonical_article_key
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b"LAWSNAP\x00"
+VERSION = 1
+SUFFIX = ".lawsnap"
+
+# マジック, バージョン, 予約, 条文数, メタ情報オフセット, メタ情報長, 索引オフセット, 文字列テーブルオフセット
+HEADER = struct.Struct("<8sHHIIIII")
+
+# 条番号・見出し・本文・構造（JSON）それぞれの (オフセット, 長さ)
+INDEX_ENTRY = struct.Struct("<8I")
+
+# スナップショットに保存する法令基本情報
+META_FIELDS = (
+    "law_id", "title", "law_no", "law_type", "enact_date", "source_url",
+    "title_kana", "abbreviations", "abbreviation_kana"
+)
+
+_UNSAFE_FILENAME = re.compile(r"[^0-9A-Za-z_\-]")
+
+
+def encode_snapshot(law_data: Dict[str, Any]) -> bytes:
+    """
+    パース済み法令データをスナップショット形式に変換
+    
+    Args:
+        law_data: パース済み法令データ
+    
+    Returns:
+        スナップショットのバイト列
+    """
+    articles = law_data.get("articles", [])
+    meta = json.dumps(
+        {field: law_data.get(field) for field in META_FIELDS},
+        ensure_ascii=False
+    ).encode("utf-8")
+    
+    strings = bytearray()
+    offsets: Dict[bytes, int] = {}
+    
+    def intern(value: bytes) -> Tuple[int, int]:
+        offset = offsets.get(value)
+        if offset is None:
+            offset = offsets[value] = len(strings)
+            strings.extend(value)
+        return offset, len(value)
+    
+    index = bytearray()
+    for article in articles:
+        structure = article.get("structure")
+        fields = (
+            (article.get("article_no") or "").encode("utf-8"),
+            (article.get("heading") or "").encode("utf-8"),
+            (article.get("text") or "").encode("utf-8"),
+            json.dumps(structure, ensure_ascii=False).encode("utf-8") if structure else b""
+        )
+        entry: List[int] = []
+        for value in fields:
+            entry.extend(intern(value))
+        index.extend(INDEX_ENTRY.pack(*entry))
+    
+    meta_offset = HEADER.size
+    index_offset = meta_offset + len(meta)
+    strings_offset = index_offset + len(index)
+    header = HEADER.pack(
+        MAGIC, VERSION, 0, len(articles),
+        meta_offset, len(meta), index_offset, strings_offset
+    )
+    return b"".join((header, meta, bytes(index), bytes(strings)))
+
+
+class LawSnapshot:
+    """
+    mmap で開いた法令スナップショット
+    
+    開く際はヘッダーのみを読み、条文は参照された時点で文字列テーブルから切り出す。
+    ファイルはページキャッシュ経由で読まれるため、同じスナップショットを開いた
+    複数のワーカープロセスでメモリを共有する。
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: スナップショットファイルのパス
+        
+        Raises:
+            ValueError: スナップショット形式でない場合
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        
+        try:
+            (
+                magic, version, _, self.article_count,
+                meta_offset, meta_length, self._index_offset, self._strings_offset
+            ) = HEADER.unpack_from(self._mmap, 0)
+        except struct.error:
+            self.close()
+            raise ValueError(f"Invalid law snapshot: {path}")
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported law snapshot format: {path}")
+        
+        self._meta_range = (meta_offset, meta_length)
+        self._meta: Optional[Dict[str, Any]] = None
+        self._article_index: Optional[Dict[str, int]] = None
+    
+    def __len__(self) -> int:
+        return self.article_count
+    
+    @property
+    def law_info(self) -> Dict[str, Any]:
+        """法令基本情報"""
+        if self._meta is None:
+            offset, length = self._meta_range
+            self._meta = json.loads(self._view[offset:offset + length].tobytes())
+        return dict(self._meta)
+    
+    @property
+    def article_index(self) -> Dict[str, int]:
+        """条文キー → 位置の索引（初回参照時に条番号のみを読んで作成）"""
+        if self._article_index is None:
+            index: Dict[str, int] = {}
+            for position in range(self.article_count):
+                article_no = self._string(self._entry(position), 0)
+                index.setdefault(canonical_article_key(article_no), position)
+            self._article_index = index
+        return self._article_index
+    
+    def text_view(self, position: int) -> memoryview:
+        """
+        条文本文のUTF-8バイト列をコピーせずに参照
+        
+        Args:
+            position: 条文の位置
+        
+        Returns:
+            本文のメモリビュー
+        """
+        offset, length = self._entry(position)[4:6]
+        start = self._strings_offset + offset
+        return self._view[start:start + length]
+    
+    def get_article(self, position: int) -> Dict[str, Any]:
+        """
+        指定位置の条文を取得
+        
+        Args:
+            position: 条文の位置
+        
+        Returns:
+            条文データ
+        """
+        if not 0 <= position < self.article_count:
+            raise IndexError(f"Article position out of range: {position}")
+        
+        entry = self._entry(position)
+        structure = self._string(entry, 3)
+        return {
+            "article_no": self._string(entry, 0),
+            "heading": self._string(entry, 1),
+            "text": self._string(entry, 2),
+            "structure": json.loads(structure) if structure else None
+        }
+    
+    def find_article(self, article_no: str) -> Optional[Dict[str, Any]]:
+        """
+        条番号で条文を取得（表記揺れ可）
+        
+        Args:
+            article_no: 条番号（"第百二十三条の二"・"123の2" など）
+        
+        Returns:
+            条文データ（該当する条文がなければ None）
+        """
+        position = self.article_index.get(canonical_article_key(article_no))
+        if position is None:
+            return None
+        return self.get_article(position)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        パース済み法令データ（LegalXMLParser.parse_xml と同じ形式）に変換
+        
+        Returns:
+            パース済み法令データ
+        """
+        law = self.law_info
+        law["articles"] = [self.get_article(position) for position in range(self.article_count)]
+        law["article_index"] = dict(self.article_index)
+        return law
+    
+    def prefetch(self):
+        """ファイル全体の先読みをOSに依頼（ページキャッシュに載せる）"""
+        if hasattr(mmap, "MADV_WILLNEED"):
+            self._mmap.madvise(mmap.MADV_WILLNEED)
+    
+    def close(self):
+        """mmap を閉じる"""
+        self._view.release()
+        self._mmap.close()
+    
+    def _entry(self, position: int) -> Tuple[int, ...]:
+        """条文索引のエントリを読む"""
+        return INDEX_ENTRY.unpack_from(self._mmap, self._index_offset + position * INDEX_ENTRY.size)
+    
+    def _string(self, entry: Tuple[int, ...], field: int) -> str:
+        """条文索引のエントリから文字列を切り出す"""
+        offset, length = entry[field * 2], entry[field * 2 + 1]
+        start = self._strings_offset + offset
+        return str(self._view[start:start + length], "utf-8")
+
+
+class LawSnapshotStore:
+    """
+    法令スナップショットストア
+    
+    法令ごとのスナップショットファイルをディレクトリに保存し、開いたスナップショットを保持する。
+    ファイルが書き換えられた場合（同期バッチによる更新）は次回参照時に開き直す。
+    """
+    
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Args:
+            directory: スナップショットの保存先（省略時は settings.snapshot_dir）
+        """
+        self.directory = Path(directory or settings.snapshot_dir)
+        self._open: Dict[str, Tuple[Tuple[int, int], LawSnapshot]] = {}
+    
+    def path(self, law_id: str) -> Path:
+        """
+        法令のスナップショットファイルのパス
+        
+        Args:
+            law_id: 法令ID
+        
+        Returns:
+            ファイルパス
+        """
+        return self.directory / f"{_UNSAFE_FILENAME.sub('_', law_id)}{SUFFIX}"
+    
+    def save(self, law_id: str, law_data: Dict[str, Any]):
+        """
+        スナップショットを保存（一時ファイルに書き込んでから置き換える）
+        
+        Args:
+            law_id: 法令ID
+            law_data: パース済み法令データ
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = encode_snapshot(law_data)
+        
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path(law_id))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
+    def open(self, law_id: str) -> Optional[LawSnapshot]:
+        """
+        スナップショットを開く
+        
+        Args:
+            law_id: 法令ID
+        
+        Returns:
+            スナップショット（存在しない場合は None）
+        """
+        path = self.path(law_id)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._open.pop(law_id, None)
+            return None
+        
+        version = (stat.st_ino, stat.st_mtime_ns)
+        cached = self._open.get(law_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        try:
+            snapshot = LawSnapshot(str(path))
+        except (OSError, ValueError) as e:
+            logger.error(f"Error opening law snapshot {law_id}: {str(e)}")
+            return None
+        
+        # 置き換え前の mmap は参照が無くなった時点で解放される
+        self._open[law_id] = (version, snapshot)
+        return snapshot
+    
+    def delete(self, law_id: str):
+        """
+        スナップショットを削除
+        
+        Args:
+            law_id: 法令ID
+        """
+        self._open.pop(law_id, None)
+        try:
+            self.path(law_id).unlink()
+        except FileNotFoundError:
+            pass
+    
+    def warm(self, law_ids: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> int:
+        """
+        スナップショットを事前に開いて先読みする（ワーカー起動時）
+        
+        指定した法令（参照回数の多い順など）を先に開き、上限に満たない分は
+        更新日時の新しい順に補う。
+        
+        Args:
+            law_ids: 優先して開く法令ID
+            limit: 開く件数の上限（省略時は settings.snapshot_warm_laws）
+        
+        Returns:
+            開いたスナップショットの数
+        """
+        limit = settings.snapshot_warm_laws if limit is None else limit
+        warmed = set()
+        for law_id in itertools.chain(law_ids or (), self._newest_law_ids()):
+            if len(warmed) >= limit:
+                break
+            if law_id in warmed:
+                continue
+            snapshot = self.open(law_id)
+            if snapshot is not None:
+                snapshot.prefetch()
+                warmed.add(law_id)
+        count = len(warmed)
+        
+        logger.info(f"Warmed {count} law snapshots from {self.directory}")
+        return count
+    
+    def _newest_law_ids(self) -> Iterator[str]:
+        """保存済みスナップショットの法令IDを更新日時の新しい順に返す"""
+        if not self.directory.is_dir():
+            return
+        paths = sorted(
+            self.directory.glob(f"*{SUFFIX}"),
+            key=lambda p: p.stat().st_mtime_ns,
+            reverse=True
+        )
+        for path in paths:
+            yield path.name[:-len(SUFFIX)]
+
+
+# アプリケーション共通のスナップショットストア
+law_snapshots = LawSnapshotStore()
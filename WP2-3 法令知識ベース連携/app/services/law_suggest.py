@@ -0,0 +1,253 @@
+"""
+法令名の入力補完
+法令名・略称・読みの前方一致を、ソート済みのキー配列と短い接頭辞の順位表で参照回数順に返す
+"""
+import asyncio
+import re
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional
+from .law_popularity import LawPopularity, law_popularity
+from .law_reference import LAW_ABBREVIATIONS, LAW_TYPE_PRIORITY
+from .search_service import LawSearchService, law_search
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+# 順位表を事前に作成する接頭辞の最大長（これより長い接頭辞は一致範囲を走査する）
+SHORT_PREFIX_LENGTH = 2
+
+# 前方一致の範囲の上限（Unicode の最大の文字）
+_PREFIX_END = "\U0010ffff"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_suggest(text: str) -> str:
+    """
+    入力補完用に正規化（NFKC・小文字化・空白除去・カタカナをひらがなに変換）
+    
+    Args:
+        text: 法令名・読み・入力中の文字列
+    
+    Returns:
+        正規化した文字列
+    """
+    text = _WHITESPACE.sub("", unicodedata.normalize("NFKC", text or "").lower())
+    return "".join(chr(ord(c) - 0x60) if "ァ" <= c <= "ヶ" else c for c in text)
+
+
+class LawSuggester:
+    """
+    法令名の入力補完の索引
+    
+    法令名・読み・略称（LawTitle の Abbrev 属性と LAW_ABBREVIATIONS）を正規化した
+    キーをソートした配列に格納し、二分探索で前方一致の範囲を求める。1〜2文字の
+    接頭辞は一致する法令が多いため、順位順の法令リストを作成時に用意しておく。
+    順位は参照回数の降順、法令種別、法令名の短い順。作成後は変更しない。
+    """
+    
+    def __init__(self, laws: Iterable[Dict[str, Any]], popularity: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            laws: 法令情報（law_id・title・law_type、任意で title_kana・abbreviations・abbreviation_kana）
+            popularity: {法令ID: 参照回数}
+        """
+        popularity = popularity or {}
+        laws = list(laws)
+        
+        order = sorted(
+            range(len(laws)),
+            key=lambda i: (
+                -popularity.get(laws[i]["law_id"], 0),
+                LAW_TYPE_PRIORITY.get(laws[i].get("law_type") or "", len(LAW_TYPE_PRIORITY)),
+                len(laws[i].get("title") or ""),
+                laws[i]["law_id"]
+            )
+        )
+        # 順位順に法令を並べ替え、添字をそのまま順位として扱う
+        self._laws = [
+            {
+                "law_id": laws[i]["law_id"],
+                "title": laws[i].get("title") or "",
+                "law_type": laws[i].get("law_type") or None,
+                "title_kana": laws[i].get("title_kana") or None,
+                "popularity": popularity.get(laws[i]["law_id"], 0)
+            }
+            for i in order
+        ]
+        
+        abbreviations: Dict[str, List[str]] = {}
+        for abbreviation, title in LAW_ABBREVIATIONS.items():
+            abbreviations.setdefault(normalize_suggest(title), []).append(abbreviation)
+        
+        entries = set()
+        for rank, i in enumerate(order):
+            law = laws[i]
+            names = [law.get("title"), law.get("title_kana")]
+            names.extend(law.get("abbreviations") or ())
+            names.extend(law.get("abbreviation_kana") or ())
+            names.extend(abbreviations.get(normalize_suggest(law.get("title")), ()))
+            for name in names:
+                key = normalize_suggest(name)
+                if key:
+                    entries.add((key, rank))
+        
+        entries = sorted(entries)
+        self._keys = [key for key, _ in entries]
+        self._key_ranks = array("I", (rank for _, rank in entries))
+        
+        exact: Dict[str, List[int]] = {}
+        short: Dict[str, List[int]] = {}
+        for key, rank in entries:
+            exact.setdefault(key, []).append(rank)
+            for length in range(1, min(len(key), SHORT_PREFIX_LENGTH) + 1):
+                short.setdefault(key[:length], []).append(rank)
+        self._exact = {key: array("I", sorted(ranks)) for key, ranks in exact.items()}
+        self._short = {key: array("I", sorted(set(ranks))) for key, ranks in short.items()}
+    
+    def __len__(self) -> int:
+        return len(self._laws)
+    
+    def suggest(self, query: str, limit: int = 10, law_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        入力中の文字列に前方一致する法令を順位順に取得（完全一致する法令を先頭に置く）
+        
+        Args:
+            query: 入力中の文字列（法令名・読み・略称）
+            limit: 最大件数
+            law_type: 法令種別で絞り込む場合に指定
+        
+        Returns:
+            法令情報のリスト（law_id・title・law_type・title_kana・popularity）
+        """
+        key = normalize_suggest(query)
+        if not key or limit <= 0:
+            return []
+        
+        if len(key) <= SHORT_PREFIX_LENGTH:
+            candidates: Iterable[int] = self._short.get(key, ())
+        else:
+            start = bisect_left(self._keys, key)
+            end = bisect_left(self._keys, key + _PREFIX_END, start)
+            candidates = sorted(set(self._key_ranks[start:end]))
+        
+        results: List[Dict[str, Any]] = []
+        seen = set()
+        for ranks in (self._exact.get(key, ()), candidates):
+            for rank in ranks:
+                if rank in seen:
+                    continue
+                seen.add(rank)
+                law = self._laws[rank]
+                if law_type is not None and law["law_type"] != law_type:
+                    continue
+                results.append(dict(law))
+                if len(results) >= limit:
+                    return results
+        return results
+
+
+class LawSuggestService:
+    """
+    法令名の入力補完サービス
+    
+    索引は転置インデックス（memory バックエンド）または知識ベース（pg_trgm バックエンド）の
+    法令名と参照回数から作成する。転置インデックスが読み込み直された場合（同期後）や
+    settings.suggest_refresh_sec が経過した場合は、バックグラウンドで新しい索引を作成してから
+    差し替えるため、作成中も前の索引で応答する。
+    """
+    
+    def __init__(
+        self,
+        search: Optional[LawSearchService] = None,
+        popularity: Optional[LawPopularity] = None,
+        refresh_sec: Optional[int] = None
+    ):
+        """
+        Args:
+            search: 法令全文検索サービス（省略時はアプリケーション共通のサービス）
+            popularity: 参照回数カウンター（省略時はアプリケーション共通のカウンター）
+            refresh_sec: 参照回数を反映して作り直す間隔（秒、省略時は settings.suggest_refresh_sec）
+        """
+        self.search = search or law_search
+        self.popularity = popularity or law_popularity
+        self.refresh_sec = refresh_sec if refresh_sec is not None else settings.suggest_refresh_sec
+        self._suggester: Optional[LawSuggester] = None
+        self._source: Any = None
+        self._built_at = 0.0
+        self._rebuilding: Optional[asyncio.Task] = None
+    
+    async def get_suggester(self) -> LawSuggester:
+        """
+        入力補完の索引を取得（初回は作成を待ち、以降の作り直しはバックグラウンドで行う）
+        
+        Returns:
+            入力補完の索引
+        """
+        source = await self.search.get_index() if self.search.backend == "memory" else None
+        if self._suggester is None:
+            await self.rebuild(source)
+        elif source is not self._source or time.monotonic() - self._built_at > self.refresh_sec:
+            if self._rebuilding is None or self._rebuilding.done():
+                self._rebuilding = asyncio.create_task(self._rebuild_in_background(source))
+        return self._suggester
+    
+    async def rebuild(self, source: Any = None):
+        """
+        索引を作成して差し替える
+        
+        Args:
+            source: 法令名の取得元の転置インデックス（pg_trgm バックエンドでは None）
+        """
+        start = time.perf_counter()
+        laws = await self._load_laws(source)
+        scores = await self.popularity.scores()
+        suggester = await asyncio.to_thread(LawSuggester, laws, scores)
+        
+        self._suggester, self._source, self._built_at = suggester, source, time.monotonic()
+        logger.info(f"Built law suggester: {len(suggester)} laws in {time.perf_counter() - start:.2f}s")
+    
+    async def _rebuild_in_background(self, source: Any):
+        """索引を作り直す（失敗した場合は前の索引を使い続ける）"""
+        try:
+            await self.rebuild(source)
+        except Exception as e:
+            logger.error(f"Error rebuilding law suggester: {str(e)}")
+    
+    async def suggest(self, query: str, limit: int = 10, law_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        入力中の文字列に前方一致する法令を取得
+        
+        Args:
+            query: 入力中の文字列
+            limit: 最大件数
+            law_type: 法令種別（任意）
+        
+        Returns:
+            法令情報のリスト
+        """
+        suggester = await self.get_suggester()
+        return suggester.suggest(query, limit=limit, law_type=law_type)
+    
+    async def _load_laws(self, source: Any) -> List[Dict[str, Any]]:
+        """転置インデックスまたは知識ベースから法令名を取得"""
+        if source is not None:
+            return [{"law_id": law_id, **source.law_info(law_id)} for law_id, _, _ in source.iter_laws()]
+        
+        repository = self.search.repository
+        if not repository.available:
+            return []
+        try:
+            titles = await repository.get_law_titles()
+        except Exception as e:
+            logger.error(f"Error reading law titles from knowledge base: {str(e)}")
+            return []
+        return [{"law_id": law_id, "title": title, "law_type": law_type} for law_id, title, law_type in titles]
+
+
+# アプリケーション共通の入力補完サービス
+law_suggest = LawSuggestService()
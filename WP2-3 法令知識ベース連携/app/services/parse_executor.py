@@ -0,0 +1,103 @@
+"""
+XML パース実行器
+法令XMLのパースを文書サイズに応じてイベントループ外（スレッド・プロセスプール）で実行
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Union
+from .xml_parser import LegalXMLParser
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+# ワーカープロセス内で使い回すパーサー
+_worker_parser: Optional[LegalXMLParser] = None
+
+
+def _parse_in_worker(xml_content: bytes) -> Dict[str, Any]:
+    """ワーカープロセスで法令XMLをパース"""
+    global _worker_parser
+    
+    if _worker_parser is None:
+        _worker_parser = LegalXMLParser()
+    return _worker_parser.parse_xml(xml_content)
+
+
+class XMLParseExecutor:
+    """
+    XML パース実行器
+    
+    小さな文書はそのままイベントループ上でパースし（スレッド切り替えのほうが高くつくため）、
+    中規模の文書はスレッド（lxml のパース中は GIL が解放される）、大きな文書は
+    ワーカー数を制限したプロセスプールでパースする。パース中も他のリクエストの
+    処理が止まらないよう、大きな法令ほどイベントループから離して実行する。
+    """
+    
+    def __init__(
+        self,
+        inline_max_bytes: Optional[int] = None,
+        process_min_bytes: Optional[int] = None,
+        max_workers: Optional[int] = None
+    ):
+        """
+        Args:
+            inline_max_bytes: この大きさ以下の文書はイベントループ上でパース
+            process_min_bytes: この大きさ以上の文書はプロセスプールでパース（0 の場合は使用しない）
+            max_workers: プロセスプールのワーカー数
+        """
+        self.parser = LegalXMLParser()
+        self.inline_max_bytes = (
+            inline_max_bytes if inline_max_bytes is not None else settings.parse_inline_max_bytes
+        )
+        self.process_min_bytes = (
+            process_min_bytes if process_min_bytes is not None else settings.parse_process_min_bytes
+        )
+        self.max_workers = max_workers or settings.parse_process_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    async def parse(self, xml_content: Union[str, bytes]) -> Dict[str, Any]:
+        """
+        法令XMLをパース
+        
+        Args:
+            xml_content: XML文字列またはバイト列
+        
+        Returns:
+            パース済み法令データ（辞書形式）
+        """
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode("utf-8")
+        size = len(xml_content)
+        
+        if size <= self.inline_max_bytes:
+            return self.parser.parse_xml(xml_content)
+        
+        if self.process_min_bytes and size >= self.process_min_bytes:
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_pool(), _parse_in_worker, xml_content)
+            except BrokenProcessPool as e:
+                # ワーカーが異常終了した場合はプールを作り直し、今回はスレッドでパース
+                logger.error(f"XML parse process pool is broken; falling back to thread: {str(e)}")
+                self.shutdown()
+        
+        return await asyncio.to_thread(self.parser.parse_xml, xml_content)
+    
+    def shutdown(self):
+        """プロセスプールを終了"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """プロセスプールを取得（初回呼び出し時に作成）"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            logger.info(f"XML parse process pool started: workers={self.max_workers}")
+        return self._pool
+
+
+# アプリケーション共通のパース実行器
+xml_parse_executor = XMLParseExecutor()
@@ -0,0 +1,465 @@
+"""
+全文検索インデックス
+文字バイグラム・1文字の転置インデックス（差分符号化した posting list）と BM25 によるランキング
+"""
+import os
+import pickle
+import re
+import tempfile
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+# BM25 パラメータ
+K1 = 1.2
+B = 0.75
+
+# 法令名の文書に掛ける重み（法令名に一致する場合は条文より上位に表示）
+TITLE_BOOST = 2.0
+
+# 法令名の文書の位置（条文の位置の代わり）
+TITLE_POSITION = -1
+
+# 削除済み文書の割合がこれを超えたら posting list を詰め直す
+COMPACT_RATIO = 0.25
+
+# 展開済み posting list のキャッシュ件数
+DECODED_CACHE_SIZE = 1024
+
+INDEX_FORMAT_VERSION = 2
+
+_SEPARATORS = re.compile(r"[^\w]+")
+
+
+def normalize_text(text: str) -> str:
+    """検索用にテキストを正規化（NFKC・小文字化）"""
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def query_terms(query: str) -> List[str]:
+    """
+    検索語を記号・空白で区切って正規化
+    
+    Args:
+        query: 検索語
+    
+    Returns:
+        語のリスト（出現順・重複なし）
+    """
+    segments = _SEPARATORS.split(normalize_text(query).replace("_", " "))
+    return list(dict.fromkeys(segment for segment in segments if segment))
+
+
+def bigrams(text: str) -> List[str]:
+    """
+    テキストを文字バイグラムに分割
+    
+    記号・空白で区切った区間ごとに2文字ずつずらして切り出す（1文字の区間はそのまま）
+    
+    Args:
+        text: テキスト
+    
+    Returns:
+        バイグラムのリスト（出現順・重複あり）
+    """
+    tokens: List[str] = []
+    for segment in _SEPARATORS.split(normalize_text(text).replace("_", " ")):
+        if len(segment) == 1:
+            tokens.append(segment)
+        else:
+            tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+    return tokens
+
+
+def index_terms(text: str) -> Tuple[List[str], int]:
+    """
+    テキストを索引する語に分割
+    
+    バイグラムに加え、1文字の検索語のために2文字以上の区間の各文字も索引する
+    （1文字の区間はバイグラムとしてそのまま含まれる）
+    
+    Args:
+        text: テキスト
+    
+    Returns:
+        (索引する語のリスト, 文書長として数えるバイグラム数)
+    """
+    tokens = bigrams(text)
+    length = len(tokens)
+    for segment in _SEPARATORS.split(normalize_text(text).replace("_", " ")):
+        if len(segment) > 1:
+            tokens.extend(segment)
+    return tokens, length
+
+
+def _narrow(values: np.ndarray) -> np.ndarray:
+    """値が収まる最小の符号なし整数型に変換（posting list の圧縮）"""
+    if values.size == 0:
+        return values.astype(np.uint8)
+    peak = int(values.max())
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if peak <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values.astype(np.uint64)
+
+
+class SearchIndex:
+    """
+    文字バイグラムの転置インデックス
+    
+    法令名（1法令1文書）と条文（見出し + 本文、1条文1文書）を文書とし、
+    バイグラムごとに文書IDの差分と出現回数を最小の整数型で保持する。
+    検索はクエリの全バイグラムを含む文書（AND）を BM25 でランキングする。
+    1文字の検索語のために各文字の posting list も保持する（文書長はバイグラム数）。
+    
+    法令の追加・更新は新しい文書IDで末尾に追記し、古い文書は削除済みとして
+    検索対象から外す。削除済みの割合が大きくなったら posting list を詰め直す。
+    """
+    
+    def __init__(self):
+        # バイグラム → (文書IDの差分, 出現回数)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # バイグラム → 最後に追記した文書ID
+        self._last_doc: Dict[str, int] = {}
+        # 文書ID → (法令ID, 条文の位置, 条番号)
+        self._docs: List[Optional[Tuple[str, int, str]]] = []
+        self._doc_lengths = np.zeros(0, dtype=np.uint32)
+        self._live = np.zeros(0, dtype=bool)
+        self._doc_law_types = np.zeros(0, dtype=np.uint16)
+        self._title_docs = np.zeros(0, dtype=bool)
+        # 法令ID → {"title", "law_type", "docs"}
+        self._laws: Dict[str, Dict[str, Any]] = {}
+        self._law_types: Dict[Optional[str], int] = {}
+        self._live_count = 0
+        self._live_length = 0
+        self._decoded: Dict[str, np.ndarray] = {}
+    
+    def __len__(self) -> int:
+        """検索対象の文書数"""
+        return self._live_count
+    
+    @property
+    def law_count(self) -> int:
+        """登録されている法令数"""
+        return len(self._laws)
+    
+    def has_law(self, law_id: str) -> bool:
+        """法令が登録されているか"""
+        return law_id in self._laws
+    
+    def law_info(self, law_id: str) -> Optional[Dict[str, Any]]:
+        """
+        登録されている法令の基本情報
+        
+        Args:
+            law_id: 法令ID
+        
+        Returns:
+            {"title", "law_type", "title_kana", "abbreviations", "abbreviation_kana"}（未登録の場合は None）
+        """
+        law = self._laws.get(law_id)
+        if law is None:
+            return None
+        return {
+            "title": law["title"],
+            "law_type": law["law_type"],
+            "title_kana": law.get("title_kana") or "",
+            "abbreviations": list(law.get("abbreviations") or ()),
+            "abbreviation_kana": list(law.get("abbreviation_kana") or ())
+        }
+    
+    def iter_laws(self) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """
+        登録されている法令を列挙
+        
+        Yields:
+            (法令ID, 法令名, 法令種別)
+        """
+        for law_id, law in self._laws.items():
+            yield law_id, law["title"], law["law_type"]
+    
+    def document(self, doc_id: int) -> Tuple[str, int, str]:
+        """
+        文書IDから (法令ID, 条文の位置, 条番号) を取得（法令名の文書は位置 TITLE_POSITION）
+        
+        Args:
+            doc_id: 文書ID
+        
+        Returns:
+            (法令ID, 条文の位置, 条番号)
+        """
+        return self._docs[doc_id]
+    
+    def add_laws(self, laws: Iterable[Dict[str, Any]]):
+        """
+        法令を追加（登録済みの法令は置き換え）
+        
+        Args:
+            laws: パース済み法令データ（law_id・title・law_type・articles を含む）
+        """
+        # 同じ法令が複数含まれる場合は後のデータを使用
+        laws = list({law["law_id"]: law for law in laws}.values())
+        self._remove([law["law_id"] for law in laws])
+        
+        pending: Dict[str, Tuple[List[int], List[int]]] = {}
+        lengths: List[int] = []
+        law_types: List[int] = []
+        first_doc = len(self._docs)
+        
+        for law in laws:
+            law_id = law["law_id"]
+            law_type = law.get("law_type") or None
+            type_id = self._law_types.setdefault(law_type, len(self._law_types))
+            documents = [(TITLE_POSITION, "", law.get("title") or "")]
+            documents.extend(
+                (position, article.get("article_no") or "",
+                 f"{article.get('heading') or ''} {article.get('text') or ''}")
+                for position, article in enumerate(law.get("articles", []))
+            )
+            
+            doc_ids = []
+            for position, article_no, text in documents:
+                doc_id = len(self._docs)
+                tokens, length = index_terms(text)
+                for term, tf in Counter(tokens).items():
+                    docs, tfs = pending.setdefault(term, ([], []))
+                    docs.append(doc_id)
+                    tfs.append(min(tf, np.iinfo(np.uint16).max))
+                self._docs.append((law_id, position, article_no))
+                lengths.append(length)
+                law_types.append(type_id)
+                doc_ids.append(doc_id)
+                self._live_length += length
+            
+            self._live_count += len(doc_ids)
+            self._laws[law_id] = {
+                "title": law.get("title") or "",
+                "law_type": law_type,
+                "title_kana": law.get("title_kana") or "",
+                "abbreviations": tuple(law.get("abbreviations") or ()),
+                "abbreviation_kana": tuple(law.get("abbreviation_kana") or ()),
+                "docs": doc_ids
+            }
+        
+        added = len(self._docs) - first_doc
+        self._doc_lengths = np.concatenate([self._doc_lengths, np.asarray(lengths, dtype=np.uint32)])
+        self._doc_law_types = np.concatenate([self._doc_law_types, np.asarray(law_types, dtype=np.uint16)])
+        self._live = np.concatenate([self._live, np.ones(added, dtype=bool)])
+        self._title_docs = np.concatenate([
+            self._title_docs,
+            np.fromiter((doc[1] == TITLE_POSITION for doc in self._docs[first_doc:]), dtype=bool, count=added)
+        ])
+        
+        for term, (docs, tfs) in pending.items():
+            doc_ids = np.asarray(docs, dtype=np.int64)
+            previous = self._last_doc.get(term)
+            deltas = np.diff(doc_ids, prepend=0 if previous is None else previous)
+            current = self._postings.get(term)
+            if current is None:
+                self._postings[term] = (_narrow(deltas), _narrow(np.asarray(tfs)))
+            else:
+                self._postings[term] = (
+                    _narrow(np.concatenate([current[0], deltas])),
+                    _narrow(np.concatenate([current[1], np.asarray(tfs)]))
+                )
+            self._last_doc[term] = docs[-1]
+        
+        self._decoded.clear()
+        self._maybe_compact()
+    
+    def remove_laws(self, law_ids: Iterable[str]):
+        """
+        法令を検索対象から削除
+        
+        Args:
+            law_ids: 法令IDのリスト
+        """
+        if self._remove(law_ids):
+            self._maybe_compact()
+    
+    def _remove(self, law_ids: Iterable[str]) -> bool:
+        """法令の文書を削除済みにする（削除した法令があれば True）"""
+        removed = False
+        for law_id in law_ids:
+            law = self._laws.pop(law_id, None)
+            if law is None:
+                continue
+            docs = np.asarray(law["docs"], dtype=np.int64)
+            self._live[docs] = False
+            self._live_count -= len(docs)
+            self._live_length -= int(self._doc_lengths[docs].sum())
+            removed = True
+        return removed
+    
+    def _maybe_compact(self):
+        """削除済み文書の割合が大きければ詰め直す"""
+        if len(self._docs) - self._live_count > COMPACT_RATIO * len(self._docs):
+            self.compact()
+    
+    def compact(self):
+        """削除済み文書を取り除いて文書IDを詰め直す"""
+        live_ids = np.flatnonzero(self._live)
+        remap = np.full(len(self._docs), -1, dtype=np.int64)
+        remap[live_ids] = np.arange(len(live_ids))
+        
+        postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        last_doc: Dict[str, int] = {}
+        for term, (deltas, tfs) in self._postings.items():
+            docs = np.cumsum(deltas, dtype=np.int64)
+            keep = self._live[docs]
+            if not keep.any():
+                continue
+            new_docs = remap[docs[keep]]
+            postings[term] = (_narrow(np.diff(new_docs, prepend=0)), _narrow(tfs[keep]))
+            last_doc[term] = int(new_docs[-1])
+        
+        self._postings = postings
+        self._last_doc = last_doc
+        self._docs = [self._docs[i] for i in live_ids]
+        self._doc_lengths = self._doc_lengths[live_ids]
+        self._doc_law_types = self._doc_law_types[live_ids]
+        self._title_docs = self._title_docs[live_ids]
+        self._live = np.ones(len(live_ids), dtype=bool)
+        for law in self._laws.values():
+            law["docs"] = [int(remap[i]) for i in law["docs"]]
+        self._decoded.clear()
+        logger.info(f"Search index compacted: {len(live_ids)} documents, {len(postings)} terms")
+    
+    def search(
+        self,
+        query: str,
+        law_type: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        クエリの全バイグラムを含む文書を BM25 の降順で取得
+        
+        Args:
+            query: 検索語（空白区切りで複数指定可）
+            law_type: 法令種別で絞り込む場合に指定
+            offset: 取得開始位置
+            limit: 取得件数
+        
+        Returns:
+            ([(文書ID, スコア)], 一致した文書の総数)
+        """
+        terms = list(dict.fromkeys(bigrams(query)))
+        if not terms or self._live_count == 0:
+            return [], 0
+        if any(term not in self._postings for term in terms):
+            return [], 0
+        
+        # 出現文書の少ない順に絞り込む
+        terms.sort(key=lambda term: len(self._postings[term][0]))
+        avg_length = self._live_length / self._live_count
+        
+        candidates = self._decode(terms[0])
+        tfs = self._postings[terms[0]][1]
+        keep = self._live[candidates]
+        if law_type is not None:
+            type_id = self._law_types.get(law_type)
+            if type_id is None:
+                return [], 0
+            keep &= self._doc_law_types[candidates] == type_id
+        candidates = candidates[keep]
+        lengths = self._doc_lengths[candidates]
+        scores = self._bm25(tfs[keep], lengths, avg_length, len(tfs))
+        
+        for term in terms[1:]:
+            if candidates.size == 0:
+                break
+            docs = self._decode(term)
+            term_tfs = self._postings[term][1]
+            idx = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+            found = docs[idx] == candidates
+            candidates, lengths, idx = candidates[found], lengths[found], idx[found]
+            scores = scores[found] + self._bm25(term_tfs[idx], lengths, avg_length, len(docs))
+        
+        total = int(candidates.size)
+        if total == 0:
+            return [], 0
+        
+        scores = np.where(self._title_docs[candidates], scores * TITLE_BOOST, scores)
+        
+        end = min(offset + limit, total)
+        if offset >= end:
+            return [], total
+        if end < total:
+            top = np.argpartition(-scores, end - 1)[:end]
+        else:
+            top = np.arange(total)
+        order = top[np.lexsort((candidates[top], -scores[top]))][offset:end]
+        return [(int(candidates[i]), float(scores[i])) for i in order], total
+    
+    def save(self, path: str):
+        """
+        インデックスをファイルに保存（一時ファイルに書き込んでから置き換える）
+        
+        Args:
+            path: 保存先
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        
+        state = {key: value for key, value in self.__dict__.items() if key != "_decoded"}
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((INDEX_FORMAT_VERSION, state), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        """
+        保存したインデックスを読み込む
+        
+        Args:
+            path: ファイルパス
+        
+        Returns:
+            検索インデックス
+        
+        Raises:
+            ValueError: 形式が異なる場合
+        """
+        with open(path, "rb") as f:
+            version, state = pickle.load(f)
+        if version != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported search index format: {version}")
+        
+        index = cls()
+        index.__dict__.update(state)
+        return index
+    
+    def _decode(self, term: str) -> np.ndarray:
+        """posting list の文書IDを展開（差分の累積和）"""
+        docs = self._decoded.get(term)
+        if docs is None:
+            docs = np.cumsum(self._postings[term][0], dtype=np.int64)
+            if len(self._decoded) >= DECODED_CACHE_SIZE:
+                self._decoded.clear()
+            self._decoded[term] = docs
+        return docs
+    
+    def _bm25(
+        self,
+        tfs: np.ndarray,
+        lengths: np.ndarray,
+        avg_length: float,
+        df: int
+    ) -> np.ndarray:
+        """BM25 のスコア（1語分）"""
+        idf = np.log(1.0 + (self._live_count - df + 0.5) / (df + 0.5))
+        tfs = tfs.astype(np.float64)
+        return idf * tfs * (K1 + 1.0) / (tfs + K1 * (1.0 - B + B * lengths / avg_length))
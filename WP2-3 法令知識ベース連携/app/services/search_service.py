@@ -0,0 +1,480 @@
+"""
+法令全文検索サービス
+プロセス内の転置インデックス（既定）または PostgreSQL の pg_trgm でキーワード検索し、
+ハイライト付きのスニペットを返す
+"""
+import asyncio
+import html
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .law_cache import LawCache, law_cache
+from .law_reference import LawReferenceResolver, select_provision
+from .law_repository import LawRepository
+from .law_service import LawService
+from .law_snapshot import SUFFIX, LawSnapshotStore, law_snapshots
+from .search_index import TITLE_POSITION, SearchIndex, bigrams, normalize_text, query_terms
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+# スニペットの長さ（文字数）
+SNIPPET_LENGTH = 120
+
+# 一致箇所より前に含める文字数
+SNIPPET_CONTEXT = 30
+
+# インデックス作成時に一度に追加する法令数
+INDEX_BATCH_LAWS = 200
+
+SEARCH_BACKENDS = ("memory", "pg_trgm")
+
+
+def make_snippet(text: str, terms: List[str], length: int = SNIPPET_LENGTH) -> str:
+    """
+    一致箇所を <mark> で囲んだスニペットを作成
+    
+    全角・半角の違いを吸収するため、1文字ずつ正規化した文字列で一致箇所を探し、
+    元のテキストの位置に戻して切り出す。スニペットは HTML エスケープ済み。
+    検索語そのものが見つからない場合（バイグラムのみ一致）はバイグラムを強調する。
+    
+    Args:
+        text: 元のテキスト
+        terms: 正規化済みの検索語
+        length: スニペットの長さ（文字数）
+    
+    Returns:
+        スニペット（HTML）
+    """
+    if not text:
+        return ""
+    
+    # 正規化後の位置 → 元のテキストの位置
+    normalized_parts: List[str] = []
+    origin: List[int] = []
+    for i, char in enumerate(text):
+        normalized = normalize_text(char)
+        normalized_parts.append(normalized)
+        origin.extend([i] * len(normalized))
+    normalized = "".join(normalized_parts)
+    
+    def find_spans(words: Iterable[str]) -> List[Tuple[int, int]]:
+        spans = []
+        for word in words:
+            start = normalized.find(word)
+            while start != -1:
+                spans.append((origin[start], origin[start + len(word) - 1] + 1))
+                start = normalized.find(word, start + len(word))
+        return spans
+    
+    spans = find_spans(terms) or find_spans({gram for term in terms for gram in bigrams(term)})
+    spans.sort()
+    
+    first = spans[0][0] if spans else 0
+    start = max(0, min(first - SNIPPET_CONTEXT, len(text) - length))
+    end = min(len(text), start + length)
+    
+    parts = ["…"] if start > 0 else []
+    cursor = start
+    for span_start, span_end in spans:
+        span_start, span_end = max(span_start, cursor), min(span_end, end)
+        if span_start >= span_end:
+            continue
+        parts.append(html.escape(text[cursor:span_start]))
+        parts.append(f"<mark>{html.escape(text[span_start:span_end])}</mark>")
+        cursor = span_end
+    parts.append(html.escape(text[cursor:end]))
+    if end < len(text):
+        parts.append("…")
+    return "".join(parts).replace("\n", " ")
+
+
+class LawSearchService:
+    """
+    法令全文検索サービス
+    
+    memory バックエンドは同期バッチが作成した転置インデックス（SearchIndex）を
+    読み込んで検索する。ファイルが更新された場合（同期バッチによる差分更新）は
+    次回の検索時に読み込み直す。スニペットの本文はスナップショット、
+    プロセス内キャッシュ、知識ベースの順に取得する。
+    
+    pg_trgm バックエンドは知識ベースの条文テーブルを pg_trgm の GIN 索引で検索する
+    （インデックスファイルを持たない構成向け）。
+    """
+    
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        index_path: Optional[str] = None,
+        repository: Optional[LawRepository] = None,
+        cache: Optional[LawCache] = None,
+        snapshots: Optional[LawSnapshotStore] = None
+    ):
+        """
+        Args:
+            backend: 検索バックエンド（memory/pg_trgm、省略時は settings.search_backend）
+            index_path: 転置インデックスのパス（省略時は settings.search_index_path）
+            repository: 法令リポジトリ（省略時は必要になった時点で作成）
+            cache: 法令キャッシュ（省略時はアプリケーション共通のキャッシュ）
+            snapshots: 法令スナップショットストア（省略時はアプリケーション共通のストア）
+        """
+        self.backend = backend or settings.search_backend
+        if self.backend not in SEARCH_BACKENDS:
+            raise ValueError(f"Unknown search backend: {self.backend}")
+        self.index_path = index_path or settings.search_index_path
+        self.cache = cache or law_cache
+        self.snapshots = snapshots or law_snapshots
+        self._repository = repository
+        self._index: Optional[SearchIndex] = None
+        self._index_version: Optional[Tuple[int, int]] = None
+        self._resolver: Optional[LawReferenceResolver] = None
+        self._resolver_loaded_at = 0.0
+    
+    @property
+    def repository(self) -> LawRepository:
+        """法令リポジトリ（初回参照時に作成）"""
+        if self._repository is None:
+            self._repository = LawRepository()
+        return self._repository
+    
+    async def get_index(self) -> SearchIndex:
+        """
+        転置インデックスを取得（ファイルが更新されていれば読み込み直す）
+        
+        Returns:
+            転置インデックス（ファイルが存在しない・形式が古い場合は空のインデックス）
+        """
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            if self._index is None:
+                logger.warning(f"Search index not found: {self.index_path}")
+                self._index = SearchIndex()
+            return self._index
+        
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if self._index is None or self._index_version != version:
+            start = time.perf_counter()
+            try:
+                self._index = await asyncio.to_thread(SearchIndex.load, self.index_path)
+            except ValueError as e:
+                # 形式が変わった場合は作り直されるまで空のインデックスで応答する
+                logger.error(f"{str(e)}; rebuild it with app.scripts.build_search_index")
+                self._index = self._index or SearchIndex()
+                self._index_version = version
+                return self._index
+            self._index_version = version
+            self._resolver = None
+            logger.info(
+                f"Loaded search index: {self._index.law_count} laws, {len(self._index)} documents "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
+        return self._index
+    
+    async def get_resolver(self) -> LawReferenceResolver:
+        """
+        条文参照の解決器を取得
+        
+        memory バックエンドでは転置インデックスの法令名から作成し、インデックスの
+        読み込み直しに合わせて作り直す。pg_trgm バックエンドでは知識ベースの法令名から
+        作成し、CACHE_TTL ごとに作り直す。
+        
+        Returns:
+            条文参照の解決器
+        """
+        if self.backend == "memory":
+            index = await self.get_index()
+            if self._resolver is None:
+                self._resolver = LawReferenceResolver(index.iter_laws())
+            return self._resolver
+        
+        if self._resolver is None or time.monotonic() - self._resolver_loaded_at > settings.cache_ttl:
+            titles = await self.repository.get_law_titles() if self.repository.available else []
+            self._resolver = LawReferenceResolver(titles)
+            self._resolver_loaded_at = time.monotonic()
+        return self._resolver
+    
+    async def lookup_reference(self, reference: str) -> Optional[Dict[str, Any]]:
+        """
+        条文参照（"民法第709条第1項" など）を解決して該当する条文を取得
+        
+        法令名はトライ木、条文は条文索引で引くため、全文検索は行わない
+        
+        Args:
+            reference: 条文参照
+        
+        Returns:
+            検索結果項目（text に条・項・号の本文を含む）。法令名に一致しない場合は None
+        
+        Raises:
+            ValueError: 法令は存在するが条・項・号が存在しない場合
+        """
+        resolver = await self.get_resolver()
+        resolved = resolver.resolve(reference)
+        if resolved is None:
+            return None
+        
+        hit = {
+            "law_id": resolved["law_id"],
+            "title": resolved["title"],
+            "law_type": resolved["law_type"],
+            "article_no": None,
+            "heading": None,
+            "snippet": html.escape(resolved["title"]),
+            "score": 1.0,
+            "text": None
+        }
+        if resolved["article_key"] is None:
+            return hit
+        
+        async with LawService(
+            repository=self._repository, cache=self.cache, snapshots=self.snapshots
+        ) as service:
+            article = await service.get_article(resolved["law_id"], resolved["article_key"])
+        
+        text = select_provision(article, resolved["paragraph"], resolved["item"])
+        if text is None:
+            raise ValueError(f"Provision not found: {reference}")
+        
+        hit.update(
+            article_no=article.get("article_no"),
+            heading=article.get("heading") or None,
+            snippet=make_snippet(text, []),
+            text=text
+        )
+        return hit
+    
+    async def search(
+        self,
+        keyword: str,
+        law_type: Optional[str] = None,
+        page: int = 1,
+        per_page: int = 20
+    ) -> Dict[str, Any]:
+        """
+        キーワードで法令名・条文を検索
+        
+        Args:
+            keyword: キーワード（空白区切りで AND 検索）
+            law_type: 法令種別（任意）
+            page: ページ番号
+            per_page: 1ページあたりの件数
+        
+        Returns:
+            {"hits": [...], "total": 件数}
+        """
+        offset = (page - 1) * per_page
+        if self.backend == "pg_trgm":
+            return await self._search_trgm(keyword, law_type, offset, per_page)
+        return await self._search_memory(keyword, law_type, offset, per_page)
+    
+    async def _search_memory(
+        self,
+        keyword: str,
+        law_type: Optional[str],
+        offset: int,
+        limit: int
+    ) -> Dict[str, Any]:
+        """転置インデックスで検索"""
+        index = await self.get_index()
+        results, total = index.search(keyword, law_type=law_type, offset=offset, limit=limit)
+        terms = query_terms(keyword)
+        
+        hits = []
+        for doc_id, score in results:
+            law_id, position, article_no = index.document(doc_id)
+            info = index.law_info(law_id) or {"title": "", "law_type": None}
+            hit = {
+                "law_id": law_id,
+                "title": info["title"],
+                "law_type": info["law_type"],
+                "article_no": None,
+                "heading": None,
+                "snippet": make_snippet(info["title"], terms),
+                "score": score
+            }
+            if position != TITLE_POSITION:
+                article = await self.article_at(law_id, position)
+                hit["article_no"] = article_no
+                if article is not None:
+                    hit["heading"] = article.get("heading") or None
+                    hit["snippet"] = make_snippet(article.get("text") or "", terms)
+            hits.append(hit)
+        
+        return {"hits": hits, "total": total}
+    
+    async def _search_trgm(
+        self,
+        keyword: str,
+        law_type: Optional[str],
+        offset: int,
+        limit: int
+    ) -> Dict[str, Any]:
+        """PostgreSQL の pg_trgm で検索"""
+        if not self.repository.available:
+            raise RuntimeError("Knowledge base database is not available for pg_trgm search")
+        
+        terms = query_terms(keyword)
+        rows, total = await self.repository.search_articles(terms, law_type, offset, limit)
+        hits = [
+            {
+                "law_id": row["law_id"],
+                "title": row["title"],
+                "law_type": row["law_type"],
+                "article_no": row["article_no"],
+                "heading": row["heading"] or None,
+                "snippet": make_snippet(row["text"] or "", terms),
+                "score": float(row["score"] or 0.0)
+            }
+            for row in rows
+        ]
+        return {"hits": hits, "total": total}
+    
+    async def article_at(self, law_id: str, position: int) -> Optional[Dict[str, Any]]:
+        """
+        法令内の並び順で条文を取得（スナップショット、プロセス内キャッシュ、知識ベースの順）
+        
+        Args:
+            law_id: 法令ID
+            position: 並び順
+        
+        Returns:
+            条文データ（取得できない場合は None）
+        """
+        law = self.snapshots.open(law_id) or await self.cache.get_cached(law_id)
+        if law is not None:
+            if 0 <= position < len(law):
+                return law.get_article(position)
+            return None
+        
+        if self.repository.available:
+            try:
+                return await self.repository.get_article_at(law_id, position)
+            except Exception as e:
+                logger.error(f"Error reading article from knowledge base: {str(e)}")
+        return None
+
+
+async def _load_laws(
+    law_ids: Iterable[str],
+    repository: Optional[LawRepository],
+    snapshots: LawSnapshotStore
+):
+    """スナップショット、知識ベースの順に法令データを読み込む（読み込めない法令は飛ばす）"""
+    for law_id in law_ids:
+        snapshot = snapshots.open(law_id)
+        if snapshot is not None:
+            yield snapshot.to_dict()
+            continue
+        if repository is not None and repository.available:
+            law = await repository.get_law(law_id)
+            if law is not None:
+                yield law
+                continue
+        logger.warning(f"Law data not found for search index: {law_id}")
+
+
+async def _add_in_batches(
+    index: SearchIndex,
+    law_ids: Iterable[str],
+    repository: Optional[LawRepository],
+    snapshots: LawSnapshotStore
+) -> int:
+    """法令を一定数ずつインデックスに追加（追加した法令数を返す）"""
+    batch: List[Dict[str, Any]] = []
+    count = 0
+    async for law in _load_laws(law_ids, repository, snapshots):
+        batch.append(law)
+        if len(batch) >= INDEX_BATCH_LAWS:
+            await asyncio.to_thread(index.add_laws, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        await asyncio.to_thread(index.add_laws, batch)
+        count += len(batch)
+    return count
+
+
+async def rebuild_search_index(
+    repository: Optional[LawRepository] = None,
+    snapshots: Optional[LawSnapshotStore] = None,
+    path: Optional[str] = None
+) -> SearchIndex:
+    """
+    全法令から転置インデックスを作成して保存
+    
+    対象は知識ベースに登録されている法令（知識ベースが利用できない場合は
+    スナップショットのある法令）
+    
+    Args:
+        repository: 法令リポジトリ（省略時はアプリケーション共通のエンジン）
+        snapshots: 法令スナップショットストア（省略時はアプリケーション共通のストア）
+        path: 保存先（省略時は settings.search_index_path）
+    
+    Returns:
+        作成した転置インデックス
+    """
+    repository = repository or LawRepository()
+    snapshots = snapshots or law_snapshots
+    path = path or settings.search_index_path
+    
+    if repository.available:
+        law_ids = sorted(await repository.get_sync_states())
+    else:
+        law_ids = sorted(p.name[:-len(SUFFIX)] for p in snapshots.directory.glob(f"*{SUFFIX}"))
+    
+    start = time.perf_counter()
+    index = SearchIndex()
+    count = await _add_in_batches(index, law_ids, repository, snapshots)
+    await asyncio.to_thread(index.save, path)
+    
+    logger.info(
+        f"Built search index: {count} laws, {len(index)} documents "
+        f"in {time.perf_counter() - start:.1f}s ({path})"
+    )
+    return index
+
+
+async def update_search_index(
+    law_ids: Iterable[str],
+    removed_law_ids: Iterable[str] = (),
+    repository: Optional[LawRepository] = None,
+    snapshots: Optional[LawSnapshotStore] = None,
+    path: Optional[str] = None
+) -> SearchIndex:
+    """
+    変更のあった法令のみ転置インデックスを更新して保存（インデックスがなければ作成）
+    
+    Args:
+        law_ids: 追加・変更された法令ID
+        removed_law_ids: 削除された法令ID
+        repository: 法令リポジトリ（省略時はアプリケーション共通のエンジン）
+        snapshots: 法令スナップショットストア（省略時はアプリケーション共通のストア）
+        path: 保存先（省略時は settings.search_index_path）
+    
+    Returns:
+        更新した転置インデックス
+    """
+    repository = repository or LawRepository()
+    snapshots = snapshots or law_snapshots
+    path = path or settings.search_index_path
+    
+    if not os.path.exists(path):
+        return await rebuild_search_index(repository, snapshots, path)
+    
+    try:
+        index = await asyncio.to_thread(SearchIndex.load, path)
+    except ValueError as e:
+        logger.warning(f"{str(e)}; rebuilding search index")
+        return await rebuild_search_index(repository, snapshots, path)
+    index.remove_laws(removed_law_ids)
+    count = await _add_in_batches(index, law_ids, repository, snapshots)
+    await asyncio.to_thread(index.save, path)
+    
+    logger.info(f"Updated search index: {count} laws re-indexed ({path})")
+    return index
+
+
+# アプリケーション共通の検索サービス
+law_search = LawSearchService()
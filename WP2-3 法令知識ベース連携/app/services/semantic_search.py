@@ -0,0 +1,364 @@
+"""
+条文の意味検索
+条文の埋め込みベクトルの近似最近傍探索（プロセス内の HNSW または pgvector）で
+クエリ文や指定した条文に意味の近い条文を返す
+"""
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .article_embedding import ArticleEmbedder, decode_vector
+from .law_repository import LawRepository
+from .search_service import LawSearchService, law_search, make_snippet
+from .vector_index import CURRENT_FILE, VectorIndex, normalize_vectors
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+SEMANTIC_BACKENDS = ("hnsw", "pgvector")
+
+# pgvector の vector 列を設定する際に一度に更新する行数
+PGVECTOR_BATCH_SIZE = 1000
+
+
+def vector_literal(vector: np.ndarray) -> str:
+    """
+    ベクトルを pgvector のテキスト表現に変換
+    
+    Args:
+        vector: ベクトル
+    
+    Returns:
+        "[0.1,0.2,...]" 形式の文字列
+    """
+    return "[" + ",".join(f"{x:.7g}" for x in np.asarray(vector, dtype=np.float32).tolist()) + "]"
+
+
+class SemanticSearchService:
+    """
+    条文の意味検索サービス
+    
+    hnsw バックエンドはバッチが作成したベクトルインデックス（VectorIndex）を読み込んで
+    検索する。CURRENT ファイルが更新された場合は次回の検索時に読み込み直す。
+    pgvector バックエンドは知識ベースの vector 列を pgvector の HNSW 索引で検索する。
+    
+    クエリ文は埋め込みモデルでベクトル化する（初回に読み込む）。類似条文の検索は
+    条文の保存済みベクトルを使うため、埋め込みモデルを必要としない。
+    """
+    
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        index_dir: Optional[str] = None,
+        search: Optional[LawSearchService] = None,
+        embedder: Optional[ArticleEmbedder] = None
+    ):
+        """
+        Args:
+            backend: 検索バックエンド（hnsw/pgvector、省略時は settings.semantic_backend）
+            index_dir: ベクトルインデックスの保存先（省略時は settings.vector_index_dir）
+            search: 法令全文検索サービス（条文参照の解決と条文の取得に使用）
+            embedder: 埋め込みモデル（省略時は必要になった時点で作成）
+        """
+        self.backend = backend or settings.semantic_backend
+        if self.backend not in SEMANTIC_BACKENDS:
+            raise ValueError(f"Unknown semantic search backend: {self.backend}")
+        self.index_dir = index_dir or settings.vector_index_dir
+        self.search = search or law_search
+        self._embedder = embedder
+        self._index: Optional[VectorIndex] = None
+        self._index_version: Optional[Tuple[int, int]] = None
+    
+    @property
+    def embedder(self) -> ArticleEmbedder:
+        """埋め込みモデル（初回参照時に作成）"""
+        if self._embedder is None:
+            self._embedder = ArticleEmbedder()
+        return self._embedder
+    
+    @property
+    def model_name(self) -> str:
+        """検索対象の埋め込みモデル名"""
+        return self._embedder.model_name if self._embedder is not None else settings.bert_model_name
+    
+    async def get_index(self) -> Optional[VectorIndex]:
+        """
+        ベクトルインデックスを取得（CURRENT ファイルが更新されていれば読み込み直す）
+        
+        Returns:
+            ベクトルインデックス（作成されていない場合は None）
+        """
+        try:
+            stat = os.stat(os.path.join(self.index_dir, CURRENT_FILE))
+        except FileNotFoundError:
+            if self._index_version is None:
+                logger.warning(f"Vector index not found: {self.index_dir}")
+                self._index_version = (0, 0)
+            return self._index
+        
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if self._index is None or self._index_version != version:
+            start = time.perf_counter()
+            self._index = await asyncio.to_thread(VectorIndex.load, self.index_dir)
+            self._index_version = version
+            if self._index.model_name and self._index.model_name != self.model_name:
+                logger.warning(
+                    f"Vector index was built with {self._index.model_name}, "
+                    f"but queries are embedded with {self.model_name}"
+                )
+            logger.info(
+                f"Loaded vector index: {len(self._index)} articles in {time.perf_counter() - start:.2f}s"
+            )
+        return self._index
+    
+    async def search_similar(
+        self,
+        query: Optional[str] = None,
+        similar_to: Optional[str] = None,
+        law_id: Optional[str] = None,
+        law_type: Optional[str] = None,
+        k: int = 10
+    ) -> Dict[str, Any]:
+        """
+        クエリ文または条文参照に意味の近い条文を類似度の降順で取得
+        
+        Args:
+            query: クエリ文
+            similar_to: 条文参照（例: "民法第709条"、query より優先）
+            law_id: 法令で絞り込む場合に指定
+            law_type: 法令種別で絞り込む場合に指定
+            k: 取得件数
+        
+        Returns:
+            {"hits": [...], "source": 条文参照の条文（query の場合は None）}
+        
+        Raises:
+            LookupError: 条文参照の条文、またはその埋め込みが見つからない場合
+            RuntimeError: インデックス・データベース・埋め込みモデルが利用できない場合
+        """
+        source = None
+        exclude: Optional[Tuple[str, str]] = None
+        if similar_to:
+            source, exclude = await self._resolve_source(similar_to)
+        index = await self.get_index() if self.backend == "hnsw" else None
+        if self.backend == "hnsw" and index is None:
+            raise RuntimeError("Vector index is not built")
+        
+        if exclude is not None:
+            vector = await self._source_vector(index, exclude)
+        else:
+            vector = (await asyncio.to_thread(self.embedder.encode, [query or ""]))[0]
+        
+        if self.backend == "pgvector":
+            hits = await self._search_pgvector(vector, k, law_id, law_type, exclude)
+        else:
+            hits = await self._search_hnsw(index, vector, k, law_id, law_type, exclude)
+        return {"hits": hits, "source": source}
+    
+    async def _resolve_source(self, reference: str) -> Tuple[Dict[str, Any], Tuple[str, str]]:
+        """条文参照を解決して検索元の条文と (法令ID, 条文キー) を返す"""
+        resolver = await self.search.get_resolver()
+        resolved = resolver.resolve(reference)
+        if resolved is None or resolved["article_key"] is None:
+            raise LookupError(f"Article not found: {reference}")
+        try:
+            source = await self.search.lookup_reference(reference)
+        except ValueError as e:
+            raise LookupError(str(e))
+        return source, (resolved["law_id"], resolved["article_key"])
+    
+    async def _source_vector(self, index: Optional[VectorIndex], source: Tuple[str, str]) -> np.ndarray:
+        """検索元の条文の保存済みベクトルを取得"""
+        if index is not None:
+            row = index.find(*source)
+            if row is None:
+                raise LookupError(f"Article is not in vector index: {source}")
+            return index.vector(row)
+        
+        repository = self.search.repository
+        if not repository.available:
+            raise RuntimeError("Knowledge base database is not available for pgvector search")
+        stored = await repository.get_article_embedding(source[0], source[1], self.model_name)
+        if stored is None:
+            raise LookupError(f"Article has no embedding: {source}")
+        return decode_vector(*stored)
+    
+    async def _search_hnsw(
+        self,
+        index: VectorIndex,
+        vector: np.ndarray,
+        k: int,
+        law_id: Optional[str],
+        law_type: Optional[str],
+        exclude: Optional[Tuple[str, str]]
+    ) -> List[Dict[str, Any]]:
+        """ベクトルインデックスで検索し、条文をスナップショット・キャッシュ・知識ベースから取得"""
+        excluded_row = index.find(*exclude) if exclude is not None else None
+        results = index.search(
+            vector, k, law_id=law_id, law_type=law_type,
+            ef=settings.hnsw_ef_search, exclude=excluded_row
+        )
+        
+        hits = []
+        for row, score in results:
+            info = index.row(row)
+            article = await self.search.article_at(info["law_id"], info["position"]) or {}
+            hits.append({
+                "law_id": info["law_id"],
+                "title": info["title"],
+                "law_type": info["law_type"],
+                "article_no": article.get("article_no"),
+                "heading": article.get("heading") or None,
+                "snippet": make_snippet(article.get("text") or "", []),
+                "score": score
+            })
+        return hits
+    
+    async def _search_pgvector(
+        self,
+        vector: np.ndarray,
+        k: int,
+        law_id: Optional[str],
+        law_type: Optional[str],
+        exclude: Optional[Tuple[str, str]]
+    ) -> List[Dict[str, Any]]:
+        """pgvector の HNSW 索引で検索"""
+        repository = self.search.repository
+        if not repository.available:
+            raise RuntimeError("Knowledge base database is not available for pgvector search")
+        
+        rows = await repository.search_similar_articles(
+            vector_literal(normalize_vectors(vector)), self.model_name, k,
+            law_id=law_id, law_type=law_type, exclude=exclude, ef_search=settings.hnsw_ef_search
+        )
+        return [
+            {
+                "law_id": row["law_id"],
+                "title": row["title"],
+                "law_type": row["law_type"],
+                "article_no": row["article_no"],
+                "heading": row["heading"] or None,
+                "snippet": make_snippet(row["text"] or "", []),
+                "score": float(row["score"])
+            }
+            for row in rows
+        ]
+
+
+async def rebuild_vector_index(
+    repository: Optional[LawRepository] = None,
+    directory: Optional[str] = None,
+    model_name: Optional[str] = None
+) -> int:
+    """
+    知識ベースの条文の埋め込みからベクトルインデックスを作り直して保存
+    
+    埋め込みは一時ファイルに mmap で書き出してから HNSW グラフを作成するため、
+    全件をメモリに展開しない
+    
+    Args:
+        repository: 法令リポジトリ（省略時はアプリケーション共通のエンジン）
+        directory: 保存先（省略時は settings.vector_index_dir）
+        model_name: 埋め込みモデル名（省略時は settings.bert_model_name）
+    
+    Returns:
+        インデックスに登録した条文数
+    """
+    repository = repository or LawRepository()
+    directory = directory or settings.vector_index_dir
+    model_name = model_name or settings.bert_model_name
+    if not repository.available:
+        raise RuntimeError("Knowledge base database is not available")
+    
+    start = time.perf_counter()
+    count = await repository.count_embeddings(model_name)
+    laws = {law_id: {"title": title, "law_type": law_type} for law_id, title, law_type in await repository.get_law_titles()}
+    os.makedirs(directory, exist_ok=True)
+    
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        vectors: Optional[np.ndarray] = None
+        law_ids: List[str] = []
+        positions: List[int] = []
+        article_keys: List[str] = []
+        article_ids: List[int] = []
+        async for batch in repository.iter_embeddings(model_name):
+            for row in batch:
+                if len(law_ids) >= count:
+                    break
+                vector = decode_vector(row["embedding"], row["dtype"] or "float16")
+                if vectors is None:
+                    vectors = np.lib.format.open_memmap(
+                        os.path.join(tmp, "vectors.npy"), mode="w+", dtype=np.float32, shape=(count, len(vector))
+                    )
+                vectors[len(law_ids)] = vector
+                law_ids.append(row["law_id"])
+                positions.append(row["position"])
+                article_keys.append(row["article_key"] or "")
+                article_ids.append(row["article_id"])
+        
+        if vectors is None:
+            logger.warning(f"No article embeddings for {model_name}; vector index was not built")
+            return 0
+        
+        await asyncio.to_thread(
+            VectorIndex.build,
+            directory,
+            vectors[:len(law_ids)],
+            law_ids,
+            positions,
+            article_keys,
+            article_ids,
+            laws,
+            m=settings.hnsw_m,
+            ef_construction=settings.hnsw_ef_construction,
+            model_name=model_name
+        )
+        del vectors
+    
+    logger.info(f"Rebuilt vector index with {len(law_ids)} articles in {time.perf_counter() - start:.1f}s")
+    return len(law_ids)
+
+
+async def sync_pgvector(repository: Optional[LawRepository] = None, model_name: Optional[str] = None) -> int:
+    """
+    pgvector の vector 列と HNSW 索引を作成し、未設定の埋め込みを正規化して設定
+    
+    埋め込みを作り直すと行が置き換わり vector 列は未設定に戻るため、
+    埋め込みバッチの後に実行すれば変更分のみ設定される
+    
+    Args:
+        repository: 法令リポジトリ（省略時はアプリケーション共通のエンジン）
+        model_name: 埋め込みモデル名（省略時は settings.bert_model_name）
+    
+    Returns:
+        設定した行数
+    """
+    repository = repository or LawRepository()
+    model_name = model_name or settings.bert_model_name
+    if not repository.available:
+        raise RuntimeError("Knowledge base database is not available")
+    
+    dimension = await repository.get_embedding_dimension(model_name)
+    if dimension is None:
+        logger.warning(f"No article embeddings for {model_name}; pgvector index was not created")
+        return 0
+    await repository.ensure_pgvector_index(dimension, settings.hnsw_m, settings.hnsw_ef_construction)
+    
+    count = 0
+    while True:
+        rows = await repository.get_embeddings_without_vector(model_name, PGVECTOR_BATCH_SIZE)
+        if not rows:
+            return count
+        await repository.set_embedding_vectors([
+            (row["article_id"], vector_literal(normalize_vectors(decode_vector(row["embedding"], row["dtype"] or "float16"))))
+            for row in rows
+        ])
+        count += len(rows)
+        logger.info(f"Set {count} pgvector embeddings")
+
+
+# アプリケーション共通の意味検索サービス
+semantic_search = SemanticSearchService()
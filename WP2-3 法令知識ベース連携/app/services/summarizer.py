@@ -3,12 +3,20 @@
 条文をローカル要約ルールで処理し、Geminiで最終要約を生成
 """
 import re
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+from .generation_cache import GenerationCache, generation_cache
 from ..clients.gemini_client import GeminiClient
+from ..utils.article_number import canonical_article_key
 from ..logger import get_logger
 
 logger = get_logger(__name__)
 
+# 要約処理（ローカル短縮・整形）の版。処理を変えた場合は上げてキャッシュを切り替える
+SUMMARY_PROMPT_VERSION = "1"
+
+# 要約スタイル
+SUMMARY_STYLES = ("plain", "legal_summary", "for_layperson")
+
 
 class ArticleSummarizer:
     """
@@ -17,28 +25,79 @@ class ArticleSummarizer:
     ローカル短縮ルールとGeminiを組み合わせて条文を要約
     """
     
-    def __init__(self):
+    def __init__(self, cache: Optional[GenerationCache] = None):
+        """
+        Args:
+            cache: 生成結果キャッシュ（省略時はアプリケーション共通のキャッシュ）
+        """
         self.gemini_client = GeminiClient()
+        self.cache = cache or generation_cache
+    
+    @property
+    def prompt_version(self) -> str:
+        """要約処理とプロンプトテンプレートの版"""
+        return f"{SUMMARY_PROMPT_VERSION}-{self.gemini_client.prompt_version('summarize_ja.txt')}"
+    
+    def cache_key(
+        self,
+        law_id: str,
+        article_no: str,
+        content_hash: str,
+        max_length: int = 200,
+        style: str = "plain"
+    ) -> str:
+        """
+        条文要約のキャッシュキーを生成
+        
+        Args:
+            law_id: 法令ID
+            article_no: 条番号
+            content_hash: 条文内容のハッシュ
+            max_length: 最大文字数
+            style: 要約スタイル
+        
+        Returns:
+            キャッシュキー
+        """
+        return self.cache.summary_key(
+            law_id, canonical_article_key(article_no), content_hash,
+            style, max_length, self.gemini_client.model, self.prompt_version
+        )
     
     async def summarize_article(
         self,
         article_text: str,
         article_no: str,
         max_length: int = 200,
-        style: str = "plain"
+        style: str = "plain",
+        law_id: Optional[str] = None,
+        content_hash: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         条文を要約
         
+        法令IDと条文ハッシュを指定した場合は生成結果キャッシュを参照し、
+        Gemini で生成した要約をキャッシュする（モック・フォールバックの要約は除く）
+        
         Args:
             article_text: 条文テキスト
             article_no: 条番号
             max_length: 最大文字数
             style: 要約スタイル（plain/legal_summary/for_layperson）
+            law_id: 法令ID（任意）
+            content_hash: 条文内容のハッシュ（任意）
             
         Returns:
             要約結果
         """
+        key = None
+        if law_id and content_hash:
+            key = self.cache_key(law_id, article_no, content_hash, max_length, style)
+            cached = await self.cache.get(key)
+            if cached is not None:
+                logger.info(f"Summary cache hit: {law_id}/{article_no} style={style}")
+                return cached
+        
         logger.info(f"Summarizing article {article_no} with style={style}")
         
         # ステップ1: ローカル短縮処理
@@ -48,19 +107,58 @@ class ArticleSummarizer:
         gemini_result = await self.gemini_client.generate_summary(
             text=reduced_text,
             context_items=[f"条文番号: {article_no}"],
-            max_tokens=min(max_length // 4, 512)  # トークン数に変換
+            max_tokens=self._max_tokens(max_length)
         )
         
         # ステップ3: 結果を整形
         summary = self._format_summary(
             gemini_result,
+            law_id,
             article_no,
             style,
             max_length
         )
         
+        # ステップ4: 生成結果をキャッシュ
+        if key is not None and not gemini_result.get("fallback"):
+            await self.cache.set(
+                key, summary, "summary",
+                model_name=self.gemini_client.model,
+                prompt_version=self.prompt_version,
+                law_id=law_id,
+                article_key=canonical_article_key(article_no)
+            )
+        
         return summary
     
+    def estimate_tokens(
+        self,
+        article_text: str,
+        article_no: str,
+        max_length: int = 200,
+        style: str = "plain"
+    ) -> Tuple[int, int]:
+        """
+        要約1件で Gemini に送る入力トークン数と出力トークン数の上限を見積もり
+        
+        Args:
+            article_text: 条文テキスト
+            article_no: 条番号
+            max_length: 最大文字数
+            style: 要約スタイル
+            
+        Returns:
+            (入力トークン数, 出力トークン数の上限)
+        """
+        reduced_text = self._apply_local_reduction(article_text, style)
+        input_tokens = self.gemini_client.estimate_summary_tokens(reduced_text, [f"条文番号: {article_no}"])
+        return input_tokens, self._max_tokens(max_length)
+    
+    @staticmethod
+    def _max_tokens(max_length: int) -> int:
+        """最大文字数を Gemini の出力トークン数の上限に変換"""
+        return min(max_length // 4, 512)
+    
     def _apply_local_reduction(
         self,
         text: str,
@@ -177,6 +275,7 @@ class ArticleSummarizer:
     def _format_summary(
         self,
         gemini_result: Dict[str, Any],
+        law_id: Optional[str],
         article_no: str,
         style: str,
         max_length: int
@@ -186,6 +285,7 @@ class ArticleSummarizer:
         
         Args:
             gemini_result: Gemini結果
+            law_id: 法令ID
             article_no: 条番号
             style: スタイル
             max_length: 最大長
@@ -202,7 +302,7 @@ class ArticleSummarizer:
         return {
             "summary_text": summary_text,
             "original_reference": {
-                "law_id": "PLACEHOLDER",
+                "law_id": law_id or "",
                 "article_no": article_no
             },
             "citations": gemini_result.get("citations", []),
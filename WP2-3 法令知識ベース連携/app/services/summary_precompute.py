@@ -0,0 +1,234 @@
+"""
+要約の事前生成
+参照回数の多い条文（または指定した法令の全条文）の要約をすべてのスタイルで生成し、生成結果キャッシュに保存する
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from .law_popularity import LawPopularity
+from .law_repository import article_hash
+from .law_service import LawService
+from .summarizer import SUMMARY_STYLES, ArticleSummarizer
+from ..utils.article_number import canonical_article_key
+from ..utils.rate_limiter import AsyncRateLimiter
+from ..config import settings
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+# 進捗をログに出す間隔（処理した要約数）
+PROGRESS_INTERVAL = 50
+
+# 連続してこの回数だけ生成に失敗した場合は中断する（API キーの失効・レート制限など）
+MAX_CONSECUTIVE_FAILURES = 10
+
+
+def estimate_cost(input_tokens: int, output_tokens: int) -> float:
+    """
+    Gemini の料金を見積もり
+    
+    Args:
+        input_tokens: 入力トークン数
+        output_tokens: 出力トークン数
+    
+    Returns:
+        料金（USD）
+    """
+    return (
+        input_tokens * settings.gemini_input_cost_per_million
+        + output_tokens * settings.gemini_output_cost_per_million
+    ) / 1_000_000
+
+
+async def popular_articles(popularity: LawPopularity, limit: int) -> List[Tuple[str, str]]:
+    """
+    参照回数の多い条文を取得
+    
+    Args:
+        popularity: 条文単位の参照回数カウンター（集計キーは article_ref）
+        limit: 最大件数
+    
+    Returns:
+        参照回数の降順の [(法令ID, 条文キー), ...]
+    """
+    scores = await popularity.scores()
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [tuple(ref.rsplit(":", 1)) for ref, _ in ranked if ":" in ref]
+
+
+async def iter_target_articles(
+    service: LawService,
+    articles: Sequence[Tuple[str, str]] = (),
+    law_ids: Sequence[str] = ()
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    事前生成の対象条文を順に取得
+    
+    指定した条文を順に返した後、指定した法令の条文を条順に返す。
+    取得できない条文（同期で削除された条文など）は読み飛ばす。
+    同じ条文キーの条文（附則など）は API から参照できる先頭の条文のみを返す。
+    
+    Args:
+        service: 法令取得サービス
+        articles: [(法令ID, 条文キー), ...]
+        law_ids: 全条文を対象にする法令ID
+    
+    Yields:
+        (法令ID, 条文データ)
+    """
+    for law_id, article_key in articles:
+        try:
+            yield law_id, await service.get_article(law_id, article_key)
+        except Exception as e:
+            logger.warning(f"Skipping article {law_id}/{article_key}: {str(e)}")
+    
+    for law_id in law_ids:
+        seen = set()
+        try:
+            async for article in service.stream_articles(law_id):
+                article_key = canonical_article_key(article.get("article_no", ""))
+                if article_key in seen:
+                    continue
+                seen.add(article_key)
+                yield law_id, article
+        except Exception as e:
+            logger.error(f"Error reading articles of {law_id}: {str(e)}")
+
+
+async def precompute_summaries(
+    targets: AsyncIterator[Tuple[str, Dict[str, Any]]],
+    summarizer: Optional[ArticleSummarizer] = None,
+    styles: Sequence[str] = SUMMARY_STYLES,
+    max_length: int = 200,
+    max_requests: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    requests_per_minute: Optional[int] = None,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    対象条文の要約をすべてのスタイルで生成してキャッシュに保存
+    
+    生成済みの要約（キャッシュにあるもの）は読み飛ばすため、中断した場合や予算に
+    達した場合も再実行すれば続きから生成する。リクエスト数と推定トークン数が予算を
+    超える手前で新たな生成を止める。dry_run では生成せず、未生成の要約すべての
+    リクエスト数・推定トークン数・費用を見積もる。
+    
+    Args:
+        targets: (法令ID, 条文データ) の非同期イテレーター（iter_target_articles）
+        summarizer: 要約サービス（省略時は新しく作成）
+        styles: 生成するスタイル
+        max_length: 最大文字数（/summarize の既定値と合わせる）
+        max_requests: 最大リクエスト数（省略時は settings.precompute_max_requests、0 で無制限）
+        max_tokens: 推定トークン数の上限（省略時は settings.precompute_max_tokens、0 で無制限）
+        concurrency: 同時に生成する要約数（省略時は settings.precompute_concurrency）
+        requests_per_minute: 1分あたりの最大リクエスト数（省略時は settings.precompute_requests_per_minute）
+        dry_run: 見積もりのみ行う
+    
+    Returns:
+        {"articles", "cached": 生成済みの要約数, "requests": 送信（dry_run では予定）した要約数,
+         "generated", "failed", "input_tokens", "output_tokens"（推定）, "estimated_cost_usd",
+         "stopped": 中断理由（budget/failures、最後まで処理した場合は None）, "elapsed_sec"}
+    """
+    summarizer = summarizer or ArticleSummarizer()
+    max_requests = settings.precompute_max_requests if max_requests is None else max_requests
+    max_tokens = settings.precompute_max_tokens if max_tokens is None else max_tokens
+    concurrency = max(concurrency or settings.precompute_concurrency, 1)
+    limiter = AsyncRateLimiter(
+        settings.precompute_requests_per_minute if requests_per_minute is None else requests_per_minute
+    )
+    
+    stats: Dict[str, Any] = {
+        "articles": 0, "cached": 0, "requests": 0, "generated": 0, "failed": 0,
+        "input_tokens": 0, "output_tokens": 0, "estimated_cost_usd": 0.0, "stopped": None
+    }
+    consecutive_failures = 0
+    start = time.perf_counter()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    
+    async def worker():
+        nonlocal consecutive_failures
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            if stats["stopped"] == "failures":
+                continue
+            
+            law_id, article, style, key = item
+            await limiter.acquire()
+            try:
+                await summarizer.summarize_article(
+                    article_text=article.get("text", ""),
+                    article_no=article.get("article_no", ""),
+                    max_length=max_length,
+                    style=style,
+                    law_id=law_id,
+                    content_hash=article["content_hash"]
+                )
+                # フォールバックの要約はキャッシュされないため、保存されたかで成否を判定する
+                ok = await summarizer.cache.get(key) is not None
+            except Exception as e:
+                logger.error(f"Error summarizing {law_id}/{article.get('article_no')}: {str(e)}")
+                ok = False
+            
+            if ok:
+                stats["generated"] += 1
+                consecutive_failures = 0
+            else:
+                stats["failed"] += 1
+                consecutive_failures += 1
+                if consecutive_failures >= MAX_CONSECUTIVE_FAILURES and stats["stopped"] is None:
+                    logger.error(f"Stopping after {consecutive_failures} consecutive failures")
+                    stats["stopped"] = "failures"
+            
+            done = stats["generated"] + stats["failed"]
+            if done % PROGRESS_INTERVAL == 0:
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"Precomputed {done}/{stats['requests']} summaries "
+                    f"({stats['failed']} failed, {stats['cached']} already cached, "
+                    f"~{stats['input_tokens'] + stats['output_tokens']} tokens, "
+                    f"${stats['estimated_cost_usd']:.4f}, {done / elapsed * 60:.1f}/min)"
+                )
+    
+    workers = [] if dry_run else [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        async for law_id, article in targets:
+            if stats["stopped"] is not None:
+                break
+            stats["articles"] += 1
+            article = dict(article, content_hash=article_hash(article))
+            
+            for style in styles:
+                key = summarizer.cache_key(law_id, article.get("article_no", ""), article["content_hash"], max_length, style)
+                if await summarizer.cache.get(key) is not None:
+                    stats["cached"] += 1
+                    continue
+                
+                input_tokens, output_tokens = summarizer.estimate_tokens(
+                    article.get("text", ""), article.get("article_no", ""), max_length, style
+                )
+                if not dry_run and (
+                    (max_requests > 0 and stats["requests"] >= max_requests)
+                    or (max_tokens > 0 and stats["input_tokens"] + stats["output_tokens"] + input_tokens + output_tokens > max_tokens)
+                ):
+                    logger.info(f"Precompute budget reached after {stats['requests']} requests")
+                    stats["stopped"] = "budget"
+                    break
+                
+                stats["requests"] += 1
+                stats["input_tokens"] += input_tokens
+                stats["output_tokens"] += output_tokens
+                stats["estimated_cost_usd"] = estimate_cost(stats["input_tokens"], stats["output_tokens"])
+                if not dry_run:
+                    await queue.put((law_id, article, style, key))
+    finally:
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    
+    stats["estimated_cost_usd"] = round(stats["estimated_cost_usd"], 4)
+    stats["elapsed_sec"] = round(time.perf_counter() - start, 2)
+    logger.info(f"Summary precompute finished: {stats}")
+    return stats
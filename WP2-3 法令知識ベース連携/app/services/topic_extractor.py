@@ -2,12 +2,16 @@
 論点抽出サービス
 複数条文から論点と関係を抽出
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from .generation_cache import GenerationCache, generation_cache
 from ..clients.gemini_client import GeminiClient
 from ..logger import get_logger
 
 logger = get_logger(__name__)
 
+# 論点抽出処理（整形）の版。処理を変えた場合は上げてキャッシュを切り替える
+TOPICS_PROMPT_VERSION = "1"
+
 
 class TopicExtractor:
     """
@@ -16,8 +20,18 @@ class TopicExtractor:
     Geminiとルールベース処理を組み合わせて論点を抽出
     """
     
-    def __init__(self):
+    def __init__(self, cache: Optional[GenerationCache] = None):
+        """
+        Args:
+            cache: 生成結果キャッシュ（省略時はアプリケーション共通のキャッシュ）
+        """
         self.gemini_client = GeminiClient()
+        self.cache = cache or generation_cache
+    
+    @property
+    def prompt_version(self) -> str:
+        """論点抽出処理とプロンプトテンプレートの版"""
+        return f"{TOPICS_PROMPT_VERSION}-{self.gemini_client.prompt_version('extract_topics_ja.txt')}"
     
     async def extract_topics(
         self,
@@ -28,6 +42,8 @@ class TopicExtractor:
         """
         複数条文から論点を抽出
         
+        同じテキストの組（順序は問わない）・モード・最大論点数の結果はキャッシュから返す
+        
         Args:
             texts: 条文テキストリスト
             mode: 抽出モード（topic_extraction/issue_mapping）
@@ -36,6 +52,12 @@ class TopicExtractor:
         Returns:
             論点抽出結果
         """
+        key = self.cache.topics_key(texts, mode, max_topics, self.gemini_client.model, self.prompt_version)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            logger.info(f"Topics cache hit for {len(texts)} texts, mode={mode}")
+            return cached
+        
         logger.info(f"Extracting topics from {len(texts)} texts, mode={mode}")
         
         try:
@@ -49,6 +71,14 @@ class TopicExtractor:
             # 結果を整形
             formatted_result = self._format_topics(gemini_result, mode)
             
+            # 生成結果をキャッシュ（モック・フォールバックの結果は除く）
+            if not gemini_result.get("fallback"):
+                await self.cache.set(
+                    key, formatted_result, "topics",
+                    model_name=self.gemini_client.model,
+                    prompt_version=self.prompt_version
+                )
+            
             return formatted_result
             
         except Exception as e:
@@ -0,0 +1,704 @@
+"""
+条文ベクトルの近似最近傍探索インデックス
+HNSW グラフと条文の対応表をファイルに保存し、ベクトルと最下層のグラフは mmap で参照する
+"""
+import heapq
+import json
+import math
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from ..logger import get_logger
+
+logger = get_logger(__name__)
+
+# インデックスの保存形式のバージョン（互換性の無い変更時に更新）
+VECTOR_INDEX_FORMAT_VERSION = 1
+
+# 最新のインデックスのディレクトリ名を記録するファイル
+CURRENT_FILE = "CURRENT"
+
+# 絞り込み後の行数がこれ以下の場合は HNSW を使わずに全件の内積で探索（768次元で数ミリ秒）
+EXACT_SEARCH_MAX_ROWS = 10000
+
+# 階層の上限（M=16 では 1,600万件でも 6 階層程度）
+MAX_LEVEL = 16
+
+# 保存する条文キーの最大バイト数
+ARTICLE_KEY_BYTES = 24
+
+
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    """
+    ベクトルを L2 正規化（内積をコサイン類似度として扱う）
+    
+    Args:
+        vectors: (件数, 次元数) または (次元数,) の配列
+    
+    Returns:
+        正規化した float32 の配列
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class HNSWGraph:
+    """
+    HNSW（Hierarchical Navigable Small World）グラフ
+    
+    各ノードは確率的に決まる階層まで存在し、階層ごとに近傍へのリンクを持つ。
+    探索は最上位の階層から貪欲に入口を絞り込み、最下層で ef 件の候補を保ちながら
+    近傍をたどる。類似度は内積（正規化済みベクトルのコサイン類似度）。
+    
+    最下層のリンクは (ノード数, 2M) の int32 配列（空きは -1）、上位の階層は
+    (ノードID の配列, (ノード数, M) のリンク配列) で保持する。ベクトルと最下層の
+    リンクは mmap した配列でもよい。
+    """
+    
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        layer0: np.ndarray,
+        upper: Sequence[Tuple[np.ndarray, np.ndarray]],
+        entry: int,
+        m: int
+    ):
+        """
+        Args:
+            vectors: (ノード数, 次元数) の正規化済みベクトル
+            layer0: 最下層のリンク
+            upper: 階層1以上の (ノードIDの配列, リンク配列) のリスト
+            entry: 探索の入口のノード（ノードが無い場合は -1）
+            m: 階層1以上のリンク数の上限（最下層は 2M）
+        """
+        self.vectors = vectors
+        self.layer0 = layer0
+        self.upper = list(upper)
+        self.entry = entry
+        self.m = m
+        self._upper_rows = [dict(zip(nodes.tolist(), range(len(nodes)))) for nodes, _ in self.upper]
+    
+    def __len__(self) -> int:
+        return len(self.layer0)
+    
+    @property
+    def max_level(self) -> int:
+        """最上位の階層"""
+        return len(self.upper)
+    
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        m: int = 16,
+        ef_construction: int = 100,
+        seed: int = 0,
+        log_every: int = 50000
+    ) -> "HNSWGraph":
+        """
+        ベクトルを1件ずつ挿入してグラフを作成
+        
+        Args:
+            vectors: (ノード数, 次元数) の正規化済みベクトル（mmap した配列でもよい）
+            m: 階層1以上のリンク数の上限（最下層は 2M）
+            ef_construction: 挿入時に保つ候補数（大きいほど精度が高く作成が遅い）
+            seed: 階層を決める乱数のシード
+            log_every: 進捗をログに出力する間隔（件数）
+        
+        Returns:
+            HNSW グラフ
+        """
+        count = len(vectors)
+        rng = np.random.default_rng(seed)
+        levels = np.minimum(
+            (-np.log(1.0 - rng.random(count)) / math.log(m)).astype(np.int64), MAX_LEVEL
+        )
+        
+        builder = _GraphBuilder(vectors, m, ef_construction)
+        start = time.perf_counter()
+        for node in range(count):
+            builder.insert(node, int(levels[node]))
+            if log_every and (node + 1) % log_every == 0:
+                elapsed = time.perf_counter() - start
+                logger.info(f"Inserted {node + 1}/{count} vectors into HNSW graph ({(node + 1) / elapsed:.0f}/s)")
+        return builder.to_graph()
+    
+    def neighbors(self, node: int, level: int) -> List[int]:
+        """
+        ノードのリンク先を取得
+        
+        Args:
+            node: ノード
+            level: 階層
+        
+        Returns:
+            リンク先のノードのリスト
+        """
+        if level == 0:
+            links = self.layer0[node]
+        else:
+            nodes, all_links = self.upper[level - 1]
+            links = all_links[self._upper_rows[level - 1][node]]
+        return [n for n in links.tolist() if n >= 0]
+    
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        ef: int = 64,
+        allowed: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        クエリに近いノードを類似度の降順で取得
+        
+        Args:
+            query: 正規化済みのクエリベクトル
+            k: 取得件数
+            ef: 最下層で保つ候補数（k 未満の場合は k）
+            allowed: 結果に含めてよいノードの真偽値配列（探索自体は全ノードをたどる）
+        
+        Returns:
+            [(ノード, 類似度), ...]
+        """
+        if self.entry < 0 or k <= 0:
+            return []
+        
+        query = np.asarray(query, dtype=np.float32)
+        entry = self.entry
+        entry_sim = float(self.vectors[entry] @ query)
+        for level in range(self.max_level, 0, -1):
+            entry_sim, entry = max(search_layer(self, query, [(entry_sim, entry)], 1, level))
+        
+        results = search_layer(self, query, [(entry_sim, entry)], max(ef, k), 0, allowed)
+        results.sort(reverse=True)
+        return [(node, sim) for sim, node in results[:k]]
+    
+    def save(self, directory: str):
+        """
+        グラフをディレクトリに保存（ベクトルは別途保存する）
+        
+        Args:
+            directory: 保存先のディレクトリ
+        """
+        np.save(os.path.join(directory, "layer0.npy"), np.asarray(self.layer0, dtype=np.int32))
+        arrays = {}
+        for level, (nodes, links) in enumerate(self.upper, 1):
+            arrays[f"nodes_{level}"] = nodes
+            arrays[f"links_{level}"] = links
+        np.savez(os.path.join(directory, "upper.npz"), **arrays)
+    
+    @classmethod
+    def load(cls, directory: str, vectors: np.ndarray, entry: int, m: int) -> "HNSWGraph":
+        """
+        保存したグラフを読み込む（最下層のリンクは mmap で参照）
+        
+        Args:
+            directory: 保存先のディレクトリ
+            vectors: ノードのベクトル
+            entry: 探索の入口のノード
+            m: 階層1以上のリンク数の上限
+        
+        Returns:
+            HNSW グラフ
+        """
+        layer0 = np.load(os.path.join(directory, "layer0.npy"), mmap_mode="r")
+        with np.load(os.path.join(directory, "upper.npz")) as data:
+            levels = len(data.files) // 2
+            upper = [(data[f"nodes_{level}"], data[f"links_{level}"]) for level in range(1, levels + 1)]
+        return cls(vectors, layer0, upper, entry, m)
+
+
+def search_layer(
+    graph: Any,
+    query: np.ndarray,
+    entries: List[Tuple[float, int]],
+    ef: int,
+    level: int,
+    allowed: Optional[np.ndarray] = None
+) -> List[Tuple[float, int]]:
+    """
+    1つの階層で入口から近傍をたどり、類似度の高い ef 件を求める
+    
+    Args:
+        graph: neighbors(node, level) と vectors を持つグラフ
+        query: 正規化済みのクエリベクトル
+        entries: 入口 [(類似度, ノード), ...]
+        ef: 保つ候補数
+        level: 階層
+        allowed: 結果に含めてよいノードの真偽値配列（任意）
+    
+    Returns:
+        [(類似度, ノード), ...]（順不同）
+    """
+    visited = {node for _, node in entries}
+    candidates = [(-sim, node) for sim, node in entries]
+    heapq.heapify(candidates)
+    results = [(sim, node) for sim, node in entries if allowed is None or allowed[node]]
+    heapq.heapify(results)
+    while len(results) > ef:
+        heapq.heappop(results)
+    
+    vectors = graph.vectors
+    while candidates:
+        neg_sim, node = heapq.heappop(candidates)
+        if len(results) >= ef and -neg_sim < results[0][0]:
+            break
+        
+        new = [n for n in graph.neighbors(node, level) if n not in visited]
+        if not new:
+            continue
+        visited.update(new)
+        
+        for n, sim in zip(new, (vectors[new] @ query).tolist()):
+            if len(results) >= ef and sim <= results[0][0]:
+                continue
+            heapq.heappush(candidates, (-sim, n))
+            if allowed is None or allowed[n]:
+                heapq.heappush(results, (sim, n))
+                if len(results) > ef:
+                    heapq.heappop(results)
+    return results
+
+
+class _GraphBuilder:
+    """HNSW グラフの作成（挿入中のリンクは最下層を配列、上位の階層を辞書で保持）"""
+    
+    def __init__(self, vectors: np.ndarray, m: int, ef_construction: int):
+        self.vectors = vectors
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = max(ef_construction, m)
+        self.layer0 = np.full((len(vectors), self.m0), -1, dtype=np.int32)
+        self.counts0 = np.zeros(len(vectors), dtype=np.int32)
+        self.upper: List[Dict[int, List[int]]] = []
+        self.entry = -1
+    
+    def neighbors(self, node: int, level: int) -> List[int]:
+        if level == 0:
+            return self.layer0[node, :self.counts0[node]].tolist()
+        return self.upper[level - 1][node]
+    
+    def insert(self, node: int, level: int):
+        """ノードを挿入"""
+        while len(self.upper) < level:
+            self.upper.append({})
+        for lv in range(1, level + 1):
+            self.upper[lv - 1][node] = []
+        
+        if self.entry < 0:
+            self.entry = node
+            return
+        
+        query = np.asarray(self.vectors[node], dtype=np.float32)
+        entry = self.entry
+        entries = [(float(self.vectors[entry] @ query), entry)]
+        top = self._level_of(entry)
+        for lv in range(top, level, -1):
+            entries = [max(search_layer(self, query, entries, 1, lv))]
+        
+        for lv in range(min(level, top), -1, -1):
+            found = search_layer(self, query, entries, self.ef_construction, lv)
+            found.sort(reverse=True)
+            selected = self._select(found, self.m)
+            self._set_links(node, lv, selected)
+            for neighbor in selected:
+                self._add_link(neighbor, node, lv)
+            entries = found
+        
+        if level > top:
+            self.entry = node
+    
+    def _level_of(self, node: int) -> int:
+        """ノードが存在する最上位の階層"""
+        level = 0
+        while level < len(self.upper) and node in self.upper[level]:
+            level += 1
+        return level
+    
+    def _select(self, candidates: List[Tuple[float, int]], limit: int) -> List[int]:
+        """
+        近傍の選択（HNSW のヒューリスティック）
+        
+        類似度の高い順に、選択済みのどのノードよりもクエリに近い候補のみを選ぶ。
+        近傍が一方向に偏らず、グラフの到達性が保たれる。
+        """
+        if len(candidates) <= limit:
+            return [node for _, node in candidates]
+        
+        nodes = [node for _, node in candidates]
+        vectors = np.asarray(self.vectors[nodes], dtype=np.float32)
+        pairwise = vectors @ vectors.T
+        selected: List[int] = []
+        for i, (sim, _) in enumerate(candidates):
+            if not selected or pairwise[i, selected].max() < sim:
+                selected.append(i)
+                if len(selected) >= limit:
+                    break
+        return [nodes[i] for i in selected]
+    
+    def _set_links(self, node: int, level: int, links: List[int]):
+        if level == 0:
+            self.layer0[node, :len(links)] = links
+            self.layer0[node, len(links):] = -1
+            self.counts0[node] = len(links)
+        else:
+            self.upper[level - 1][node] = list(links)
+    
+    def _add_link(self, node: int, new: int, level: int):
+        """逆方向のリンクを追加（上限を超える場合は近傍を選び直す）"""
+        limit = self.m0 if level == 0 else self.m
+        links = self.neighbors(node, level)
+        if len(links) < limit:
+            self._set_links(node, level, links + [new])
+            return
+        
+        links.append(new)
+        sims = (np.asarray(self.vectors[links], dtype=np.float32) @ np.asarray(self.vectors[node], dtype=np.float32)).tolist()
+        candidates = sorted(zip(sims, links), reverse=True)
+        self._set_links(node, level, self._select(candidates, limit))
+    
+    def to_graph(self) -> HNSWGraph:
+        upper = []
+        for links in self.upper:
+            nodes = np.array(sorted(links), dtype=np.int32)
+            array = np.full((len(nodes), self.m), -1, dtype=np.int32)
+            for row, node in enumerate(nodes.tolist()):
+                array[row, :len(links[node])] = links[node]
+            upper.append((nodes, array))
+        return HNSWGraph(self.vectors, self.layer0, upper, self.entry, self.m)
+
+
+class VectorIndex:
+    """
+    条文ベクトルの検索インデックス
+    
+    行は法令ID・並び順の順に並べ、法令ごとの行範囲を持つ。法令で絞り込む場合は
+    その範囲、行数の少ない法令種別で絞り込む場合は該当行のみを全件の内積で探索し、
+    それ以外は HNSW グラフで探索する。
+    
+    ベクトルは float32 で保存する（float16 は numpy の内積で float32 への変換が必要になり、
+    探索が数倍遅くなる）。保存先のディレクトリには作成ごとのサブディレクトリを作り、CURRENT ファイルを
+    置き換えて切り替える（読み込み中のプロセスは古いファイルを参照し続けられるよう、直前の
+    インデックスは次の作成まで残す）。
+    """
+    
+    def __init__(
+        self,
+        graph: HNSWGraph,
+        laws: List[Dict[str, Any]],
+        law_offsets: np.ndarray,
+        positions: np.ndarray,
+        article_keys: np.ndarray,
+        article_ids: np.ndarray,
+        model_name: Optional[str] = None
+    ):
+        """
+        Args:
+            graph: HNSW グラフ（ノードは行番号）
+            laws: 法令ID順の法令情報（law_id・title・law_type）
+            law_offsets: 法令ごとの行範囲の先頭（末尾に行数を持つ）
+            positions: 行ごとの法令内の並び順
+            article_keys: 行ごとの条文キー（バイト列）
+            article_ids: 行ごとの条文ID
+            model_name: 埋め込みモデル名
+        """
+        self.graph = graph
+        self.laws = laws
+        self.law_offsets = law_offsets
+        self.positions = positions
+        self.article_keys = article_keys
+        self.article_ids = article_ids
+        self.model_name = model_name
+        self._law_rows = {law["law_id"]: i for i, law in enumerate(laws)}
+        
+        row_types = np.zeros(len(positions), dtype=np.int32)
+        self._law_types: Dict[Optional[str], int] = {}
+        for i, law in enumerate(laws):
+            code = self._law_types.setdefault(law.get("law_type"), len(self._law_types))
+            row_types[law_offsets[i]:law_offsets[i + 1]] = code
+        self._row_types = row_types
+        self._row_laws = np.repeat(np.arange(len(laws), dtype=np.int32), np.diff(law_offsets))
+    
+    def __len__(self) -> int:
+        return len(self.positions)
+    
+    @property
+    def dimension(self) -> int:
+        """ベクトルの次元数"""
+        return self.graph.vectors.shape[1] if len(self) else 0
+    
+    @classmethod
+    def build(
+        cls,
+        directory: str,
+        vectors: np.ndarray,
+        law_ids: Sequence[str],
+        positions: Sequence[int],
+        article_keys: Sequence[str],
+        article_ids: Sequence[int],
+        laws: Dict[str, Dict[str, Any]],
+        m: int = 16,
+        ef_construction: int = 100,
+        model_name: Optional[str] = None
+    ) -> "VectorIndex":
+        """
+        条文ベクトルからインデックスを作成して保存し、CURRENT を切り替える
+        
+        Args:
+            directory: 保存先のディレクトリ
+            vectors: (行数, 次元数) のベクトル（mmap した配列でもよい）
+            law_ids: 行ごとの法令ID（法令ID・並び順の順に並んでいること）
+            positions: 行ごとの法令内の並び順
+            article_keys: 行ごとの条文キー
+            article_ids: 行ごとの条文ID
+            laws: {法令ID: {"title", "law_type"}}
+            m: HNSW のリンク数の上限
+            ef_construction: HNSW の挿入時に保つ候補数
+            model_name: 埋め込みモデル名
+        
+        Returns:
+            作成したインデックス（保存したファイルを mmap で参照）
+        
+        Raises:
+            ValueError: 行が法令ID順に並んでいない場合
+        """
+        law_order: List[str] = []
+        law_offsets = [0]
+        for row, law_id in enumerate(law_ids):
+            if not law_order or law_id != law_order[-1]:
+                if law_order and law_id < law_order[-1]:
+                    raise ValueError("Vector index rows must be sorted by law_id")
+                if law_order:
+                    law_offsets.append(row)
+                law_order.append(law_id)
+        law_offsets.append(len(law_ids))
+        if not law_order:
+            law_offsets = [0]
+        
+        os.makedirs(directory, exist_ok=True)
+        build_dir = os.path.join(directory, f"index-{time.time_ns()}")
+        os.makedirs(build_dir)
+        
+        normalized = np.lib.format.open_memmap(
+            os.path.join(build_dir, "vectors.npy"), mode="w+", dtype=np.float32, shape=vectors.shape
+        )
+        for start in range(0, len(vectors), 10000):
+            normalized[start:start + 10000] = normalize_vectors(vectors[start:start + 10000])
+        normalized.flush()
+        
+        graph = HNSWGraph.build(normalized, m=m, ef_construction=ef_construction)
+        graph.save(build_dir)
+        
+        np.save(os.path.join(build_dir, "positions.npy"), np.asarray(positions, dtype=np.int32))
+        np.save(
+            os.path.join(build_dir, "article_keys.npy"),
+            np.array([key.encode("utf-8") for key in article_keys], dtype=f"S{ARTICLE_KEY_BYTES}")
+        )
+        np.save(os.path.join(build_dir, "article_ids.npy"), np.asarray(article_ids, dtype=np.int64))
+        np.save(os.path.join(build_dir, "law_offsets.npy"), np.asarray(law_offsets, dtype=np.int64))
+        meta = {
+            "version": VECTOR_INDEX_FORMAT_VERSION,
+            "model_name": model_name,
+            "m": m,
+            "entry": graph.entry,
+            "laws": [
+                {
+                    "law_id": law_id,
+                    "title": (laws.get(law_id) or {}).get("title") or "",
+                    "law_type": (laws.get(law_id) or {}).get("law_type")
+                }
+                for law_id in law_order
+            ]
+        }
+        with open(os.path.join(build_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        
+        _switch_current(directory, os.path.basename(build_dir))
+        logger.info(f"Built vector index: {len(law_ids)} articles of {len(law_order)} laws")
+        return cls.load(directory)
+    
+    @classmethod
+    def load(cls, directory: str) -> "VectorIndex":
+        """
+        保存したインデックスを読み込む（ベクトル・最下層のリンク・行の対応表は mmap で参照）
+        
+        Args:
+            directory: 保存先のディレクトリ
+        
+        Returns:
+            インデックス
+        
+        Raises:
+            FileNotFoundError: インデックスが作成されていない場合
+            ValueError: 保存形式のバージョンが異なる場合
+        """
+        try:
+            return cls._load_current(directory)
+        except FileNotFoundError:
+            # 読み込み中に2回続けて作成し直され、読んでいたインデックスが削除された場合は読み直す
+            logger.warning(f"Vector index changed while loading; retrying: {directory}")
+            return cls._load_current(directory)
+    
+    @classmethod
+    def _load_current(cls, directory: str) -> "VectorIndex":
+        """CURRENT が指すインデックスを読み込む"""
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as f:
+            build_dir = os.path.join(directory, f.read().strip())
+        with open(os.path.join(build_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != VECTOR_INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector index version: {meta.get('version')}")
+        
+        def array(name: str) -> np.ndarray:
+            return np.load(os.path.join(build_dir, f"{name}.npy"), mmap_mode="r")
+        
+        graph = HNSWGraph.load(build_dir, array("vectors"), meta["entry"], meta["m"])
+        return cls(
+            graph,
+            meta["laws"],
+            np.load(os.path.join(build_dir, "law_offsets.npy")),
+            array("positions"),
+            array("article_keys"),
+            array("article_ids"),
+            meta.get("model_name")
+        )
+    
+    def law_info(self, law_id: str) -> Optional[Dict[str, Any]]:
+        """
+        法令情報を取得
+        
+        Args:
+            law_id: 法令ID
+        
+        Returns:
+            {"law_id", "title", "law_type"}（インデックスに無い場合は None）
+        """
+        row = self._law_rows.get(law_id)
+        return None if row is None else self.laws[row]
+    
+    def find(self, law_id: str, article_key: str) -> Optional[int]:
+        """
+        条文の行番号を取得
+        
+        Args:
+            law_id: 法令ID
+            article_key: 条文キー
+        
+        Returns:
+            行番号（インデックスに無い場合は None）
+        """
+        law_row = self._law_rows.get(law_id)
+        if law_row is None:
+            return None
+        start, end = int(self.law_offsets[law_row]), int(self.law_offsets[law_row + 1])
+        matches = np.flatnonzero(self.article_keys[start:end] == article_key.encode("utf-8"))
+        return start + int(matches[0]) if len(matches) else None
+    
+    def vector(self, row: int) -> np.ndarray:
+        """行のベクトル（float32）"""
+        return np.asarray(self.graph.vectors[row], dtype=np.float32)
+    
+    def row(self, row: int) -> Dict[str, Any]:
+        """
+        行の条文情報を取得
+        
+        Args:
+            row: 行番号
+        
+        Returns:
+            {"law_id", "title", "law_type", "position", "article_key", "article_id"}
+        """
+        law = self.laws[int(self._row_laws[row])]
+        return {
+            **law,
+            "position": int(self.positions[row]),
+            "article_key": self.article_keys[row].decode("utf-8"),
+            "article_id": int(self.article_ids[row])
+        }
+    
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        law_id: Optional[str] = None,
+        law_type: Optional[str] = None,
+        ef: int = 64,
+        exclude: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        クエリベクトルに近い条文を類似度の降順で取得
+        
+        Args:
+            query: クエリベクトル
+            k: 取得件数
+            law_id: 法令で絞り込む場合に指定
+            law_type: 法令種別で絞り込む場合に指定
+            ef: HNSW の探索で保つ候補数
+            exclude: 結果から除く行（類似条文の検索元など）
+        
+        Returns:
+            [(行番号, 類似度), ...]
+        """
+        if not len(self) or k <= 0:
+            return []
+        query = normalize_vectors(query)
+        wanted = k + (exclude is not None)
+        
+        if law_id is not None:
+            law_row = self._law_rows.get(law_id)
+            if law_row is None or (law_type is not None and self.laws[law_row].get("law_type") != law_type):
+                return []
+            start, end = int(self.law_offsets[law_row]), int(self.law_offsets[law_row + 1])
+            results = self._exact(query, np.arange(start, end), wanted)
+        elif law_type is not None:
+            code = self._law_types.get(law_type)
+            if code is None:
+                return []
+            allowed = self._row_types == code
+            rows = np.flatnonzero(allowed)
+            if len(rows) <= EXACT_SEARCH_MAX_ROWS:
+                results = self._exact(query, rows, wanted)
+            else:
+                results = self.graph.search(query, wanted, ef=ef, allowed=allowed)
+        else:
+            results = self.graph.search(query, wanted, ef=ef)
+        
+        return [(row, sim) for row, sim in results if row != exclude][:k]
+    
+    def _exact(self, query: np.ndarray, rows: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """指定した行を全件の内積で探索"""
+        if not len(rows):
+            return []
+        if rows[-1] - rows[0] + 1 == len(rows):
+            vectors = self.graph.vectors[int(rows[0]):int(rows[-1]) + 1]
+        else:
+            vectors = self.graph.vectors[rows]
+        sims = np.asarray(vectors, dtype=np.float32) @ query
+        top = np.argpartition(-sims, k - 1)[:k] if len(sims) > k else np.arange(len(sims))
+        top = top[np.argsort(-sims[top])]
+        return [(int(rows[i]), float(sims[i])) for i in top]
+
+
+def _switch_current(directory: str, name: str):
+    """
+    CURRENT ファイルを置き換えて新しいインデックスに切り替え、古いインデックスを削除
+    
+    切り替え前に CURRENT が指していたインデックスは、読み込み中のプロセスのために残す
+    """
+    current = os.path.join(directory, CURRENT_FILE)
+    previous = None
+    if os.path.exists(current):
+        with open(current, encoding="utf-8") as f:
+            previous = f.read().strip()
+    
+    tmp = f"{current}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp, current)
+    
+    for entry in os.listdir(directory):
+        if entry.startswith("index-") and entry not in (name, previous):
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
@@ -2,9 +2,11 @@
 XML パーサー
 e-Gov API から取得したXMLデータを内部JSON形式に変換
 """
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator, Optional, Union
+import io
 import xml.etree.ElementTree as ET
 import re
+from ..utils.article_number import build_article_index
 from ..logger import get_logger
 
 # lxml が利用可能な場合のみインポート
@@ -16,6 +18,62 @@ except ImportError:
 
 logger = get_logger(__name__)
 
+# 逐次パースで一度に読み込むバイト数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 行を分けるブロック要素と構造上の階層（項 → 号 → 号の細分、Article は改正規定で引用された条文）
+BLOCK_LEVELS = {
+    "Article": 1,
+    "Paragraph": 1,
+    "Item": 2,
+    **{f"Subitem{i}": i + 2 for i in range(1, 11)}
+}
+
+# 行頭に番号として置く要素（項番号・号名・細分名、引用された条文の条名・見出し）
+LABEL_TAGS = {
+    "ParagraphNum", "ItemTitle", "ArticleTitle", "ArticleCaption",
+    *(f"Subitem{i}Title" for i in range(1, 11))
+}
+
+# 条文データの別項目として抽出する要素（本文には含めない）
+ARTICLE_META_TAGS = {"ArticleTitle", "ArticleCaption"}
+
+# 本文に含めない要素（Rt はルビの読み）
+SKIP_TAGS = {"Rt"}
+
+# 法令基本情報として参照する要素
+LAW_INFO_TAGS = {"LawId", "LawTitle", "LawName", "Title", "LawNum", "LawNo", "EnactDate"}
+
+# 法令基本情報の抽出時に走査しない要素（本則・附則・目次）
+BODY_TAGS = {"MainProvision", "SupplProvision", "TOC", "Article"}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _local_name(tag: Any) -> str:
+    """名前空間を除いたタグ名を返す（コメント等は空文字列）"""
+    if not isinstance(tag, str):
+        return ""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _normalize_space(text: str) -> str:
+    """連続する空白・改行を1つの空白にまとめて前後を除去"""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _split_names(value: Optional[str]) -> List[str]:
+    """カンマ・読点区切りの名称（LawTitle の Abbrev 属性など）をリストに分割"""
+    return [name.strip() for name in re.split(r"[,，、]", value or "") if name.strip()]
+
+
+def _append_text(line: Dict[str, Any], text: str):
+    """空白を正規化したテキストを行に追加"""
+    if text:
+        text = _normalize_space(text)
+        if text:
+            line["parts"].append(text)
+
 
 class LegalXMLParser:
     """
@@ -27,20 +85,22 @@ class LegalXMLParser:
     def __init__(self):
         pass
     
-    def parse_xml(self, xml_content: str) -> Dict[str, Any]:
+    def parse_xml(self, xml_content: Union[str, bytes]) -> Dict[str, Any]:
         """
         XML文字列をパースして内部形式に変換
         
         Args:
-            xml_content: XML文字列
-            
+            xml_content: XML文字列（バイト列の場合はコピーせずにそのままパース）
+        
         Returns:
             パース済み法令データ（辞書形式）
         """
         try:
             if HAS_LXML:
                 # lxml を使用してパース（より堅牢）
-                root = etree.fromstring(xml_content.encode('utf-8'))
+                if isinstance(xml_content, str):
+                    xml_content = xml_content.encode('utf-8')
+                root = etree.fromstring(xml_content)
             else:
                 # 標準ライブラリのElementTreeを使用
                 root = ET.fromstring(xml_content)
@@ -52,10 +112,13 @@ class LegalXMLParser:
             articles = self._extract_articles(root)
             law_info["articles"] = articles
             
+            # 条文キー → 位置の索引（条文単位の参照を O(1) にする）
+            law_info["article_index"] = build_article_index(articles)
+            
             logger.info(f"Parsed law: {law_info.get('law_id')} with {len(articles)} articles")
             
             return law_info
-            
+        
         except (ET.ParseError, ValueError) as e:
             logger.error(f"XML syntax error: {str(e)}")
             raise ValueError(f"Invalid XML format: {str(e)}")
@@ -67,101 +130,242 @@ class LegalXMLParser:
         """
         法令基本情報を抽出
         
+        e-Gov 法令XML（LawNum・LawTitle/LawName・EnactDate 要素、名前空間付きを含む）、
+        API レスポンスの外側要素（ApplData/LawId）、ルート要素の属性のいずれにも対応する。
+        本則・附則の中は走査しない。
+        
         Args:
             root: XMLルート要素
-            
+        
         Returns:
-            法令基本情報（辞書）
+            法令基本情報（辞書）。LawTitle の Kana・Abbrev・AbbrevKana 属性は
+            title_kana・abbreviations・abbreviation_kana に格納する
         """
-        # 実際のXML構造に合わせて調整が必要
-        # ここではサンプル実装
+        found: Dict[str, str] = {}
+        title_attrs: Dict[str, str] = {}
+        law_elem = root if _local_name(root.tag) == "Law" else None
+        
+        stack = [root]
+        while stack:
+            elem = stack.pop()
+            tag = _local_name(elem.tag)
+            if tag in BODY_TAGS:
+                continue
+            if law_elem is None and tag == "Law":
+                law_elem = elem
+            if tag in LAW_INFO_TAGS and tag not in found:
+                found[tag] = _normalize_space("".join(elem.itertext()))
+                if tag == "LawTitle":
+                    title_attrs = dict(elem.attrib)
+            stack.extend(reversed(elem))
+        
+        def pick(attr: str, *tags: str) -> str:
+            value = root.get(attr)
+            if value:
+                return value
+            for tag in tags:
+                if found.get(tag):
+                    return found[tag]
+            return ""
+        
+        law_type = root.get("type")
+        if not law_type and law_elem is not None:
+            law_type = law_elem.get("LawType", "")
         
         return {
-            "law_id": root.get("lawId", ""),
-            "title": root.get("title", ""),
-            "law_no": root.get("lawNo", ""),
-            "law_type": root.get("type", ""),
-            "enact_date": root.get("enactDate", ""),
-            "source_url": root.get("sourceUrl", "")
+            "law_id": pick("lawId", "LawId"),
+            "title": pick("title", "LawTitle", "LawName", "Title"),
+            "law_no": pick("lawNo", "LawNum", "LawNo"),
+            "law_type": law_type or "",
+            "enact_date": pick("enactDate", "EnactDate"),
+            "source_url": root.get("sourceUrl", ""),
+            "title_kana": title_attrs.get("Kana", ""),
+            "abbreviations": _split_names(title_attrs.get("Abbrev")),
+            "abbreviation_kana": _split_names(title_attrs.get("AbbrevKana"))
         }
     
     def _extract_articles(self, root: ET.Element) -> List[Dict[str, Any]]:
         """
         条文データを抽出
         
+        本則・附則の <Article> 要素を文書順に抽出する。改正規定として引用された
+        条文（Article 内の Article）は独立した条文として扱わない。
+        
         Args:
             root: XMLルート要素
-            
+        
         Returns:
             条文リスト
         """
         articles = []
         
-        # XML の構造に基づいて条文を抽出
-        # 実際のXML形式に合わせて調整が必要
-        
-        # サンプル: <Article> 要素を探す
-        for article_elem in root.findall(".//Article"):
-            article = {
-                "article_no": article_elem.get("number", ""),
-                "heading": article_elem.get("heading", ""),
-                "text": self._extract_text(article_elem),
-                "structure": self._parse_structure(article_elem)
-            }
-            articles.append(article)
+        stack = [root]
+        while stack:
+            elem = stack.pop()
+            if _local_name(elem.tag) == "Article":
+                articles.append(self._article_to_dict(elem))
+                continue
+            stack.extend(reversed(elem))
         
         return articles
     
+    def iter_articles(self, xml_content: Union[str, bytes]) -> Iterator[Dict[str, Any]]:
+        """
+        XMLを逐次パースして条文を順に返す（DOM 全体を保持しない）
+        
+        Args:
+            xml_content: XML文字列またはバイト列
+        
+        Yields:
+            条文データ
+        """
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode('utf-8')
+        
+        stream_parser = ArticleStreamParser(self)
+        source = io.BytesIO(xml_content)
+        while True:
+            chunk = source.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield from stream_parser.feed(chunk)
+        yield from stream_parser.close()
+    
+    def _article_to_dict(self, article_elem: ET.Element) -> Dict[str, Any]:
+        """
+        条文要素を条文データに変換
+        
+        条番号は number 属性、ArticleTitle 要素（"第一条"）、Num 属性（"1"・"3_2"）の順に、
+        見出しは heading 属性、Title 属性、ArticleCaption 要素の順に参照する。
+        
+        Args:
+            article_elem: 条文XML要素
+        
+        Returns:
+            条文データ
+        """
+        article_no = article_elem.get("number")
+        heading = article_elem.get("heading") or article_elem.get("Title")
+        
+        for child in article_elem:
+            tag = _local_name(child.tag)
+            if not article_no and tag == "ArticleTitle":
+                article_no = _normalize_space("".join(child.itertext()))
+            elif not heading and tag == "ArticleCaption":
+                heading = _normalize_space("".join(child.itertext())).strip("（）()")
+        
+        if not article_no and article_elem.get("Num"):
+            article_no = self._format_article_num(article_elem.get("Num"))
+        
+        lines = self._collect_lines(article_elem)
+        
+        return {
+            "article_no": article_no or "",
+            "heading": heading or "",
+            "text": "\n".join(line["text"] for line in lines if line["text"]),
+            "structure": {
+                "items": [
+                    {"level": line["level"], "text": line["text"], "number": line["number"]}
+                    for line in lines
+                    if line["level"] > 0
+                ]
+            }
+        }
+    
     def _extract_text(self, element: ET.Element) -> str:
         """
         要素のテキストを抽出（ネストされた要素も含む）
         
+        項・号などのブロック要素ごとに改行し、行内の空白は正規化する
+        
         Args:
             element: XML要素
-            
+        
         Returns:
             テキスト内容
         """
-        text_parts = []
+        return "\n".join(line["text"] for line in self._collect_lines(element) if line["text"])
+    
+    def _collect_lines(self, element: ET.Element) -> List[Dict[str, Any]]:
+        """
+        要素を一度だけ走査して、ブロック要素（項・号・細分）ごとの行を作成
+        
+        各要素のテキストは一度だけ追加されるため、処理時間は要素数・文字数に比例する
+        （ネストの深さによらない）。
+        
+        Args:
+            element: XML要素
         
-        # 直接テキストを追加
-        if element.text:
-            text_parts.append(element.text.strip())
+        Returns:
+            [{"level": 階層, "number": 番号, "text": テキスト}] のリスト
+            （level 0 は要素直下のテキスト、1 は項、2 は号、3 以降は号の細分）
+        """
+        root_line: Dict[str, Any] = {"level": 0, "number": None, "parts": []}
+        lines = [root_line]
+        open_lines = [root_line]
         
-        # 子要素のテキストを再帰的に追加
-        for child in element:
-            if child.text:
-                text_parts.append(child.text.strip())
-            text_parts.extend(self._extract_text(child).split('\n'))
+        # 条名・条見出しは条文データの別項目になるため本文から除く
+        meta = [child for child in element if _local_name(child.tag) in ARTICLE_META_TAGS]
         
-        # 末尾テキストを追加
-        if element.tail:
-            text_parts.append(element.tail.strip())
+        # (要素, 開始か終了か)
+        stack = [(element, False), (element, True)]
+        while stack:
+            elem, entering = stack.pop()
+            is_root = elem is element
+            
+            if not entering:
+                if not is_root:
+                    if _local_name(elem.tag) in BLOCK_LEVELS:
+                        open_lines.pop()
+                    _append_text(open_lines[-1], elem.tail)
+                continue
+            
+            tag = _local_name(elem.tag)
+            if not is_root and (not tag or tag in SKIP_TAGS or any(elem is m for m in meta)):
+                # コメント・条名・条見出し・ルビの読みは本文に含めない（後続テキストは残す）
+                _append_text(open_lines[-1], elem.tail)
+                continue
+            
+            if not is_root and tag in LABEL_TAGS:
+                label = _normalize_space("".join(elem.itertext()))
+                if label:
+                    open_lines[-1]["parts"].append(label + " ")
+                _append_text(open_lines[-1], elem.tail)
+                continue
+            
+            if not is_root and tag in BLOCK_LEVELS:
+                line = {
+                    "level": BLOCK_LEVELS[tag],
+                    "number": elem.get("Num", elem.get("number")),
+                    "parts": []
+                }
+                lines.append(line)
+                open_lines.append(line)
+            elif tag == "Column" and open_lines[-1]["parts"] and not open_lines[-1]["parts"][-1].endswith(" "):
+                # 表形式の列（用語と定義など）は空白で区切る
+                open_lines[-1]["parts"].append(" ")
+            
+            _append_text(open_lines[-1], elem.text)
+            stack.append((elem, False))
+            stack.extend((child, True) for child in reversed(elem))
         
-        return '\n'.join(filter(None, text_parts))
+        return [
+            {"level": line["level"], "number": line["number"], "text": "".join(line["parts"]).strip()}
+            for line in lines
+        ]
     
-    def _parse_structure(self, article_elem: ET.Element) -> Dict[str, Any]:
+    def _format_article_num(self, num: str) -> str:
         """
-        条文の構造を解析（項・号などの階層構造）
+        e-Gov の Num 属性を条番号に変換（例: "1" -> "第1条"、"3_2" -> "第3条の2"）
         
         Args:
-            article_elem: 条文XML要素
-            
+            num: Num 属性値
+        
         Returns:
-            構造データ
+            条番号
         """
-        structure = {"items": []}
-        
-        # 項レベルを抽出
-        for paragraph in article_elem.findall(".//Paragraph"):
-            para_text = self._extract_text(paragraph)
-            structure["items"].append({
-                "level": 1,
-                "text": para_text,
-                "number": paragraph.get("number")
-            })
-        
-        return structure
+        main, *branches = num.split("_")
+        return f"第{main}条" + "".join(f"の{branch}" for branch in branches)
     
     def normalize_article_no(self, article_no: str) -> str:
         """
@@ -169,7 +373,7 @@ class LegalXMLParser:
         
         Args:
             article_no: 条番号（様々な形式）
-            
+        
         Returns:
             正規化された条番号
         """
@@ -184,3 +388,77 @@ class LegalXMLParser:
         # その他の形式を処理
         return article_no
 
+
+
+
+class ArticleStreamParser:
+    """
+    条文ストリーミングパーサー
+    
+    XMLを断片ごとに受け取り、閉じた <Article> 要素から順に条文データを返す。
+    処理済みの要素は破棄するため、法令全体の大きさによらずメモリ使用量は一定に保たれる。
+    lxml が利用可能な場合は lxml.etree.XMLPullParser（iterparse と同じイベント処理）を使用する。
+    """
+    
+    def __init__(self, parser: LegalXMLParser):
+        """
+        Args:
+            parser: 条文要素の変換に使用する法令XMLパーサー
+        """
+        self.parser = parser
+        self._depth = 0
+        if HAS_LXML:
+            self._pull = etree.XMLPullParser(events=("start", "end"), tag="{*}Article")
+        else:
+            self._pull = ET.XMLPullParser(events=("start", "end"))
+    
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        """
+        XMLの断片を投入し、この時点で閉じた条文を返す
+        
+        Args:
+            data: XMLの断片
+        
+        Returns:
+            条文データのリスト
+        """
+        try:
+            self._pull.feed(data)
+        except (ET.ParseError, ValueError) as e:
+            raise ValueError(f"Invalid XML format: {str(e)}")
+        return list(self._drain())
+    
+    def close(self) -> List[Dict[str, Any]]:
+        """
+        入力の終わりを通知し、残りの条文を返す
+        
+        Returns:
+            条文データのリスト
+        """
+        try:
+            self._pull.close()
+        except (ET.ParseError, ValueError) as e:
+            raise ValueError(f"Invalid XML format: {str(e)}")
+        return list(self._drain())
+    
+    def _drain(self) -> Iterator[Dict[str, Any]]:
+        """閉じた条文要素を変換し、処理済みの要素を破棄"""
+        for event, elem in self._pull.read_events():
+            if _local_name(elem.tag) != "Article":
+                continue
+            
+            # 改正規定として引用された条文（Article 内の Article）は外側の条文の一部として扱う
+            if event == "start":
+                self._depth += 1
+                continue
+            self._depth -= 1
+            if self._depth > 0:
+                continue
+            
+            yield self.parser._article_to_dict(elem)
+            
+            elem.clear()
+            if HAS_LXML:
+                # 処理済みの兄弟要素も親から外す（親に空要素が溜まらないようにする）
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
@@ -0,0 +1,109 @@
+"""
+条番号ユーティリティ
+表記揺れのある条番号（漢数字・全角数字・枝番号）を正規化した条文キーに変換
+"""
+import re
+import unicodedata
+from typing import Any, Dict, List
+
+KANJI_DIGITS = {
+    "〇": 0, "零": 0, "一": 1, "二": 2, "三": 3, "四": 4,
+    "五": 5, "六": 6, "七": 7, "八": 8, "九": 9
+}
+KANJI_UNITS = {"十": 10, "百": 100, "千": 1000}
+
+_NUMBER = r"[0-9〇零一二三四五六七八九十百千]+"
+NUMBER_PATTERN = re.compile(_NUMBER)
+
+# 第百二十三条の二 / 123の2 / 123条の2 / 123_2（e-Gov の Num 属性）/ 123-2
+ARTICLE_NO_PATTERN = re.compile(
+    rf"^第?(?P<main>{_NUMBER})条?(?P<branches>(?:[のノ_\-]{_NUMBER})*)$"
+)
+
+
+def kanji_to_int(text: str) -> int:
+    """
+    漢数字（算用数字混在可）を整数に変換
+    
+    Args:
+        text: 数字文字列（例: "百二十三", "二〇", "123"）
+    
+    Returns:
+        整数値
+    """
+    if text.isdigit():
+        return int(text)
+    
+    total = 0
+    current = 0
+    for ch in text:
+        if ch.isdigit():
+            current = current * 10 + int(ch)
+        elif ch in KANJI_DIGITS:
+            current = current * 10 + KANJI_DIGITS[ch]
+        else:
+            total += (current or 1) * KANJI_UNITS[ch]
+            current = 0
+    return total + current
+
+
+def canonical_article_key(article_no: str) -> str:
+    """
+    条番号を正規化した条文キーに変換
+    
+    "第百二十三条の二"・"１２３の２"・"123_2" はいずれも "123-2" になる。
+    条番号として解釈できない場合はNFKC正規化・空白除去した文字列を返す。
+    
+    Args:
+        article_no: 条番号（様々な形式）
+    
+    Returns:
+        条文キー
+    """
+    text = re.sub(r"\s+", "", unicodedata.normalize("NFKC", article_no or ""))
+    match = ARTICLE_NO_PATTERN.match(text)
+    if not match:
+        return text
+    
+    numbers = [match.group("main")] + NUMBER_PATTERN.findall(match.group("branches"))
+    return "-".join(str(kanji_to_int(n)) for n in numbers)
+
+
+def build_article_index(articles: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    条文キーから条文リスト内の位置への索引を作成
+    
+    同じキーの条文が複数ある場合（附則など）は先に現れた条文を優先する
+    
+    Args:
+        articles: 条文リスト
+    
+    Returns:
+        {条文キー: 位置} の辞書
+    """
+    index: Dict[str, int] = {}
+    for position, article in enumerate(articles):
+        index.setdefault(canonical_article_key(article.get("article_no", "")), position)
+    return index
+
+
+def unique_article_keys(articles: List[Dict[str, Any]]) -> List[str]:
+    """
+    条文ごとに法令内で一意な条文キーを作成
+    
+    同じキーの条文が複数ある場合（附則など）は2つ目以降に "#2", "#3" ... を付ける。
+    先に現れた条文のキーは canonical_article_key と一致する。
+    
+    Args:
+        articles: 条文リスト
+    
+    Returns:
+        条文リストと同じ順序の条文キー
+    """
+    counts: Dict[str, int] = {}
+    keys = []
+    for article in articles:
+        key = canonical_article_key(article.get("article_no", ""))
+        counts[key] = counts.get(key, 0) + 1
+        keys.append(key if counts[key] == 1 else f"{key}#{counts[key]}")
+    return keys
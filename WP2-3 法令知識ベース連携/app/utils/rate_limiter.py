@@ -0,0 +1,37 @@
+"""
+非同期レートリミッター
+外部APIへのリクエスト間隔を一定以上に保つ
+"""
+import asyncio
+import time
+
+
+class AsyncRateLimiter:
+    """
+    非同期レートリミッター
+    
+    1分あたりの上限からリクエスト間隔を算出し、複数のタスクから呼ばれても
+    その間隔を空けてリクエストを許可する
+    """
+    
+    def __init__(self, per_minute: int):
+        """
+        Args:
+            per_minute: 1分あたりの最大リクエスト数（0以下の場合は制限なし）
+        """
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """次のリクエストが許可されるまで待機"""
+        if self.interval <= 0:
+            return
+        
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                now = time.monotonic()
+            self._next_at = max(now, self._next_at) + self.interval
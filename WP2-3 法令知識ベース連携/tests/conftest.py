@@ -0,0 +1,70 @@
+"""
+テスト共通のフィクスチャ
+"""
+import pytest
+import pytest_asyncio
+
+from app.services.cache_service import CacheService
+from app.services.generation_cache import GenerationCache
+from app.services.law_repository import GeneratedResultRepository, LawRepository
+
+
+class FakeGeminiClient:
+    """呼び出し回数を数える Gemini クライアント"""
+    
+    model = "gemini-test"
+    
+    def __init__(self, fallback: bool = False):
+        self.fallback = fallback
+        self.calls = 0
+    
+    def prompt_version(self, filename: str) -> str:
+        return "test"
+    
+    def estimate_summary_tokens(self, text, context_items=None) -> int:
+        return len(text)
+    
+    async def generate_summary(self, text, context_items=None, max_tokens=None, temperature=None):
+        self.calls += 1
+        return {"summary": f"要約{self.calls}", "citations": [], "fallback": self.fallback}
+    
+    async def extract_topics(self, texts, mode="topic_extraction", max_topics=5):
+        self.calls += 1
+        return {"topics": [{"id": "1", "title": f"論点{self.calls}"}], "relations": []}
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """テーブルを作成したインメモリ SQLite のセッションファクトリ"""
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.models.models import Base
+    
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    
+    await engine.dispose()
+
+
+@pytest.fixture
+def repository(session_factory):
+    """インメモリ SQLite を使うリポジトリ"""
+    return LawRepository(session_factory)
+
+
+@pytest.fixture
+def generation_cache(session_factory):
+    """Redis 未接続・インメモリ SQLite の生成結果キャッシュ"""
+    return GenerationCache(
+        cache_service=CacheService(),
+        repository=GeneratedResultRepository(session_factory)
+    )
+
+
+@pytest.fixture
+def gemini():
+    """呼び出し回数を数える Gemini クライアント"""
+    return FakeGeminiClient()
@@ -62,3 +62,22 @@ def test_extract_topics_endpoint(client):
     # APIが実装されている場合 200、未実装の場合 500
     assert response.status_code in [200, 500]
 
+
+
+def test_search_accepts_one_character_keyword(client, monkeypatch):
+    """1文字のキーワードで検索でき、空のキーワードは 400 になる"""
+    from app.api import laws
+    
+    calls = []
+    
+    async def fake_search(keyword, law_type=None, page=1, per_page=20):
+        calls.append(keyword)
+        return {"hits": [], "total": 0}
+    
+    monkeypatch.setattr(laws.law_search, "search", fake_search)
+    
+    response = client.post("/laws/search", params={"keyword": "法"})
+    
+    assert response.status_code == 200
+    assert calls == ["法"]
+    assert client.post("/laws/search", params={"keyword": " "}).status_code == 400
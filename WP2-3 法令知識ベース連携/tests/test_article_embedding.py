@@ -0,0 +1,69 @@
+"""
+条文埋め込みバッチの単体テスト（SQLite で実行、モデルは固定ベクトルを返す代替を使用）
+"""
+import numpy as np
+import pytest
+from app.services.article_embedding import bucket_batches, decode_vector, embed_articles, encode_vector
+
+
+class FixedEmbedder:
+    """テキストの長さから決まるベクトルを返す埋め込みモデル"""
+    
+    model_name = "test-model"
+    
+    def __init__(self):
+        self.encoded = []
+    
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(text), 1.0, 0.0] for text in texts], dtype=np.float32)
+
+
+def test_bucket_batches_and_vector_codec():
+    """長さの近い入力をトークン数の上限内でまとめ、ベクトルをバイナリで往復できる"""
+    lengths = [120, 5, 512, 7, 130, 6]
+    batches = bucket_batches(lengths, batch_size=2, max_batch_tokens=300)
+    
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    assert batches[0] == [1, 5]
+    for batch in batches:
+        assert len(batch) <= 2
+        assert len(batch) == 1 or max(lengths[i] for i in batch) * len(batch) <= 300
+    
+    vector = [0.25, -1.5, 3.0]
+    assert len(encode_vector(vector, "float16")) == 6
+    assert decode_vector(encode_vector(vector, "float16"), "float16").tolist() == vector
+    assert decode_vector(encode_vector(vector, "float32"), "float32").tolist() == vector
+
+
+@pytest.mark.asyncio
+async def test_embed_articles_incremental(repository):
+    """中断後は続きから再開し、内容が変わった条文のみ埋め込み直す"""
+    articles = [
+        {"article_no": "第1条", "heading": "基本原則", "text": "本文1"},
+        {"article_no": "第2条", "text": "本文2"},
+        {"article_no": "第3条", "text": "本文3"}
+    ]
+    await repository.save_law("CIVIL_LAW_001", {"title": "民法", "articles": articles})
+    embedder = FixedEmbedder()
+    
+    stats = await embed_articles(repository, embedder, dtype="float32", limit=2, chunk_size=1)
+    assert (stats["pending"], stats["embedded"]) == (3, 2)
+    
+    stats = await embed_articles(repository, embedder, dtype="float32")
+    assert (stats["pending"], stats["embedded"]) == (1, 1)
+    assert embedder.encoded == ["基本原則\n本文1", "本文2", "本文3"]
+    
+    stats = await embed_articles(repository, embedder)
+    assert stats["embedded"] == 0
+    
+    await repository.apply_article_changes(
+        "CIVIL_LAW_001",
+        {"title": "民法"},
+        changed=[("2", 1, {"article_no": "第2条", "text": "改正後の本文2"})],
+        moved={},
+        removed=[]
+    )
+    stats = await embed_articles(repository, embedder)
+    assert stats["embedded"] == 1
+    assert embedder.encoded[-1] == "改正後の本文2"
@@ -0,0 +1,68 @@
+"""
+要約・論点抽出結果キャッシュの単体テスト（SQLite で実行）
+"""
+import pytest
+from app.services.summarizer import ArticleSummarizer
+from app.services.topic_extractor import TopicExtractor
+
+
+def summarizer_with(cache, gemini):
+    summarizer = ArticleSummarizer(cache=cache)
+    summarizer.gemini_client = gemini
+    return summarizer
+
+
+@pytest.mark.asyncio
+async def test_summary_cached_by_article_hash_and_style(generation_cache, gemini):
+    """同じ条文・スタイル・長さの要約は再生成せず、条文ハッシュやスタイルが変われば生成し直す"""
+    summarizer = summarizer_with(generation_cache, gemini)
+    args = {"article_text": "私権は、公共の福祉に適合しなければならない。", "article_no": "第1条", "law_id": "CIVIL_LAW_001"}
+    
+    first = await summarizer.summarize_article(**args, content_hash="h1")
+    second = await summarizer_with(generation_cache, gemini).summarize_article(**args, content_hash="h1")
+    assert gemini.calls == 1
+    assert second == first
+    assert first["original_reference"] == {"law_id": "CIVIL_LAW_001", "article_no": "第1条"}
+    
+    await summarizer.summarize_article(**args, content_hash="h1", style="for_layperson")
+    await summarizer.summarize_article(**args, content_hash="h2")
+    assert gemini.calls == 3
+    
+    # Gemini を使えなかった場合の要約はキャッシュしない
+    gemini.fallback = True
+    await summarizer.summarize_article(**args, content_hash="h3")
+    await summarizer.summarize_article(**args, content_hash="h3")
+    assert gemini.calls == 5
+
+
+@pytest.mark.asyncio
+async def test_invalidate_changes_removes_changed_articles(generation_cache, gemini):
+    """同期の変更セットで変更された条文の要約のみを削除する"""
+    summarizer = summarizer_with(generation_cache, gemini)
+    for article_no in ("第1条", "第2条"):
+        await summarizer.summarize_article("本文", article_no, law_id="CIVIL_LAW_001", content_hash="h")
+    
+    await generation_cache.invalidate_changes([
+        {"law_id": "CIVIL_LAW_001", "change": "updated", "articles": {"added": [], "updated": ["2"], "removed": []}}
+    ])
+    
+    assert await generation_cache.get(summarizer.cache_key("CIVIL_LAW_001", "第1条", "h")) is not None
+    assert await generation_cache.get(summarizer.cache_key("CIVIL_LAW_001", "第2条", "h")) is None
+    
+    await generation_cache.invalidate_changes([{"law_id": "CIVIL_LAW_001", "change": "removed", "articles": None}])
+    assert await generation_cache.get(summarizer.cache_key("CIVIL_LAW_001", "第1条", "h")) is None
+
+
+@pytest.mark.asyncio
+async def test_topics_cached_regardless_of_text_order(generation_cache, gemini):
+    """論点抽出はテキストの順序が違っても同じ結果を返し、モードが違えば生成し直す"""
+    extractor = TopicExtractor(cache=generation_cache)
+    extractor.gemini_client = gemini
+    
+    first = await extractor.extract_topics(["条文A", "条文B"])
+    second = await extractor.extract_topics(["条文B", "条文A"])
+    assert gemini.calls == 1
+    assert second == first
+    
+    await extractor.extract_topics(["条文A", "条文B"], mode="issue_mapping")
+    assert gemini.calls == 2
@@ -0,0 +1,223 @@
+"""
+法令キャッシュの単体テスト
+"""
+import asyncio
+import fnmatch
+import pytest
+from app.services.cache_service import CacheService
+from app.services.law_cache import LawCache
+from app.services.compact_law import CompactLaw
+
+
+class FakeRedis:
+    """法令キャッシュが使う操作のみを持つインメモリの Redis"""
+    
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+    
+    async def get(self, key):
+        return self.values.get(key)
+    
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+    
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+    
+    async def scan_iter(self, match="*", count=None):
+        for key in list(self.values):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+    
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+    
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+    
+    async def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, 0)) + amount)
+    
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """コマンドを溜めて execute でまとめて実行するパイプライン"""
+    
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append(getattr(self.redis, name)(*args, **kwargs))
+    
+    async def execute(self):
+        return [await command for command in self.commands]
+
+
+def process_cache(redis):
+    """Redis を共有する別プロセスの法令キャッシュ"""
+    cache_service = CacheService()
+    cache_service.redis_client = redis
+    cache = LawCache(cache_service)
+    cache.generation_check_sec = 0
+    return cache
+
+
+@pytest.fixture
+def cache():
+    """Redis 未接続の法令キャッシュ"""
+    return LawCache()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_fetch_once(cache):
+    """同じ法令への同時ミスでも上流への取得は1回"""
+    calls = 0
+    
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"law_id": "CIVIL_LAW_001", "articles": []}
+    
+    results = await asyncio.gather(*[
+        cache.get_or_load("CIVIL_LAW_001", loader) for _ in range(10)
+    ])
+    
+    assert calls == 1
+    assert all(result["law_id"] == "CIVIL_LAW_001" for result in results)
+    
+    # 2回目以降はプロセス内キャッシュから返す
+    await cache.get_or_load("CIVIL_LAW_001", loader)
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_reload(cache):
+    """キャッシュ削除後は再取得する"""
+    calls = 0
+    
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return {"law_id": "CIVIL_LAW_001", "articles": []}
+    
+    await cache.get_or_load("CIVIL_LAW_001", loader)
+    await cache.invalidate("CIVIL_LAW_001")
+    await cache.get_or_load("CIVIL_LAW_001", loader)
+    
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_get_article_by_canonical_key(cache):
+    """表記揺れのある条番号で条文を取得できる"""
+    async def loader():
+        return {
+            "law_id": "CIVIL_LAW_001",
+            "articles": [
+                {"article_no": "第1条", "text": "私権は、公共の福祉に適合しなければならない。"},
+                {"article_no": "第123条の2", "text": "枝番号付きの条文"}
+            ]
+        }
+    
+    article = await cache.get_article("CIVIL_LAW_001", "第百二十三条の二", loader)
+    assert article["text"] == "枝番号付きの条文"
+    
+    article = await cache.get_article("CIVIL_LAW_001", "１", loader)
+    assert article["article_no"] == "第1条"
+    
+    assert await cache.get_article("CIVIL_LAW_001", "第999条", loader) is None
+
+
+@pytest.mark.asyncio
+async def test_hot_law_hit_skips_conversion(cache, monkeypatch):
+    """よく参照される法令はキャッシュヒット時に条文を組み立て直さない"""
+    conversions = 0
+    to_dict = CompactLaw.to_dict
+    
+    def counting_to_dict(self):
+        nonlocal conversions
+        conversions += 1
+        return to_dict(self)
+    
+    monkeypatch.setattr(CompactLaw, "to_dict", counting_to_dict)
+    cache._hot.max_entries = 1
+    
+    async def loader(law_id):
+        return {"law_id": law_id, "articles": [{"article_no": f"第{i}条", "text": "本文"} for i in range(1, 501)]}
+    
+    first = await cache.get_or_load("CIVIL_LAW_001", lambda: loader("CIVIL_LAW_001"))
+    for _ in range(100):
+        assert await cache.get_or_load("CIVIL_LAW_001", lambda: loader("CIVIL_LAW_001")) is first
+    assert conversions == 0
+    
+    # 辞書形式から追い出された法令は1回だけ変換し、以降は変換済みの辞書を返す
+    await cache.get_or_load("PENAL_LAW_001", lambda: loader("PENAL_LAW_001"))
+    for _ in range(10):
+        law = await cache.get_or_load("CIVIL_LAW_001", lambda: loader("CIVIL_LAW_001"))
+    assert conversions == 1
+    assert [article["text"] for article in law["articles"]] == [article["text"] for article in first["articles"]]
+
+
+def test_compact_law_round_trip():
+    """CompactLaw は元の辞書形式に復元でき、条文単位でも参照できる"""
+    law = {
+        "law_id": "CIVIL_LAW_001",
+        "title": "民法",
+        "articles": [
+            {
+                "article_no": "第1条",
+                "heading": "基本原則",
+                "text": "私権は、公共の福祉に適合しなければならない。\n２ 権利の行使は、信義に従い誠実に行わなければならない。",
+                "structure": {"items": [
+                    {"level": 1, "text": "私権は、公共の福祉に適合しなければならない。", "number": "1"},
+                    {"level": 1, "text": "２ 権利の行使は、信義に従い誠実に行わなければならない。", "number": "2"}
+                ]}
+            },
+            {"article_no": "第2条", "heading": "基本原則", "text": "解釈の基準", "structure": None},
+            {"article_no": "第3条", "heading": None, "text": "", "structure": {"custom": True}}
+        ]
+    }
+    compact = CompactLaw.from_dict(law)
+    
+    restored = compact.to_dict()
+    assert restored["articles"] == law["articles"]
+    assert restored["article_index"] == {"1": 0, "2": 1, "3": 2}
+    assert compact.find_article("二")["text"] == "解釈の基準"
+
+
+@pytest.mark.asyncio
+async def test_invalidation_in_another_process_evicts_local_copy():
+    """同期プロセスでの無効化は世代番号を介して API プロセスのLRUにも反映される"""
+    redis = FakeRedis()
+    api, sync = process_cache(redis), process_cache(redis)
+    version = "v1"
+    
+    async def loader():
+        return {"law_id": "CIVIL_LAW_001", "articles": [{"article_no": "第1条", "text": version}]}
+    
+    assert (await api.get_article("CIVIL_LAW_001", "1", loader))["text"] == "v1"
+    
+    version = "v2"
+    assert (await api.get_article("CIVIL_LAW_001", "1", loader))["text"] == "v1"
+    await sync.invalidate("CIVIL_LAW_001")
+    assert await api.get_cached("CIVIL_LAW_001") is None
+    assert (await api.get_article("CIVIL_LAW_001", "1", loader))["text"] == "v2"
+    
+    # フル同期後はすべての法令を破棄し、Redis の法令データも削除する
+    version = "v3"
+    await sync.invalidate_all(["CIVIL_LAW_001"])
+    assert (await api.get_or_load("CIVIL_LAW_001", loader))["articles"][0]["text"] == "v3"
+    assert redis.hashes[api.generation_key]["_all"] == "1"
@@ -0,0 +1,55 @@
+"""
+条文参照の解決の単体テスト
+"""
+import pytest
+from app.services.law_reference import LawReferenceResolver, select_provision
+
+
+@pytest.fixture
+def resolver():
+    """民法・刑事訴訟法・会社法関係の法令名を登録した解決器"""
+    return LawReferenceResolver([
+        ("129AC0000000089", "民法", "Act"),
+        ("323AC0000000131", "刑事訴訟法", "Act"),
+        ("417AC0000000086", "会社法", "Act"),
+        ("418M60000010012", "会社法施行規則", "MinisterialOrdinance"),
+    ])
+
+
+@pytest.mark.parametrize("reference, law_id, article_key, paragraph, item", [
+    ("民法第709条", "129AC0000000089", "709", None, None),
+    ("民法７０９条", "129AC0000000089", "709", None, None),
+    ("民法第七百九条の二第一項第三号", "129AC0000000089", "709-2", 1, 3),
+    ("刑訴法321条1項2号", "323AC0000000131", "321", 1, 2),
+    ("会社法施行規則 第3条", "418M60000010012", "3", None, None),
+    ("会社法", "417AC0000000086", None, None, None),
+])
+def test_resolve_reference(resolver, reference, law_id, article_key, paragraph, item):
+    """数字の表記・略称・項・号を解釈し、最長一致の法令名に対応付ける"""
+    resolved = resolver.resolve(reference)
+    assert resolved["law_id"] == law_id
+    assert (resolved["article_key"], resolved["paragraph"], resolved["item"]) == (article_key, paragraph, item)
+
+
+def test_unresolvable_reference(resolver):
+    """未登録の法令名や条番号として解釈できない参照は解決しない"""
+    assert resolver.resolve("商法第1条") is None
+    assert resolver.resolve("民法の規定") is None
+
+
+def test_select_provision():
+    """項・号を構造の行から切り出す"""
+    article = {
+        "text": "本文",
+        "structure": {"items": [
+            {"level": 1, "text": "第一項", "number": "1"},
+            {"level": 2, "text": "一 第一号", "number": "1"},
+            {"level": 2, "text": "二 第二号", "number": "2"},
+            {"level": 3, "text": "イ 細分", "number": "1"},
+            {"level": 1, "text": "２ 第二項", "number": "2"},
+        ]}
+    }
+    assert select_provision(article, None, None) == "本文"
+    assert select_provision(article, 1, 2) == "二 第二号\nイ 細分"
+    assert select_provision(article, 2, None) == "２ 第二項"
+    assert select_provision(article, 3, None) is None
@@ -0,0 +1,74 @@
+"""
+法令リポジトリの単体テスト（SQLite で実行）
+"""
+import pytest
+from app.services.bulk_writer import KnowledgeBaseBulkWriter
+
+
+@pytest.mark.asyncio
+async def test_save_and_get_law(repository):
+    """保存した法令を条文の順序を保って取得できる"""
+    await repository.save_law("CIVIL_LAW_001", {
+        "title": "民法",
+        "law_no": "明治29年法律第89号",
+        "enact_date": "1896-04-27",
+        "articles": [
+            {"article_no": "第1条", "heading": "基本原則", "text": "私権は、公共の福祉に適合しなければならない。"},
+            {"article_no": "第2条", "heading": "解釈の基準", "text": "この法律は、個人の尊厳と両性の本質的平等を旨として、解釈しなければならない。"}
+        ]
+    })
+    
+    law = await repository.get_law("CIVIL_LAW_001")
+    
+    assert law["title"] == "民法"
+    assert law["enact_date"] == "1896-04-27T00:00:00"
+    assert [a["article_no"] for a in law["articles"]] == ["第1条", "第2条"]
+    assert law["article_index"]["2"] == 1
+    
+    listed = await repository.list_laws()
+    assert listed["total"] == 1
+    assert await repository.get_law("UNKNOWN") is None
+
+
+@pytest.mark.asyncio
+async def test_apply_article_changes(repository):
+    """変更のあった条文のみを書き換え、並び順を保つ"""
+    articles = [
+        {"article_no": "第1条", "text": "本文1"},
+        {"article_no": "第2条", "text": "本文2"}
+    ]
+    await repository.save_law("CIVIL_LAW_001", {"title": "民法", "articles": articles})
+    before = await repository.get_article_states("CIVIL_LAW_001")
+    
+    await repository.apply_article_changes(
+        "CIVIL_LAW_001",
+        {"title": "民法"},
+        changed=[("1-2", 1, {"article_no": "第1条の2", "text": "追加"})],
+        moved={"2": 2},
+        removed=[]
+    )
+    
+    after = await repository.get_article_states("CIVIL_LAW_001")
+    assert after["1"] == before["1"]
+    assert after["2"][1] == 2
+    
+    law = await repository.get_law("CIVIL_LAW_001")
+    assert [a["article_no"] for a in law["articles"]] == ["第1条", "第1条の2", "第2条"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_writer_upserts_laws(repository):
+    """一括書き込みで再投入した法令は置き換えられる"""
+    async with KnowledgeBaseBulkWriter(repository.session_factory, batch_size=3) as writer:
+        for i in range(3):
+            await writer.add_law(f"LAW_{i}", {
+                "title": f"法令{i}",
+                "articles": [{"article_no": "第1条", "text": "旧"}, {"article_no": "第2条", "text": "旧"}]
+            })
+        await writer.add_law("LAW_0", {"title": "法令0", "articles": [{"article_no": "第1条", "text": "新"}]})
+    
+    assert writer.rows_written == 11
+    assert (await repository.list_laws())["total"] == 3
+    
+    law = await repository.get_law("LAW_0")
+    assert [a["text"] for a in law["articles"]] == ["新"]
@@ -0,0 +1,76 @@
+"""
+法令スナップショットの単体テスト
+"""
+import os
+import pytest
+from app.services.law_snapshot import LawSnapshotStore
+
+
+@pytest.fixture
+def law():
+    """パース済み法令データ"""
+    articles = [
+        {
+            "article_no": "第一条",
+            "heading": "基本原則",
+            "text": "私権は、公共の福祉に適合しなければならない。",
+            "structure": {"items": [{"level": 1, "text": "私権は、公共の福祉に適合しなければならない。", "number": "1"}]}
+        },
+        {"article_no": "第三条の二", "heading": "基本原則", "text": "意思能力", "structure": None}
+    ]
+    return {"law_id": "129AC0000000089", "title": "民法", "law_no": "明治二十九年法律第八十九号", "articles": articles}
+
+
+@pytest.fixture
+def store(tmp_path):
+    """一時ディレクトリのスナップショットストア"""
+    return LawSnapshotStore(str(tmp_path))
+
+
+def test_snapshot_round_trip(store, law):
+    """保存したスナップショットから同じ法令データを復元できる"""
+    store.save(law["law_id"], law)
+    snapshot = store.open(law["law_id"])
+    
+    restored = snapshot.to_dict()
+    assert restored["title"] == "民法"
+    assert restored["articles"] == law["articles"]
+    assert restored["article_index"] == {"1": 0, "3-2": 1}
+
+
+def test_snapshot_article_lookup(store, law):
+    """条番号の表記揺れで条文を取得でき、本文はコピーせずに参照できる"""
+    store.save(law["law_id"], law)
+    snapshot = store.open(law["law_id"])
+    
+    assert snapshot.find_article("3の2")["text"] == "意思能力"
+    assert snapshot.find_article("第4条") is None
+    assert snapshot.text_view(0).tobytes().decode("utf-8") == law["articles"][0]["text"]
+
+
+def test_snapshot_reopened_after_update(store, law):
+    """同期バッチがスナップショットを書き換えると次回参照時に新しい内容を返す"""
+    store.save(law["law_id"], law)
+    assert store.open(law["law_id"]).find_article("1")["heading"] == "基本原則"
+    
+    law["articles"][0]["heading"] = "改正後"
+    store.save(law["law_id"], law)
+    assert store.open(law["law_id"]).find_article("1")["heading"] == "改正後"
+    
+    store.delete(law["law_id"])
+    assert store.open(law["law_id"]) is None
+
+
+def test_warm_prefers_given_laws(store, law):
+    """指定した法令を先に開き、上限に満たない分は更新日時の新しい順に補う"""
+    for i, law_id in enumerate(["A", "B", "C"]):
+        store.save(law_id, {**law, "law_id": law_id})
+        os.utime(store.path(law_id), ns=(i * 10**9, i * 10**9))
+    
+    assert store.warm(["A", "MISSING"], limit=2) == 2
+    assert set(store._open) == {"A", "C"}
+    
+    cold = LawSnapshotStore(str(store.directory))
+    assert cold.warm([], limit=1) == 1
+    assert set(cold._open) == {"C"}
+    assert store.warm(["B", "B"], limit=10) == 3
@@ -0,0 +1,50 @@
+"""
+法令名の入力補完の単体テスト
+"""
+import pytest
+from app.services.law_suggest import LawSuggester
+from app.services.xml_parser import LegalXMLParser
+
+
+@pytest.fixture
+def suggester():
+    """参照回数付きの入力補完の索引"""
+    laws = [
+        {"law_id": "129AC0000000089", "title": "民法", "law_type": "Act", "title_kana": "みんぽう"},
+        {"law_id": "323AC0000000131", "title": "刑事訴訟法", "law_type": "Act", "title_kana": "けいじそしょうほう"},
+        {"law_id": "323CO0000000000", "title": "刑事訴訟法施行令", "law_type": "CabinetOrder"},
+        {"law_id": "322AC0000000000", "title": "民法施行法", "law_type": "Act", "abbreviations": ["民施法"]},
+    ]
+    return LawSuggester(laws, {"323CO0000000000": 50, "323AC0000000131": 10})
+
+
+def titles(items):
+    return [item["title"] for item in items]
+
+
+def test_suggest_prefix_ranked_by_popularity(suggester):
+    """法令名の前方一致を参照回数の多い順に返し、完全一致は先頭に置く"""
+    assert titles(suggester.suggest("刑")) == ["刑事訴訟法施行令", "刑事訴訟法"]
+    assert titles(suggester.suggest("刑事訴訟法")) == ["刑事訴訟法", "刑事訴訟法施行令"]
+    assert titles(suggester.suggest("刑", law_type="Act")) == ["刑事訴訟法"]
+    assert titles(suggester.suggest("刑", limit=1)) == ["刑事訴訟法施行令"]
+
+
+def test_suggest_readings_and_abbreviations(suggester):
+    """読み（カタカナ入力を含む）と略称でも候補になる"""
+    assert titles(suggester.suggest("ミンポ")) == ["民法"]
+    assert titles(suggester.suggest("刑訴法")) == ["刑事訴訟法"]
+    assert titles(suggester.suggest("民施")) == ["民法施行法"]
+    assert suggester.suggest("商法") == []
+
+
+def test_parse_title_readings():
+    """LawTitle の読み・略称の属性を法令基本情報に含める"""
+    xml = """<Law LawType="Act"><LawNum>昭和二十二年法律第五十四号</LawNum><LawBody>
+<LawTitle Kana="してきどくせんのきんしおよびこうせいとりひきのかくほにかんするほうりつ" Abbrev="独占禁止法,独禁法" AbbrevKana="どくせんきんしほう,どっきんほう">私的独占の禁止及び公正取引の確保に関する法律</LawTitle>
+</LawBody></Law>"""
+    result = LegalXMLParser().parse_xml(xml)
+    
+    assert result["title_kana"].startswith("してきどくせん")
+    assert result["abbreviations"] == ["独占禁止法", "独禁法"]
+    assert result["abbreviation_kana"] == ["どくせんきんしほう", "どっきんほう"]
@@ -2,7 +2,9 @@
 XML パーサーの単体テスト
 """
 import pytest
-from app.services.xml_parser import LegalXMLParser
+from app.services.xml_parser import LegalXMLParser, ArticleStreamParser
+from app.services.parse_executor import XMLParseExecutor
+from app.utils.article_number import canonical_article_key
 
 
 @pytest.fixture
@@ -58,9 +60,80 @@ def test_extract_articles(parser, sample_xml):
     assert articles[1]["article_no"] == "第2条"
 
 
+def test_parse_egov_schema(parser):
+    """名前空間付きの e-Gov 形式（LawNum・LawName・Num/Title 属性）をパースできる"""
+    with open("sample_xml/law_civil_001.xml", encoding="utf-8") as f:
+        result = parser.parse_xml(f.read())
+    
+    assert result["title"] == "民法"
+    assert result["law_no"] == "明治29年法律第89号"
+    assert [a["article_no"] for a in result["articles"]] == ["第1条", "第2条"]
+    assert result["articles"][0]["heading"] == "私権の内容"
+    assert result["articles"][0]["text"] == "私権は、公共の福祉に適合しなければならない。"
+
+
+def test_extract_hierarchy_without_duplication(parser):
+    """項・号・細分の階層を1行ずつ、テキストを重複させずに抽出する"""
+    xml = """<Law><MainProvision>
+<Article Num="3_2"><ArticleCaption>（意思能力）</ArticleCaption><ArticleTitle>第三条の二</ArticleTitle>
+  <Paragraph Num="1"><ParagraphNum/><ParagraphSentence>
+    <Sentence>本文の<Ruby>前段<Rt>ぜんだん</Rt></Ruby>。</Sentence><Sentence>後段。</Sentence>
+  </ParagraphSentence>
+    <Item Num="1"><ItemTitle>一</ItemTitle><ItemSentence><Sentence>号</Sentence></ItemSentence>
+      <Subitem1 Num="1"><Subitem1Title>イ</Subitem1Title><Subitem1Sentence><Sentence>細分</Sentence></Subitem1Sentence></Subitem1>
+    </Item>
+  </Paragraph>
+</Article>
+</MainProvision></Law>"""
+    article = parser.parse_xml(xml)["articles"][0]
+    
+    assert article["article_no"] == "第三条の二"
+    assert article["heading"] == "意思能力"
+    assert article["text"] == "本文の前段。後段。\n一 号\nイ 細分"
+    assert [(i["level"], i["text"]) for i in article["structure"]["items"]] == [
+        (1, "本文の前段。後段。"),
+        (2, "一 号"),
+        (3, "イ 細分")
+    ]
+
+
 def test_normalize_article_no(parser):
     """条番号が正規化される"""
     assert parser.normalize_article_no("1") == "第1条"
     assert parser.normalize_article_no("第1条") == "第1条"
     assert parser.normalize_article_no("第123条") == "第123条"
 
+
+
+@pytest.mark.parametrize("article_no", ["第百二十三条の二", "123の2", "１２３の２", "第123条の2", "123_2"])
+def test_canonical_article_key(article_no):
+    """条番号の表記揺れを同じ条文キーに正規化できる"""
+    assert canonical_article_key(article_no) == "123-2"
+
+
+def test_stream_parser_yields_articles_across_chunks(parser, sample_xml):
+    """チャンク境界をまたいでも条文を順に取り出せる"""
+    stream_parser = ArticleStreamParser(parser)
+    data = sample_xml.encode("utf-8")
+    
+    articles = []
+    for i in range(0, len(data), 16):
+        articles.extend(stream_parser.feed(data[i:i + 16]))
+    articles.extend(stream_parser.close())
+    
+    assert [a["article_no"] for a in articles] == [
+        a["article_no"] for a in parser.parse_xml(sample_xml)["articles"]
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("inline_max_bytes,process_min_bytes", [(10 ** 9, 0), (0, 0), (0, 1)])
+async def test_parse_executor_modes(parser, sample_xml, inline_max_bytes, process_min_bytes):
+    """イベントループ上・スレッド・プロセスプールのいずれでも同じ結果になる"""
+    executor = XMLParseExecutor(inline_max_bytes=inline_max_bytes, process_min_bytes=process_min_bytes)
+    try:
+        result = await executor.parse(sample_xml)
+    finally:
+        executor.shutdown()
+    
+    assert result == parser.parse_xml(sample_xml)
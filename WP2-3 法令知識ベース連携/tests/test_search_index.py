@@ -0,0 +1,88 @@
+"""
+全文検索インデックスの単体テスト
+"""
+import pytest
+from app.services.search_index import SearchIndex, TITLE_POSITION
+from app.services.search_service import make_snippet
+
+
+def make_law(law_id, title, texts, law_type="Act"):
+    """パース済み法令データ"""
+    return {
+        "law_id": law_id,
+        "title": title,
+        "law_type": law_type,
+        "articles": [
+            {"article_no": f"第{i + 1}条", "heading": "", "text": text}
+            for i, text in enumerate(texts)
+        ]
+    }
+
+
+@pytest.fixture
+def index():
+    """民法・刑法を登録したインデックス"""
+    index = SearchIndex()
+    index.add_laws([
+        make_law("CIVIL", "民法", [
+            "私権は、公共の福祉に適合しなければならない。",
+            "故意又は過失によって他人の権利を侵害した者は、損害を賠償する責任を負う。"
+        ]),
+        make_law("PENAL", "刑法", ["人を殺した者は、死刑又は無期若しくは五年以上の懲役に処する。"], law_type="CabinetOrder")
+    ])
+    return index
+
+
+def test_search_ranks_and_filters(index):
+    """全バイグラムを含む文書のみが一致し、法令種別で絞り込める"""
+    hits, total = index.search("損害賠償")
+    assert total == 0
+    
+    hits, total = index.search("過失 損害")
+    assert total == 1
+    assert index.document(hits[0][0]) == ("CIVIL", 1, "第2条")
+    
+    hits, total = index.search("民法")
+    assert index.document(hits[0][0])[1] == TITLE_POSITION
+    
+    assert index.search("者は")[1] == 2
+    assert index.search("者は", law_type="Act")[1] == 1
+
+
+def test_single_character_query(index):
+    """1文字の語はその文字を含む条文・法令名に一致する"""
+    hits, total = index.search("法")
+    assert total == 2
+    assert {index.document(doc_id)[0] for doc_id, _ in hits} == {"CIVIL", "PENAL"}
+    assert all(index.document(doc_id)[1] == TITLE_POSITION for doc_id, _ in hits)
+    
+    assert index.search("権")[1] == 2
+    assert index.search("権 侵害")[1] == 1
+    assert index.search("権", law_type="CabinetOrder")[1] == 0
+    assert index.search("鯨") == ([], 0)
+    
+    # 追加した法令も1文字の検索に反映される
+    index.add_laws([make_law("LABOR", "労働基準法", ["労働条件は、労働者が人たるに値する生活を営むための必要を充たすべきものでなければならない。"])])
+    assert index.search("法")[1] == 3
+
+
+def test_incremental_update_and_persistence(index, tmp_path):
+    """更新・削除した法令は古い文書が検索対象から外れ、保存後も同じ結果になる"""
+    index.add_laws([make_law("CIVIL", "民法", ["不法行為による損害賠償の請求権は、時効によって消滅する。"])])
+    assert index.search("過失")[1] == 0
+    assert index.search("不法行為")[1] == 1
+    
+    index.remove_laws(["PENAL"])
+    assert index.search("懲役")[1] == 0
+    assert index.law_count == 1
+    
+    path = str(tmp_path / "index.pkl")
+    index.save(path)
+    restored = SearchIndex.load(path)
+    assert restored.search("時効 消滅") == index.search("時効 消滅")
+
+
+def test_snippet_highlights_normalized_match():
+    """全角・半角の違いを吸収して元のテキストの一致箇所を強調する"""
+    snippet = make_snippet("前項の規定は、ＡＢＣ株式会社<甲>に適用する。", ["abc"])
+    assert snippet == "前項の規定は、<mark>ＡＢＣ</mark>株式会社&lt;甲&gt;に適用する。"
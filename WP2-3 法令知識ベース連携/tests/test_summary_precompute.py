@@ -0,0 +1,77 @@
+"""
+要約の事前生成の単体テスト（SQLite で実行）
+"""
+import pytest
+from app.services.cache_service import CacheService
+from app.services.law_popularity import LawPopularity, article_ref
+from app.services.law_repository import article_hash
+from app.services.summarizer import ArticleSummarizer
+from app.services.summary_precompute import popular_articles, precompute_summaries
+
+ARTICLES = [
+    {"article_no": "第1条", "heading": "基本原則", "text": "私権は、公共の福祉に適合しなければならない。"},
+    {"article_no": "第2条", "heading": "解釈の基準", "text": "この法律は、個人の尊厳と両性の本質的平等を旨として、解釈しなければならない。"}
+]
+
+
+@pytest.fixture
+def summarizer(generation_cache, gemini):
+    """Redis 未接続・インメモリ SQLite のキャッシュを使う要約サービス"""
+    summarizer = ArticleSummarizer(cache=generation_cache)
+    summarizer.gemini_client = gemini
+    return summarizer
+
+
+async def targets():
+    for article in ARTICLES:
+        yield "CIVIL_LAW_001", article
+
+
+async def run(summarizer, **kwargs):
+    return await precompute_summaries(
+        targets(), summarizer, max_tokens=0, concurrency=1, requests_per_minute=0, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_precompute_stops_at_budget_and_resumes(summarizer):
+    """予算に達したら止まり、再実行すると生成済みの要約を読み飛ばして続きを生成する"""
+    stats = await run(summarizer, max_requests=4)
+    assert stats["generated"] == 4
+    assert stats["stopped"] == "budget"
+    
+    stats = await run(summarizer, max_requests=0)
+    assert stats["cached"] == 4
+    assert stats["generated"] == 2
+    assert stats["stopped"] is None
+    assert summarizer.gemini_client.calls == 6
+    
+    # /summarize と同じキーで参照できる
+    cached = await summarizer.summarize_article(
+        ARTICLES[1]["text"], "2", style="for_layperson", law_id="CIVIL_LAW_001",
+        content_hash=article_hash(ARTICLES[1])
+    )
+    assert cached["original_reference"]["law_id"] == "CIVIL_LAW_001"
+    assert summarizer.gemini_client.calls == 6
+
+
+@pytest.mark.asyncio
+async def test_estimate_does_not_call_gemini(summarizer):
+    """見積もりでは Gemini を呼ばずに全スタイル分のトークン数と費用を算出する"""
+    stats = await run(summarizer, max_requests=1, dry_run=True)
+    
+    assert summarizer.gemini_client.calls == 0
+    assert stats["requests"] == len(ARTICLES) * 3
+    assert stats["output_tokens"] == len(ARTICLES) * 3 * 50
+    assert stats["estimated_cost_usd"] > 0
+
+
+@pytest.mark.asyncio
+async def test_popular_articles_ranked_by_access_count():
+    """条文単位の参照回数の降順に対象条文を並べる"""
+    popularity = LawPopularity(cache_service=CacheService(), key="test:article_popularity")
+    for ref, count in ((article_ref("CIVIL_LAW_001", "709"), 3), (article_ref("CIVIL_LAW_001", "1"), 1), (article_ref("PENAL_LAW_001", "199"), 2)):
+        for _ in range(count):
+            popularity.record(ref)
+    
+    assert await popular_articles(popularity, 2) == [("CIVIL_LAW_001", "709"), ("PENAL_LAW_001", "199")]
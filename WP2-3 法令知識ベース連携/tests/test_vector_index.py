@@ -0,0 +1,115 @@
+"""
+ベクトルインデックス（HNSW）と意味検索の単体テスト
+"""
+import numpy as np
+import pytest
+from app.services.article_embedding import encode_vector
+from app.services.law_snapshot import LawSnapshotStore
+from app.services.search_service import LawSearchService
+from app.services.semantic_search import SemanticSearchService, rebuild_vector_index
+from app.services.vector_index import VectorIndex, normalize_vectors
+
+
+def embedding_like_vectors(count, dimension=32, latent=6, seed=0):
+    """低次元の部分空間に分布する正規化済みベクトル（文の埋め込みに近い分布）"""
+    projection = np.random.default_rng(99).normal(size=(latent, dimension))
+    return normalize_vectors(np.random.default_rng(seed).normal(size=(count, latent)) @ projection)
+
+
+class QueryEmbedder:
+    """クエリ文を固定ベクトルに変換する埋め込みモデル"""
+    
+    model_name = "test-model"
+    
+    def __init__(self, vector):
+        self.vector = vector
+    
+    def encode(self, texts):
+        return np.array([self.vector for _ in texts], dtype=np.float32)
+
+
+def test_hnsw_recall_and_filters(tmp_path):
+    """HNSW の結果が全件探索とほぼ一致し、法令・法令種別で絞り込める"""
+    vectors = embedding_like_vectors(3000)
+    law_ids = [f"LAW{i // 30:03d}" for i in range(3000)]
+    laws = {law_id: {"title": law_id, "law_type": "Act" if int(law_id[3:]) % 4 else "CabinetOrder"} for law_id in law_ids}
+    VectorIndex.build(
+        str(tmp_path), vectors, law_ids, [i % 30 for i in range(3000)], [str(i % 30 + 1) for i in range(3000)],
+        list(range(1, 3001)), laws, m=8, ef_construction=64
+    )
+    index = VectorIndex.load(str(tmp_path))
+    
+    queries = embedding_like_vectors(50, seed=1)
+    stored = np.asarray(index.graph.vectors)
+    recall = 0.0
+    for query in queries:
+        truth = set(np.argsort(-(stored @ query))[:10].tolist())
+        recall += len(truth & {row for row, _ in index.search(query, 10)}) / 10
+    assert recall / len(queries) >= 0.95
+    
+    results = index.search(queries[0], 5, law_id="LAW007")
+    assert len(results) == 5
+    assert {index.row(row)["law_id"] for row, _ in results} == {"LAW007"}
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+    
+    results = index.search(queries[0], 10, law_type="CabinetOrder")
+    assert {index.row(row)["law_type"] for row, _ in results} == {"CabinetOrder"}
+    
+    row = index.find("LAW007", "3")
+    assert index.row(row)["article_id"] == 7 * 30 + 3
+    assert row not in [r for r, _ in index.search(index.vector(row), 5, exclude=row)]
+
+
+def test_rebuild_keeps_previous_index(tmp_path):
+    """作り直しても直前のインデックスは残り、読み込み中のプロセスが参照し続けられる"""
+    def build():
+        vectors = embedding_like_vectors(20)
+        VectorIndex.build(
+            str(tmp_path), vectors, ["LAW"] * 20, list(range(20)), [str(i + 1) for i in range(20)],
+            list(range(1, 21)), {"LAW": {"title": "LAW", "law_type": "Act"}}, m=4, ef_construction=16
+        )
+        return (tmp_path / "CURRENT").read_text(encoding="utf-8")
+    
+    build()
+    second, third = build(), build()
+    builds = sorted(path.name for path in tmp_path.iterdir() if path.name.startswith("index-"))
+    assert builds == [second, third]
+    assert len(VectorIndex.load(str(tmp_path))) == 20
+
+
+@pytest.mark.asyncio
+async def test_rebuild_and_semantic_search(repository, tmp_path):
+    """知識ベースの埋め込みからインデックスを作り、クエリ文で条文を検索できる"""
+    await repository.save_law("CIVIL", {"title": "民法", "law_type": "Act", "articles": [
+        {"article_no": "第1条", "text": "私権は、公共の福祉に適合しなければならない。"},
+        {"article_no": "第2条", "text": "この法律は、個人の尊厳を旨として解釈しなければならない。"}
+    ]})
+    await repository.save_law("PENAL", {"title": "刑法", "law_type": "Act", "articles": [
+        {"article_no": "第1条", "text": "この法律は、日本国内において罪を犯したすべての者に適用する。"}
+    ]})
+    articles = await repository.get_articles_to_embed("test-model", 0, 10)
+    vectors = np.eye(3, 4, dtype=np.float32)
+    await repository.save_embeddings([
+        {
+            "article_id": article["article_id"], "embedding": encode_vector(vector), "dimension": 4,
+            "dtype": "float16", "content_hash": article["content_hash"], "model_name": "test-model"
+        }
+        for article, vector in zip(articles, vectors)
+    ])
+    
+    assert await rebuild_vector_index(repository, str(tmp_path), "test-model") == 3
+    
+    service = SemanticSearchService(
+        backend="hnsw",
+        index_dir=str(tmp_path),
+        search=LawSearchService(repository=repository, snapshots=LawSnapshotStore(str(tmp_path / "snapshots"))),
+        embedder=QueryEmbedder([0.1, 1.0, 0.0, 0.0])
+    )
+    result = await service.search_similar(query="個人の尊厳", k=2)
+    
+    assert [hit["article_no"] for hit in result["hits"]] == ["第2条", "第1条"]
+    assert result["hits"][0]["title"] == "民法"
+    assert result["hits"][0]["snippet"].startswith("この法律は、個人の尊厳")
+    
+    result = await service.search_similar(query="個人の尊厳", law_id="PENAL", k=2)
+    assert [hit["law_id"] for hit in result["hits"]] == ["PENAL"]